@@ -4,141 +4,393 @@
 #3 -- error in list checker (problem with adding or checking for airplanes)
 #4 -- list of airplanes is empty. Either initialization went wrong or append didn't work properly
 
-from typing import List, Optional
+import sys
+import threading
+from dataclasses import dataclass
 from decimal import Decimal
-from utils import get_connection
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
+import metrics
+from utils import connection_scope, get_connection
+from upgrade_config import UPGRADE_CODE
+from session_helpers.catalog import get_model_catalog
+from session_helpers.economy import eco_multiplier_for_level
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Toistuvat merkkijonot (status, mallikoodi, kenttä) jaetaan koneiden kesken."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(frozen=True, slots=True)
 class Airplane:
-    def __init__(
-        self,
-        aircraft_id: int,
-        model_code: str,
-        base_level: int,
-        current_airport_ident: str,
-        registration: str,
-        nickname: Optional[str],
-        acquired_day: int,
-        purchase_price: Decimal,
-        condition_percent: int,
-        status: str,
-        hours_flown: int,
-        sold_day: Optional[int],
-        sale_price: Optional[Decimal],
-        save_id: int,
-        base_id: Optional[int],
-        model_name: Optional[str] = None,
-    ):
-        self.aircraft_id = aircraft_id
-        self.model_code = model_code
-        self.base_level = base_level
-        self.current_airport_ident = current_airport_ident
-        self.registration = registration
-        self.nickname = nickname
-        self.acquired_day = acquired_day
-        self.purchase_price = purchase_price
-        self.condition_percent = condition_percent
-        self.status = status
-        self.hours_flown = hours_flown
-        self.sold_day = sold_day
-        self.sale_price = sale_price
-        self.save_id = save_id
-        self.base_id = base_id
-        # Lisäattribuutteja/takav. yhteensopivuus
-        self.model_name = model_name
-        self.ident = current_airport_ident  # alias vanhalle nimelle
-        self.speed_day = None               # ei saraketta kannassa; pidetään attribuutti
+    """
+    Yksi aircraft-rivi muuttumattomana tietueena (__slots__, ei __dict__:iä).
+    Muutokset tehdään kantaan ja tietue korvataan FleetStore.refresh():llä.
+    """
+    aircraft_id: int
+    model_code: str
+    base_level: int
+    current_airport_ident: str
+    registration: str
+    nickname: Optional[str]
+    acquired_day: int
+    purchase_price: Decimal
+    condition_percent: int
+    status: str
+    hours_flown: int
+    sold_day: Optional[int]
+    sale_price: Optional[Decimal]
+    save_id: int
+    base_id: Optional[int]
+    model_name: Optional[str] = None
+    category: Optional[str] = None
+    eco_fee_multiplier: Optional[Decimal] = None
+    eco_level: int = 0
+
+    # Takav. yhteensopivuus
+    @property
+    def ident(self) -> str:
+        """Alias vanhalle nimelle (current_airport_ident)."""
+        return self.current_airport_ident
+
+    @property
+    def speed_day(self) -> None:
+        """Ei saraketta kannassa; pidetään attribuutti."""
+        return None
+
+    @property
+    def effective_eco(self) -> Optional[Decimal]:
+        """Efektiivinen ECO-kerroin (mallin perus-ECO + päivitystaso)."""
+        if self.eco_fee_multiplier is None:
+            return None
+        return eco_multiplier_for_level(Decimal(str(self.eco_fee_multiplier)), self.eco_level)
+
+    @classmethod
+    def from_row(cls, r: dict) -> "Airplane":
+        """Muodostaa tietueen kantarivistä (dictionary=True)."""
+        eco = r.get("eco_fee_multiplier")
+        return cls(
+            aircraft_id=int(r["aircraft_id"]),
+            model_code=_intern(r["model_code"]),
+            base_level=int(r.get("base_level") or 0),
+            current_airport_ident=_intern(r["current_airport_ident"]),
+            registration=r["registration"],
+            nickname=r.get("nickname"),
+            acquired_day=int(r["acquired_day"] or 0),
+            purchase_price=Decimal(str(r["purchase_price"] or "0")),
+            condition_percent=int(r["condition_percent"] or 0),
+            status=_intern(r["status"]),
+            hours_flown=int(r["hours_flown"] or 0),
+            sold_day=(int(r["sold_day"]) if r.get("sold_day") is not None else None),
+            sale_price=(Decimal(str(r["sale_price"])) if r.get("sale_price") is not None else None),
+            save_id=int(r["save_id"]),
+            base_id=(int(r["base_id"]) if r.get("base_id") is not None else None),
+            model_name=_intern(r.get("model_name")),
+            category=_intern(r.get("category")),
+            eco_fee_multiplier=(Decimal(str(eco)) if eco is not None else None),
+            eco_level=int(r.get("eco_level") or 0),
+        )
 
+
+@dataclass(frozen=True, slots=True)
 class AircraftModel:
-    def __init__(
-        self,
-        model_code: str,
-        manufacturer: str,
-        model_name: str,
-        purchase_price: Decimal,
-        base_cargo_kg: int,
-        range_km: int,
-        cruise_speed_kts: int,
-        category: str,
-        upkeep_price: Decimal,
-        efficiency_score: int,
-        co2_kg_per_km: Decimal,
-        eco_class: str,
-        eco_free_multiplier: Decimal,
-    ):
-        self.model_code = model_code
-        self.manufacturer = manufacturer
-        self.model_name = model_name
-        self.purchase_price = purchase_price
-        self.base_cargo_kg = base_cargo_kg
-        self.range_km = range_km
-        self.cruise_speed_kts = cruise_speed_kts
-        self.category = category
-        self.upkeep_price = upkeep_price
-        self.efficiency_score = efficiency_score
-        self.co2_kg_per_km = co2_kg_per_km
-        self.eco_class = eco_class
-        self.eco_free_multiplier = eco_free_multiplier
+    model_code: str
+    manufacturer: str
+    model_name: str
+    purchase_price: Decimal
+    base_cargo_kg: int
+    range_km: int
+    cruise_speed_kts: int
+    category: str
+    upkeep_price: Decimal
+    efficiency_score: int
+    co2_kg_per_km: Decimal
+    eco_class: str
+    eco_free_multiplier: Decimal
+
 
+@dataclass(frozen=True, slots=True)
 class AircraftUpgrade:
-    def __init__(self, aircraft_upgrade_id: int, aircraft_id: int, upgrade_code: str, level: int, installed_day: int):
-        self.aircraft_upgrade_id = aircraft_upgrade_id
-        self.aircraft_id = aircraft_id
-        self.upgrade_code = upgrade_code
-        self.level = level
-        self.installed_day = installed_day
+    aircraft_upgrade_id: int
+    aircraft_id: int
+    upgrade_code: str
+    level: int
+    installed_day: int
 
-# Globaali lista helppoon selailuun/tulostukseen
-Aircrafts: List[Airplane] = []
 
-def init_airplanes(save_id: int, include_sold: bool = False) -> List[Airplane]:
-    """
-    Lataa save_id:tä vastaavat koneet kannasta ja täyttää Aircrafts-listan.
+_FLEET_COLUMNS = """
+    a.aircraft_id, a.model_code, a.base_level, a.current_airport_ident, a.registration,
+    a.nickname, a.acquired_day, a.purchase_price, a.condition_percent, a.status,
+    a.hours_flown, a.sold_day, a.sale_price, a.save_id, a.base_id,
+    (SELECT MAX(u.level) FROM aircraft_upgrades u
+      WHERE u.aircraft_id = a.aircraft_id AND u.upgrade_code = %s) AS eco_level
+"""
+
+
+def _query_fleet_rows(save_id: int, aircraft_ids: Optional[List[int]] = None,
+                      include_sold: bool = False) -> List[dict]:
+    """Hakee koneet ECO-tasolla yhdellä kyselyllä; mallitiedot tulevat konemalliluettelosta."""
+    where = ["a.save_id = %s"]
+    params: list = [UPGRADE_CODE, save_id]
+    if not include_sold:
+        where.append("(a.sold_day IS NULL OR a.sold_day = 0)")
+    if aircraft_ids is not None:
+        where.append(f"a.aircraft_id IN ({','.join(['%s'] * len(aircraft_ids))})")
+        params.extend(aircraft_ids)
+    query = f"""
+        SELECT {_FLEET_COLUMNS}
+        FROM aircraft a
+        WHERE {' AND '.join(where)}
+        ORDER BY a.aircraft_id ASC
     """
-    global Aircrafts
     yhteys = get_connection()
     kursori = yhteys.cursor(dictionary=True)
     try:
-        where_sold = "" if include_sold else "AND a.sold_day IS NULL"
-        query = f"""
-            SELECT
-                a.aircraft_id, a.model_code, a.base_level, a.current_airport_ident, a.registration,
-                a.nickname, a.acquired_day, a.purchase_price, a.condition_percent, a.status,
-                a.hours_flown, a.sold_day, a.sale_price, a.save_id, a.base_id,
-                am.model_name
-            FROM aircraft a
-            JOIN aircraft_models am ON a.model_code = am.model_code
-            WHERE a.save_id = %s {where_sold}
-            ORDER BY a.aircraft_id ASC
-        """
-        kursori.execute(query, (save_id,))
+        kursori.execute(query, tuple(params))
         rows = kursori.fetchall() or []
+    finally:
+        kursori.close()
+        yhteys.close()
 
-        Aircrafts = []
-        for r in rows:
-            plane = Airplane(
-                aircraft_id=r["aircraft_id"],
-                model_code=r["model_code"],
-                base_level=int(r["base_level"] or 0),
-                current_airport_ident=r["current_airport_ident"],
-                registration=r["registration"],
-                nickname=r.get("nickname"),
-                acquired_day=int(r["acquired_day"] or 0),
-                purchase_price=Decimal(str(r["purchase_price"] or "0")),
-                condition_percent=int(r["condition_percent"] or 0),
-                status=r["status"],
-                hours_flown=int(r["hours_flown"] or 0),
-                sold_day=(int(r["sold_day"]) if r.get("sold_day") is not None else None),
-                sale_price=(Decimal(str(r["sale_price"])) if r.get("sale_price") is not None else None),
-                save_id=int(r["save_id"]),
-                base_id=(int(r["base_id"]) if r.get("base_id") is not None else None),
-                model_name=r.get("model_name"),
-            )
-            Aircrafts.append(plane)
-        return Aircrafts
+    catalog = get_model_catalog()
+    out = []
+    for r in rows:
+        model = catalog.get(r["model_code"])
+        if model is None:
+            continue
+        row = dict(r)
+        row["model_name"] = model.get("model_name")
+        row["category"] = model.get("category")
+        row["eco_fee_multiplier"] = model.get("eco_fee_multiplier")
+        out.append(row)
+    return out
+
+
+def _read_fleet_version(save_id: int) -> int:
+    """game_saves.fleet_version: kasvaa jokaisen konemuutoksen jälkeen (FleetStore.refresh)."""
+    yhteys = get_connection()
+    kursori = yhteys.cursor()
+    try:
+        kursori.execute("SELECT fleet_version FROM game_saves WHERE save_id = %s", (save_id,))
+        row = kursori.fetchone()
+        return int(row[0] or 0) if row else 0
     finally:
         kursori.close()
         yhteys.close()
 
+
+def bump_fleet_version(kursori, save_id: int) -> None:
+    """
+    Kasvattaa game_saves.fleet_versionia kirjoittajan avoimessa transaktiossa,
+    jolloin versio ja konemuutos commitoidaan yhdessä. GameSessionin kirjoittajat
+    käyttävät FleetStore.bump_version()-metodia, joka palauttaa myös uuden version.
+    """
+    kursori.execute(
+        "UPDATE game_saves SET fleet_version = fleet_version + 1 WHERE save_id = %s", (save_id,)
+    )
+
+
+# Lukujen osumat: ladattu store vs. koko laivaston lataus kannasta
+_fleet_stats = metrics.cache_stats("fleet_store")
+
+
+class FleetStore:
+    """
+    Yhden tallennuksen myymättömät koneet muistissa, indeksoituna
+    id:n, statuksen ja sijainnin mukaan.
+
+    - Ladataan laiskasti ensimmäisellä lukukerralla (yksi kysely)
+    - refresh(ids) lukee kannasta vain muuttuneet rivit (päivänvaihto, ostot, korjaukset)
+    - Lataamaton store ei tee refresh-kyselyitä, joten kirjoituspolut eivät maksa
+      mitään, jos laivastonäkymiä ei käytetä
+    - Store on prosessikohtainen. Muut prosessit (useampi API-worker) huomaavat
+      muutokset game_saves.fleet_version-sarakkeesta: kirjoittaja kasvattaa sitä
+      samassa transaktiossa kuin konemuutoksen (bump_version) ja antaa uuden
+      version refresh()-kutsulle. GameSession vertaa sitä ladattuun versioon
+      lukiessaan game_saves-rivin (check_version), muut lukijat kutsuvat validate()
+    """
+
+    def __init__(self, save_id: int):
+        self.save_id = int(save_id)
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._version = 0
+        self._by_id: Dict[int, Airplane] = {}
+        self._by_status: Dict[str, Set[int]] = {}
+        self._by_airport: Dict[str, Set[int]] = {}
+
+    # ---------- Lataus ----------
+
+    def load(self) -> "FleetStore":
+        """Lataa koko laivaston kannasta (korvaa nykyisen sisällön)."""
+        # Versio ennen rivejä: välissä tullut muutos johtaa ylimääräiseen lataukseen, ei vanhaan dataan
+        version = _read_fleet_version(self.save_id)
+        rows = _query_fleet_rows(self.save_id)
+        with self._lock:
+            self._version = version
+            self._by_id.clear()
+            self._by_status.clear()
+            self._by_airport.clear()
+            for r in rows:
+                self._put(Airplane.from_row(r))
+            self._loaded = True
+        return self
+
+    def bump_version(self, kursori) -> Optional[int]:
+        """
+        Kasvattaa fleet_versionia kirjoittajan transaktiossa (ennen committia).
+        Palauttaa uuden version refresh()-kutsulle; lataamattomalle storelle None
+        ilman lukukyselyä.
+        """
+        bump_fleet_version(kursori, self.save_id)
+        if not self._loaded:
+            return None
+        kursori.execute("SELECT fleet_version FROM game_saves WHERE save_id = %s", (self.save_id,))
+        row = kursori.fetchone()
+        if not row:
+            return None
+        return int((row["fleet_version"] if isinstance(row, dict) else row[0]) or 0)
+
+    def refresh(self, aircraft_ids: Iterable[int], version: Optional[int]) -> None:
+        """
+        Päivittää annetut koneet kannasta commitin jälkeen; myydyt/poistetut
+        pudotetaan pois. version on saman transaktion bump_version()-arvo.
+        """
+        if not self._loaded:
+            return
+        if version is None or version != self._version + 1:
+            # Store ladattiin kesken kirjoituksen tai toinen prosessi muutti laivastoa
+            self.invalidate()
+            return
+        ids = sorted({int(a) for a in aircraft_ids})
+        rows = _query_fleet_rows(self.save_id, ids) if ids else []
+        with self._lock:
+            self._version = version
+            for aid in ids:
+                self._drop(aid)
+            for r in rows:
+                self._put(Airplane.from_row(r))
+
+    def check_version(self, version: int) -> "FleetStore":
+        """Merkitsee storen vanhentuneeksi, jos kannan fleet_version poikkeaa ladatusta."""
+        if self._loaded and int(version or 0) != self._version:
+            self.invalidate()
+        return self
+
+    def validate(self) -> "FleetStore":
+        """check_version() kannasta luetulla versiolla (yksi pääavainhaku, jos store on ladattu)."""
+        if self._loaded:
+            self.check_version(_read_fleet_version(self.save_id))
+        return self
+
+    def invalidate(self) -> None:
+        """Merkitsee storen vanhentuneeksi; seuraava luku lataa kaiken uudelleen."""
+        with self._lock:
+            self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    # ---------- Haut ----------
+
+    def get(self, aircraft_id: int) -> Optional[Airplane]:
+        self._ensure_loaded()
+        return self._by_id.get(int(aircraft_id))
+
+    def all(self) -> List[Airplane]:
+        """Kaikki koneet aircraft_id-järjestyksessä."""
+        self._ensure_loaded()
+        with self._lock:
+            return [self._by_id[aid] for aid in sorted(self._by_id)]
+
+    def by_status(self, status: str) -> List[Airplane]:
+        self._ensure_loaded()
+        with self._lock:
+            return [self._by_id[aid] for aid in sorted(self._by_status.get(status, ()))]
+
+    def at_airport(self, ident: str) -> List[Airplane]:
+        self._ensure_loaded()
+        with self._lock:
+            return [self._by_id[aid] for aid in sorted(self._by_airport.get(ident, ()))]
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._by_id)
+
+    # ---------- Sisäiset ----------
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            _fleet_stats.hit()
+        else:
+            _fleet_stats.miss()
+            self.load()
+
+    def _put(self, plane: Airplane) -> None:
+        self._by_id[plane.aircraft_id] = plane
+        self._by_status.setdefault(plane.status, set()).add(plane.aircraft_id)
+        self._by_airport.setdefault(plane.current_airport_ident, set()).add(plane.aircraft_id)
+
+    def _drop(self, aircraft_id: int) -> None:
+        old = self._by_id.pop(aircraft_id, None)
+        if old is None:
+            return
+        for index, key in ((self._by_status, old.status), (self._by_airport, old.current_airport_ident)):
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.discard(aircraft_id)
+                if not bucket:
+                    del index[key]
+
+
+# Prosessin laajuiset storet tallennuksittain (API luo GameSessionin per pyyntö).
+# Avaimena myös connection_scope(), jotta haarautetun kannan (save_fork) samat
+# save_id:t eivät sekoitu oikeisiin.
+_FLEET_STORES: Dict[Tuple[Optional[str], int], FleetStore] = {}
+_FLEET_STORES_LOCK = threading.Lock()
+
+
+def get_fleet_store(save_id: int) -> FleetStore:
+    """
+    Palauttaa tallennuksen FleetStoren (luodaan tarvittaessa, ladataan laiskasti).
+    Ei tarkista versiota: GameSessionin ulkopuoliset lukijat kutsuvat validate().
+    """
+    key = (connection_scope(), int(save_id))
+    with _FLEET_STORES_LOCK:
+        store = _FLEET_STORES.get(key)
+        if store is None:
+            store = _FLEET_STORES[key] = FleetStore(key[1])
+        return store
+
+
+def invalidate_fleet_store(save_id: Optional[int] = None) -> None:
+    """Pudottaa aktiivisen kannan tallennuksen storen (tai kaikki, jos save_id puuttuu)."""
+    with _FLEET_STORES_LOCK:
+        if save_id is None:
+            scope = connection_scope()
+            for key in [k for k in _FLEET_STORES if k[0] == scope]:
+                del _FLEET_STORES[key]
+        else:
+            _FLEET_STORES.pop((connection_scope(), int(save_id)), None)
+
+
+# Globaali lista helppoon selailuun/tulostukseen
+Aircrafts: List[Airplane] = []
+
+def init_airplanes(save_id: int, include_sold: bool = False) -> List[Airplane]:
+    """
+    Lataa save_id:tä vastaavat koneet ja täyttää Aircrafts-listan.
+    Myymättömät koneet luetaan FleetStoresta (ei uutta kyselyä, jos store on ladattu).
+    """
+    global Aircrafts
+    if include_sold:
+        Aircrafts = [Airplane.from_row(r) for r in _query_fleet_rows(save_id, include_sold=True)]
+    else:
+        Aircrafts = get_fleet_store(save_id).validate().all()
+    return Aircrafts
+
 def print_aircrafts():
     """
     Tulostaa Aircrafts-listalla olevat koneet.
@@ -0,0 +1,97 @@
+"""
+api_json.py - API-vastausten JSON-sarjallistus ja pakkaus
+=========================================================
+- AfcJSONProvider: Flaskin JSON-provideri, joka sarjallistaa Decimalin ja
+  Moneyn tasamuotoisina merkkijonoina ("1234.50"), datetime/date ISO-muodossa
+  ja dataclassit (Airplane, FlightEvent) sanakirjoina samalla läpikäynnillä.
+  Reittien ei tarvitse muuntaa kenttiä käsin ennen jsonifyä.
+- init_compression: pakkaa tekstivastaukset (JSON, HTML, JS, CSS) gzipillä
+  tai brotlilla (jos asennettu) Accept-Encodingin mukaan, kun vastaus on
+  vähintään COMPRESS_MIN_BYTES. Valmiiksi pakatut ja send_file-vastaukset
+  jätetään ennalleen.
+"""
+
+import dataclasses
+import gzip
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from flask import Flask, Response, request
+from flask.json.provider import DefaultJSONProvider
+
+from build_static import brotli, pick_encoding
+from session_helpers.money import Money
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6          # nopeus/koko-kompromissi dynaamisille vastauksille
+BROTLI_QUALITY = 4
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "image/svg+xml",
+}
+
+
+class AfcJSONProvider(DefaultJSONProvider):
+    """Decimal/Money merkkijonoina, päivämäärät ISO-muodossa, tiivis tuloste."""
+
+    ensure_ascii = False
+    sort_keys = False
+    compact = True
+
+    @staticmethod
+    def default(o: Any) -> Any:
+        if isinstance(o, Money):
+            return str(o)
+        if isinstance(o, Decimal):
+            return format(o, "f")
+        if isinstance(o, datetime):
+            return o.isoformat()
+        if isinstance(o, date):
+            return o.isoformat()
+        if dataclasses.is_dataclass(o) and not isinstance(o, type):
+            return dataclasses.asdict(o)
+        return DefaultJSONProvider.default(o)
+
+
+def _available_encodings():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress_response(response: Response, min_bytes: int = COMPRESS_MIN_BYTES) -> Response:
+    """Pakkaa vastauksen rungon, jos se on pakattavaa tekstiä ja tarpeeksi suuri."""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < min_bytes:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = pick_encoding(request.headers.get("Accept-Encoding", ""), _available_encodings())
+    if encoding == "br":
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+    elif encoding == "gzip":
+        response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+    else:
+        return response
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(app: Flask, min_bytes: int = COMPRESS_MIN_BYTES) -> None:
+    """Asettaa JSON-providerin ja pakkauksen Flask-sovellukselle."""
+    app.json = AfcJSONProvider(app)
+    app.after_request(lambda response: compress_response(response, min_bytes))
@@ -1,19 +1,41 @@
 """Flask-pohjainen rajapinta"""
 
+import functools
 import os
 import random
+from contextlib import contextmanager
 from decimal import Decimal
 from typing import Any, Dict, List, Optional
 
-from flask import Flask, jsonify, request, send_from_directory
+import mimetypes
 
+from flask import Flask, jsonify, request, send_file, send_from_directory
+
+import api_json
+import build_static
+import metrics
+import request_profiler
+import sql_accounting
+from airplane import Airplane, get_fleet_store, invalidate_fleet_store
+from event_system import classify_event, get_events_for_range
 from game_session import GameSession
+from save_executor import SaveBusy, save_writer, save_writers
+from save_fork import ForkConflict, ForkError, create_fork, discard_fork, get_fork, list_forks
 from utils import get_connection
 from session_helpers.common import _to_dec
+from session_helpers.money import Money
 from upgrade_config import SURVIVAL_TARGET_DAYS
 
 ACTIVE_GAME_SESSION: GameSession = None
 app = Flask(__name__, static_folder='static')
+# Reittien kestot/virheet ja GET /metrics (ks. metrics.py); ensin, jotta kesto sisältää pakkauksen
+metrics.init_app(app)
+# Decimal/Money-tietoinen JSON ja vastausten pakkaus (ks. api_json.py)
+api_json.init_app(app)
+# Pyyntökohtainen profilointi, vain AFC_PROFILING=1 (ks. request_profiler.py)
+request_profiler.init_app(app)
+# SQL-lauseiden kirjanpito pyynnöittäin (AFC_SQL_ACCOUNTING=1 tai debug-tila)
+sql_accounting.init_app(app)
 # Tämä kertoo minkä tallennuksen tietoja API lukee; oletuksena käytetään slot 1:tä.
 ACTIVE_SAVE_ID = int(os.environ.get("AFC_ACTIVE_SAVE_ID", 1))
 # Näin monta tarjousta pyydetään kerralla GameSessionilta.
@@ -21,29 +43,76 @@ DEFAULT_TASK_OFFER_COUNT = 5
 
 #Lentokoneita varten funktiot
 from session_helpers import (
-    fetch_player_aircrafts_with_model_info,
-    get_current_aircraft_upgrade_state,
     calc_aircraft_upgrade_cost,
     apply_aircraft_upgrade,
-    get_effective_eco_for_aircraft,
+    get_model_catalog,
     fetch_owned_bases,
-    fetch_base_current_level_map,
     insert_base_upgrade,
     get_base_capacity_info,  # ADD THIS
+    fetch_daily_stats,
+    downsample_history,
 )
 
 from upgrade_config import REPAIR_COST_PER_PERCENT
 # ---------- Apufunktiot ----------
 
 def _decimal_to_string(value: Any) -> Optional[str]:
-    """Palauttaa Decimal-arvon tasamuotoisena tekstinä."""
+    """Palauttaa Decimal- tai Money-arvon tasamuotoisena tekstinä."""
     if value is None:
         return None
+    if isinstance(value, Money):
+        return str(value)
     if isinstance(value, Decimal):
         return format(value, "f")
     return str(value)
 
 
+def _serialized_save(view):
+    """
+    Tallennusta muuttava reitti: ajetaan tallennuksen kirjoitusjonossa
+    (save_executor), jotta rinnakkaiset kutsut eivät kilpaile samasta päivästä/kassasta.
+    Tallennus on reitin save_id-parametri tai aktiivinen tallennus.
+
+    Aktiivinen tallennus vaihtuu vain sen kirjoitusvuorossa (_active_save_switch),
+    joten vuoron aikana ACTIVE_SAVE_ID pysyy samana koko pyynnön ajan. Jos se
+    vaihtui vuoroa odottaessa, jonotetaan uuden aktiivisen tallennuksen vuoroon.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            if "save_id" in kwargs:
+                with save_writer(kwargs["save_id"]):
+                    return view(*args, **kwargs)
+            while True:
+                save_id = ACTIVE_SAVE_ID
+                with save_writer(save_id):
+                    if save_id == ACTIVE_SAVE_ID:
+                        return view(*args, **kwargs)
+        except SaveBusy as e:
+            return jsonify({"virhe": str(e)}), 409
+    return wrapper
+
+
+@contextmanager
+def _active_save_switch(new_save_id: int):
+    """
+    Aktiivisen tallennuksen vaihto: with-lohko ajetaan sekä nykyisen että uuden
+    tallennuksen kirjoitusvuorossa (save_writers, id-järjestyksessä), jotta
+    vanhan tallennuksen keskeneräinen kirjoittaja ei näe ACTIVE_SAVE_ID:n
+    vaihtuvan kesken pyynnön. Lohko asettaa ACTIVE_SAVE_ID:n itse.
+
+    Raises:
+        SaveBusy: Vuoroa ei saatu aikarajassa
+    """
+    while True:
+        old_save_id = ACTIVE_SAVE_ID
+        with save_writers(old_save_id, new_save_id):
+            # Toinen vaihto ehti ensin: otetaan vuoro uudelta aktiiviselta
+            if old_save_id == ACTIVE_SAVE_ID:
+                yield
+                return
+
+
 def _query_dicts(sql: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
     """Suorittaa kyselyn ja palauttaa tulokset sanakirjoina."""
     # Pidetään kyselyt yksinkertaisina: jokainen kutsu avaa ja sulkee oman yhteyden.
@@ -75,6 +144,16 @@ def _get_recent_events(limit: int = 10) -> List[Dict[str, Any]]:
         (ACTIVE_SAVE_ID, limit),
     )
 
+def _upgrade_cost_row(plane: Airplane) -> Dict[str, Any]:
+    """calc_aircraft_upgrade_cost odottaa rivin, jossa category ja ostohinnat."""
+    model = get_model_catalog().get(plane.model_code) or {}
+    return {
+        "category": plane.category,
+        "purchase_price_aircraft": plane.purchase_price,
+        "purchase_price_model": model.get("purchase_price"),
+    }
+
+
 def _fetch_one_dict(sql: str, params: tuple) -> Optional[Dict[str, Any]]:
     """Hakee yhden rivin (tai None)."""
     results = _query_dicts(sql, params)
@@ -88,8 +167,8 @@ def _serialize_task_row(row: Dict[str, Any]) -> Dict[str, Any]:
         "aircraft": row.get("registration"),
         "destination": row.get("dest_ident"),
         "payloadKg": row.get("payload_kg"),
-        "reward": _decimal_to_string(row.get("reward")),
-        "penalty": _decimal_to_string(row.get("penalty")),
+        "reward": row.get("reward"),
+        "penalty": row.get("penalty"),
         "deadlineDay": row.get("deadline_day"),
         "status": row.get("status"),
         "flight": {
@@ -109,32 +188,35 @@ def _serialize_offer(offer: Dict[str, Any]) -> Dict[str, Any]:
         "distance_km": int(offer.get("distance_km", 0)),
         "trips": offer.get("trips"),
         "total_days": offer.get("total_days"),
-        "reward": _decimal_to_string(offer.get("reward")),
-        "penalty": _decimal_to_string(offer.get("penalty")),
+        "reward": offer.get("reward"),
+        "penalty": offer.get("penalty"),
         "deadline": offer.get("deadline"),
     }
 
 
-def _fetch_plane(aircraft_id: int) -> Optional[Dict[str, Any]]:
-    """Hakee koneen perustiedot tarjousten luontia varten."""
+def _fetch_plane(aircraft_id: int, save_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Hakee koneen perustiedot tarjousten luontia varten (FleetStore + konemalliluettelo).
+    save_id: oletuksena aktiivinen tallennus; haaran session()-lohkossa haaran save_id,
+    jolloin store luetaan haaran kannasta.
+    """
     # Tarvitsemme koneen mallin ja sijainnin, jotta GameSession osaa antaa järkevät tarjoukset.
-    return _fetch_one_dict(
-        """
-        SELECT a.aircraft_id,
-               a.registration,
-               a.current_airport_ident,
-               a.status,
-               am.model_code,
-               am.model_name,
-               am.base_cargo_kg,
-               am.cruise_speed_kts,
-               am.eco_fee_multiplier
-        FROM aircraft a
-                 JOIN aircraft_models am ON am.model_code = a.model_code
-        WHERE a.save_id = %s AND a.aircraft_id = %s
-        """,
-        (ACTIVE_SAVE_ID, aircraft_id),
-    )
+    plane = get_fleet_store(ACTIVE_SAVE_ID if save_id is None else save_id).validate().get(aircraft_id)
+    if plane is None:
+        return None
+    model = get_model_catalog().get(plane.model_code) or {}
+    return {
+        "aircraft_id": plane.aircraft_id,
+        "registration": plane.registration,
+        "current_airport_ident": plane.current_airport_ident,
+        "status": plane.status,
+        "model_code": plane.model_code,
+        "model_name": plane.model_name,
+        "base_cargo_kg": model.get("base_cargo_kg"),
+        "cruise_speed_kts": model.get("cruise_speed_kts"),
+        "range_km": model.get("range_km"),
+        "eco_fee_multiplier": model.get("eco_fee_multiplier"),
+    }
 
 def _list_all_saves() -> List[Dict[str, Any]]:
     """Hakee listan tallennetuista peleistä game_saves-taulusta."""
@@ -172,8 +254,9 @@ def create_game():
         new_save_id = session.save_id
 
         # Aseta uusi peli aktiiviseksi
-        global ACTIVE_SAVE_ID
-        ACTIVE_SAVE_ID = new_save_id
+        with _active_save_switch(new_save_id):
+            global ACTIVE_SAVE_ID
+            ACTIVE_SAVE_ID = new_save_id
 
         return jsonify({
         "Viesti": "Uusi peli luotu",
@@ -183,6 +266,8 @@ def create_game():
         "cash": session.cash,
         }), 201
 
+    except SaveBusy as e:
+        return jsonify({"virhe": str(e)}), 409
     except Exception as e:
         app.logger.exception("Pelin luonti epäonnistui")
         return jsonify({"Virhe": f"Pelin luonti epäonnistui: str{e}"}), 500
@@ -191,20 +276,26 @@ def create_game():
 def load_game(save_id: int):
     """Lataa tallennuksen ja asettaa sen aktiiviseksi"""
     try:
-        # Tarkistetaan onko tallennus olemassa
-        session = GameSession.load(save_id)
+        # Vanhan ja uuden tallennuksen kirjoitusvuorossa (ks. _active_save_switch)
+        with _active_save_switch(save_id):
+            # Tarkistetaan onko tallennus olemassa
+            session = GameSession.load(save_id)
+            # Lataus on eksplisiittinen synkronointipiste: laivasto luetaan kannasta uudelleen
+            invalidate_fleet_store(save_id)
 
-        global ACTIVE_SAVE_ID
-        ACTIVE_SAVE_ID = save_id
+            global ACTIVE_SAVE_ID
+            ACTIVE_SAVE_ID = save_id
 
         return jsonify({
             "Viesti": f"Peli {save_id} ladattu onnistuneesti.",
             "save_id": ACTIVE_SAVE_ID,
             "player_name": session.player_name,
             "current_day": session.current_day,
-            "cash": _decimal_to_string(session.cash),
+            "cash": session.cash,
             "status": session.status,
         })
+    except SaveBusy as e:
+        return jsonify({"virhe": str(e)}), 409
     except ValueError as e:
         if "ei löytynyt" in str(e):
             return jsonify({"virhe": f"Tallennusta {save_id} ei löytynyt"}), 404
@@ -229,7 +320,7 @@ def get_active_game_info():
             "save_id": ACTIVE_SAVE_ID,
             "player_name": session.player_name,
             "current_day": session.current_day,
-            "cash": _decimal_to_string(session.cash),
+            "cash": session.cash,
             "home_base": home_base,
             "status": session.status,
             "difficulty": session.difficulty,
@@ -249,11 +340,6 @@ def get_game_stats():
     try:
         session = GameSession(save_id=ACTIVE_SAVE_ID)
         stats = session.get_end_game_stats()
-        
-        # Muunnetaan desimaalit stringeiksi
-        stats["final_balance"] = _decimal_to_string(stats.get("final_balance"))
-        stats["total_income"] = _decimal_to_string(stats.get("total_income"))
-        
         return jsonify(stats)
     except Exception as e:
         app.logger.exception("Tilastojen haku epäonnistui")
@@ -272,7 +358,7 @@ def save_game():
             "save_id": ACTIVE_SAVE_ID,
             "player_name": session.player_name,
             "current_day": session.current_day,
-            "cash": _decimal_to_string(session.cash),
+            "cash": session.cash,
             "status": session.status,
         })
     except ValueError as e:
@@ -291,8 +377,6 @@ def get_game_events():
         limit = request.args.get("limit", default=10, type=int)
         limit = max(1, min(limit, 100))
         events = _get_recent_events(limit)
-        for event in events:
-            event["created_at"] = str(event.get("created_at"))
         return jsonify({
             "events": events,
             "count" : len(events),
@@ -304,12 +388,17 @@ def get_game_events():
 #----------- Reitit: Päivän siirto ----------
 
 @app.post("/api/game/advance-day")
+@_serialized_save
 def advance_day():
-    """Siirtää peliä eteenpäin yhdellä päivällä."""
+    """
+    Siirtää peliä eteenpäin yhdellä päivällä.
+    ?timings=1 lisää vastaukseen vaiheiden kestot ja SQL-lauseiden määrät.
+    """
     try:
         session = GameSession(save_id=ACTIVE_SAVE_ID)
-        
-        result = session.advance_to_next_day(silent=True)
+        timings = request.args.get("timings", default=0, type=int) == 1
+
+        result = session.advance_to_next_day(silent=True, timings=timings)
         
         # Synkronoidaan session tietokantaan kirjoitettujen muutosten kanssa
         session._refresh_save_state()
@@ -317,13 +406,6 @@ def advance_day():
         # Lisää nykyinen päivä tulokseen
         result["day"] = session.current_day
         
-        # Muunnetaan Decimalit stringeiksi
-        result["earned"] = _decimal_to_string(result.get("earned"))
-        if result.get("bills"):
-            for bill in result["bills"]:
-                bill["amount"] = _decimal_to_string(bill.get("amount"))
-                bill["base"] = _decimal_to_string(bill.get("base"))
-        
         return jsonify(result)
     except Exception as e:
         app.logger.exception("Päivän siirto epäonnistui")
@@ -333,6 +415,7 @@ def advance_day():
 # ---------- Reitit: Päivän siirto kunnes ensimmäinen kone palaa tai konkurssi ----------
 
 @app.post("/api/game/fast-forward")
+@_serialized_save
 def fast_forward():
     """Siirrytään eteenpäin kunnes ensimmäinen lento saapuu tai konkurssi."""
     try:
@@ -363,7 +446,7 @@ def fast_forward():
 
 
         days_advanced = 0
-        earned_total = Decimal("0.00")
+        earned_total = Money(0)
         stop_reason = "max"
         day_summaries = []
         max_days = 365  # Turvamekanismi loputtomaan silmukkaan
@@ -372,19 +455,8 @@ def fast_forward():
         for _ in range(max_days):
             summary = session.advance_to_next_day(silent=True)
             days_advanced += 1
-            earned_total += _to_dec(summary.get("earned", 0))
-            summary_copy = summary.copy()
-            summary_copy["earned"] = _decimal_to_string(summary_copy.get("earned", 0))
-
-            for event in summary_copy.get("events", []):
-                if "reward_delta" in event:
-                    event["reward_delta"] = _decimal_to_string(event["reward_delta"])
-
-            for bill in summary_copy.get("bills", []):
-                if "amount" in bill:
-                    bill["amount"] = _decimal_to_string(bill["amount"])
-            
-            day_summaries.append(summary_copy)
+            earned_total += Money.of(summary.get("earned", 0))
+            day_summaries.append(summary)
 
             # eri tilanteet pysähtymiselle
 
@@ -417,7 +489,7 @@ def fast_forward():
             "days_advanced": days_advanced,
             "stop_reason": stop_reason,
             "current_day": session.current_day,
-            "total_earned": _decimal_to_string(earned_total),
+            "total_earned": earned_total,
             "message": messages.get(stop_reason, "Pikakelaus valmis"),
             "day_summaries": day_summaries,
         }), 200
@@ -432,6 +504,261 @@ def fast_forward():
         return jsonify({"virhe": f"Pikakelaus epäonnistui: {str(e)}"}), 500
 
 
+# ---------- Reitit: Kassaennuste ----------
+
+MAX_FORECAST_DAYS = 3650
+
+
+@app.get("/api/game/forecast")
+def get_cash_forecast():
+    """
+    Kassaennuste ilman pikakelausta: GET /api/game/forecast?days=N (oletus 30).
+    Tunnetut saapumiset palkkioineen, kuukausilaskut ja konkurssiriskipäivä.
+    """
+    try:
+        days = int(request.args.get("days", 30))
+    except (TypeError, ValueError):
+        return jsonify({"virhe": "days tulee olla kokonaisluku"}), 400
+    if days < 1 or days > MAX_FORECAST_DAYS:
+        return jsonify({"virhe": f"days tulee olla välillä 1-{MAX_FORECAST_DAYS}"}), 400
+
+    try:
+        session = GameSession(save_id=ACTIVE_SAVE_ID)
+        result = session.forecast(days)
+    except Exception:
+        app.logger.exception("Kassaennusteen laskenta epäonnistui")
+        return jsonify({"virhe": "Kassaennusteen laskenta epäonnistui"}), 500
+
+    return jsonify(result)
+
+
+# ---------- Reitit: Talouden historia ----------
+
+DEFAULT_HISTORY_BUCKETS = 300
+MAX_HISTORY_BUCKETS = 2000
+
+
+@app.get("/api/game/history")
+def get_financial_history():
+    """
+    Päivittäiset talousluvut kaaviolle: GET /api/game/history?from=A&to=B&buckets=N.
+    Oletuksena koko peli (1..nykyinen päivä) enintään 300 ämpärissä:
+    kassa/laivasto/sopimukset min/max/viimeinen per ämpäri + LTTB-harvennettu kassakäyrä.
+    """
+    try:
+        session = GameSession(save_id=ACTIVE_SAVE_ID)
+    except ValueError as e:
+        if "ei löytynyt" in str(e):
+            return jsonify({"virhe": f"Tallennusta {ACTIVE_SAVE_ID} ei löytynyt"}), 404
+        app.logger.exception("Historian haku epäonnistui")
+        return jsonify({"virhe": f"Historian haku epäonnistui: {str(e)}"}), 500
+
+    try:
+        from_day = int(request.args.get("from", 1))
+        to_day = int(request.args.get("to", session.current_day))
+        buckets = int(request.args.get("buckets", DEFAULT_HISTORY_BUCKETS))
+    except (TypeError, ValueError):
+        return jsonify({"virhe": "from, to ja buckets tulee olla kokonaislukuja"}), 400
+    if from_day < 1 or to_day < from_day:
+        return jsonify({"virhe": "Vaaditaan 1 <= from <= to"}), 400
+    if buckets < 1 or buckets > MAX_HISTORY_BUCKETS:
+        return jsonify({"virhe": f"buckets tulee olla välillä 1-{MAX_HISTORY_BUCKETS}"}), 400
+
+    try:
+        rows = fetch_daily_stats(session.save_id, from_day, to_day)
+        result = downsample_history(rows, from_day, to_day, buckets)
+    except Exception as e:
+        app.logger.exception("Historian haku epäonnistui")
+        return jsonify({"virhe": f"Historian haku epäonnistui: {str(e)}"}), 500
+
+    out_buckets = []
+    for b in result["buckets"]:
+        cash = b["cash_cents"]
+        out_buckets.append({
+            "day_start": b["day_start"],
+            "day_end": b["day_end"],
+            "days": b["days"],
+            "cash": {k: Money(v) for k, v in cash.items()},
+            "fleet_size": b["fleet_size"],
+            "active_contracts": b["active_contracts"],
+            "earnings": Money(b["earnings_cents"]),
+        })
+    return jsonify({
+        "current_day": session.current_day,
+        "from": from_day,
+        "to": to_day,
+        "days": len(rows),
+        "bucket_days": result["bucket_days"],
+        "buckets": out_buckets,
+        "points": [{"day": day, "cash": Money(cents)} for day, cents in result["points"]],
+    }), 200
+
+
+# ---------- Reitit: Haarat ("mitä jos" -esikatselu) ----------
+# Haara on aktiivisen tallennuksen kopio erillisessä kannassa (save_fork.py).
+# Päiviä, ostoja ja tehtäviä voi ajaa haarassa; lopuksi haara hyväksytään
+# (commit → oikea tallennus) tai hylätään (DELETE).
+
+@app.post("/api/game/forks")
+def create_save_fork():
+    """Luo aktiivisesta tallennuksesta haaran."""
+    try:
+        fork = create_fork(ACTIVE_SAVE_ID)
+        return jsonify(fork.state()), 201
+    except ForkError as e:
+        return jsonify({"virhe": str(e)}), 404
+    except Exception:
+        app.logger.exception("Haaran luonti epäonnistui")
+        return jsonify({"virhe": "Haaran luonti epäonnistui"}), 500
+
+
+@app.get("/api/game/forks")
+def list_save_forks():
+    """Aktiivisen tallennuksen haarat."""
+    return jsonify({"forks": [f.state() for f in list_forks(ACTIVE_SAVE_ID)]})
+
+
+@app.get("/api/game/forks/<fork_id>")
+def get_save_fork(fork_id: str):
+    try:
+        return jsonify(get_fork(fork_id).state())
+    except ForkError as e:
+        return jsonify({"virhe": str(e)}), 404
+
+
+@app.post("/api/game/forks/<fork_id>/advance")
+def advance_save_fork(fork_id: str):
+    """
+    Siirtää haaraa eteenpäin.
+    Odottaa: {"days": int} (oletus 1, enintään MAX_FORK_DAYS)
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        days = int(payload.get("days", 1))
+    except (TypeError, ValueError):
+        return jsonify({"virhe": "days tulee olla kokonaisluku"}), 400
+    if days < 1:
+        return jsonify({"virhe": "days tulee olla vähintään 1"}), 400
+    try:
+        fork = get_fork(fork_id)
+        summaries = fork.advance(days)
+        return jsonify({
+            "day_summaries": summaries,
+            "fork": fork.state(),
+        })
+    except ForkError as e:
+        return jsonify({"virhe": str(e)}), 404
+    except Exception:
+        app.logger.exception("Haaran päivän siirto epäonnistui")
+        return jsonify({"virhe": "Haaran päivän siirto epäonnistui"}), 500
+
+
+@app.get("/api/game/forks/<fork_id>/aircrafts/<int:aircraft_id>/task-offers")
+def save_fork_task_offers(fork_id: str, aircraft_id: int):
+    """Haaran koneen tarjoukset haaran päivälle (kuten /api/aircrafts/<id>/task-offers)."""
+    try:
+        fork = get_fork(fork_id)
+        with fork.session() as session:
+            plane = _fetch_plane(aircraft_id, save_id=fork.save_id)
+            if not plane:
+                return jsonify({"virhe": "Koneen haku epäonnistui"}), 404
+            offers = session._random_task_offers_for_plane(plane, count=DEFAULT_TASK_OFFER_COUNT)
+        return jsonify({"offers": [_serialize_offer(o) for o in offers]})
+    except ForkError as e:
+        return jsonify({"virhe": str(e)}), 404
+    except Exception:
+        app.logger.exception("Haaran tarjousten generointi epäonnistui")
+        return jsonify({"virhe": "Tarjousten muodostus epäonnistui"}), 500
+
+
+@app.post("/api/game/forks/<fork_id>/tasks")
+def accept_save_fork_tasks(fork_id: str):
+    """Hyväksyy tehtäviä haarassa (runko kuten POST /api/tasks/bulk)."""
+    payload = request.get_json(silent=True) or {}
+    items = payload.get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"virhe": "items-lista on pakollinen"}), 400
+    try:
+        fork = get_fork(fork_id)
+        with fork.session() as session:
+            results = session.accept_task_offers_bulk(items)
+        return jsonify({"results": results, "fork": fork.state()})
+    except ForkError as e:
+        return jsonify({"virhe": str(e)}), 404
+    except Exception:
+        app.logger.exception("Haaran tehtävien hyväksyntä epäonnistui")
+        return jsonify({"virhe": "Tehtävien hyväksyminen epäonnistui"}), 500
+
+
+@app.post("/api/game/forks/<fork_id>/purchase")
+def purchase_in_save_fork(fork_id: str):
+    """
+    Ostaa uuden koneen haarassa.
+    Odottaa: {"model_code": str}
+    """
+    payload = request.get_json(silent=True) or {}
+    model_code = payload.get("model_code")
+    if not model_code:
+        return jsonify({"virhe": "model_code puuttuu"}), 400
+    model_row = get_model_catalog().get(model_code)
+    if not model_row:
+        return jsonify({"virhe": "Koneen mallia ei löytynyt"}), 404
+    try:
+        fork = get_fork(fork_id)
+        with fork.session() as session:
+            success = session._purchase_aircraft_tx(
+                model_code=model_code,
+                current_airport_ident=session._get_primary_base_ident() or "EFHK",
+                registration=session._generate_registration(),
+                nickname=None,
+                purchase_price=_to_dec(model_row["purchase_price"]),
+                base_id=None,
+            )
+        if not success:
+            return jsonify({"virhe": "Ostos epäonnistui: riittämätön saldo"}), 400
+        return jsonify({"fork": fork.state()}), 201
+    except ForkError as e:
+        return jsonify({"virhe": str(e)}), 404
+    except Exception:
+        app.logger.exception("Haaran koneen osto epäonnistui")
+        return jsonify({"virhe": "Koneen osto epäonnistui"}), 500
+
+
+@app.post("/api/game/forks/<fork_id>/commit")
+def commit_save_fork(fork_id: str):
+    """Kirjoittaa haaran tilan oikeaan tallennukseen ja poistaa haaran."""
+    try:
+        fork = get_fork(fork_id)
+        with save_writer(fork.save_id):
+            fork.commit()
+    except SaveBusy as e:
+        return jsonify({"virhe": str(e)}), 409
+    except ForkConflict as e:
+        return jsonify({"virhe": str(e)}), 409
+    except ForkError as e:
+        return jsonify({"virhe": str(e)}), 404
+    except Exception:
+        app.logger.exception("Haaran hyväksyntä epäonnistui")
+        return jsonify({"virhe": "Haaran hyväksyntä epäonnistui"}), 500
+    session = GameSession(save_id=fork.save_id)
+    return jsonify({
+        "viesti": "Haara hyväksytty",
+        "current_day": session.current_day,
+        "cash": session.cash,
+        "status": session.status,
+    })
+
+
+@app.delete("/api/game/forks/<fork_id>")
+def discard_save_fork(fork_id: str):
+    """Hylkää haaran."""
+    try:
+        discard_fork(fork_id)
+    except ForkError as e:
+        return jsonify({"virhe": str(e)}), 404
+    return jsonify({"viesti": "Haara hylätty"})
+
+
 @app.get("/api/games")
 def list_games():
     """Palauttaa listan tallennetuista peleistä JSON-muodossa."""
@@ -444,7 +771,7 @@ def list_games():
                 'name': game['player_name'],
                 'day': game['current_day'],
                 'status': game['status'],
-                'cash': _decimal_to_string(game['cash']),
+                'cash': game['cash'],
                 'created_at': game['created_at'],
                 'updated_at': game['updated_at']
             }
@@ -572,6 +899,7 @@ def task_offers(aircraft_id: int):
 
 
 @app.post("/api/tasks")
+@_serialized_save
 def accept_task():
     """
     Hyväksyy uuden tehtävän ja kirjaa sopimuksen & lennon tietokantaan.
@@ -719,10 +1047,13 @@ def accept_task():
                 cursor=kursori,
             )
             
+            session._bump_contracts_version(kursori)
+            fleet_version = session.fleet.bump_version(kursori)
             yhteys.commit()
             
             kursori.close()
             yhteys.close()
+            session.fleet.refresh([aircraft_id], fleet_version)
             
             return jsonify({
                 "viesti": f"✅ Tehtävä hyväksytty!",
@@ -745,6 +1076,45 @@ def accept_task():
         return jsonify({"virhe": f"Tehtävän hyväksyminen epäonnistui"}), 500
 
 
+@app.post("/api/tasks/bulk")
+@_serialized_save
+def accept_tasks_bulk():
+    """
+    Hyväksyy useita tehtäviä kerralla yhdessä transaktiossa (esim. koko laivasto päivän alussa).
+
+    Odottaa:
+    {
+        "items": [
+            {"aircraft_id": int, "offer": {... kuten POST /api/tasks ...}},
+            ...
+        ]
+    }
+
+    Palauttaa tuloksen jokaiselle parille samassa järjestyksessä; epäonnistuneet
+    parit eivät estä muiden hyväksyntää.
+    """
+    payload = request.get_json(silent=True) or {}
+    items = payload.get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"virhe": "items-lista on pakollinen"}), 400
+
+    try:
+        session = GameSession(save_id=ACTIVE_SAVE_ID)
+        if session.current_day is None:
+            return jsonify({"virhe": "Pelin päivää ei voitu määrittää"}), 500
+        results = session.accept_task_offers_bulk(items)
+    except Exception as e:
+        app.logger.exception(f"Tehtävien massahyväksyntä epäonnistui: {e}")
+        return jsonify({"virhe": "Tehtävien hyväksyminen epäonnistui"}), 500
+
+    accepted = sum(1 for r in results if r.get("ok"))
+    return jsonify({
+        "results": results,
+        "accepted": accepted,
+        "failed": len(results) - accepted,
+    }), 201 if accepted else 400
+
+
 # ---------- Reitit: Kauppapaikka ----------
 # Kauppapaikka-endpointit hallitsevat koneiden ostamista uusien ja käytettyjen
 # markkinoilta. Uudet koneet suodatetaan pelaajan tukikohdan tason (SMALL..HUGE)
@@ -784,7 +1154,7 @@ def market_new():
                 "model_code": row.get("model_code"),
                 "manufacturer": row.get("manufacturer"),
                 "model_name": row.get("model_name"),
-                "purchase_price": _decimal_to_string(row.get("purchase_price")),
+                "purchase_price": row.get("purchase_price"),
                 "base_cargo_kg": row.get("base_cargo_kg"),
                 "cruise_speed_kts": row.get("cruise_speed_kts"),
                 "range_km": row.get("range_km"),
@@ -839,7 +1209,6 @@ def market_used():
             """,
         )
         for row in rows:
-            row["purchase_price"] = _decimal_to_string(row.get("purchase_price"))
             row["hours_flown"] = row.get("hours_flown") or 0
             row["condition_percent"] = row.get("condition_percent") or 100
             # Lasketaan koneena ikä vuosina nykyisestä peliajasta
@@ -853,6 +1222,7 @@ def market_used():
 
 
 @app.post("/api/market/buy")
+@_serialized_save
 def market_buy():
     """
     Ostaa koneen markkinapaikalta (uusi tai käytetty).
@@ -879,26 +1249,12 @@ def market_buy():
             if not model_code:
                 return jsonify({"virhe": "model_code puuttuu"}), 400
             
-            # Hae koneen hinta ja tiedot
-            yhteys = get_connection()
-            kursori = yhteys.cursor()
-            try:
-                kursori.execute(
-                    "SELECT model_code, model_name, purchase_price FROM aircraft_models WHERE model_code = %s",
-                    (model_code,)
-                )
-                model_row = kursori.fetchone()
-                if not model_row:
-                    kursori.close()
-                    yhteys.close()
-                    return jsonify({"virhe": "Koneen mallia ei löytynyt"}), 404
-                
-                purchase_price = _to_dec(model_row[2] if not isinstance(model_row, dict) else model_row["purchase_price"])
-                model_name = model_row[1] if not isinstance(model_row, dict) else model_row["model_name"]
-                
-            finally:
-                kursori.close()
-                yhteys.close()
+            # Hae koneen hinta ja tiedot konemalliluettelosta
+            model_row = get_model_catalog().get(model_code)
+            if not model_row:
+                return jsonify({"virhe": "Koneen mallia ei löytynyt"}), 404
+            purchase_price = _to_dec(model_row["purchase_price"])
+            model_name = model_row["model_name"]
             
             # Käytä GameSession:n metodia ostolle
             registration = session._generate_registration()
@@ -1001,6 +1357,7 @@ def clubhouse_info():
 
 
 @app.post("/api/clubhouse")
+@_serialized_save
 def clubhouse_play():
     """
     Pelaa minipeliä (coin_flip, high_low, slots) ja päivitä kassaa GameSessionin kautta.
@@ -1047,7 +1404,7 @@ def clubhouse_play():
                 "flip": flip,
                 "voitto": voitto,
                 "viesti": viesti,
-                "uusi_saldo": _decimal_to_string(session.cash)
+                "uusi_saldo": session.cash
             })
         
         elif peli == "high_low":
@@ -1078,7 +1435,7 @@ def clubhouse_play():
                 "voitto": voitto,
                 "push": is_push,
                 "viesti": viesti,
-                "uusi_saldo": _decimal_to_string(session.cash)
+                "uusi_saldo": session.cash
             })
         
         elif peli == "slots":
@@ -1112,7 +1469,7 @@ def clubhouse_play():
                 "reels": reels,
                 "voitto": voitto,
                 "viesti": viesti,
-                "uusi_saldo": _decimal_to_string(session.cash)
+                "uusi_saldo": session.cash
             })
         
         elif peli == "blackjack":
@@ -1152,7 +1509,7 @@ def clubhouse_play():
                 "dealer_value": dealer_value,
                 "voitto": voitto,
                 "viesti": viesti,
-                "cash": _decimal_to_string(session.cash)
+                "cash": session.cash
             })
         
         else:
@@ -1165,42 +1522,30 @@ def clubhouse_play():
 # ---------- Reitit: Lentokoneet ja tukikohdat ----------
 @app.get("/api/aircrafts")
 def api_list_aircrafts():
-    """Omistettujen lentokoneiden lista (ACTIVE_SAVE_ID:stä)."""
+    """Omistettujen lentokoneiden lista (ACTIVE_SAVE_ID:stä, FleetStoresta)."""
     try:
-        rows = fetch_player_aircrafts_with_model_info(ACTIVE_SAVE_ID) or []
+        planes = get_fleet_store(ACTIVE_SAVE_ID).validate().all()
     except Exception:
-        app.logger.exception("fetch_player_aircrafts_with_model_info epäonnistui")
+        app.logger.exception("FleetStore-haku epäonnistui")
         return jsonify({"virhe": "aircrafts fetch failed"}), 500
 
-    session = GameSession(save_id=ACTIVE_SAVE_ID)
-    ids = [int(r["aircraft_id"]) for r in rows]
-    try:
-        upgrade_map = session._fetch_upgrade_levels(ids) if ids else {}
-    except Exception:
-        upgrade_map = {}
-
     out = []
-    for r in rows:
-        aid = int(r["aircraft_id"])
-        try:
-            eff_val = get_effective_eco_for_aircraft(aid)
-            eff = _decimal_to_string(Decimal(str(eff_val))) if eff_val is not None else None
-        except Exception:
-            eff = None
+    for p in planes:
+        eff_val = p.effective_eco
         out.append(
             {
-                "aircraft_id": aid,
-                "registration": r.get("registration"),
-                "model_code": r.get("model_code"),
-                "model_name": r.get("model_name"),
-                "current_airport_ident": r.get("current_airport_ident"),
-                "purchase_price": _decimal_to_string(r.get("purchase_price")),
-                "condition_percent": int(r.get("condition_percent") or 0),
-                "hours_flown": int(r.get("hours_flown") or 0),
-                "status": r.get("status"),
-                "acquired_day": int(r.get("acquired_day") or 0),
-                "eco_level": int(upgrade_map.get(aid, 0)),
-                "effective_eco": eff,
+                "aircraft_id": p.aircraft_id,
+                "registration": p.registration,
+                "model_code": p.model_code,
+                "model_name": p.model_name,
+                "current_airport_ident": p.current_airport_ident,
+                "purchase_price": p.purchase_price,
+                "condition_percent": p.condition_percent,
+                "hours_flown": p.hours_flown,
+                "status": p.status,
+                "acquired_day": p.acquired_day,
+                "eco_level": p.eco_level,
+                "effective_eco": Decimal(str(float(eff_val))) if eff_val is not None else None,
             }
         )
     return jsonify({"save_id": ACTIVE_SAVE_ID, "aircraft": out})
@@ -1209,57 +1554,53 @@ def api_list_aircrafts():
 @app.get("/api/aircrafts/<int:aircraft_id>")
 def api_get_aircraft(aircraft_id: int):
     """Tarkemmat tiedot yhdestä lentokoneesta."""
-    rows = fetch_player_aircrafts_with_model_info(ACTIVE_SAVE_ID) or []
-    row = next((r for r in rows if int(r["aircraft_id"]) == aircraft_id), None)
-    if not row:
+    plane = get_fleet_store(ACTIVE_SAVE_ID).validate().get(aircraft_id)
+    if not plane:
         return jsonify({"virhe": "aircraft not found"}), 404
 
-    state = get_current_aircraft_upgrade_state(aircraft_id) or {"level": 0}
-    cur_level = int(state.get("level") or 0)
+    cur_level = plane.eco_level
     next_level = cur_level + 1
 
     try:
-        next_cost = calc_aircraft_upgrade_cost(row, next_level)
+        next_cost = calc_aircraft_upgrade_cost(_upgrade_cost_row(plane), next_level)
     except Exception:
         next_cost = None
 
-    try:
-        cur_eff_val = get_effective_eco_for_aircraft(aircraft_id)
-        cur_eff = _decimal_to_string(Decimal(str(cur_eff_val))) if cur_eff_val is not None else None
-    except Exception:
-        cur_eff = None
+    cur_eff_val = plane.effective_eco
+    cur_eff = Decimal(str(float(cur_eff_val))) if cur_eff_val is not None else None
 
     # Konservatiivinen arvio seuraavasta ECO-arvosta
     next_eff = None
     try:
         if cur_eff is not None:
-            next_eff = _decimal_to_string(Decimal(cur_eff) * Decimal("1.05"))
+            next_eff = Decimal(cur_eff) * Decimal("1.05")
     except Exception:
         next_eff = None
 
     return jsonify(
         {
             "aircraft_id": aircraft_id,
-            "registration": row.get("registration"),
-            "model_code": row.get("model_code"),
-            "model_name": row.get("model_name"),
-            "current_airport_ident": row.get("current_airport_ident"),
-            "condition_percent": int(row.get("condition_percent") or 0),
-            "hours_flown": int(row.get("hours_flown") or 0),
-            "status": row.get("status"),
-            "acquired_day": int(row.get("acquired_day") or 0),
+            "registration": plane.registration,
+            "model_code": plane.model_code,
+            "model_name": plane.model_name,
+            "current_airport_ident": plane.current_airport_ident,
+            "condition_percent": plane.condition_percent,
+            "hours_flown": plane.hours_flown,
+            "status": plane.status,
+            "acquired_day": plane.acquired_day,
             "eco": {
                 "current_level": cur_level,
                 "next_level": next_level,
                 "current_effective_eco": cur_eff,
                 "next_effective_eco_estimate": next_eff,
-                "next_upgrade_cost": _decimal_to_string(next_cost),
+                "next_upgrade_cost": next_cost,
             },
         }
     )
 
 
 @app.post("/api/aircrafts/<int:aircraft_id>/repair")
+@_serialized_save
 def api_repair_aircraft(aircraft_id: int):
     """Korjaa lentokoneen täydelliseksi (100% kuntoon)."""
     
@@ -1298,29 +1639,27 @@ def api_repair_aircraft(aircraft_id: int):
         "aircraft_id": aircraft_id,
         "previous_condition": current_cond,
         "new_condition": new_cond,
-        "cost": _decimal_to_string(repair_cost),
-        "remaining_cash": _decimal_to_string(session.cash),
+        "cost": repair_cost,
+        "remaining_cash": session.cash,
     }), 200
 
 
 @app.post("/api/aircrafts/<int:aircraft_id>/upgrade")
+@_serialized_save
 def api_upgrade_aircraft(aircraft_id: int):
     """ECO-päivitys lentokoneelle."""
     payload = request.get_json(silent=True) or {}
     if not payload.get("confirm"):
         return jsonify({"virhe": "confirm required"}), 400
 
-    rows = fetch_player_aircrafts_with_model_info(ACTIVE_SAVE_ID) or []
-    row = next((r for r in rows if int(r["aircraft_id"]) == aircraft_id), None)
-    if not row:
+    plane = get_fleet_store(ACTIVE_SAVE_ID).validate().get(aircraft_id)
+    if not plane:
         return jsonify({"virhe": "aircraft not found"}), 404
 
-    state = get_current_aircraft_upgrade_state(aircraft_id) or {"level": 0}
-    cur_level = int(state.get("level") or 0)
-    next_level = cur_level + 1
+    next_level = plane.eco_level + 1
 
     try:
-        cost = calc_aircraft_upgrade_cost(row, next_level)
+        cost = calc_aircraft_upgrade_cost(_upgrade_cost_row(plane), next_level)
     except Exception as e:
         app.logger.exception("calc cost failed")
         return jsonify({"virhe": "cost_calculation_failed", "detail": str(e)}), 500
@@ -1330,7 +1669,7 @@ def api_upgrade_aircraft(aircraft_id: int):
         return jsonify({"virhe": "insufficient_funds"}), 402
 
     try:
-        apply_aircraft_upgrade(aircraft_id=aircraft_id, installed_day=session.current_day)
+        apply_aircraft_upgrade(aircraft_id=aircraft_id, installed_day=session.current_day, fleet=session.fleet)
         session._add_cash(-Decimal(str(cost)), context="AIRCRAFT_ECO_UPGRADE")
     except Exception as e:
         app.logger.exception("upgrade failed")
@@ -1342,8 +1681,8 @@ def api_upgrade_aircraft(aircraft_id: int):
                 "status": "ok",
                 "aircraft_id": aircraft_id,
                 "new_level": next_level,
-                "cost": _decimal_to_string(cost),
-                "remaining_cash": _decimal_to_string(session.cash),
+                "cost": cost,
+                "remaining_cash": session.cash,
             }
         ),
         200,
@@ -1359,9 +1698,6 @@ def api_list_bases():
         app.logger.exception("fetch_owned_bases epäonnistui")
         return jsonify({"virhe": "bases fetch failed"}), 500
 
-    base_ids = [int(b["base_id"]) for b in bases]
-    level_map = fetch_base_current_level_map(base_ids) if base_ids else {}
-
     out = []
     for b in bases:
         out.append(
@@ -1370,14 +1706,15 @@ def api_list_bases():
                 "base_ident": b.get("base_ident"),
                 "base_name": b.get("base_name"),
                 "acquired_day": int(b.get("acquired_day") or 0),
-                "purchase_cost": _decimal_to_string(b.get("purchase_cost")),
-                "current_level": level_map.get(int(b["base_id"]), "SMALL"),
+                "purchase_cost": b.get("purchase_cost"),
+                "current_level": b.get("current_level") or "SMALL",
             }
         )
     return jsonify({"owned_bases": out})
 
 
 @app.post("/api/bases/<int:base_id>/upgrade")
+@_serialized_save
 def api_upgrade_base(base_id: int):
     """Tukikohdan päivitys seuraavalle tasolle."""
     payload = request.get_json(silent=True) or {}
@@ -1389,8 +1726,7 @@ def api_upgrade_base(base_id: int):
     if not b:
         return jsonify({"virhe": "base not owned"}), 404
 
-    lvl_map = fetch_base_current_level_map([base_id]) or {}
-    current = lvl_map.get(base_id, "SMALL")
+    current = b.get("current_level") or "SMALL"
     BASE_LEVELS = ["SMALL", "MEDIUM", "LARGE", "HUGE"]
     BASE_UPGRADE_COST_PCTS = {
         ("SMALL", "MEDIUM"): Decimal("0.50"),
@@ -1426,8 +1762,8 @@ def api_upgrade_base(base_id: int):
                 "base_id": base_id,
                 "from": current,
                 "to": nxt,
-                "cost": _decimal_to_string(cost),
-                "remaining_cash": _decimal_to_string(session.cash),
+                "cost": cost,
+                "remaining_cash": session.cash,
             }
         ),
         200,
@@ -1493,7 +1829,7 @@ def api_available_bases():
                 "country": country,
                 "municipality": row.get("municipality"),
                 "type": airport_type,
-                "purchase_price": _decimal_to_string(Decimal(str(base_price))),
+                "purchase_price": Decimal(str(base_price)),
                 "max_capacity": 2,  # All new bases start at SMALL level
                 "latitude": row.get("latitude_deg"),
                 "longitude": row.get("longitude_deg"),
@@ -1506,6 +1842,7 @@ def api_available_bases():
 
 
 @app.post("/api/bases/buy")
+@_serialized_save
 def api_buy_base():
     """Osta uusi tukikohta."""
     payload = request.get_json(silent=True) or {}
@@ -1553,10 +1890,16 @@ def api_buy_base():
             kursori.execute(
                 """
                 INSERT INTO owned_bases 
-                (save_id, base_ident, base_name, acquired_day, purchase_cost, is_headquarters, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                (save_id, base_ident, base_name, acquired_day, purchase_cost, is_headquarters,
+                 current_level, aircraft_count, created_at, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, 'SMALL',
+                        (SELECT COUNT(*) FROM aircraft a
+                         WHERE a.save_id = %s AND a.current_airport_ident = %s
+                           AND (a.sold_day IS NULL OR a.sold_day = 0)),
+                        %s, %s)
                 """,
-                (ACTIVE_SAVE_ID, ident, airport.get("name"), session.current_day, float(base_price), False, now, now)
+                (ACTIVE_SAVE_ID, ident, airport.get("name"), session.current_day, float(base_price), False,
+                 ACTIVE_SAVE_ID, ident, now, now)
             )
             new_base_id = kursori.lastrowid
             yhteys.commit()
@@ -1573,8 +1916,8 @@ def api_buy_base():
             "base_id": new_base_id,
             "base_ident": ident,
             "base_name": airport.get("name"),
-            "purchase_cost": _decimal_to_string(base_price),
-            "remaining_cash": _decimal_to_string(session.cash),
+            "purchase_cost": base_price,
+            "remaining_cash": session.cash,
         }), 201
         
     except Exception as e:
@@ -1679,7 +2022,7 @@ def get_map_data():
                 "currentDay": current_day,
                 "arrivalDay": end_day,
                 "progressPercent": progress_pct,
-                "reward": _decimal_to_string(contract.get("reward")),
+                "reward": contract.get("reward"),
             })
         
         # Rakennetaan omien kantojen ICAO-koodit ja pääkotisatama
@@ -1772,135 +2115,61 @@ def get_map_data():
 
 # ---------- Reitit: Uutiset / Random Events ----------
 
+# Vaikutusluokka (event_system.classify_event) → (news-widgetin tyyppi, väri)
+EVENT_IMPACT_STYLE = {
+    "negative": ("negative", "red"),
+    "positive": ("positive", "green"),
+    "neutral": ("normal", "cyan"),
+}
+
+
+def _serialize_event_day(day: int, event) -> dict:
+    """Yhden kalenteripäivän tapahtuma JSON-muotoon."""
+    impact = classify_event(event)
+    event_type, color = EVENT_IMPACT_STYLE[impact]
+    return {
+        "day": day,
+        "event_name": event.name,
+        "description": event.description or "",
+        "weather_description": event.weather_description or "",
+        "impact": impact,
+        "type": event_type,
+        "color": color,
+        "package_multiplier": event.package_multiplier,
+        "plane_damage": event.plane_damage,
+    }
+
+
 @app.get("/api/events")
 def get_recent_events():
     """Palauttaa viimeisimmät satunnaiset tapahtumatehtävät päivittäisen news-widgetin käyttöön.
     
-    Näyttää tapahtumia viimeisimmiltä päiviltä (max 4).
+    Näyttää tapahtumia viimeisimmiltä päiviltä (max 4), uusin ensin.
     """
     try:
-        from event_system import get_event_for_day
-        
         session = GameSession(save_id=ACTIVE_SAVE_ID)
         current_day = session.current_day
         if current_day is None:
             current_day = 1
         
-        # Hae tapahtumia viimeisimmältä 4 päivältä
-        events = []
-        yhteys = get_connection()
-        kursori = None
-        
-        try:
-            kursori = yhteys.cursor(dictionary=True)
-        except TypeError:
-            kursori = yhteys.cursor()
-        
-        try:
-            # Hae random_events taulusta kaikki tapahtumat, jotta voidaan yhdistää tiedot
-            kursori.execute("""
-                SELECT event_id, event_name, description, weather_description 
-                FROM random_events
-                ORDER BY event_id ASC
-            """)
-            event_defs = {}
-            for row in kursori.fetchall():
-                if isinstance(row, dict):
-                    event_defs[row['event_name']] = {
-                        'name': row['event_name'],
-                        'description': row['description'],
-                        'weather_description': row.get('weather_description')
-                    }
-                else:
-                    event_name = row[1] if len(row) > 1 else row.get('event_name')
-                    description = row[2] if len(row) > 2 else row.get('description')
-                    weather_desc = row[3] if len(row) > 3 else row.get('weather_description')
-                    event_defs[event_name] = {
-                        'name': event_name,
-                        'description': description,
-                        'weather_description': weather_desc
-                    }
-            
-            # Hae viimeisimmät 4 päivää tapahtumistaan
-            days_to_check = min(4, current_day)
-            for day_offset in range(days_to_check):
-                check_day = current_day - day_offset
-                if check_day <= 0:
-                    break
-                    
-                kursori.execute("""
-                    SELECT event_name FROM player_fate 
-                    WHERE seed = %s AND day = %s 
-                    LIMIT 1
-                """, (session.rng_seed, check_day))
-                
-                row = kursori.fetchone()
-                if row:
-                    event_name = row[0] if not isinstance(row, dict) else row.get('event_name')
-                    if event_name is None:
-                        continue
-                        
-                    event_info = event_defs.get(event_name, {
-                        'name': event_name,
-                        'description': '',
-                        'weather_description': ''
-                    })
-                    
-                    # Määritä event-tyyppi ja väri
-                    event_type = 'normal'
-                    color_class = 'cyan'
-                    
-                    event_name_lower = str(event_name).lower()
-                    
-                    # Negatiiviset eventit
-                    if event_name in ['Volcano', 'Freezing Cold', 'Storm Clouds', 'Hurricane', 'Meteor', 'Workers Strike']:
-                        event_type = 'negative'
-                        color_class = 'red'
-                    # Positiiviset eventit
-                    elif event_name in ['Sunny Sky', 'Favorable Winds', 'Best Day Ever']:
-                        event_type = 'positive'
-                        color_class = 'green'
-                    # Neutraalit/outot eventit
-                    elif event_name in ['Aliens']:
-                        event_type = 'warning'
-                        color_class = 'amber'
-                    # Normaalit
-                    elif event_name in ['Normal Day']:
-                        event_type = 'normal'
-                        color_class = 'cyan'
-                    
-                    events.append({
-                        'day': check_day,
-                        'event_name': event_name,
-                        'description': event_info.get('description', ''),
-                        'weather_description': event_info.get('weather_description', ''),
-                        'type': event_type,
-                        'color': color_class
-                    })
-            
-            # Jos ei tapahtumia, palauta placeholder
-            if not events:
-                events.append({
-                    'day': current_day,
-                    'event_name': 'Normal Day',
-                    'description': 'Normaali lentopäivä ilman erityistä tapahtumaa',
-                    'weather_description': 'Mitään erityistä! Tavanomainen päivä operaatioissa.',
-                    'type': 'normal',
-                    'color': 'cyan'
-                })
+        window = get_events_for_range(session.rng_seed, current_day - 3, current_day)
+        events = [_serialize_event_day(day, event) for day, event in reversed(window)]
             
-            return jsonify({
-                'current_day': current_day,
-                'events': events
+        # Jos ei tapahtumia, palauta placeholder
+        if not events:
+            events.append({
+                'day': current_day,
+                'event_name': 'Normal Day',
+                'description': 'Normaali lentopäivä ilman erityistä tapahtumaa',
+                'weather_description': 'Mitään erityistä! Tavanomainen päivä operaatioissa.',
+                'type': 'normal',
+                'color': 'cyan'
             })
             
-        finally:
-            if kursori:
-                try:
-                    kursori.close()
-                except:
-                    pass
-            yhteys.close()
+        return jsonify({
+            'current_day': current_day,
+            'events': events
+        })
             
     except Exception as e:
         app.logger.exception("Tapahtumien haku epäonnistui")
@@ -1916,20 +2185,120 @@ def get_recent_events():
         }), 500
 
 
+@app.get("/api/events/timeline")
+def get_event_timeline():
+    """
+    Tapahtumakalenteri mille tahansa aikavälille: GET /api/events/timeline?start=A&end=B.
+    Oletuksena koko kampanja (päivät 1..SURVIVAL_TARGET_DAYS). Yksi kutsu, välimuistista.
+    """
+    try:
+        start = int(request.args.get("start", 1))
+        end = int(request.args.get("end", SURVIVAL_TARGET_DAYS))
+    except (TypeError, ValueError):
+        return jsonify({"virhe": "start ja end tulee olla kokonaislukuja"}), 400
+    if start < 1 or end < start:
+        return jsonify({"virhe": "Vaaditaan 1 <= start <= end"}), 400
+
+    try:
+        session = GameSession(save_id=ACTIVE_SAVE_ID)
+        window = get_events_for_range(session.rng_seed, start, end)
+        return jsonify({
+            "current_day": session.current_day,
+            "start": start,
+            "end": end,
+            "events": [_serialize_event_day(day, event) for day, event in window],
+        }), 200
+    except ValueError as e:
+        if "ei löytynyt" in str(e):
+            return jsonify({"virhe": f"Tallennusta {ACTIVE_SAVE_ID} ei löytynyt"}), 404
+        app.logger.exception("Tapahtumakalenterin haku epäonnistui")
+        return jsonify({"virhe": f"Tapahtumakalenterin haku epäonnistui: {str(e)}"}), 500
+    except Exception as e:
+        app.logger.exception("Tapahtumakalenterin haku epäonnistui")
+        return jsonify({"virhe": f"Tapahtumakalenterin haku epäonnistui: {str(e)}"}), 500
+
+
+
+# ---------- Reitit: Kehitystyökalut ----------
+
+@app.get("/api/debug/profiles")
+def list_request_profiles():
+    """Tallennetut pyyntöprofiilit (vain AFC_PROFILING=1)."""
+    if not request_profiler.ENABLED:
+        return jsonify({"virhe": "Profilointi ei ole käytössä (AFC_PROFILING=1)"}), 404
+    return jsonify({
+        "directory": request_profiler.PROFILE_DIR,
+        "profiles": request_profiler.list_profiles(),
+    })
+
+
+@app.get("/api/debug/profiles/<path:name>")
+def get_request_profile(name: str):
+    """Yksittäinen profiilitiedosto (collapsed tai speedscope JSON)."""
+    if not request_profiler.ENABLED:
+        return jsonify({"virhe": "Profilointi ei ole käytössä (AFC_PROFILING=1)"}), 404
+    return send_from_directory(request_profiler.PROFILE_DIR, name, as_attachment=True)
+
+
+
+@app.get("/api/debug/sql")
+def sql_fingerprint_report():
+    """
+    Prosessin top-N SQL-sormenjäljet (vain AFC_SQL_ACCOUNTING=1 tai debug-tila).
+    ?top=N (oletus 20), ?sort=total|count|max|avg, ?reset=1 nollaa koosteen luvun jälkeen.
+    slow_queries: hitaiden kyselyiden lokiin kirjatut sormenjäljet (None, jos loki ei ole päällä).
+    """
+    if not (sql_accounting.ENABLED or app.debug):
+        return jsonify({"virhe": "SQL-kirjanpito ei ole käytössä (AFC_SQL_ACCOUNTING=1)"}), 404
+    top = max(1, min(request.args.get("top", default=20, type=int), 500))
+    sort = request.args.get("sort", default="total")
+    if sort not in sql_accounting.SORT_KEYS:
+        return jsonify({"virhe": f"sort tulee olla yksi: {', '.join(sql_accounting.SORT_KEYS)}"}), 400
+    report = sql_accounting.top_fingerprints(top, sort)
+    slow = sql_accounting.slow_queries() if sql_accounting.slow_query_enabled() else None
+    if request.args.get("reset", default=0, type=int) == 1:
+        sql_accounting.reset_totals()
+        sql_accounting.reset_slow_queries()
+    return jsonify({"sort": sort, "fingerprints": report, "slow_queries": slow})
+
+
 # ---------- Staattiset tiedostot (Frontend) ----------
 
+STATIC_DIR = os.path.join(os.path.dirname(__file__), 'static')
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+def _send_built(rel_path: str, encodings: List[str], cache_control: str):
+    """Palauttaa static_dist/-tiedoston (esipakattu versio Accept-Encodingin mukaan)."""
+    encoding = build_static.pick_encoding(request.headers.get("Accept-Encoding", ""), encodings)
+    path = os.path.join(build_static.DIST_DIR, rel_path)
+    suffix = {"br": ".br", "gzip": ".gz"}.get(encoding, "")
+    mimetype = mimetypes.guess_type(rel_path)[0] or "application/octet-stream"
+    response = send_file(path + suffix, mimetype=mimetype, conditional=True, etag=True)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Cache-Control"] = cache_control
+    response.vary.add("Accept-Encoding")
+    return response
+
+
 @app.route('/')
 def serve_index():
-    """Palauttaa pääsivun (index.html)"""
-    static_dir = os.path.join(os.path.dirname(__file__), 'static')
-    return send_from_directory(static_dir, 'index.html')
+    """Palauttaa pääsivun (index.html); käännetty versio viittaa tiivistenimiin."""
+    manifest = build_static.load_manifest()
+    if manifest is not None:
+        index = manifest["index"]
+        return _send_built(index["path"], index["encodings"], "no-cache")
+    return send_from_directory(STATIC_DIR, 'index.html')
 
 
 @app.route('/<path:filename>')
 def serve_static(filename):
     """Palauttaa kaikki staattiset tiedostot (JS, CSS, kuvat)"""
-    static_dir = os.path.join(os.path.dirname(__file__), 'static')
-    return send_from_directory(static_dir, filename)
+    asset = build_static.hashed_asset(filename)
+    if asset is not None:
+        return _send_built(asset["path"], asset["encodings"], IMMUTABLE_CACHE)
+    return send_from_directory(STATIC_DIR, filename)
 
 
 if __name__ == "__main__":
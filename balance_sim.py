@@ -0,0 +1,464 @@
+#!/usr/bin/env python
+"""
+balance_sim.py - Monte Carlo -tasapainoajo upgrade_config-parametreille
+=======================================================================
+Simuloi kokonaisia kampanjoita muistissa (ei tietokantakirjoituksia) botti-
+strategioilla ja käy läpi parametriruudukon × siemenet prosessipoolissa.
+
+Malli seuraa pelin sääntöjä samoilla kaavoilla kuin GameSession:
+- Aloitus: kassa, EFHK-tukikohta (30 % kassasta) ja STARTER-kone (DC3FREE)
+- Tarjoukset: pick_banded_destinations + roll_task_offer (session_helpers)
+- Tapahtumat: roll_event_calendar (event_system), vaikutus saapumispäivänä
+- Korjaukset: REPAIR_COST_PER_PERCENT, vain 100 % kunnossa oleva kone lähtee
+- Paluulennot: joutilaat koneet vieraalla kentällä palaavat joka päivä
+- Kuukausilasku joka 30. päivä (compute_monthly_bill); jos kassa ei riitä → konkurssi
+
+Strategiat:
+- greedy: paras palkkio/päivä, ostaa ECO-päivityksiä kun kassa kattaa hinnan + seuraavan laskun
+- conservative: lyhimmät keikat, ei päivityksiä
+
+Pelidata (tapahtumat, STARTER-malli, lentokentät) ladataan kerran valitusta
+tietokannasta ja jaetaan työprosesseille; itse simulointi ei koske kantaan.
+
+Käyttö:
+    python balance_sim.py --backend sqlite --seeds 1000
+    python balance_sim.py --backend sqlite --seeds 500 \\
+        --param HQ_MONTHLY_FEE=100000,125000,150000 --param BILL_GROWTH_RATE=0.03,0.05
+    python balance_sim.py --strategy greedy --output -    # tulos stdoutiin
+
+Tulos (JSON) konfiguraatio × strategia -kohtaisesti: survival_rate,
+konkurssipäivien jakauma ja kassakäyrän persentiilit jokaisena laskupäivänä.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+import upgrade_config
+from upgrade_config import ECO_MULT_MIN, ECO_MULT_MAX, SURVIVAL_TARGET_DAYS
+
+DEFAULT_SEEDS = 200
+DEFAULT_SEED_BASE = 6660000
+DEFAULT_CHUNK = 25
+DEFAULT_START_CASH = Decimal("300000.00")  # GameSession.new_game oletus
+START_BASE_IDENT = "EFHK"
+START_BASE_FACTOR = Decimal("0.30")        # EFHK:n hinta osuutena aloituskassasta
+STARTER_MODEL_CODE = "DC3FREE"
+OFFERS_PER_PLANE = 5
+BILL_INTERVAL_DAYS = 30
+
+# Ruudukossa säädettävät upgrade_config-parametrit
+SWEEPABLE_PARAMS = (
+    "HQ_MONTHLY_FEE",
+    "MAINT_PER_AIRCRAFT",
+    "STARTER_MAINT_DISCOUNT",
+    "BILL_GROWTH_RATE",
+    "REPAIR_COST_PER_PERCENT",
+    "TASK_REWARD_PER_KG",
+    "TASK_REWARD_PER_KM",
+    "TASK_MIN_REWARD",
+    "TASK_PENALTY_RATIO",
+    "DEFAULT_ECO_FACTOR_PER_LEVEL",
+    "STARTER_BASE_COST",
+    "STARTER_GROWTH",
+)
+
+# Työprosessin jaettu pelidata (asetetaan _init_worker:ssa)
+_WORLD: Optional[dict] = None
+
+
+# ---------- Pelidata ----------
+
+def load_world() -> dict:
+    """Lataa simulaation tarvitseman staattisen pelidatan tietokannasta."""
+    from event_system import fetch_event_definitions
+    from session_helpers import get_airport_index, get_model_catalog
+
+    model = get_model_catalog().get(STARTER_MODEL_CODE)
+    if not model:
+        raise RuntimeError(f"Mallia {STARTER_MODEL_CODE} ei löydy aircraft_models-taulusta")
+
+    index = get_airport_index()
+    if index.coords(START_BASE_IDENT) is None:
+        raise RuntimeError(f"Tukikohdan {START_BASE_IDENT} koordinaatit puuttuvat airport-taulusta")
+
+    return {
+        "events": fetch_event_definitions(),
+        "index": index,
+        "starter": {
+            "capacity": int(model["base_cargo_kg"] or 0) or 1,
+            "speed_km_per_day": max(1.0, float(model["cruise_speed_kts"] or 200.0) * 1.852 * 24.0 * 2.0),
+            "range_km": model["range_km"],
+            "base_eco": Decimal(str(model["eco_fee_multiplier"] or 1.0)),
+        },
+    }
+
+
+def default_params() -> Dict[str, Decimal]:
+    """Nykyiset upgrade_config-arvot säädettäville parametreille."""
+    return {name: Decimal(str(getattr(upgrade_config, name))) for name in SWEEPABLE_PARAMS}
+
+
+# ---------- Strategiat ----------
+
+def _pick_best_rate(offers: List[dict]) -> dict:
+    return max(offers, key=lambda o: o["reward"].cents / max(1, o["total_days"]))
+
+
+def _pick_shortest(offers: List[dict]) -> dict:
+    return min(offers, key=lambda o: (o["total_days"], -o["reward"].cents))
+
+
+STRATEGIES = {
+    "greedy": {"pick": _pick_best_rate, "eco_upgrades": True},
+    "conservative": {"pick": _pick_shortest, "eco_upgrades": False},
+}
+
+
+# ---------- Kampanjan simulointi ----------
+
+class _Plane:
+    """Simuloidun koneen tila (vastaa aircraft + avoin flights/contracts -riviä)."""
+
+    __slots__ = ("location", "condition", "eco_level", "busy", "arrival_day", "dest", "contract")
+
+    def __init__(self, location: str):
+        self.location = location
+        self.condition = 100
+        self.eco_level = 0
+        self.busy = False
+        self.arrival_day = 0
+        self.dest = location
+        self.contract: Optional[dict] = None
+
+
+def simulate_campaign(seed: int, params: Dict[str, Decimal], strategy: str, days: int,
+                      start_cash: Decimal, world: dict) -> dict:
+    """
+    Simuloi yhden kampanjan päivästä 1 päivään 'days' (tai konkurssiin).
+
+    Returns:
+        {"seed", "bankrupt_day" (None = selvisi), "final_cash", "curve"}
+        curve = kassa jokaisen maksetun kuukausilaskun jälkeen
+    """
+    from event_system import roll_event_calendar
+    from session_helpers import (
+        Money,
+        compute_monthly_bill,
+        compute_upgrade_cost,
+        eco_multiplier_for_level,
+        pick_banded_destinations,
+        roll_task_offer,
+    )
+
+    rng = random.Random(seed)
+    index = world["index"]
+    starter = world["starter"]
+    pick = STRATEGIES[strategy]["pick"]
+    eco_upgrades = STRATEGIES[strategy]["eco_upgrades"]
+
+    bill_kwargs = {
+        "hq_fee": params["HQ_MONTHLY_FEE"],
+        "maint_per_aircraft": params["MAINT_PER_AIRCRAFT"],
+        "starter_discount": params["STARTER_MAINT_DISCOUNT"],
+        "growth_rate": params["BILL_GROWTH_RATE"],
+    }
+    reward_kwargs = {
+        "per_kg": params["TASK_REWARD_PER_KG"],
+        "per_km": params["TASK_REWARD_PER_KM"],
+        "min_reward": params["TASK_MIN_REWARD"],
+        "penalty_ratio": params["TASK_PENALTY_RATIO"],
+    }
+    repair_per_pct = Money.of(params["REPAIR_COST_PER_PERCENT"])
+
+    calendar = roll_event_calendar(world["events"], SURVIVAL_TARGET_DAYS, rng)
+    cash = Money.of(start_cash)
+    cash -= cash.scale(START_BASE_FACTOR)  # tukikohdan hinta
+    base_xy = index.coords(START_BASE_IDENT)
+    planes = [_Plane(START_BASE_IDENT)]
+    curve: List[float] = []
+
+    def eco_of(plane: _Plane) -> Decimal:
+        eco = eco_multiplier_for_level(starter["base_eco"], plane.eco_level,
+                                       factor_per_level=params["DEFAULT_ECO_FACTOR_PER_LEVEL"])
+        return max(ECO_MULT_MIN, min(ECO_MULT_MAX, eco))
+
+    def next_bill(day: int) -> Money:
+        bill_day = (day // BILL_INTERVAL_DAYS + 1) * BILL_INTERVAL_DAYS
+        return compute_monthly_bill(bill_day, len(planes), len(planes), **bill_kwargs)[2]
+
+    day = 1
+    while day < days:
+        # --- Botin vuoro: korjaukset, lähetykset, päivitykset ---
+        for plane in planes:
+            if plane.busy:
+                continue
+            if plane.condition < 100:
+                cost = repair_per_pct * (100 - plane.condition)
+                if cash < cost:
+                    continue
+                cash -= cost
+                plane.condition = 100
+            dep_xy = index.coords(plane.location)
+            if dep_xy is None:
+                continue
+            dests = pick_banded_destinations(index, plane.location, dep_xy, starter["range_km"],
+                                             OFFERS_PER_PLANE, rng=rng)
+            if not dests:
+                continue
+            eco = eco_of(plane)
+            offers = [roll_task_offer(d, starter["capacity"], starter["speed_km_per_day"], eco, day,
+                                      rng=rng, **reward_kwargs) for d in dests]
+            offer = pick(offers)
+            plane.busy = True
+            plane.arrival_day = day + offer["total_days"]
+            plane.dest = offer["dest_ident"]
+            plane.contract = offer
+
+        if eco_upgrades:
+            for plane in planes:
+                cost = compute_upgrade_cost(params["STARTER_BASE_COST"], params["STARTER_GROWTH"],
+                                            plane.eco_level + 1)
+                if cash >= cost + next_bill(day):
+                    cash -= cost
+                    plane.eco_level += 1
+
+        # --- Paluulennot (kuten advance_to_next_day: joka päivä) ---
+        for plane in planes:
+            if plane.busy or plane.location == START_BASE_IDENT:
+                continue
+            xy = index.coords(plane.location)
+            if xy is None:
+                continue
+            dist = index.distance_km(xy[0], xy[1], base_xy[0], base_xy[1])
+            plane.busy = True
+            plane.arrival_day = day + max(1, math.ceil(dist / starter["speed_km_per_day"]))
+            plane.dest = START_BASE_IDENT
+            plane.contract = None
+
+        # --- Päivä vaihtuu: saapumiset ---
+        new_day = day + 1
+        for plane in planes:
+            if not plane.busy or plane.arrival_day > new_day:
+                continue
+            plane.busy = False
+            plane.location = plane.dest
+            contract = plane.contract
+            plane.contract = None
+            if contract is None:
+                continue
+            event = calendar[plane.arrival_day - 1] if 0 < plane.arrival_day <= len(calendar) else None
+            multiplier = Decimal("1.0")
+            if event is not None:
+                multiplier = max(Decimal("0.0"), Decimal(str(event.package_multiplier or 1.0)))
+                plane.condition = max(0, plane.condition - max(0, int(event.plane_damage or 0)))
+            if new_day <= contract["deadline"]:
+                base_reward = contract["reward"]
+            else:
+                base_reward = max(Money(0), contract["reward"] - contract["penalty"])
+            cash += max(Money(0), base_reward.scale(multiplier))
+        day = new_day
+
+        # --- Kuukausilaskut ---
+        if day % BILL_INTERVAL_DAYS == 0:
+            _, _, bill = compute_monthly_bill(day, len(planes), len(planes), **bill_kwargs)
+            if cash < bill:
+                return {"seed": seed, "bankrupt_day": day, "final_cash": float(cash), "curve": curve}
+            cash -= bill
+            curve.append(float(cash))
+
+    return {"seed": seed, "bankrupt_day": None, "final_cash": float(cash), "curve": curve}
+
+
+def _init_worker(world: dict) -> None:
+    global _WORLD
+    _WORLD = world
+
+
+def _run_chunk(key: Tuple[int, str], params: Dict[str, Decimal], strategy: str, seeds: List[int],
+               days: int, start_cash: Decimal) -> Tuple[Tuple[int, str], List[dict]]:
+    """Työprosessin tehtävä: simuloi joukon siemeniä yhdellä konfiguraatiolla."""
+    return key, [simulate_campaign(s, params, strategy, days, start_cash, _WORLD) for s in seeds]
+
+
+# ---------- Yhteenveto ----------
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Lähimmän sijan persentiili (ei interpolointia)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def summarize(params: Dict[str, Decimal], strategy: str, results: List[dict]) -> dict:
+    """Kokoaa yhden konfiguraation × strategian kampanjat tunnusluvuiksi."""
+    total = len(results)
+    bankrupt_days = [r["bankrupt_day"] for r in results if r["bankrupt_day"] is not None]
+    survivors = total - len(bankrupt_days)
+
+    by_day: Dict[str, int] = {}
+    for d in sorted(bankrupt_days):
+        by_day[str(d)] = by_day.get(str(d), 0) + 1
+
+    # Kassakäyrä laskupäivittäin niistä kampanjoista, jotka olivat vielä pystyssä
+    max_points = max((len(r["curve"]) for r in results), default=0)
+    curve = []
+    for i in range(max_points):
+        values = [r["curve"][i] for r in results if len(r["curve"]) > i]
+        curve.append({
+            "day": (i + 1) * BILL_INTERVAL_DAYS,
+            "alive": len(values),
+            "p10": round(_percentile(values, 10), 2),
+            "p50": round(_percentile(values, 50), 2),
+            "p90": round(_percentile(values, 90), 2),
+        })
+
+    finals = [r["final_cash"] for r in results]
+    return {
+        "params": {k: format(v, "f") for k, v in params.items()},
+        "strategy": strategy,
+        "campaigns": total,
+        "survivors": survivors,
+        "survival_rate": round(survivors / total, 4) if total else 0.0,
+        "bankruptcy_day": {
+            "count": len(bankrupt_days),
+            "p10": _percentile(bankrupt_days, 10) if bankrupt_days else None,
+            "p50": _percentile(bankrupt_days, 50) if bankrupt_days else None,
+            "p90": _percentile(bankrupt_days, 90) if bankrupt_days else None,
+            "by_day": by_day,
+        },
+        "final_cash": {
+            "p10": round(_percentile(finals, 10), 2),
+            "p50": round(_percentile(finals, 50), 2),
+            "p90": round(_percentile(finals, 90), 2),
+        },
+        "cash_curve": curve,
+    }
+
+
+# ---------- Komentorivi ----------
+
+def _parse_grid(specs: List[str], parser: argparse.ArgumentParser) -> List[Dict[str, Decimal]]:
+    """Muuntaa --param NIMI=a,b,c -määritykset konfiguraatiolistaksi (karteesinen tulo)."""
+    axes: Dict[str, List[Decimal]] = {}
+    for spec in specs or []:
+        name, _, raw = spec.partition("=")
+        name = name.strip().upper()
+        if name not in SWEEPABLE_PARAMS:
+            parser.error(f"tuntematon parametri {name!r}; sallitut: {', '.join(SWEEPABLE_PARAMS)}")
+        try:
+            axes[name] = [Decimal(v.strip()) for v in raw.split(",") if v.strip()]
+        except ArithmeticError:
+            parser.error(f"virheellinen arvo parametrille {name}: {raw!r}")
+        if not axes[name]:
+            parser.error(f"parametrille {name} ei annettu arvoja")
+
+    base = default_params()
+    names = list(axes)
+    configs = []
+    for combo in itertools.product(*(axes[n] for n in names)):
+        params = dict(base)
+        params.update(zip(names, combo))
+        configs.append(params)
+    return configs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="AFC 666 -tasapainosimulaattori (Monte Carlo)")
+    parser.add_argument("--param", action="append", metavar="NIMI=a,b,...",
+                        help="säädettävä upgrade_config-parametri ja sen arvot (voi antaa useasti)")
+    parser.add_argument("--strategy", action="append", choices=sorted(STRATEGIES),
+                        help="bottistrategia (voi antaa useasti; oletus kaikki)")
+    parser.add_argument("--seeds", type=int, default=DEFAULT_SEEDS, help="kampanjoita konfiguraatiota kohden")
+    parser.add_argument("--seed-base", type=int, default=DEFAULT_SEED_BASE, help="ensimmäinen RNG-siemen")
+    parser.add_argument("--days", type=int, default=SURVIVAL_TARGET_DAYS, help="kampanjan pituus päivinä")
+    parser.add_argument("--cash", type=Decimal, default=DEFAULT_START_CASH, help="aloituskassa")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="työprosessien määrä")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="siemeniä per tehtävä")
+    parser.add_argument("--backend", choices=("mysql", "sqlite"),
+                        help="pelidatan tietokantatausta (oletus: AFC_DB_BACKEND tai mysql)")
+    parser.add_argument("--output", default="balance_output.json", help="JSON-tulostiedosto ('-' = stdout)")
+    args = parser.parse_args(argv)
+
+    if args.backend:
+        os.environ["AFC_DB_BACKEND"] = args.backend
+    configs = _parse_grid(args.param, parser)
+    strategies = args.strategy or sorted(STRATEGIES)
+    seeds = list(range(args.seed_base, args.seed_base + max(1, args.seeds)))
+    chunk = max(1, args.chunk)
+
+    world = load_world()
+    results: Dict[Tuple[int, str], List[dict]] = {}
+    tasks = [
+        ((ci, strategy), params, strategy, seeds[i:i + chunk])
+        for ci, params in enumerate(configs)
+        for strategy in strategies
+        for i in range(0, len(seeds), chunk)
+    ]
+    campaigns = len(configs) * len(strategies) * len(seeds)
+    print(f"🎲 {campaigns} kampanjaa ({len(configs)} konfiguraatiota × {len(strategies)} strategiaa × "
+          f"{len(seeds)} siementä), {args.workers} prosessia", file=sys.stderr)
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.workers), initializer=_init_worker,
+                             initargs=(world,)) as pool:
+        futures = [pool.submit(_run_chunk, key, params, strategy, chunk_seeds, args.days, args.cash)
+                   for key, params, strategy, chunk_seeds in tasks]
+        for done, future in enumerate(as_completed(futures), start=1):
+            key, chunk_results = future.result()
+            results.setdefault(key, []).extend(chunk_results)
+            if done % max(1, len(futures) // 10) == 0 or done == len(futures):
+                print(f"   {done}/{len(futures)} tehtävää valmiina", file=sys.stderr)
+    wall = time.perf_counter() - started
+
+    summaries = []
+    for ci, params in enumerate(configs):
+        for strategy in strategies:
+            runs = sorted(results.get((ci, strategy), []), key=lambda r: r["seed"])
+            summary = summarize(params, strategy, runs)
+            summaries.append(summary)
+            print(f"✈️  #{ci} {strategy:<12} selviytyi {summary['survival_rate'] * 100:5.1f} % | "
+                  f"konkurssin mediaanipäivä {summary['bankruptcy_day']['p50']}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "workers": args.workers,
+            "campaigns": campaigns,
+            "wall_seconds": round(wall, 3),
+            "campaigns_per_sec": round(campaigns / wall, 1) if wall > 0 else None,
+            "days": args.days,
+            "seeds": len(seeds),
+            "seed_base": args.seed_base,
+            "start_cash": format(args.cash, "f"),
+            "swept": sorted({spec.partition("=")[0].strip().upper() for spec in (args.param or [])}),
+        },
+        "results": summaries,
+    }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"📄 Tulokset: {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
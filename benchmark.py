@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+"""
+benchmark.py - Koko kampanjan suorituskykymittaus ilman käyttöliittymää
+=======================================================================
+Luo N siemennettyä tallennusta (GameSession.new_game, interactive=False) ja
+ajaa ne SURVIVAL_TARGET_DAYS päivän läpi skriptatulla lähetyspolitiikalla:
+- Rikkinäiset IDLE-koneet korjataan täyteen kuntoon
+- Jokainen vapaa kone saa parhaan tarjouksen (palkkio / päivä)
+- Tarjoukset hyväksytään yhdellä massahyväksynnällä, sitten päivä vaihtuu
+
+Mittarit laivastokokoa kohden (oletus 1/10/100 konetta):
+- days_per_sec: simuloidut päivät sekunnissa (sis. lähetyspolitiikan)
+- queries_per_day: tietokantalauseet päivää kohden (MariaDB: Questions, SQLite: oma laskuri)
+- advance_ms: advance_to_next_day-kutsun p50/p99/mean/max
+- peak_rss_mb: prosessin huippumuisti (jokainen koko ajetaan omassa prosessissa)
+
+Tausta: paikallinen MariaDB (oletus) tai prosessinsisäinen SQLite (--backend sqlite),
+jolloin jokainen laivastokoko saa oman väliaikaisen tietokantatiedoston.
+
+Käyttö:
+    python benchmark.py                       # 1/10/100 konetta, 1 tallennus kutakin
+    python benchmark.py --backend sqlite      # ilman tietokantapalvelinta
+    python benchmark.py --fleet 10 --saves 3 --days 120 --output bench.json
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+from upgrade_config import SURVIVAL_TARGET_DAYS
+
+DEFAULT_FLEET_SIZES = (1, 10, 100)
+DEFAULT_SEED_BASE = 6660000
+DEFAULT_CASH = 50_000_000  # riittävä kassa, jotta isokin laivasto selviää laskuista
+FLEET_MODEL_CODE = "DC3FREE"
+OFFERS_PER_PLANE = 3
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Lähimmän sijan persentiili (ei interpolointia)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def _peak_rss_mb() -> float:
+    """Prosessin huippumuisti megatavuina (Linux: ru_maxrss on kilotavuja)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return rss / (1024 * 1024)
+    return rss / 1024
+
+
+def _statement_count() -> Optional[int]:
+    """
+    Palauttaa suoritettujen tietokantalauseiden kokonaismäärän.
+    - sqlite: prosessin oma laskuri (storage.sqlite_backend)
+    - mysql: palvelimen Questions-laskuri (mittaa tyhjällä palvelimella)
+    """
+    from utils import DB_BACKEND, get_connection
+
+    if DB_BACKEND == "sqlite":
+        from storage.sqlite_backend import statement_count
+        return statement_count()
+
+    yhteys = get_connection()
+    kursori = None
+    try:
+        kursori = yhteys.cursor()
+        kursori.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+        row = kursori.fetchone()
+        # Vähennetään oma Questions-kysely
+        return int(row[1]) - 1 if row else None
+    except Exception:
+        return None
+    finally:
+        if kursori:
+            kursori.close()
+        yhteys.close()
+
+
+def _fetch_fleet(session) -> List[dict]:
+    """Hakee laivaston tarjousten vaatimilla mallitiedoilla (yksi kysely päivässä)."""
+    from utils import get_connection
+
+    yhteys = get_connection()
+    kursori = None
+    try:
+        kursori = yhteys.cursor(dictionary=True)
+        kursori.execute(
+            """
+            SELECT a.aircraft_id, a.status, a.condition_percent, a.current_airport_ident,
+                   am.base_cargo_kg, am.cruise_speed_kts, am.range_km, am.eco_fee_multiplier
+            FROM aircraft a
+                     JOIN aircraft_models am ON am.model_code = a.model_code
+            WHERE a.save_id = %s
+              AND (a.sold_day IS NULL OR a.sold_day = 0)
+            ORDER BY a.aircraft_id
+            """,
+            (session.save_id,),
+        )
+        return kursori.fetchall() or []
+    finally:
+        if kursori:
+            kursori.close()
+        yhteys.close()
+
+
+def _dispatch_day(session) -> int:
+    """
+    Skriptattu lähetyspolitiikka yhdelle päivälle.
+    Palauttaa lähetettyjen koneiden määrän.
+    """
+    fleet = _fetch_fleet(session)
+    broken = [p["aircraft_id"] for p in fleet if p["status"] == "IDLE" and int(p["condition_percent"] or 0) < 100]
+    if broken:
+        session._repair_many_to_full_tx(broken)
+        fleet = _fetch_fleet(session)
+
+    items = []
+    for plane in fleet:
+        if plane["status"] != "IDLE" or int(plane["condition_percent"] or 0) < 100:
+            continue
+        offers = session._random_task_offers_for_plane(plane, count=OFFERS_PER_PLANE)
+        if not offers:
+            continue
+        best = max(offers, key=lambda o: float(o["reward"]) / max(1, o["total_days"]))
+        items.append({"aircraft_id": plane["aircraft_id"], "offer": best})
+
+    if not items:
+        return 0
+    results = session.accept_task_offers_bulk(items)
+    return sum(1 for r in results if r and r.get("ok"))
+
+
+def _setup_save(seed: int, fleet_size: int, cash: int):
+    """Luo siemennetyn tallennuksen ja täydentää laivaston haluttuun kokoon."""
+    from game_session import GameSession
+
+    session = GameSession.new_game(
+        name=f"bench-{fleet_size}-{seed}",
+        cash=cash,
+        show_intro=False,
+        rng_seed=seed,
+        interactive=False,
+    )
+    base = session._get_primary_base()
+    for i in range(fleet_size - 1):
+        session._insert_gift_aircraft_tx(
+            model_code=FLEET_MODEL_CODE,
+            current_airport_ident=base["base_ident"],
+            base_id=base["base_id"],
+            nickname=f"bench-{i + 2}",
+        )
+    return session
+
+
+def run_fleet_benchmark(fleet_size: int, saves: int, days: int, seed_base: int, cash: int) -> Dict:
+    """
+    Ajaa 'saves' kampanjaa annetulla laivastokoolla ja palauttaa mittarit.
+    Ajetaan omassa prosessissaan, jotta huippumuisti on kokokohtainen.
+    """
+    advance_ms: List[float] = []
+    finals = []
+    days_simulated = 0
+    statements_before = None
+    wall = 0.0
+
+    with open(os.devnull, "w") as sink, redirect_stdout(sink):
+        sessions = [_setup_save(seed_base + i, fleet_size, cash) for i in range(saves)]
+
+        statements_before = _statement_count()
+        started = time.perf_counter()
+        for session in sessions:
+            for _ in range(days):
+                if session.status != "ACTIVE":
+                    break
+                _dispatch_day(session)
+                t0 = time.perf_counter()
+                session.advance_to_next_day(silent=True)
+                advance_ms.append((time.perf_counter() - t0) * 1000.0)
+                days_simulated += 1
+            finals.append({
+                "save_id": session.save_id,
+                "seed": session.rng_seed,
+                "day": session.current_day,
+                "cash": format(session.cash, "f"),
+                "status": session.status,
+            })
+        wall = time.perf_counter() - started
+        statements_after = _statement_count()
+
+    queries_per_day = None
+    if statements_before is not None and statements_after is not None and days_simulated:
+        queries_per_day = round((statements_after - statements_before) / days_simulated, 2)
+
+    return {
+        "fleet_size": fleet_size,
+        "saves": saves,
+        "days_simulated": days_simulated,
+        "wall_seconds": round(wall, 3),
+        "days_per_sec": round(days_simulated / wall, 3) if wall > 0 else None,
+        "queries_per_day": queries_per_day,
+        "advance_ms": {
+            "p50": round(_percentile(advance_ms, 50), 3),
+            "p99": round(_percentile(advance_ms, 99), 3),
+            "mean": round(statistics.fmean(advance_ms), 3) if advance_ms else 0.0,
+            "max": round(max(advance_ms), 3) if advance_ms else 0.0,
+        },
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "final": finals,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="AFC 666 -kampanjabenchmark")
+    parser.add_argument("--fleet", type=int, action="append",
+                        help="laivastokoko (voi antaa useasti; oletus 1, 10 ja 100)")
+    parser.add_argument("--saves", type=int, default=1, help="tallennuksia laivastokokoa kohden")
+    parser.add_argument("--days", type=int, default=SURVIVAL_TARGET_DAYS, help="simuloitavat päivät")
+    parser.add_argument("--seed-base", type=int, default=DEFAULT_SEED_BASE, help="ensimmäinen RNG-siemen")
+    parser.add_argument("--cash", type=int, default=DEFAULT_CASH, help="aloituskassa")
+    parser.add_argument("--backend", choices=("mysql", "sqlite"),
+                        help="tietokantatausta (oletus: AFC_DB_BACKEND tai mysql)")
+    parser.add_argument("--output", default="bench_output.json", help="JSON-tulostiedosto ('-' = stdout)")
+    args = parser.parse_args(argv)
+
+    if args.backend:
+        os.environ["AFC_DB_BACKEND"] = args.backend
+    backend = os.environ.get("AFC_DB_BACKEND", "mysql")
+    tmp_dir = tempfile.mkdtemp(prefix="afc666-bench-") if backend == "sqlite" else None
+
+    fleet_sizes = args.fleet or list(DEFAULT_FLEET_SIZES)
+    results = []
+    for fleet_size in fleet_sizes:
+        if tmp_dir:
+            os.environ["AFC_SQLITE_PATH"] = os.path.join(tmp_dir, f"bench-{fleet_size}.sqlite3")
+        # Uusi prosessi jokaiselle koolle → erillinen huippumuisti ja yhteyspooli
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            result = pool.submit(
+                run_fleet_benchmark, fleet_size, args.saves, args.days, args.seed_base, args.cash
+            ).result()
+        results.append(result)
+        print(
+            f"✈️  {fleet_size:>3} konetta: {result['days_per_sec']} pv/s | "
+            f"{result['queries_per_day']} kyselyä/pv | p50 {result['advance_ms']['p50']} ms | "
+            f"p99 {result['advance_ms']['p99']} ms | RSS {result['peak_rss_mb']} MB",
+            file=sys.stderr,
+        )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": backend,
+            "days": args.days,
+            "saves": args.saves,
+            "seed_base": args.seed_base,
+            "cash": args.cash,
+        },
+        "results": results,
+    }
+    if tmp_dir:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"📄 Tulokset: {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
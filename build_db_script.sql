@@ -11,6 +11,8 @@ DROP TABLE IF EXISTS base_upgrades;
 DROP TABLE IF EXISTS available_bases; -- ei enää käytössä, varmuuden vuoksi drop
 DROP TABLE IF EXISTS aircraft;
 DROP TABLE IF EXISTS owned_bases;
+DROP TABLE IF EXISTS save_daily_stats;
+DROP TABLE IF EXISTS cash_ledger;
 DROP TABLE IF EXISTS save_event_log;
 DROP TABLE IF EXISTS player_fate;
 DROP TABLE IF EXISTS random_events;
@@ -29,7 +31,9 @@ CREATE TABLE game_saves (
   status VARCHAR(40),
   rng_seed BIGINT,
   created_at DATETIME,
-  updated_at DATETIME
+  updated_at DATETIME,
+  fleet_version INT NOT NULL DEFAULT 0,
+  contracts_version INT NOT NULL DEFAULT 0
 ) ENGINE=InnoDB DEFAULT CHARSET=latin1;
 
 -- --------------------------------------------------------
@@ -44,6 +48,8 @@ CREATE TABLE owned_bases (
   purchase_cost DECIMAL(15,2) NOT NULL DEFAULT 0.00,
   sold_day INT NULL,                      -- varalla tulevaisuutta varten
   is_headquarters BOOLEAN DEFAULT FALSE,  -- varalla tulevaisuutta varten
+  current_level VARCHAR(40) NOT NULL DEFAULT 'SMALL', -- viimeisin base_upgrades-taso (ylläpidetään)
+  aircraft_count INT NOT NULL DEFAULT 0,  -- myymättömät koneet kentällä (ylläpidetään)
   created_at DATETIME NOT NULL,
   updated_at DATETIME NOT NULL,
   CONSTRAINT fk_owned_bases_save FOREIGN KEY (save_id) REFERENCES game_saves(save_id),
@@ -155,6 +161,34 @@ CREATE TABLE save_event_log (
   INDEX idx_event_log_type (event_type)
 ) ENGINE=InnoDB DEFAULT CHARSET=latin1;
 
+-- --------------------------------------------------------
+-- 6c. cash_ledger (kassakirjanpito, game_saves.cash = SUM / 100)
+-- --------------------------------------------------------
+CREATE TABLE cash_ledger (
+  ledger_id INT AUTO_INCREMENT PRIMARY KEY,
+  save_id INT NOT NULL,
+  day INT NOT NULL,
+  amount_cents BIGINT NOT NULL,
+  reason VARCHAR(64) NOT NULL,
+  ref_id INT,
+  FOREIGN KEY (save_id) REFERENCES game_saves(save_id),
+  INDEX idx_cash_ledger_save_day (save_id, day)
+) ENGINE=InnoDB DEFAULT CHARSET=latin1;
+
+-- --------------------------------------------------------
+-- 6d. save_daily_stats (päivän loppuluvut kaavioille, rahat sentteinä)
+-- --------------------------------------------------------
+CREATE TABLE save_daily_stats (
+  save_id INT NOT NULL,
+  day INT NOT NULL,
+  cash_cents BIGINT NOT NULL,
+  fleet_size INT NOT NULL,
+  active_contracts INT NOT NULL,
+  earnings_cents BIGINT NOT NULL,
+  PRIMARY KEY (save_id, day),
+  FOREIGN KEY (save_id) REFERENCES game_saves(save_id)
+) ENGINE=InnoDB DEFAULT CHARSET=latin1;
+
 -- --------------------------------------------------------
 -- 7. flights
 -- --------------------------------------------------------
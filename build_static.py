@@ -0,0 +1,186 @@
+"""
+build_static.py - Staattisten tiedostojen julkaisukäännös
+========================================================
+Kopioi static/-hakemiston tiedostot static_dist/-hakemistoon
+sisältötiivisteellä nimettyinä (app.js → app.3f9a1c2b7d4e.js) ja pakkaa
+tekstitiedostot valmiiksi (.gz aina, .br jos brotli-paketti on asennettu).
+index.html kirjoitetaan uudelleen viittaamaan tiivistenimiin.
+
+Palvelin (api_server) lukee manifest.json-tiedoston:
+- Tiivistenimet palvelee Cache-Control: immutable -otsakkeella (vuoden välimuisti)
+- index.html palvellaan no-cache-otsakkeella (ETag-tarkistus), joten
+  uusintakäynnillä ladataan vain se
+- Pakattu versio valitaan Accept-Encodingin mukaan (br > gzip > pakkaamaton)
+- Tiedostot, joihin viitataan JS:stä alkuperäisellä nimellä (kuvat, äänet),
+  palvellaan edelleen static/-hakemistosta
+
+Jos static_dist/ puuttuu, palvelin toimii kuten ennen (kehitystila).
+
+Käyttö:
+    python build_static.py [--out static_dist]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from typing import Dict, List, Optional
+
+try:  # Valinnainen: brotli-pakkaus
+    import brotli
+except ImportError:  # pragma: no cover - riippuu ympäristöstä
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, "static")
+DIST_DIR = os.environ.get("AFC_STATIC_DIST", os.path.join(ROOT, "static_dist"))
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+INDEX_NAME = "index.html"
+HASH_LENGTH = 12
+# Pakataan vain tekstimuodot (kuvat/äänet ovat jo pakattuja)
+COMPRESS_EXTENSIONS = {".css", ".js", ".html", ".svg", ".json", ".txt"}
+SKIP_EXTENSIONS = {".md"}
+
+_REF_RE = re.compile(r'\b(src|href)="([^"#?:]+)"')
+
+
+def _hashed_name(rel_path: str, data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest}{ext}"
+
+
+def _write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _write_compressed(path: str, data: bytes) -> List[str]:
+    """Kirjoittaa .br/.gz-versiot, jos ne ovat pienempiä. Palauttaa koodaukset."""
+    encodings = []
+    if brotli is not None:
+        packed = brotli.compress(data, quality=11)
+        if len(packed) < len(data):
+            _write(path + ".br", packed)
+            encodings.append("br")
+    packed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(packed) < len(data):
+        _write(path + ".gz", packed)
+        encodings.append("gzip")
+    return encodings
+
+
+def build(static_dir: str = STATIC_DIR, out_dir: str = DIST_DIR) -> Dict:
+    """Rakentaa out_dir-hakemiston ja palauttaa manifestin."""
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+
+    assets: Dict[str, Dict] = {}
+    for dirpath, _dirs, files in os.walk(static_dir):
+        for name in sorted(files):
+            rel = os.path.relpath(os.path.join(dirpath, name), static_dir).replace(os.sep, "/")
+            ext = os.path.splitext(name)[1].lower()
+            if rel == INDEX_NAME or ext in SKIP_EXTENSIONS:
+                continue
+            with open(os.path.join(dirpath, name), "rb") as f:
+                data = f.read()
+            hashed = _hashed_name(rel, data)
+            target = os.path.join(out_dir, hashed)
+            _write(target, data)
+            encodings = _write_compressed(target, data) if ext in COMPRESS_EXTENSIONS else []
+            assets[rel] = {"path": hashed, "size": len(data), "encodings": encodings}
+
+    with open(os.path.join(static_dir, INDEX_NAME), encoding="utf-8") as f:
+        html = f.read()
+
+    def rewrite(m: "re.Match") -> str:
+        asset = assets.get(m.group(2))
+        return f'{m.group(1)}="{asset["path"]}"' if asset else m.group(0)
+
+    index_data = _REF_RE.sub(rewrite, html).encode("utf-8")
+    index_path = os.path.join(out_dir, INDEX_NAME)
+    _write(index_path, index_data)
+    index_encodings = _write_compressed(index_path, index_data)
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "index": {"path": INDEX_NAME, "size": len(index_data), "encodings": index_encodings},
+        "assets": assets,
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+# ---------- Palvelimen apurit ----------
+
+_manifest_cache: Dict[str, object] = {"mtime": None, "manifest": None, "hashed": None}
+
+
+def load_manifest(out_dir: str = DIST_DIR) -> Optional[Dict]:
+    """
+    Palauttaa manifestin (tai None, jos käännöstä ei ole). Luetaan uudelleen
+    vain, jos tiedosto on muuttunut (uusi käännös ilman palvelimen uudelleenkäynnistystä).
+    """
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _manifest_cache["mtime"] != mtime:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        _manifest_cache["hashed"] = {a["path"]: a for a in manifest["assets"].values()}
+        _manifest_cache["manifest"] = manifest
+        _manifest_cache["mtime"] = mtime
+    return _manifest_cache["manifest"]
+
+
+def hashed_asset(rel_path: str, out_dir: str = DIST_DIR) -> Optional[Dict]:
+    """Manifestin tietue tiivistenimelle (esim. "app.3f9a1c2b7d4e.js"), muuten None."""
+    if load_manifest(out_dir) is None:
+        return None
+    return _manifest_cache["hashed"].get(rel_path)
+
+
+def pick_encoding(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """Valitsee Accept-Encoding-otsakkeen perusteella br > gzip (q=0 hylkää)."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            accepted[token.lower()] = q
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rakentaa static_dist/-hakemiston (tiivistenimet + esipakkaus)")
+    parser.add_argument("--out", default=DIST_DIR, help="kohdehakemisto (oletus static_dist)")
+    args = parser.parse_args(argv)
+
+    manifest = build(STATIC_DIR, args.out)
+    raw = sum(a["size"] for a in manifest["assets"].values()) + manifest["index"]["size"]
+    print(f"✅ {len(manifest['assets'])} tiedostoa + {INDEX_NAME} → {args.out} ({raw / 1024:.0f} KiB)")
+    if brotli is None:
+        print("ℹ️  brotli-pakettia ei ole asennettu: vain .gz-versiot")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+"""
+conftest.py - Testien yhteiset fixturet
+=======================================
+Pelimoduulit lukevat tietokantataustan (AFC_DB_BACKEND, AFC_SQLITE_PATH)
+utilsin tuonnin yhteydessä, joten testit tuovat ne vasta sqlite_env-fixturen
+jälkeen. MySQL-taustalla jo tuotu utils ohittaa SQLiteä vaativat testit.
+
+make_save luo siemennetyn tallennuksen halutulla laivastokoolla; api tuo
+api_serverin profiloinnin ja SQL-kirjanpidon kanssa (kaikki testit saavat
+sen tätä kautta, jotta profilointi kytkeytyy tuonnissa).
+"""
+
+import sys
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def sqlite_env(tmp_path_factory):
+    """Ohjaa pelimoduulit väliaikaiseen SQLite-kantaan; palauttaa kannan polun."""
+    with pytest.MonkeyPatch.context() as mp:
+        path = tmp_path_factory.mktemp("afc666") / "test.sqlite3"
+        if "utils" not in sys.modules:
+            mp.setenv("AFC_DB_BACKEND", "sqlite")
+            mp.setenv("AFC_SQLITE_PATH", str(path))
+        import utils
+
+        if utils.DB_BACKEND != "sqlite":
+            pytest.skip("Testi vaatii SQLite-taustan (utils tuotiin jo MySQL-taustalla)")
+        yield path
+
+
+# Laivasto täydennetään lahjakoneilla (sama malli kuin benchmark.py:ssä)
+GIFT_MODEL_CODE = "DC3FREE"
+
+
+@pytest.fixture(scope="session")
+def make_save(sqlite_env):
+    """Tehdas: make_save(seed, fleet_size, cash) -> GameSession (kotitukikohta + lahjakoneet)."""
+    from game_session import GameSession
+
+    def make(seed: int, fleet_size: int, cash: int) -> "GameSession":
+        session = GameSession.new_game(
+            name=f"test-{fleet_size}-{seed}",
+            cash=cash,
+            show_intro=False,
+            rng_seed=seed,
+            interactive=False,
+        )
+        base = session._get_primary_base()
+        for i in range(fleet_size - 1):
+            session._insert_gift_aircraft_tx(
+                model_code=GIFT_MODEL_CODE,
+                current_airport_ident=base["base_ident"],
+                base_id=base["base_id"],
+                nickname=f"test-{i + 2}",
+            )
+        return session
+
+    return make
+
+
+@pytest.fixture(scope="session")
+def api(sqlite_env, tmp_path_factory):
+    """api_server profiloinnin (AFC_PROFILING) ja SQL-kirjanpidon (AFC_SQL_ACCOUNTING) kanssa."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("AFC_PROFILING", "1")
+        mp.setenv("AFC_PROFILE_DIR", str(tmp_path_factory.mktemp("profiles")))
+        import request_profiler
+        import sql_accounting
+
+        if not request_profiler.ENABLED:
+            pytest.skip("request_profiler tuotiin jo ilman AFC_PROFILING=1")
+        # sql_accounting tuotiin jo utilsin mukana: kytketään päälle suoraan
+        mp.setattr(sql_accounting, "ENABLED", True)
+        import api_server
+
+        yield api_server
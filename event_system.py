@@ -8,9 +8,12 @@ from __future__ import annotations
 
 import logging
 import random
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List, Optional, Sequence, Set, Tuple
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
+import metrics
 from utils import get_connection
 from play_sound import event_playsound
 
@@ -33,6 +36,7 @@ class FlightEvent:
     days: float
     duration: int
     sound_file: Optional[str]
+    weather_description: Optional[str] = None
 
     @staticmethod
     def from_row(row: Sequence) -> "FlightEvent":
@@ -49,6 +53,7 @@ class FlightEvent:
                 days=float(row["days"]),
                 duration=int(row["duration"] or 1),
                 sound_file=row.get("sound_file"),
+                weather_description=row.get("weather_description"),
             )
 
         (
@@ -61,7 +66,10 @@ class FlightEvent:
             days,
             duration,
             sound_file,
+            *rest,
         ) = row
+        # Valinnainen 10. sarake: weather_description
+        weather_description = rest[0] if rest else None
         return FlightEvent(
             event_id=int(event_id),
             name=str(event_name),
@@ -72,11 +80,10 @@ class FlightEvent:
             days=float(days or 0),
             duration=int(duration or 1),
             sound_file=str(sound_file) if sound_file is not None else None,
+            weather_description=str(weather_description) if weather_description is not None else None,
         )
 
 
-_current_flight_event: Optional[FlightEvent] = None
-_current_duration_left: int = 0
 # Muistetaan mille (seed, päivä) -yhdistelmille ääni on jo soitettu,
 # jotta sama efekti ei toistu joka kyselyllä.
 _played_event_sounds: Set[Tuple[int, int]] = set()
@@ -102,20 +109,12 @@ def _fetch_event_definitions(cursor) -> List[FlightEvent]:
     return [FlightEvent.from_row(row) for row in rows]
 
 
-def _randomize_flight_event(cursor) -> FlightEvent:
+def _pick_flight_event(event_map: dict, rng=random) -> FlightEvent:
     """Valitsee tapahtuman chance_max-arvojen perusteella."""
 
-    # Rakennetaan sanakirja helpottamaan tapahtuman hakua nimen perusteella.
-
-    events = _fetch_event_definitions(cursor)
-    if not events:
-        logger.error("random_events-taulu on tyhjä, arvontaa ei voi suorittaa")
-        raise RuntimeError("random_events-taulu on tyhjä – tapahtumia ei voida luoda")
-
-    event_map = {evt.name: evt for evt in events}
-    candidate_name = random.choice(list(event_map.keys()))
+    candidate_name = rng.choice(list(event_map.keys()))
     candidate = event_map[candidate_name]
-    roll = random.randint(1, max(1, candidate.chance_max))
+    roll = rng.randint(1, max(1, candidate.chance_max))
 
     # Osuma chance_max-arvoon aktivoi erikoistapahtuman, muuten palautetaan normaali päivä.
     # Arvontamekaniikka: chance_max toimii ylärajana, ja osuma laukaisee erikoistapahtuman.
@@ -129,45 +128,55 @@ def _randomize_flight_event(cursor) -> FlightEvent:
     return normal
 
 
-def _event_for_next_day(cursor) -> FlightEvent:
-    """Palauttaa seuraavan päivän tapahtuman ja päivittää kestolaskurin."""
-
-    # Jos edellinen tapahtuma päättyi, arvotaan uusi ja asetetaan sen kesto.
-
-    global _current_flight_event, _current_duration_left
-
-    # Kun edellinen tapahtuma on päättynyt tai puuttuu, arvotaan uusi tapahtuma.
-    if _current_flight_event is None or _current_duration_left <= 0:
-        _current_flight_event = _randomize_flight_event(cursor)
-        _current_duration_left = max(1, _current_flight_event.duration)
-
-    # Kestolaskuri pienenee joka päivä; sama tapahtuma jatkuu, kunnes duration laskee nollaan.
-    event = _current_flight_event
-    _current_duration_left -= 1
-    return event
+def roll_event_calendar(
+    events: Sequence[FlightEvent],
+    total_days: int,
+    rng=random,
+) -> List[FlightEvent]:
+    """Arpoo päivien 1..total_days tapahtumat (lista, indeksi = päivä - 1).
 
+    Puhdas funktio ilman tietokantaa: tapahtuma arvotaan, se kestää duration
+    päivää ja sen jälkeen arvotaan uusi. Sama rng-tila → sama kalenteri.
+    """
 
-def _load_event_by_name(cursor, event_name: str) -> Optional[FlightEvent]:
-    """Hakee tapahtuman nimen perusteella random_events-taulusta."""
+    if not events:
+        logger.error("random_events-taulu on tyhjä, arvontaa ei voi suorittaa")
+        raise RuntimeError("random_events-taulu on tyhjä – tapahtumia ei voida luoda")
 
-    # Yritetään löytää yksittäinen tapahtumarivi annetulla nimellä.
+    # Rakennetaan sanakirja helpottamaan tapahtuman hakua nimen perusteella.
+    event_map = {evt.name: evt for evt in events}
+    calendar: List[FlightEvent] = []
+    current: Optional[FlightEvent] = None
+    duration_left = 0
+    for _ in range(total_days):
+        # Kun edellinen tapahtuma on päättynyt, arvotaan uusi ja asetetaan sen kesto.
+        if current is None or duration_left <= 0:
+            current = _pick_flight_event(event_map, rng)
+            duration_left = max(1, current.duration)
+        # Sama tapahtuma jatkuu, kunnes kestolaskuri laskee nollaan.
+        calendar.append(current)
+        duration_left -= 1
+    return calendar
+
+
+def fetch_event_definitions() -> List[FlightEvent]:
+    """Julkinen apuri: noutaa kaikki tapahtumamäärittelyt (esim. simulaattorille)."""
 
+    conn = get_connection()
     try:
-        cursor.execute(
-            """
-            SELECT event_id, event_name, description, chance_max,
-                   package_multiplier, plane_damage, days, duration, sound_file
-            FROM random_events
-            WHERE event_name = %s
-            LIMIT 1
-            """,
-            (event_name,),
-        )
-        row = cursor.fetchone()
-    except Exception as exc:  # pragma: no cover - DB-virheet riippuvat konfiguraatiosta
-        logger.exception("Tapahtuman haku epäonnistui nimellä %s", event_name)
-        raise RuntimeError("Tapahtuman haku tietokannasta epäonnistui") from exc
-    return FlightEvent.from_row(row) if row else None
+        cursor = conn.cursor()
+        try:
+            return _fetch_event_definitions(cursor)
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
 
 
 def _load_event_by_id(cursor, event_id: int) -> Optional[FlightEvent]:
@@ -205,10 +214,6 @@ def init_events_for_seed(seed: int, total_days: int) -> bool:
     if seed is None:
         raise ValueError("Seed ei voi olla None tapahtumien alustuksessa")
 
-    global _current_flight_event, _current_duration_left
-    _current_flight_event = None
-    _current_duration_left = 0
-
     conn = get_connection()
     try:
         try:
@@ -225,11 +230,9 @@ def init_events_for_seed(seed: int, total_days: int) -> bool:
             if cursor.fetchone():
                 return False
 
-            entries = []
-            for day in range(1, total_days + 1):
-                # Arvotaan päivän tapahtuma ja puskuroidaan INSERT:ia varten.
-                event = _event_for_next_day(cursor)
-                entries.append((seed, day, event.name))
+            # Arvotaan koko kalenteri kerralla ja puskuroidaan INSERT:ia varten.
+            calendar = roll_event_calendar(_fetch_event_definitions(cursor), total_days)
+            entries = [(seed, day, event.name) for day, event in enumerate(calendar, start=1)]
 
             # Täytetään player_fate-taulu yhdellä kerralla tehokkuuden vuoksi.
             cursor.executemany(
@@ -261,70 +264,90 @@ def init_events_for_seed(seed: int, total_days: int) -> bool:
             pass
 
 
-def get_event_for_day(
-    seed: int,
-    day: int,
-    event_type: str = "flight",
-    play_sound: bool = True,
-) -> Optional[FlightEvent]:
-    """Hakee tietyn päivän tapahtuman. Nykyisin tuetaan vain "flight"-tyyppiä.
+# ---------- Kalenterivälimuisti ----------
+# player_fate ei muutu alustuksen jälkeen ja random_events on staattinen, joten
+# molemmat pidetään prosessin muistissa (yksi tietokanta per prosessi).
+# Kalenterit ovat siemenkohtaisia; vanhimmat pudotetaan CALENDAR_CACHE_SIZE:n yli.
 
-    play_sound-parametrilla voidaan estää ääniefektin toisto, jos kutsu tehdään
-    pelkän simulaation vuoksi (esim. kestoarvion laskenta valikossa).
-    """
+CALENDAR_CACHE_SIZE = 64
 
-    # Vain positiiviset päivät ja tunnettu event_type ovat sallittuja.
+_cache_lock = threading.Lock()
+_event_definitions_by_name: Optional[Dict[str, FlightEvent]] = None
+_calendar_cache: "OrderedDict[int, Dict[int, str]]" = OrderedDict()
+_definitions_stats = metrics.cache_stats("event_definitions")
+_calendar_stats = metrics.cache_stats("event_calendar")
 
-    if seed is None or day <= 0 or event_type != "flight":
-        return None
+
+def get_event_definitions_by_name() -> Dict[str, FlightEvent]:
+    """Tapahtumamäärittelyt nimen mukaan (välimuistista). Sama nimi → pienin event_id."""
+
+    global _event_definitions_by_name
+    with _cache_lock:
+        if _event_definitions_by_name is not None:
+            _definitions_stats.hit()
+            return _event_definitions_by_name
+    _definitions_stats.miss()
 
     conn = get_connection()
     try:
+        cursor = conn.cursor()
         try:
-            # mysql-connector saattaa yrittää palauttaa dict-kursoria; fallback tuplille.
-            cursor = conn.cursor()
-        except TypeError:
-            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT event_id, event_name, description, chance_max,
+                       package_multiplier, plane_damage, days, duration, sound_file,
+                       weather_description
+                FROM random_events
+                ORDER BY event_id
+                """
+            )
+            rows = cursor.fetchall() or []
+        except Exception as exc:  # pragma: no cover - DB-virheet riippuvat konfiguraatiosta
+            logger.exception("random_events-taulun nouto epäonnistui")
+            raise RuntimeError("Tapahtumien noutaminen tietokannasta epäonnistui") from exc
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    by_name: Dict[str, FlightEvent] = {}
+    for row in rows:
+        event = FlightEvent.from_row(row)
+        by_name.setdefault(event.name, event)
+    with _cache_lock:
+        _event_definitions_by_name = by_name
+    return by_name
 
+
+def _get_calendar(seed: int) -> Dict[int, str]:
+    """Siemenen koko kalenteri {päivä: event_name} yhdellä kyselyllä (välimuistista)."""
+
+    with _cache_lock:
+        calendar = _calendar_cache.get(seed)
+        if calendar is not None:
+            _calendar_cache.move_to_end(seed)
+            _calendar_stats.hit()
+            return calendar
+    _calendar_stats.miss()
+
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
         try:
             cursor.execute(
-                "SELECT event_name FROM player_fate WHERE seed = %s AND day = %s LIMIT 1",
-                (seed, day),
+                "SELECT day, event_name FROM player_fate WHERE seed = %s ORDER BY day",
+                (seed,),
             )
-            row = cursor.fetchone()
-            if not row:
-                return None
-
-            event_name = row[0] if not isinstance(row, dict) else row["event_name"]
-            event = _load_event_by_name(cursor, event_name)
-
-            # 🎧 Soitetaan ääniefekti kerran per siemen/päivä, jos sellainen on asetettu.
-            sound_key = (seed, day)
-            if (
-                play_sound
-                and event is not None
-                and event.sound_file
-                and sound_key not in _played_event_sounds
-            ):
-                # Pyritään soittamaan ääniefekti vain kerran per siemen/päivä.
-                try:
-                    if event_playsound(event.name):
-                        _played_event_sounds.add(sound_key)
-                except Exception as exc:  # pragma: no cover - ääniominaisuus riippuu ympäristöstä
-                    logger.warning(
-                        "Ääniefektin toisto epäonnistui tapahtumalle %s (seed %s, päivä %s)",
-                        event.name,
-                        seed,
-                        day,
-                    )
-                    logger.debug("Äänivirheen taustat", exc_info=exc)
-
-            return event
+            rows = cursor.fetchall() or []
         except Exception as exc:  # pragma: no cover - DB-virheet riippuvat konfiguraatiosta
-            logger.exception(
-                "Päivän tapahtuman haku epäonnistui seed=%s, day=%s", seed, day
-            )
-            raise RuntimeError("Päivän tapahtuman haku tietokannasta epäonnistui") from exc
+            logger.exception("Tapahtumakalenterin haku epäonnistui seed=%s", seed)
+            raise RuntimeError("Tapahtumakalenterin haku tietokannasta epäonnistui") from exc
         finally:
             try:
                 cursor.close()
@@ -336,6 +359,117 @@ def get_event_for_day(
         except Exception:
             pass
 
+    calendar = {}
+    for row in rows:
+        day, event_name = (row["day"], row["event_name"]) if isinstance(row, dict) else row
+        calendar.setdefault(int(day), str(event_name))
+
+    # Tyhjää kalenteria ei muisteta: init_events_for_seed voi täyttää sen myöhemmin
+    if calendar:
+        with _cache_lock:
+            _calendar_cache[seed] = calendar
+            _calendar_cache.move_to_end(seed)
+            while len(_calendar_cache) > CALENDAR_CACHE_SIZE:
+                _calendar_cache.popitem(last=False)
+    return calendar
+
+
+def invalidate_event_caches() -> None:
+    """Tyhjentää tapahtuma- ja kalenterivälimuistit (esim. kannan vaihdon jälkeen)."""
+
+    global _event_definitions_by_name
+    with _cache_lock:
+        _event_definitions_by_name = None
+        _calendar_cache.clear()
+
+
+def classify_event(event: FlightEvent) -> str:
+    """Luokittelee tapahtuman vaikutuksen: "negative", "positive" tai "neutral".
+
+    Koneeseen osuva vaurio tai palkkiota pienentävä kerroin on negatiivinen,
+    palkkiota kasvattava kerroin positiivinen, muut neutraaleja.
+    """
+
+    if event.plane_damage > 0 or event.package_multiplier < 1.0:
+        return "negative"
+    if event.package_multiplier > 1.0:
+        return "positive"
+    return "neutral"
+
+
+def get_events_for_range(seed: int, start: int, end: int) -> List[Tuple[int, FlightEvent]]:
+    """Palauttaa päivien start..end (mukaan lukien) tapahtumat päiväjärjestyksessä.
+
+    Kalenteri ja määrittelyt luetaan välimuistista, joten koko kampanjankin
+    hakeminen maksaa enintään kaksi kyselyä. Päivät, joille kalenterissa ei
+    ole (tunnettua) tapahtumaa, jätetään pois.
+    """
+
+    if seed is None:
+        return []
+    start = max(1, int(start))
+    end = int(end)
+    if end < start:
+        return []
+
+    calendar = _get_calendar(seed)
+    if not calendar:
+        return []
+    definitions = get_event_definitions_by_name()
+
+    out: List[Tuple[int, FlightEvent]] = []
+    for day in range(start, min(end, max(calendar)) + 1):
+        event = definitions.get(calendar.get(day))
+        if event is not None:
+            out.append((day, event))
+    return out
+
+
+def get_event_for_day(
+    seed: int,
+    day: int,
+    event_type: str = "flight",
+    play_sound: bool = True,
+) -> Optional[FlightEvent]:
+    """Hakee tietyn päivän tapahtuman. Nykyisin tuetaan vain "flight"-tyyppiä.
+
+    play_sound-parametrilla voidaan estää ääniefektin toisto, jos kutsu tehdään
+    pelkän simulaation vuoksi (esim. kestoarvion laskenta valikossa).
+    """
+
+    # Vain positiiviset päivät ja tunnettu event_type ovat sallittuja.
+
+    if seed is None or day <= 0 or event_type != "flight":
+        return None
+
+    event_name = _get_calendar(seed).get(int(day))
+    if event_name is None:
+        return None
+    event = get_event_definitions_by_name().get(event_name)
+
+    # 🎧 Soitetaan ääniefekti kerran per siemen/päivä, jos sellainen on asetettu.
+    sound_key = (seed, day)
+    if (
+        play_sound
+        and event is not None
+        and event.sound_file
+        and sound_key not in _played_event_sounds
+    ):
+        # Pyritään soittamaan ääniefekti vain kerran per siemen/päivä.
+        try:
+            if event_playsound(event.name):
+                _played_event_sounds.add(sound_key)
+        except Exception as exc:  # pragma: no cover - ääniominaisuus riippuu ympäristöstä
+            logger.warning(
+                "Ääniefektin toisto epäonnistui tapahtumalle %s (seed %s, päivä %s)",
+                event.name,
+                seed,
+                day,
+            )
+            logger.debug("Äänivirheen taustat", exc_info=exc)
+
+    return event
+
 
 def get_event_by_id(event_id: Optional[int]) -> Optional[FlightEvent]:
     """Julkinen apuri tapahtumien noutamiseen suoraan ID:llä."""
@@ -370,5 +504,16 @@ def get_event_by_id(event_id: Optional[int]) -> Optional[FlightEvent]:
             pass
 
 
-__all__ = ["FlightEvent", "init_events_for_seed", "get_event_for_day", "get_event_by_id"]
+__all__ = [
+    "FlightEvent",
+    "roll_event_calendar",
+    "fetch_event_definitions",
+    "init_events_for_seed",
+    "get_event_for_day",
+    "get_event_by_id",
+    "get_event_definitions_by_name",
+    "get_events_for_range",
+    "classify_event",
+    "invalidate_event_caches",
+]
 
@@ -67,10 +67,18 @@ import time
 from typing import List, Optional, Dict, Set, Any
 from decimal import Decimal, ROUND_HALF_UP, getcontext
 from datetime import datetime
+import metrics
+from sql_accounting import recording
 from utils import get_connection, get_db_connection
-from airplane import init_airplanes, upgrade_airplane as db_upgrade_airplane
+from airplane import (
+    FleetStore,
+    get_fleet_store,
+    invalidate_fleet_store,
+    upgrade_airplane as db_upgrade_airplane,
+)
 from event_system import init_events_for_seed, get_event_for_day, FlightEvent
 from session_helpers import (
+    Money,
     _to_dec,
     _icon_title,
     fetch_player_aircrafts_with_model_info,
@@ -79,18 +87,30 @@ from session_helpers import (
     calc_aircraft_upgrade_cost,
     apply_aircraft_upgrade,
     get_effective_eco_for_aircraft,
+    get_airport_index,
+    get_model_catalog,
+    category_tier,
+    pick_banded_destinations,
+    compute_monthly_bill,
+    event_reward_multiplier,
+    roll_task_offer,
+    settle_contract_reward,
+    fetch_pending_arrivals,
+    forecast_cash_flow,
     fetch_owned_bases,
-    fetch_base_current_level_map,
     insert_base_upgrade,
+    apply_base_aircraft_deltas,
+    post_cash_entries,
+    record_daily_stats,
+    PhaseTimer,
 )
+from session_helpers.catalog import STARTER_CATEGORY
 
 # Konfiguraatiot yhdessä paikassa
 from upgrade_config import (
     UPGRADE_CODE,
-    HQ_MONTHLY_FEE,
-    MAINT_PER_AIRCRAFT,
-    BILL_GROWTH_RATE,
-    STARTER_MAINT_DISCOUNT,
+    ECO_MULT_MIN,
+    ECO_MULT_MAX,
     REPAIR_COST_PER_PERCENT,
     SURVIVAL_TARGET_DAYS,
 )
@@ -100,6 +120,14 @@ getcontext().prec = 28
 
 logger = logging.getLogger(__name__)
 
+# Prosessin mittarit (/metrics); päivänvaihdon kesto: afc_phase_seconds{operation="advance_day"}
+_ARRIVALS_PER_DAY = metrics.histogram(
+    "afc_advance_day_arrivals", "Saapuneet lennot per päivänvaihto", buckets=metrics.COUNT_BUCKETS
+)
+_OFFER_GENERATION_SECONDS = metrics.histogram(
+    "afc_offer_generation_seconds", "Rahtitarjousten generointi per kone"
+)
+
 # ---------- GameSession-luokka ----------
 
 class GameSession:
@@ -121,7 +149,7 @@ class GameSession:
         # Tallennetaan konstruktorin parametrit – puuttuvat täydennetään kannasta
         self.save_id = int(save_id)
         self.player_name = player_name
-        self.cash = _to_dec(cash) if cash is not None else None
+        self.cash = cash  # Money (ks. cash-property)
         self.current_day = int(current_day) if current_day is not None else None
         self.status = status
         self.rng_seed = rng_seed
@@ -132,6 +160,20 @@ class GameSession:
         if self.rng_seed is not None:
             random.seed(self.rng_seed)
 
+    @property
+    def cash(self) -> Optional[Money]:
+        """Kassa kokonaislukusentteinä (Money); Decimaliksi vasta tietokantarajalla."""
+        return self._cash
+
+    @cash.setter
+    def cash(self, value) -> None:
+        self._cash = Money.of(value) if value is not None else None
+
+    @property
+    def fleet(self) -> FleetStore:
+        """Tallennuksen laivasto muistissa (ladataan laiskasti, päivitetään muutoksista)."""
+        return get_fleet_store(self.save_id)
+
     # ---------- Luonti / Lataus ----------
 
     @classmethod
@@ -178,7 +220,13 @@ class GameSession:
                 ),
             )
             save_id = kursori.lastrowid
+            # Aloituskassa kirjanpitoon (saldo on jo rivillä)
+            kursori.execute(
+                "INSERT INTO cash_ledger (save_id, day, amount_cents, reason, ref_id) VALUES (%s, %s, %s, %s, %s)",
+                (save_id, start_day, Money.of(cash).cents, "OPENING_BALANCE", None),
+            )
             yhteys.commit()
+            invalidate_fleet_store(save_id)
         except Exception as err:
             yhteys.rollback()
             raise RuntimeError(f"Uuden pelin luonti epäonnistui: {err}") from err
@@ -397,26 +445,21 @@ class GameSession:
         """
         Listaa kaikki aktiiviset koneet ja näytä perusinfot + (ECO)upgradet.
         """
-        planes = init_airplanes(self.save_id, include_sold=False)
+        planes = self.fleet.all()
         if not planes:
             print("ℹ️  Sinulla ei ole vielä koneita.")
             input("\n↩︎ Enter jatkaaksesi...")
             return
 
-        # Haetaan nykyiset ECO-tasot
-        upgrade_levels = self._fetch_upgrade_levels([p.aircraft_id for p in planes])
-
         _icon_title("Laivasto")
         for i, p in enumerate(planes, start=1):
-            cond = getattr(p, "condition_percent", None)
-            cond = int(cond if cond is not None else 0)
+            cond = p.condition_percent
             broken_flag = " (RIKKI)" if cond < 100 else ""
-            lvl = upgrade_levels.get(p.aircraft_id, 0)
-            eco_now = get_effective_eco_for_aircraft(p.aircraft_id)
-            print(f"\n#{i:>2} ✈️  {(getattr(p, 'model_name', None) or p.model_code)} ({p.registration}) @ {p.current_airport_ident}")
+            eco_now = p.effective_eco or 0
+            print(f"\n#{i:>2} ✈️  {(p.model_name or p.model_code)} ({p.registration}) @ {p.current_airport_ident}")
             print(f"   💶 Ostohinta: {self._fmt_money(p.purchase_price)} | 🔧 Kunto: {cond}%{broken_flag} | 🧭 Status: {p.status}")
             print(f"   ⏱️ Tunnit: {p.hours_flown} h | 📅 Hankittu päivä: {p.acquired_day}")
-            print(f"   ♻️ ECO-taso: {lvl} | Efektiivinen eco-kerroin: x{eco_now:.2f}")
+            print(f"   ♻️ ECO-taso: {p.eco_level} | Efektiivinen eco-kerroin: x{eco_now:.2f}")
 
         input("\n↩︎ Enter jatkaaksesi...")
 
@@ -677,9 +720,8 @@ class GameSession:
             if num_to_add <= 0:
                 return
 
-            # Haetaan kaikki mahdolliset konemallit, joita voidaan lisätä
-            kursori.execute("SELECT model_code, purchase_price FROM aircraft_models WHERE category != 'STARTER'")
-            all_models = kursori.fetchall() or []
+            # Kaikki mahdolliset konemallit, joita voidaan lisätä (konemalliluettelosta)
+            all_models = get_model_catalog().non_starter()
             if not all_models: return
 
             for _ in range(num_to_add):
@@ -717,21 +759,17 @@ class GameSession:
         with get_db_connection() as yhteys:
             kursori = yhteys.cursor()
             try:
-                # 1. Varmista kassa ja lukitse pelaajan tallennus
-                kursori.execute("SELECT cash FROM game_saves WHERE save_id = %s FOR UPDATE", (self.save_id,))
-                cash_now = Decimal(kursori.fetchone()[0])
                 price = Decimal(plane_data['purchase_price'])
-                if cash_now < price:
-                    return False
 
-                # 2. Poista ilmoitus markkinoilta
+                # 1. Poista ilmoitus markkinoilta
                 kursori.execute("DELETE FROM market_aircraft WHERE market_id = %s", (plane_data['market_id'],))
                 if kursori.rowcount == 0:
                     print("⚠️  Joku ehti ostaa koneen ennen sinua!");
                     return False
 
-                # 3. Lisää kone pelaajan laivastoon
+                # 2. Lisää kone pelaajan laivastoon (oletuksena pääkonttorille)
                 registration = self._generate_registration()
+                airport_ident = self._get_primary_base_ident() or 'EFHK'
                 kursori.execute(
                     """
                     INSERT INTO aircraft (model_code, current_airport_ident, registration, acquired_day, purchase_price,
@@ -740,7 +778,7 @@ class GameSession:
                     """,
                     (
                         plane_data['model_code'],
-                        self._get_primary_base_ident() or 'EFHK',  # Sijoitetaan oletuksena pääkonttorille
+                        airport_ident,
                         registration,
                         self.current_day,
                         price,
@@ -749,14 +787,22 @@ class GameSession:
                         self.save_id
                     )
                 )
+                new_aircraft_id = kursori.lastrowid
+                apply_base_aircraft_deltas(kursori, self.save_id, {airport_ident: 1})
 
-                # 4. Päivitä pelaajan kassa
-                new_cash = (cash_now - price).quantize(Decimal("0.01"))
-                kursori.execute("UPDATE game_saves SET cash = %s, updated_at = %s WHERE save_id = %s",
-                                (new_cash, datetime.utcnow(), self.save_id))
+                # 3. Veloita kassa kirjanpidon kautta (ei riitä → peruutus)
+                new_cash = post_cash_entries(
+                    kursori, self.save_id, self.current_day,
+                    [(-Money.of(price), "MARKET_AIRCRAFT_PURCHASE", new_aircraft_id)],
+                )
+                if new_cash is None:
+                    yhteys.rollback()
+                    return False
 
+                fleet_version = self.fleet.bump_version(kursori)
                 yhteys.commit()
                 self.cash = new_cash
+                self.fleet.refresh([new_aircraft_id], fleet_version)
                 return True
             except Exception as e:
                 yhteys.rollback()
@@ -827,7 +873,7 @@ class GameSession:
 
         try:
             # Kutsutaan yksinkertaistettua funktiota ilman turhia parametreja
-            apply_aircraft_upgrade(aircraft_id=aircraft_id, installed_day=self.current_day)
+            apply_aircraft_upgrade(aircraft_id=aircraft_id, installed_day=self.current_day, fleet=self.fleet)
             self._add_cash(-cost, context="AIRCRAFT_ECO_UPGRADE")
             self._log_event(
                 "AIRCRAFT_UPGRADE",
@@ -883,9 +929,8 @@ class GameSession:
     # Ensin haetaan kone, (lukitus/FOR UPDATE)
     # Lasketaan puuttuva kunto (100 - condition_percent)
     # Lasketaan korjaukselle hinta (REPAIR_COST_PER_PERCENT configin mukaan)
-    # Lukitaan kassa (SELECT / FOR UPDATE), tarkistetaan riittävyys
     # Päivitetään koneeseen condition_percent = 100, status = "IDLE"
-    # Hinta kassasta yhdellä UPDATE:lla näin pidetään self.cash synkassa
+    # Hinta kirjanpidon kautta (post_cash_entries): ei riitä → peruutus
     #
     # Palauttaa
     # True, jos korjaus onnistui
@@ -927,13 +972,11 @@ class GameSession:
             missing = 100 - cond
             repair_cost = (Decimal(missing) * REPAIR_COST_PER_PERCENT).quantize(Decimal("0.01"))
 
-
-            # Lukitaan kassa ja tarkistetaan rahojen riittävyys
-            kursori.execute("SELECT cash FROM game_saves WHERE save_id = %s FOR UPDATE", (self.save_id,))
-            cash_result = kursori.fetchone()
-            cash_now = _to_dec(cash_result["cash"] if cash_result and "cash" in cash_result else 0)
-
-            if cash_now < repair_cost:
+            # Veloitetaan kassa (ei riitä → peruutus)
+            new_cash = post_cash_entries(
+                kursori, self.save_id, self.current_day, [(-Money.of(repair_cost), "AIRCRAFT_REPAIR", aircraft_id)],
+            )
+            if new_cash is None:
                 yhteys.rollback()
                 print("❌ Kassa ei riitä.")
                 return False
@@ -942,13 +985,6 @@ class GameSession:
                 "UPDATE aircraft SET condition_percent = 100, status = 'IDLE' WHERE aircraft_id = %s", (aircraft_id,),
             )
 
-            # Lasketaan uusi kassa
-            new_cash = (cash_now - repair_cost).quantize(Decimal("0.01"),rounding=ROUND_HALF_UP)
-            kursori.execute(
-                "UPDATE game_saves SET cash = %s, updated_at = %s WHERE save_id = %s",
-                (new_cash, datetime.utcnow(), self.save_id),
-            )
-
             self._log_event(
                 "AIRCRAFT_REPAIR",
                 f"aircraft_id={aircraft_id}; cost={repair_cost}",
@@ -956,9 +992,11 @@ class GameSession:
                 cursor=kursori,
             )
 
+            fleet_version = self.fleet.bump_version(kursori)
             yhteys.commit()
 
             self.cash = new_cash
+            self.fleet.refresh([aircraft_id], fleet_version)
             print(f"Kone {aircraft_id} on korjattu täyteen kuntoon. Se maksoi {self._fmt_money(repair_cost)}.")
             return True
         except Exception as err:
@@ -984,10 +1022,9 @@ class GameSession:
         2. Lasketaan yhteenlaskettu kustannus vain niille koneille jotka:
            - Ovat alle 100% kunnossa
            - Eivät ole lennolla (BUSY)
-        3. Lukitaan kassa ja tarkistetaan riittävyys
+        3. Veloitetaan kokonaiskustannus kirjanpidon kautta (ei riitä → peruutus)
         4. Päivitetään kaikki korjattavat koneet kerralla
-        5. Veloitetaan kokonaiskustannus kertaotteella
-        6. Tulostetaan yhteenveto
+        5. Tulostetaan yhteenveto
 
         Args:
             aircraft_ids: Lista koneiden ID:itä jotka halutaan korjata
@@ -1054,18 +1091,14 @@ class GameSession:
                 print("ℹ️ Ei korjattavaa (koneet jo kunnossa tai lennolla).")
                 return True
 
-            # 4. Lukitaan kassa ja tarkistetaan riittävyys
-            kursori.execute(
-                "SELECT cash FROM game_saves WHERE save_id = %s FOR UPDATE",
-                (self.save_id,)
+            # 4. Veloitetaan kokonaiskustannus kassasta (ei riitä → peruutus)
+            new_cash = post_cash_entries(
+                kursori, self.save_id, self.current_day, [(-Money.of(total_cost), "AIRCRAFT_REPAIR_BULK", None)],
             )
-            cr = kursori.fetchone()
-            cash_now = _to_dec(cr["cash"] if cr and "cash" in cr else 0)
-
-            if cash_now < total_cost:
+            if new_cash is None:
                 yhteys.rollback()
                 print(
-                    f"❌ Kassa ei riitä kaikkien korjaamiseen. Tarvitaan {self._fmt_money(total_cost)}, kassassa {self._fmt_money(cash_now)}.")
+                    f"❌ Kassa ei riitä kaikkien korjaamiseen. Tarvitaan {self._fmt_money(total_cost)}, kassassa {self._fmt_money(self.cash)}.")
                 return False
 
             # 5. Päivitetään kaikki korjattavat koneet kerralla
@@ -1076,13 +1109,6 @@ class GameSession:
                 tuple(repair_ids),
             )
 
-            # 6. Veloitetaan kokonaiskustannus kassasta
-            new_cash = (cash_now - total_cost).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-            kursori.execute(
-                "UPDATE game_saves SET cash = %s, updated_at = %s WHERE save_id = %s",
-                (new_cash, datetime.utcnow(), self.save_id),
-            )
-
             self._log_event(
                 "AIRCRAFT_REPAIR_BULK",
                 f"aircraft_ids={','.join(map(str, repair_ids))}; cost={total_cost}",
@@ -1090,11 +1116,13 @@ class GameSession:
                 cursor=kursori,
             )
 
-            # 7. Commitoidaan kaikki muutokset
+            # 6. Commitoidaan kaikki muutokset
+            fleet_version = self.fleet.bump_version(kursori)
             yhteys.commit()
 
-            # 8. Päivitetään session kassa-arvo ja tulostetaan yhteenveto
+            # 7. Päivitetään session kassa-arvo, laivasto ja tulostetaan yhteenveto
             self.cash = new_cash
+            self.fleet.refresh(repair_ids, fleet_version)
             print(f"✅ Korjattu {len(repair_ids)} konetta. Kokonaishinta: {self._fmt_money(total_cost)}.")
             return True
 
@@ -1219,12 +1247,10 @@ class GameSession:
             input("\n↩︎ Enter jatkaaksesi...")
             return
 
-        level_map = fetch_base_current_level_map([b["base_id"] for b in bases])
-
         _icon_title("Tukikohtien päivitykset")
         menu_rows = []
         for i, b in enumerate(bases, start=1):
-            current = level_map.get(b["base_id"], "SMALL")
+            current = b.get("current_level") or "SMALL"
             cur_idx = BASE_LEVELS.index(current)
 
             if cur_idx >= len(BASE_LEVELS) - 1:
@@ -1303,135 +1329,26 @@ class GameSession:
 
     # ---------- Tehtävät ja lentologiikka (tiivistetty, painopisteet ennallaan) ----------
 
-    def _get_airport_coords(self, ident: str):
-        """
-        Hae kentän koordinaatit airport-taulusta.
-        Palauttaa (lat, lon) floatteina tai None jos data puuttuu.
-        """
-        yhteys = get_connection()
-        try:
-            try:
-                kursori = yhteys.cursor(dictionary=True)
-            except TypeError:
-                kursori = yhteys.cursor()
-
-            kursori.execute(
-                "SELECT latitude_deg, longitude_deg FROM airport WHERE ident = %s",
-                (ident,),
-            )
-            row = kursori.fetchone()
-            if not row:
-                return None
-
-            if isinstance(row, dict):
-                lat, lon = row.get("latitude_deg"), row.get("longitude_deg")
-            else:
-                lat = row[0] if len(row) > 0 else None
-                lon = row[1] if len(row) > 1 else None
-
-            if lat is None or lon is None:
-                return None
-
-            return float(lat), float(lon)
-        finally:
-            try:
-                kursori.close()
-            except Exception:
-                pass
-            yhteys.close()
-
-    def _pick_random_destinations(self, n: int, exclude_ident: str):
-        """
-        Hae n satunnaista kohdekenttää (poislukien exclude_ident).
-
-        HUOM: Determinismiä varten käytetään Pythonin random-moduulia,
-        ei MySQL:n RAND()-funktiota. Haemme KAIKKI sopivat kentät ja
-        valitsemme niistä satunnaisesti Pythonilla.
-        """
-        yhteys = get_connection()
-        try:
-            try:
-                kursori = yhteys.cursor(dictionary=True)
-            except TypeError:
-                kursori = yhteys.cursor()
-
-            # Haetaan KAIKKI sopivat kentät ilman satunnaisuutta
-            # (Poistetaan ORDER BY RAND() jotta determinismi toimii)
-            # Haetaan KAIKKI sopivat kentät joilla on koordinaatit
-            kursori.execute(
-                """
-                SELECT ident, name
-                FROM airport
-                WHERE ident <> %s
-                  AND type IN ('small_airport', 'medium_airport', 'large_airport')
-                  AND latitude_deg IS NOT NULL
-                  AND longitude_deg IS NOT NULL
-                """,
-                (exclude_ident,),
-            )
-
-            rows = kursori.fetchall() or []
-
-            # Jos kenttiä on vähemmän kuin pyydetty, palautetaan kaikki
-            if len(rows) <= n:
-                kohteet = []
-                for r in rows:
-                    if isinstance(r, dict):
-                        kohteet.append({"ident": r["ident"], "name": r.get("name")})
-                    else:
-                        kohteet.append({"ident": r[0], "name": r[1] if len(r) > 1 else None})
-                return kohteet
-
-            # Valitaan satunnaisesti n kenttää Pythonin random-moduulilla
-            # Tämä käyttää asetettua RNG-siementä!
-            selected_rows = random.sample(rows, n)
-
-            kohteet = []
-            for r in selected_rows:
-                if isinstance(r, dict):
-                    kohteet.append({"ident": r["ident"], "name": r.get("name")})
-                else:
-                    kohteet.append({"ident": r[0], "name": r[1] if len(r) > 1 else None})
-
-            return kohteet
-
-        finally:
-            try:
-                kursori.close()
-            except Exception:
-                pass
-            yhteys.close()
-
-    def _haversine_km(self, lat1, lon1, lat2, lon2) -> float:
+    def _pick_banded_destinations(self, dep_ident: str, dep_xy, range_km, count: int) -> List[dict]:
         """
-        Haversine-kaava kahden pisteen etäisyyteen (km).
+        Arpoo 'count' kohdekenttää tasaisesti OFFER_DISTANCE_BANDS-kaistoista
+        (ks. session_helpers.airports.pick_banded_destinations).
         """
-        R = 6371.0
-        phi1, phi2 = math.radians(lat1), math.radians(lat2)
-        dphi = math.radians(lat2 - lat1)
-        dl = math.radians(lon2 - lon1)
-        a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dl / 2) ** 2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        return R * c
+        return pick_banded_destinations(get_airport_index(), dep_ident, dep_xy, range_km, count)
 
     def _random_task_offers_for_plane(self, plane, count: int = 5):
         """
         Generoi 'count' kpl tämän päivän rahtitarjouksia annetulle koneelle.
+        - Kohteet arvotaan etäisyyskaistoittain koneen kantaman (range_km) sisältä.
         - Etäisyyteen suhteutettu rahtimäärä (voi ylittää kapasiteetin → useita reissuja).
         - Kesto lasketaan matkan ja nopeuden perusteella; yli-kapasiteetti kasvattaa total_days.
-        - Palkkio: (payload * PER_KG + distance * PER_KM) * effective_eco
+        - Palkkio: (payload * TASK_REWARD_PER_KG + distance * TASK_REWARD_PER_KM) * effective_eco
           ja lattia varmistaa ettei palkkio mene negatiiviseksi/turhan pieneksi.
         - Sakko on osuus palkkiosta, mutta ei koskaan negatiivinen.
-        Muokkaa: PER_KG, PER_KM, MIN_TASK_REWARD, ECO_MIN/ECO_MAX.
+        Kaavat: session_helpers.economy (roll_task_offer), parametrit upgrade_configissa.
         """
+        started = time.perf_counter()
         try:
-            # Muokattavat palkkioparametrit
-            PER_KG = Decimal("10.10")  # €/kg
-            PER_KM = Decimal("6.90")  # €/km
-            MIN_TASK_REWARD = Decimal("250.00")  # alin sallittu palkkio
-            ECO_MIN = Decimal("0.10")  # eco-kerroin ei alle tämän
-            ECO_MAX = Decimal("5.00")  # eikä yli tämän
-            
             dep_ident = plane.get("current_airport_ident")
             if not dep_ident:
                 print(f"⚠️ Koneella {plane.get('aircraft_id')} ei ole sijaintia.")
@@ -1449,78 +1366,30 @@ class GameSession:
             except Exception:
                 eff_eco = Decimal(str(plane.get("eco_fee_multiplier") or 1.0))
             # Rajaa eco kohtuullisiin rajoihin
-            eff_eco = max(ECO_MIN, min(ECO_MAX, eff_eco))
+            eff_eco = max(ECO_MULT_MIN, min(ECO_MULT_MAX, eff_eco))
 
-            # Haetaan hieman ylimääräisiä kohteita siltä varalta, että osa karsiutuu
-            dests = self._pick_random_destinations(count * 2, dep_ident)
+            # Kohteet arvotaan etäisyyskaistoittain koneen kantaman sisältä
+            index = get_airport_index()
+            dep_xy = index.coords(dep_ident)
+            if not dep_xy:
+                print(f"⚠️ Kentän {dep_ident} koordinaatit puuttuvat.")
+                return []
+            dests = self._pick_banded_destinations(dep_ident, dep_xy, plane.get("range_km"), count)
             if not dests:
                 print(f"⚠️ Ei kohteita saatavilla kentältä {dep_ident}.")
                 return []
 
-            offers = []
-
-            for d in dests:
-                if len(offers) >= count:
-                    break
-
-                dest_ident = d["ident"]
-                dep_xy = self._get_airport_coords(dep_ident)
-                dst_xy = self._get_airport_coords(dest_ident)
-                if not (dep_xy and dst_xy):
-                    # Jos koordinaatit puuttuvat, ohitetaan
-                    continue
-
-                # Etäisyys (km)
-                dist_km = self._haversine_km(dep_xy[0], dep_xy[1], dst_xy[0], dst_xy[1])
-
-                # Rahti skaalataan etäisyyden mukaan; sallitaan yli-kapasiteetti (→ useita reissuja)
-                if dist_km < 500:
-                    base_payload = random.randint(max(1, capacity // 2), max(1, capacity * 3))
-                elif dist_km < 1500:
-                    base_payload = random.randint(capacity, capacity * 4)
-                else:
-                    base_payload = random.randint(capacity * 2, capacity * 6)
-
-                # Päivän tapahtuma ei enää vaikuta etukäteen lastiin; käytetään perusrahtia.
-                payload = max(1, int(base_payload))
-
-                # Peruskesto (päivinä) matkan mukaan; yli-kapasiteetti lisää reissujen määrää ja kokonaiskestoa
-                base_days = max(1, math.ceil(dist_km / speed_km_per_day))
-                trips = max(1, math.ceil(payload / capacity))
-                total_days = base_days * trips
-
-                # Palkkion laskenta (lattia varmistaa ettei negatiivinen)
-                base_reward = (Decimal(payload) * PER_KG) + (Decimal(dist_km) * PER_KM)
-                reward = (base_reward * eff_eco).quantize(Decimal("0.01"))
-                if reward < MIN_TASK_REWARD:
-                    reward = MIN_TASK_REWARD
-
-                # Sakko osuutena; ei koskaan negatiivinen
-                penalty = (reward * Decimal("0.30")).quantize(Decimal("0.01"))
-                if penalty < Decimal("0.00"):
-                    penalty = Decimal("0.00")
-
-                # Deadline: kokonaiskesto + puskuri
-                buffer_days = max(1, trips // 2)
-                deadline = self.current_day + total_days + buffer_days
-
-                offers.append({
-                    "dest_ident": dest_ident,
-                    "dest_name": d.get("name"),
-                    "payload_kg": payload,
-                    "distance_km": dist_km,
-                    "base_days": base_days,
-                    "trips": trips,
-                    "total_days": total_days,
-                    "reward": reward,
-                    "penalty": penalty,
-                    "deadline": deadline,
-                })
+            offers = [
+                roll_task_offer(d, capacity, speed_km_per_day, eff_eco, self.current_day)
+                for d in dests
+            ]
 
-            return offers[:count]
+            return offers
         except Exception as e:
             print(f"❌ Virhe tarjousten generoinnissa: {e}")
             return []
+        finally:
+            _OFFER_GENERATION_SECONDS.observe(time.perf_counter() - started)
 
     def show_active_tasks(self) -> None:
         """
@@ -1628,6 +1497,7 @@ class GameSession:
                        am.model_name,
                        am.base_cargo_kg,
                        am.cruise_speed_kts,
+                       am.range_km,
                        am.eco_fee_multiplier
                 FROM aircraft a
                          JOIN aircraft_models am ON am.model_code = a.model_code
@@ -1745,7 +1615,7 @@ class GameSession:
                             %s, %s, %s, %s)
                     """,
                     (
-                        offer["payload_kg"], offer["reward"], offer["penalty"], "NORMAL",
+                        offer["payload_kg"], _to_dec(offer["reward"]), _to_dec(offer["penalty"]), "NORMAL",
                         now_day, offer["deadline"], now_day, None,
                         "IN_PROGRESS", 0, 0,
                         self.save_id, plane["aircraft_id"], offer["dest_ident"], None
@@ -1792,7 +1662,10 @@ class GameSession:
                     cursor=kursori,
                 )
 
+                self._bump_contracts_version(kursori)
+                fleet_version = self.fleet.bump_version(kursori)
                 yhteys.commit()
+                self.fleet.refresh([plane["aircraft_id"]], fleet_version)
                 print(f"✅ Tehtävä #{contract_id} aloitettu. ETA: {baseline_arr_day} (lähtöjä {offer['trips']}).")
                 print("ℹ️  Palkkio hyvitetään, kun lento on saapunut (Seuraava päivä).")
             except Exception as e:
@@ -1808,21 +1681,229 @@ class GameSession:
                 pass
             yhteys.close()
 
+    def accept_task_offers_bulk(self, items: List[dict]) -> List[dict]:
+        """
+        Hyväksyy useita tarjouksia yhdellä transaktiolla (koko laivaston lähetys kerralla).
+
+        Koneet lukitaan yhdellä FOR UPDATE -haulla, jokainen pari validoidaan
+        (IDLE-tila, kunto 100 %) ja hyväksytyt sopimukset, lennot ja lokirivit
+        lisätään executemany-kutsuilla. Virheelliset parit eivät kaada muita.
+
+        Args:
+            items: [{"aircraft_id": int, "offer": {...}}, ...]; offer kuten
+                   _random_task_offers_for_plane palauttaa (reward/penalty myös merkkijonoina)
+
+        Returns:
+            Tulos jokaiselle parille samassa järjestyksessä:
+            {"aircraft_id", "ok": True, "contractId", "destination", "eta_day", "reward"}
+            tai {"aircraft_id", "ok": False, "virhe": str}
+        """
+        results: List[Optional[dict]] = [None] * len(items)
+        now_day = self.current_day
+        candidates = []  # (indeksi, aircraft_id, offer)
+        seen_ids: Set[int] = set()
+
+        for i, item in enumerate(items):
+            item = item if isinstance(item, dict) else {}
+            offer = item.get("offer") or {}
+            try:
+                aircraft_id = int(item.get("aircraft_id"))
+            except (TypeError, ValueError):
+                results[i] = {"aircraft_id": item.get("aircraft_id"), "ok": False, "virhe": "aircraft_id on pakollinen"}
+                continue
+            if not offer.get("dest_ident"):
+                results[i] = {"aircraft_id": aircraft_id, "ok": False, "virhe": "Tarjouksen kohde on pakollinen"}
+                continue
+            if aircraft_id in seen_ids:
+                results[i] = {"aircraft_id": aircraft_id, "ok": False, "virhe": "Kone on jo tässä erässä"}
+                continue
+            seen_ids.add(aircraft_id)
+            candidates.append((i, aircraft_id, offer))
+
+        if not candidates:
+            return results
+
+        ids = [aid for _, aid, _ in candidates]
+        placeholders = ", ".join(["%s"] * len(ids))
+
+        yhteys = get_connection()
+        try:
+            kursori = yhteys.cursor(dictionary=True)
+            try:
+                yhteys.start_transaction()
+
+                # Lukitaan kaikki erän koneet kerralla
+                kursori.execute(
+                    f"""
+                    SELECT aircraft_id, status, current_airport_ident, condition_percent
+                    FROM aircraft
+                    WHERE save_id = %s AND aircraft_id IN ({placeholders})
+                    FOR UPDATE
+                    """,
+                    (self.save_id, *ids),
+                )
+                planes = {int(r["aircraft_id"]): r for r in (kursori.fetchall() or [])}
+
+                accepted = []  # (indeksi, aircraft_id, dep_ident, dest, payload, reward, penalty, deadline, arr_day, dist)
+                for i, aircraft_id, offer in candidates:
+                    plane = planes.get(aircraft_id)
+                    if not plane:
+                        results[i] = {"aircraft_id": aircraft_id, "ok": False, "virhe": "Konetta ei löytynyt"}
+                        continue
+                    if plane["status"] != "IDLE":
+                        results[i] = {"aircraft_id": aircraft_id, "ok": False,
+                                      "virhe": f"Kone on tilassa {plane['status']}, ei IDLE"}
+                        continue
+                    condition = int(plane.get("condition_percent") or 0)
+                    if condition < 100:
+                        results[i] = {"aircraft_id": aircraft_id, "ok": False,
+                                      "virhe": f"Kone ei ole 100% kunnossa (nykyinen: {condition}%)"}
+                        continue
+                    try:
+                        total_days = int(offer.get("total_days", 1))
+                        trips = int(offer.get("trips", 1))
+                        accepted.append((
+                            i,
+                            aircraft_id,
+                            plane["current_airport_ident"],
+                            offer["dest_ident"],
+                            int(offer.get("payload_kg", 0)),
+                            _to_dec(offer.get("reward", "0")),
+                            _to_dec(offer.get("penalty", "0")),
+                            offer.get("deadline"),
+                            now_day + total_days,
+                            float(offer.get("distance_km", 0)) * trips,
+                        ))
+                    except (TypeError, ValueError, ArithmeticError):
+                        results[i] = {"aircraft_id": aircraft_id, "ok": False, "virhe": "Virheellinen tarjous"}
+
+                if accepted:
+                    kursori.executemany(
+                        """
+                        INSERT INTO contracts (payload_kg, reward, penalty, priority,
+                                               created_day, deadline_day, accepted_day, completed_day,
+                                               status, lost_packages, damaged_packages,
+                                               save_id, aircraft_id, ident, event_id)
+                        VALUES (%s, %s, %s, %s,
+                                %s, %s, %s, %s,
+                                %s, %s, %s,
+                                %s, %s, %s, %s)
+                        """,
+                        [
+                            (payload, reward, penalty, "NORMAL",
+                             now_day, deadline, now_day, None,
+                             "IN_PROGRESS", 0, 0,
+                             self.save_id, aircraft_id, dest, None)
+                            for _, aircraft_id, _, dest, payload, reward, penalty, deadline, _, _ in accepted
+                        ],
+                    )
+
+                    # Uusimmat sopimukset koneittain; IDLE-koneella ei ole muita keskeneräisiä
+                    acc_placeholders = ", ".join(["%s"] * len(accepted))
+                    kursori.execute(
+                        f"""
+                        SELECT aircraft_id, MAX(contractId) AS contract_id
+                        FROM contracts
+                        WHERE save_id = %s AND status = 'IN_PROGRESS'
+                          AND aircraft_id IN ({acc_placeholders})
+                        GROUP BY aircraft_id
+                        """,
+                        (self.save_id, *[a[1] for a in accepted]),
+                    )
+                    contract_ids = {int(r["aircraft_id"]): int(r["contract_id"]) for r in (kursori.fetchall() or [])}
+
+                    kursori.executemany(
+                        """
+                        INSERT INTO flights (created_day, dep_day, arrival_day, status, distance_km, schedule_delay_min,
+                                             emission_kg_co2, eco_fee, dep_ident, arr_ident, aircraft_id, save_id,
+                                             contract_id)
+                        VALUES (%s, %s, %s, %s, %s, %s,
+                                %s, %s, %s, %s, %s, %s, %s)
+                        """,
+                        [
+                            (now_day, now_day, arr_day, "ENROUTE", dist, 0,
+                             Decimal("0.0"), Decimal("0.00"), dep_ident, dest, aircraft_id, self.save_id,
+                             contract_ids[aircraft_id])
+                            for _, aircraft_id, dep_ident, dest, _, _, _, _, arr_day, dist in accepted
+                        ],
+                    )
+
+                    kursori.execute(
+                        f"UPDATE aircraft SET status = 'BUSY' WHERE save_id = %s AND aircraft_id IN ({acc_placeholders})",
+                        (self.save_id, *[a[1] for a in accepted]),
+                    )
+                    fleet_version = self.fleet.bump_version(kursori)
+                    self._bump_contracts_version(kursori)
+
+                    self._log_events(
+                        [
+                            ("CONTRACT_STARTED",
+                             f"contract_id={contract_ids[aircraft_id]}; dest={dest}; payload={payload}; "
+                             f"eta_day={arr_day}; duration_days={arr_day - now_day}")
+                            for _, aircraft_id, _, dest, payload, _, _, _, arr_day, _ in accepted
+                        ],
+                        event_day=now_day,
+                        cursor=kursori,
+                    )
+
+                yhteys.commit()
+            except Exception:
+                yhteys.rollback()
+                raise
+            if accepted:
+                self.fleet.refresh((a[1] for a in accepted), fleet_version)
+
+            for i, aircraft_id, _, dest, _, reward, _, _, arr_day, _ in accepted:
+                results[i] = {
+                    "aircraft_id": aircraft_id,
+                    "ok": True,
+                    "contractId": contract_ids[aircraft_id],
+                    "destination": dest,
+                    "eta_day": arr_day,
+                    "reward": reward,
+                }
+            return results
+        finally:
+            try:
+                kursori.close()
+            except Exception:
+                pass
+            yhteys.close()
+
     # ---------- Seuraava päivä + kuukausilaskut ----------
 
-    def advance_to_next_day(self, silent: bool = False) -> dict:
+    def advance_to_next_day(self, silent: bool = False, timings: bool = False) -> dict:
         """
         Siirtää päivän eteenpäin yhdellä, prosessoi saapuneet lennot ja päivittää kassaa.
         Tarkistaa myös, onko joutilaita koneita väärillä kentillä ja lähettää ne kotiin.
+
+        Vaiheiden kestot kirjataan aina prosessin histogrammeihin (phase_histograms).
+        timings=True lisää yhteenvetoon "timings"-osion: kesto ja SQL-lauseet vaiheittain
+        (rtb, day_update, arrivals_query, arrival, event_lookup, base_counts,
+        cash_update, commit, billing).
         """
+        timer = PhaseTimer("advance_day", statements=timings)
+        if timings:
+            with recording(timer.recorder):
+                summary = self._advance_one_day(silent, timer)
+        else:
+            summary = self._advance_one_day(silent, timer)
+        report = timer.finish()
+        _ARRIVALS_PER_DAY.observe(summary.get("arrivals", 0))
+        if timings:
+            summary["timings"] = report
+        return summary
+
+    def _advance_one_day(self, silent: bool, timer: PhaseTimer) -> dict:
+        """advance_to_next_day:n runko; timer mittaa vaiheet."""
         # --- LÄHETÄ KONEET KOTIIN (RTB) ---------------------------------
-        # Ajetaan tämä vain joka 3. päivä suorituskyvyn säästämiseksi pikakelauksessa
-        if self.current_day % 3 == 0:
+        with timer.phase("rtb"):
             self._initiate_return_flights_for_idle_aircraft(silent=silent)
 
         new_day = self.current_day + 1
         arrivals_count = 0
-        total_delta = Decimal("0.00") # Sopimuksista ansaittu raha
+        total_delta = Money(0)  # Sopimuksista ansaittu raha
+        ledger_entries: List[tuple] = []  # Kirjanpitorivit, kirjataan yhtenä eränä
         db_timestamp = datetime.utcnow()
         arrival_details: List[str] = []
 
@@ -1831,6 +1912,7 @@ class GameSession:
             # Käytetään dictionary=True, jotta sarakkeisiin voi viitata nimillä
             kursori = yhteys.cursor(dictionary=True)
             try:
+                timer.start("day_update")
                 yhteys.start_transaction()
 
                 # Päivitä pelin päivä tietokantaan
@@ -1838,16 +1920,20 @@ class GameSession:
                     "UPDATE game_saves SET current_day = %s, updated_at = %s WHERE save_id = %s",
                     (new_day, db_timestamp, self.save_id),
                 )
+                timer.stop("day_update")
 
                 # Hae SAAPUVAT lennot (sekä sopimuslennot että paluulennot)
+                timer.start("arrivals_query")
                 kursori.execute(
                     """
                     SELECT f.flight_id, f.contract_id, f.aircraft_id,
                            f.arr_ident, f.arrival_day, f.dep_day, f.status AS flight_status,
-                           c.deadline_day, c.reward, c.penalty, c.payload_kg
+                           c.deadline_day, c.reward, c.penalty, c.payload_kg,
+                           a.current_airport_ident AS from_ident
                     FROM flights f
                     -- LEFT JOIN, jotta paluulennot (ei sopimusta) tulevat mukaan
                     LEFT JOIN contracts c ON c.contractId = f.contract_id
+                    JOIN aircraft a ON a.aircraft_id = f.aircraft_id
                     WHERE f.save_id = %s
                     -- KÄSITTELE SEKÄ ENROUTE ETTÄ ENROUTE_RTB TILAT --
                     AND f.status IN ('ENROUTE', 'ENROUTE_RTB')
@@ -1856,10 +1942,14 @@ class GameSession:
                     (self.save_id, new_day),
                 )
                 arrivals = kursori.fetchall() or []
+                timer.stop("arrivals_query")
                 arrivals_count = len(arrivals)
                 daily_events: List[dict] = []
+                # Tukikohtien konemäärät: kone siirtyy lähtökentältä saapumiskentälle
+                base_deltas: Dict[str, int] = {}
 
                 for flight_data in arrivals:
+                    timer.start("arrival")
                     flight_id = flight_data["flight_id"]
                     aircraft_id = flight_data["aircraft_id"]
                     arr_ident = flight_data["arr_ident"]
@@ -1887,14 +1977,18 @@ class GameSession:
                         "UPDATE aircraft SET status = 'IDLE', current_airport_ident = %s WHERE aircraft_id = %s",
                         (arr_ident, aircraft_id),
                     )
+                    from_ident = flight_data["from_ident"]
+                    if from_ident != arr_ident:
+                        base_deltas[from_ident] = base_deltas.get(from_ident, 0) - 1
+                        base_deltas[arr_ident] = base_deltas.get(arr_ident, 0) + 1
 
                     # --- Käsittele sopimus (Vain jos kyseessä sopimuslento, EI RTB) ---
                     contract_id = flight_data["contract_id"]
                     # Tarkista, ettei contract_id ole NULL ja että status oli 'ENROUTE'
                     if contract_id is not None and current_flight_status == 'ENROUTE':
                         deadline = int(flight_data["deadline_day"])
-                        reward = _to_dec(flight_data["reward"])
-                        penalty = _to_dec(flight_data["penalty"])
+                        reward = Money.of(flight_data["reward"])
+                        penalty = Money.of(flight_data["penalty"])
                         payload_val = flight_data.get("payload_kg") if isinstance(flight_data, dict) else None
                         payload_kg = int(payload_val) if payload_val is not None else 0
 
@@ -1903,14 +1997,10 @@ class GameSession:
                         event_damage = 0
                         base_contract_reward = reward
                         if self.rng_seed is not None:
-                            arrival_event = get_event_for_day(self.rng_seed, arr_day, "flight")
+                            with timer.phase("event_lookup"):
+                                arrival_event = get_event_for_day(self.rng_seed, arr_day, "flight")
                             if arrival_event is not None:
-                                try:
-                                    event_multiplier = Decimal(str(arrival_event.package_multiplier or 1.0))
-                                except (ArithmeticError, ValueError):
-                                    event_multiplier = Decimal("1.0")
-                                if event_multiplier < Decimal("0.0"):
-                                    event_multiplier = Decimal("0.0")
+                                event_multiplier = event_reward_multiplier(arrival_event.package_multiplier)
                                 event_damage = max(0, int(arrival_event.plane_damage or 0))
 
                         # ✈️🛠️ Tapahtuma voi vahingoittaa koneen kuntoa saapuessa.
@@ -1921,23 +2011,13 @@ class GameSession:
                                 (event_damage, aircraft_id),
                             )
 
-                        # Määritä sopimuksen lopputulos ja palkkio ennen tapahtumaa
-                        if new_day <= deadline:
-                            base_reward = reward
-                            new_contract_status = "COMPLETED"
-                        else:
-                            base_reward = max(Decimal("0.00"), reward - penalty)
-                            new_contract_status = "COMPLETED_LATE"
-
-                        final_reward = (base_reward * event_multiplier).quantize(
-                            Decimal("0.01"), rounding=ROUND_HALF_UP
+                        # Sopimuksen lopputulos: myöhästymissakko ja tapahtuman kerroin (economy)
+                        final_reward, late = settle_contract_reward(
+                            reward, penalty, deadline, new_day, event_multiplier
                         )
-                        if final_reward < Decimal("0.00"):
-                            final_reward = Decimal("0.00")
+                        new_contract_status = "COMPLETED_LATE" if late else "COMPLETED"
 
-                        event_adjustment = (base_contract_reward - final_reward).quantize(
-                            Decimal("0.01")
-                        )
+                        event_adjustment = base_contract_reward - final_reward
 
                         delivered_payload = Decimal(payload_kg)
                         lost_packages = 0
@@ -1962,13 +2042,14 @@ class GameSession:
                                 arrival_event.event_id if arrival_event is not None else None,
                                 lost_packages,
                                 event_damage,
-                                final_reward,
-                                event_adjustment,
+                                final_reward.to_decimal(),
+                                event_adjustment.to_decimal(),
                                 contract_id,
                             ),
                         )
 
                         total_delta += final_reward
+                        ledger_entries.append((final_reward, "CONTRACT_REWARD", contract_id))
 
                         # Kerää raportointia varten lisätiedot myöhempää tulostusta varten
                         summary_bits = [
@@ -1984,7 +2065,7 @@ class GameSession:
                                 summary_bits.append(f"paketteja hukassa {lost_packages} kg")
                         if new_day > deadline:
                             summary_bits.append("myöhäinen toimitus")
-                        if event_adjustment != Decimal("0.00"):
+                        if event_adjustment:
                             summary_bits.append(
                                 f"tapahtumasta vähennettiin {self._fmt_money(event_adjustment)}"
                             )
@@ -2004,7 +2085,7 @@ class GameSession:
                                 log_parts.append(f"multiplier={event_multiplier}")
                             if event_damage > 0:
                                 log_parts.append(f"damage={event_damage}")
-                            if event_adjustment != Decimal("0.00"):
+                            if event_adjustment:
                                 log_parts.append(f"event_delta={event_adjustment}")
                         if lost_packages > 0:
                             log_parts.append(f"lost={lost_packages}")
@@ -2028,17 +2109,19 @@ class GameSession:
                                     "lost_packages": lost_packages,
                                 }
                             )
+                    timer.stop("arrival")
+
+                with timer.phase("base_counts"):
+                    apply_base_aircraft_deltas(kursori, self.save_id, base_deltas)
+
+                # --- Päivitä kassa (jos sopimuksia valmistui): kirjanpito + saldo yhdellä erällä ---
+                timer.start("cash_update")
+                if total_delta:
+                    self.cash = post_cash_entries(
+                        kursori, self.save_id, new_day, ledger_entries, allow_negative=True
+                    )
 
-                # --- Päivitä kassa (jos sopimuksia valmistui) ---
-                if total_delta != Decimal("0.00"):
-                    # Lukitse pelaajan tallennus päivitystä varten
-                    kursori.execute("SELECT cash FROM game_saves WHERE save_id = %s FOR UPDATE", (self.save_id,))
-                    cur_cash = _to_dec(kursori.fetchone()["cash"])
-                    new_cash = (cur_cash + total_delta).quantize(Decimal("0.01"))
-                    # Päivitä kassa tietokantaan
-                    kursori.execute("UPDATE game_saves SET cash = %s WHERE save_id = %s", (new_cash, self.save_id))
-                    # Päivitä kassa myös sessio-olioon heti
-                    self.cash = new_cash
+                record_daily_stats(kursori, self.save_id, new_day, total_delta)
 
                 self._log_event(
                     "DAY_ADVANCE",
@@ -2046,11 +2129,22 @@ class GameSession:
                     event_day=new_day,
                     cursor=kursori,
                 )
+                timer.stop("cash_update")
 
                 # Hyväksy kaikki muutokset tietokantaan
+                timer.start("commit")
+                # Saapuneiden koneiden ja lentojen muutokset ja versiot samassa commitissa
+                fleet_version = None
+                if arrivals:
+                    fleet_version = self.fleet.bump_version(kursori)
+                    self._bump_contracts_version(kursori)
                 yhteys.commit()
                 # Päivitä päivä sessio-olioon vasta onnistuneen commitin jälkeen
                 self.current_day = new_day
+                # Saapuneiden koneiden status, sijainti, tunnit ja kunto muuttuivat
+                if arrivals:
+                    self.fleet.refresh((f["aircraft_id"] for f in arrivals), fleet_version)
+                timer.stop("commit")
 
             except Exception as e:
                 # Peru muutokset, jos jokin meni pieleen
@@ -2062,7 +2156,7 @@ class GameSession:
                 return {
                     "day": self.current_day,
                     "arrivals": 0,
-                    "earned": Decimal("0.00"),
+                    "earned": Money(0),
                     "arrival_details": [],
                     "events": [],
                     "bills": [],
@@ -2082,7 +2176,8 @@ class GameSession:
             # Tarkista, onko laskutuspäivä (joka 30. päivä) ja onko peli aktiivinen
             bill_records: List[dict] = []
             if self.current_day % 30 == 0 and self.status == "ACTIVE":
-                bill_info = self._process_monthly_bills(silent=silent)
+                with timer.phase("billing"):
+                    bill_info = self._process_monthly_bills(silent=silent)
                 if bill_info:
                     bill_records.append(bill_info)
 
@@ -2122,7 +2217,7 @@ class GameSession:
             return {
                 "day": self.current_day,
                 "arrivals": 0,
-                "earned": Decimal("0.00"),
+                "earned": Money(0),
                 "arrival_details": [],
                 "events": [],
                 "bills": [],
@@ -2167,29 +2262,16 @@ class GameSession:
             except Exception:
                 pass  # [cite: 449]
 
-        # Lasketaan ensin laskun perussumma ilman korkoja
-        maint_starter = (MAINT_PER_AIRCRAFT * STARTER_MAINT_DISCOUNT) * starter_planes
-        maint_nonstarter = MAINT_PER_AIRCRAFT * max(0, total_planes - starter_planes)
-        base_bill = (HQ_MONTHLY_FEE + maint_starter + maint_nonstarter).quantize(Decimal("0.01"))  #
-
-        # UUSI OSA: Laske "korkoa korolle" 60. päivästä alkaen
-        total_bill = base_bill
-        growth_multiplier = Decimal("1.00")
-        if self.current_day >= 60:
-            # Lasketaan, monesko korollinen laskutuskausi on menossa.
-            # Päivä 60 = 1. kausi, Päivä 90 = 2. kausi jne.
-            growth_periods = (self.current_day // 30) - 1
-
-            # Sovelletaan korkoa korolle -kaavaa peruslaskuun
-            # Kaava: Loppusumma = Perussumma * (1 + korko)^kaudet
-            growth_multiplier = Decimal((1 + BILL_GROWTH_RATE) ** growth_periods)
-            total_bill = (base_bill * growth_multiplier).quantize(Decimal("0.01"))
+        # Perussumma ja "korkoa korolle" 60. päivästä alkaen (session_helpers.economy)
+        base_bill, growth_multiplier, total_bill = compute_monthly_bill(
+            self.current_day, total_planes, starter_planes
+        )
 
         if not silent:
             print("\n💸 Kuukausilaskut erääntyivät!")
             print(f"   🏢Lainat, Vuokrat ja Huollot (perussumma): {self._fmt_money(base_bill)}")
-            if self.current_day >= 60:
-                print(f"   📈 Inflaatiokorotus: +{((total_bill / base_bill - 1) * 100):.1f}%")
+            if growth_multiplier != 1:
+                print(f"   📈 Inflaatiokorotus: +{((growth_multiplier - 1) * 100):.1f}%")
             print(f"   ➖ Yhteensä maksettavaa: {self._fmt_money(total_bill)}")
 
         # Maksu tai konkurssi
@@ -2243,29 +2325,49 @@ class GameSession:
                 "error": str(e),
             }
 
+    def forecast(self, days: int) -> dict:
+        """
+        Kassaennuste seuraaville 'days' päivälle ilman päiväsimulaatiota
+        (session_helpers.forecast): tunnetut saapumiset, kuukausilaskut ja
+        ensimmäinen päivä, jolloin kassa ei riitä laskuun.
+        """
+        planes = self.fleet.all()
+        starters = sum(1 for p in planes if p.category == STARTER_CATEGORY)
+        return forecast_cash_flow(
+            self.cash,
+            self.current_day,
+            days,
+            fetch_pending_arrivals(self.save_id, self.rng_seed),
+            len(planes),
+            starters,
+        )
+
     # ---------- Eksyneet koneet kotikentille ------------
 
     def _initiate_return_flights_for_idle_aircraft(self, silent: bool = False):
         """
         Tarkistaa kaikki IDLE-tilassa olevat koneet. Jos kone on vieraalla kentällä,
         se luo sille automaattisen paluulennon lähimpään omistettuun tukikohtaan.
+
+        Koordinaatit tulevat kenttäindeksistä ja mallitiedot konemalliluettelosta,
+        lähin tukikohta lasketaan yhdellä etäisyysmatriisilla ja kaikki paluulennot
+        kirjataan massalisäyksinä yhdessä transaktiossa (kevyt ajaa joka päivä).
         """
-        owned_bases = {b['base_ident']: b for b in fetch_owned_bases(self.save_id)}
+        owned_bases = [b['base_ident'] for b in fetch_owned_bases(self.save_id)]
         if not owned_bases:
             return  # Ei tukikohtia, ei voida palata kotiin
 
         sql = """
-            SELECT a.aircraft_id, a.current_airport_ident, am.cruise_speed_kts, am.co2_kg_per_km
-            FROM aircraft a JOIN aircraft_models am ON a.model_code = am.model_code
+            SELECT a.aircraft_id, a.current_airport_ident, a.model_code
+            FROM aircraft a
             WHERE a.save_id = %s AND a.status = 'IDLE' 
               AND a.current_airport_ident NOT IN ({})
+            ORDER BY a.aircraft_id
         """.format(','.join(['%s'] * len(owned_bases)))
 
-        params = [self.save_id] + list(owned_bases.keys())
-
         with get_db_connection() as yhteys:
             kursori = yhteys.cursor(dictionary=True)
-            kursori.execute(sql, tuple(params))
+            kursori.execute(sql, tuple([self.save_id] + owned_bases))
             stranded_planes = kursori.fetchall() or []
 
             if not stranded_planes:
@@ -2274,55 +2376,67 @@ class GameSession:
             if not silent:
                 print("ℹ️ Havaittu joutilaita koneita vierailla kentillä, aloitetaan paluulennot...")
 
+            # Lähin oma tukikohta jokaiselle lähtökentälle (sama kenttä lasketaan kerran)
+            nearest = get_airport_index().nearest(
+                (p['current_airport_ident'] for p in stranded_planes), owned_bases
+            )
+            catalog = get_model_catalog()
+
+            flight_rows = []
+            status_rows = []
+            log_entries = []
             for plane in stranded_planes:
-                current_coords = self._get_airport_coords(plane['current_airport_ident'])
-                if not current_coords:
+                hit = nearest.get(plane['current_airport_ident'])
+                if hit is None:
                     continue
+                closest_base_ident, min_dist = hit
+
+                model = catalog.get(plane['model_code']) or {}
+                speed_kts = float(model.get("cruise_speed_kts") or 200.0)
+                speed_km_per_day = speed_kts * 1.852 * 24.0 * 2.0  # Tuplataan nopeus
+                duration_days = max(1, math.ceil(min_dist / speed_km_per_day))
+                arrival_day = self.current_day + duration_days
+                co2_per_km = Decimal(str(model.get("co2_kg_per_km") or 0.2))
+                emissions = float((Decimal(min_dist) * co2_per_km).quantize(Decimal("0.01")))
+
+                flight_rows.append(
+                    (self.current_day, self.current_day, arrival_day, "ENROUTE_RTB", min_dist, emissions,
+                     plane['current_airport_ident'], closest_base_ident, plane['aircraft_id'], self.save_id)
+                )
+                status_rows.append((plane['aircraft_id'],))
+                log_entries.append((
+                    "FLIGHT_RTB_CREATED",
+                    f"aircraft_id={plane['aircraft_id']}; from={plane['current_airport_ident']}; to={closest_base_ident}; eta_day={arrival_day}",
+                ))
 
-                # Etsi lähin oma tukikohta
-                closest_base_ident = None
-                min_dist = float('inf')
-
-                for base_ident in owned_bases:
-                    base_coords = self._get_airport_coords(base_ident)
-                    if base_coords:
-                        dist = self._haversine_km(current_coords[0], current_coords[1], base_coords[0],
-                                                  base_coords[1])
-                        if dist < min_dist:
-                            min_dist = dist
-                            closest_base_ident = base_ident
-
-                if closest_base_ident:
-                    # Luo paluulento
-                    speed_kts = float(plane.get("cruise_speed_kts") or 200.0)
-                    speed_km_per_day = speed_kts * 1.852 * 24.0 * 2.0  # Tuplataan nopeus
-                    duration_days = max(1, math.ceil(min_dist / speed_km_per_day))
-                    arrival_day = self.current_day + duration_days
-                    co2_per_km = Decimal(str(plane.get("co2_kg_per_km") or 0.2))
-                    emissions = float((Decimal(min_dist) * co2_per_km).quantize(Decimal("0.01")))
+            if not flight_rows:
+                return
 
-                    try:
-                        kursori.execute(
-                            "INSERT INTO flights (created_day, dep_day, arrival_day, status, distance_km, emission_kg_co2, dep_ident, arr_ident, aircraft_id, save_id, contract_id) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NULL)",
-                            (self.current_day, self.current_day, arrival_day, "ENROUTE_RTB", min_dist, emissions,
-                             plane['current_airport_ident'], closest_base_ident, plane['aircraft_id'], self.save_id)
-                        )
-                        kursori.execute(
-                            "UPDATE aircraft SET status = 'BUSY_RTB' WHERE aircraft_id = %s",
-                            (plane['aircraft_id'],)
-                        )
-                        self._log_event(
-                            "FLIGHT_RTB_CREATED",
-                            f"aircraft_id={plane['aircraft_id']}; from={plane['current_airport_ident']}; to={closest_base_ident}; eta_day={arrival_day}",
-                            event_day=self.current_day,
-                            cursor=kursori,
-                        )
-                        if not silent:
-                            print(
-                                f"  ✈️  Kone {plane['aircraft_id']} palaa kentältä {plane['current_airport_ident']} kotiin ({closest_base_ident}). ETA: päivä {arrival_day}.")
-                    except Exception as e:
-                        if not silent:
-                            print(f"  ❌ Paluulennon luonti koneelle {plane['aircraft_id']} epäonnistui: {e}")
+            try:
+                yhteys.start_transaction()
+                kursori.executemany(
+                    "INSERT INTO flights (created_day, dep_day, arrival_day, status, distance_km, emission_kg_co2, dep_ident, arr_ident, aircraft_id, save_id, contract_id) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NULL)",
+                    flight_rows,
+                )
+                kursori.executemany(
+                    "UPDATE aircraft SET status = 'BUSY_RTB' WHERE aircraft_id = %s",
+                    status_rows,
+                )
+                self._log_events(log_entries, event_day=self.current_day, cursor=kursori)
+                fleet_version = self.fleet.bump_version(kursori)
+                self._bump_contracts_version(kursori)
+                yhteys.commit()
+            except Exception as e:
+                yhteys.rollback()
+                if not silent:
+                    print(f"  ❌ Paluulentojen luonti epäonnistui: {e}")
+                return
+
+        if not silent:
+            for row in flight_rows:
+                print(f"  ✈️  Kone {row[8]} palaa kentältä {row[6]} kotiin ({row[7]}). ETA: päivä {row[2]}.")
+
+        self.fleet.refresh([row[0] for row in status_rows], fleet_version)
 
     def fast_forward_until_first_return(self, max_days: int = 365) -> None:
         """
@@ -2481,6 +2595,16 @@ class GameSession:
 
     # ---------- DB: apurit ----------
 
+    def _bump_contracts_version(self, kursori) -> None:
+        """
+        Kasvattaa game_saves.contracts_versionia sopimus- tai lentomuutoksen
+        transaktiossa; save_fork hylkää haaran hyväksynnän, jos versio on muuttunut.
+        """
+        kursori.execute(
+            "UPDATE game_saves SET contracts_version = contracts_version + 1 WHERE save_id = %s",
+            (self.save_id,),
+        )
+
     def _log_event(
             self,
             event_type: str,
@@ -2529,6 +2653,41 @@ class GameSession:
         except Exception as exc:  # pragma: no cover - logitus ei saa pysäyttää peliä
             logger.debug("Lokimerkinnän tallennus epäonnistui (%s): %s", type_value, exc)
 
+    def _log_events(self, entries: List[tuple], event_day: Optional[int] = None, cursor=None) -> None:
+        """
+        Kirjaa useita tapahtumia kerralla (executemany).
+        entries: [(event_type, message), ...]; cursor kuten _log_event:issa (osa ulompaa transaktiota).
+        """
+        if not entries:
+            return
+        day_value = int(event_day if event_day is not None else self.current_day)
+        timestamp = datetime.utcnow()
+        rows = [
+            (self.save_id, day_value, (event_type or "UNKNOWN")[:40], message or "", timestamp)
+            for event_type, message in entries
+        ]
+        sql = """
+            INSERT INTO save_event_log (save_id, event_day, event_type, payload, created_at)
+            VALUES (%s, %s, %s, %s, %s)
+        """
+        try:
+            if cursor is not None:
+                cursor.executemany(sql, rows)
+                return
+
+            with get_db_connection() as yhteys:
+                cur = yhteys.cursor()
+                try:
+                    cur.executemany(sql, rows)
+                    yhteys.commit()
+                finally:
+                    try:
+                        cur.close()
+                    except Exception:
+                        pass
+        except Exception as exc:  # pragma: no cover - logitus ei saa pysäyttää peliä
+            logger.debug("Lokimerkintöjen tallennus epäonnistui (%d kpl): %s", len(rows), exc)
+
     def _refresh_save_state(self) -> None:
         """
         Täydennä puuttuvat kentät (nimi, kassa, päivä, status, rng_seed, difficulty) game_saves-taulusta.
@@ -2546,7 +2705,7 @@ class GameSession:
 
             kursori.execute(
                 """
-                SELECT player_name, cash, difficulty, current_day, status, rng_seed
+                SELECT player_name, cash, difficulty, current_day, status, rng_seed, fleet_version
                 FROM game_saves
                 WHERE save_id = %s
                 """,
@@ -2555,6 +2714,8 @@ class GameSession:
             r = kursori.fetchone()
             if not r:
                 raise ValueError(f"Tallennetta save_id={self.save_id} ei löytynyt.")
+            # Toisen prosessin konemuutokset: vanhentunut FleetStore ladataan uudelleen
+            self.fleet.check_version(r["fleet_version"] if isinstance(r, dict) else r[6])
 
             if isinstance(r, dict):
                 self.player_name = r["player_name"]
@@ -2580,48 +2741,22 @@ class GameSession:
     def _fetch_aircraft_models_by_base_progress(self) -> List[dict]:
         """
         Hae myynnissä olevat mallit korkeimman tukikohdan tason mukaan (SMALL..HUGE).
-        STARTER ei näy kaupassa.
+        STARTER ei näy kaupassa. Mallit tulevat konemalliluettelosta; kannasta
+        luetaan vain tukikohtien nykyiset tasot (owned_bases.current_level).
         """
         yhteys = get_connection()
         kursori = yhteys.cursor(dictionary=True)
         try:
             kursori.execute(
-                """
-                WITH max_tier AS (
-                    SELECT
-                        COALESCE(MAX(
-                                         CASE bu.upgrade_code
-                                             WHEN 'SMALL' THEN 1
-                                             WHEN 'MEDIUM' THEN 2
-                                             WHEN 'LARGE' THEN 3
-                                             WHEN 'HUGE' THEN 4
-                                             ELSE 0
-                                             END
-                                 ), 0) AS t
-                    FROM owned_bases ob
-                             JOIN base_upgrades bu ON bu.base_id = ob.base_id
-                    WHERE ob.save_id = %s
-                )
-                SELECT am.model_code, am.manufacturer, am.model_name, am.purchase_price,
-                       am.base_cargo_kg, am.range_km, am.cruise_speed_kts, am.category
-                FROM aircraft_models am
-                         CROSS JOIN max_tier mt
-                WHERE am.category <> 'STARTER'
-                  AND CASE am.category
-                          WHEN 'SMALL' THEN 1
-                          WHEN 'MEDIUM' THEN 2
-                          WHEN 'LARGE' THEN 3
-                          WHEN 'HUGE' THEN 4
-                          ELSE 0
-                          END <= mt.t
-                ORDER BY am.purchase_price ASC, am.model_code ASC
-                """,
+                "SELECT DISTINCT current_level FROM owned_bases WHERE save_id = %s",
                 (self.save_id,),
             )
-            return kursori.fetchall() or []
+            levels = [r["current_level"] for r in (kursori.fetchall() or [])]
         finally:
             kursori.close()
             yhteys.close()
+        max_tier = max((category_tier(lvl) for lvl in levels), default=0)
+        return [dict(m) for m in get_model_catalog().purchasable(max_tier)]
 
     def _create_owned_base_and_small_upgrade_tx(self, base_ident: str, base_name: str, purchase_cost: Decimal) -> int:
         """
@@ -2631,21 +2766,18 @@ class GameSession:
         yhteys = get_connection()
         kursori = yhteys.cursor()
         try:
-            kursori.execute("SELECT cash FROM game_saves WHERE save_id = %s FOR UPDATE", (self.save_id,))
-            row = kursori.fetchone()
-            if not row:
-                raise ValueError("Tallennetta ei löytynyt tukikohtaa luodessa.")
-            cur_cash = _to_dec(row["cash"] if isinstance(row, dict) else row[0])
-            if cur_cash < purchase_cost:
-                raise ValueError("Kassa ei riitä tukikohtaan.")
-
             now = datetime.utcnow()
             kursori.execute(
                 """
                 INSERT INTO owned_bases
-                (save_id, base_ident, base_name, acquired_day, purchase_cost, created_at, updated_at)
+                (save_id, base_ident, base_name, acquired_day, purchase_cost, current_level, aircraft_count,
+                 created_at, updated_at)
                 VALUES
-                    (%s, %s, %s, %s, %s, %s, %s)
+                    (%s, %s, %s, %s, %s, 'SMALL',
+                     (SELECT COUNT(*) FROM aircraft a
+                      WHERE a.save_id = %s AND a.current_airport_ident = %s
+                        AND (a.sold_day IS NULL OR a.sold_day = 0)),
+                     %s, %s)
                 """,
                 (
                     self.save_id,
@@ -2653,6 +2785,8 @@ class GameSession:
                     base_name,
                     self.current_day,
                     purchase_cost,
+                    self.save_id,
+                    base_ident,
                     now,
                     now,
                 ),
@@ -2667,11 +2801,11 @@ class GameSession:
                 (base_id, "SMALL", self.current_day, Decimal("0.00")),
             )
 
-            new_cash = (cur_cash - purchase_cost).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-            kursori.execute(
-                "UPDATE game_saves SET cash = %s, updated_at = %s WHERE save_id = %s",
-                (new_cash, now, self.save_id),
+            new_cash = post_cash_entries(
+                kursori, self.save_id, self.current_day, [(-Money.of(purchase_cost), "BASE_PURCHASE", base_id)],
             )
+            if new_cash is None:
+                raise ValueError("Kassa ei riitä tukikohtaan.")
 
             yhteys.commit()
             self.cash = new_cash
@@ -2785,19 +2919,23 @@ class GameSession:
 
     # ---------- Kassan ja statuksen hallinta ----------
 
-    def _set_cash(self, new_cash: Decimal) -> None:
+    def _set_cash(self, new_cash: Decimal, context: Optional[str] = None) -> None:
         """
-        Päivitä kassa kantaan ja pidä olion tila synkassa.
+        Aseta kassa uuteen arvoon oikaisukirjauksella ja pidä olion tila synkassa.
         """
         yhteys = get_connection()
         kursori = yhteys.cursor()
         try:
-            kursori.execute(
-                "UPDATE game_saves SET cash = %s, updated_at = %s WHERE save_id = %s",
-                (_to_dec(new_cash), datetime.utcnow(), self.save_id),
+            kursori.execute("SELECT cash FROM game_saves WHERE save_id = %s FOR UPDATE", (self.save_id,))
+            row = kursori.fetchone()
+            if not row:
+                raise ValueError("Tallennetta ei löytynyt.")
+            delta = Money.of(new_cash) - Money.of(row["cash"] if isinstance(row, dict) else row[0])
+            self.cash = post_cash_entries(
+                kursori, self.save_id, self.current_day, [(delta, context or "ADJUSTMENT", None)],
+                allow_negative=True,
             )
             yhteys.commit()
-            self.cash = _to_dec(new_cash)
         except Exception:
             yhteys.rollback()
             raise
@@ -2808,18 +2946,37 @@ class GameSession:
                 pass
             yhteys.close()
 
-    def _add_cash(self, delta: Decimal, context: Optional[str] = None) -> None:
-        """Lisää tai vähennä kassaa ja kirjaa muutos lokiin."""
-        new_val = (self.cash + _to_dec(delta)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        if new_val < Decimal("0"):
-            raise ValueError("Kassa ei voi mennä negatiiviseksi.")
-        self._set_cash(new_val)
-        if context:
-            self._log_event(
-                "CASH_CHANGE",
-                f"delta={delta}; new_cash={new_val}; context={context}",
-                event_day=self.current_day,
+    def _add_cash(self, delta: Decimal, context: Optional[str] = None, ref_id: Optional[int] = None) -> None:
+        """
+        Lisää tai vähennä kassaa: kirjanpitorivi, saldo ja lokimerkintä yhdessä transaktiossa.
+        """
+        delta = Money.of(delta)
+        yhteys = get_connection()
+        kursori = yhteys.cursor()
+        try:
+            new_val = post_cash_entries(
+                kursori, self.save_id, self.current_day, [(delta, context or "ADJUSTMENT", ref_id)]
             )
+            if new_val is None:
+                raise ValueError("Kassa ei voi mennä negatiiviseksi.")
+            if context:
+                self._log_event(
+                    "CASH_CHANGE",
+                    f"delta={delta}; new_cash={new_val}; context={context}",
+                    event_day=self.current_day,
+                    cursor=kursori,
+                )
+            yhteys.commit()
+            self.cash = new_val
+        except Exception:
+            yhteys.rollback()
+            raise
+        finally:
+            try:
+                kursori.close()
+            except Exception:
+                pass
+            yhteys.close()
 
     def _set_status(self, new_status: str) -> None:
         """
@@ -2862,22 +3019,12 @@ class GameSession:
     ) -> bool:
         """
         Atominen ostotapahtuma:
-          - Lukitse kassa
           - Lisää kone
-          - Veloita hinta
+          - Veloita hinta kirjanpidon kautta (ei riitä → peruutus)
         """
         yhteys = get_connection()
         kursori = yhteys.cursor()
         try:
-            kursori.execute("SELECT cash FROM game_saves WHERE save_id = %s FOR UPDATE", (self.save_id,))
-            row = kursori.fetchone()
-            if not row:
-                raise ValueError("Tallennetta ei löytynyt ostohetkellä.")
-            cash_now = _to_dec(row["cash"] if isinstance(row, dict) else row[0])
-            if cash_now < purchase_price:
-                yhteys.rollback()
-                return False
-
             kursori.execute(
                 """
                 INSERT INTO aircraft
@@ -2906,12 +3053,16 @@ class GameSession:
                     base_id,
                 ),
             )
+            new_aircraft_id = kursori.lastrowid
+            apply_base_aircraft_deltas(kursori, self.save_id, {current_airport_ident: 1})
 
-            new_cash = (cash_now - purchase_price).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-            kursori.execute(
-                "UPDATE game_saves SET cash = %s, updated_at = %s WHERE save_id = %s",
-                (new_cash, datetime.utcnow(), self.save_id),
+            new_cash = post_cash_entries(
+                kursori, self.save_id, self.current_day,
+                [(-Money.of(purchase_price), "AIRCRAFT_PURCHASE", new_aircraft_id)],
             )
+            if new_cash is None:
+                yhteys.rollback()
+                return False
 
             self._log_event(
                 "AIRCRAFT_PURCHASE",
@@ -2920,8 +3071,10 @@ class GameSession:
                 cursor=kursori,
             )
 
+            fleet_version = self.fleet.bump_version(kursori)
             yhteys.commit()
             self.cash = new_cash
+            self.fleet.refresh([new_aircraft_id], fleet_version)
             return True
         except Exception as e:
             print(f"❌ Virhe ostossa: {e}")
@@ -3128,6 +3281,8 @@ class GameSession:
                     base_id,
                 ),
             )
+            new_aircraft_id = kursori.lastrowid
+            apply_base_aircraft_deltas(kursori, self.save_id, {current_airport_ident: 1})
 
             kursori.execute(
                 "UPDATE game_saves SET updated_at = %s WHERE save_id = %s",
@@ -3141,7 +3296,9 @@ class GameSession:
                 cursor=kursori,
             )
 
+            fleet_version = self.fleet.bump_version(kursori)
             yhteys.commit()
+            self.fleet.refresh([new_aircraft_id], fleet_version)
         except Exception:
             yhteys.rollback()
             raise
@@ -0,0 +1,318 @@
+"""
+metrics.py - Prosessin mittarit Prometheus-tekstimuodossa
+=========================================================
+Kevyt mittarirekisteri ilman ulkoisia riippuvuuksia. Moduuli ei tuo muita
+projektin moduuleja, joten sitä voi käyttää myös utilsista ja storagesta.
+
+Mittarityypit:
+- Counter: kasvava laskuri
+- Histogram: kiinteäämpärinen histogrammi (ämpärin yläraja "le")
+- CacheStats: välimuistin osumat/ohitukset (tai lähde, esim. lru_cache.cache_info)
+- gauge(): arvo luetaan callbackilla vasta /metrics-haun aikana
+
+Kuumilla poluilla mittari haetaan kerran (moduulin vakio tai labels()-kutsu
+ensimmäisellä kerralla) ja päivitys on yksi lyhyt lukitus (Counter,
+Histogram) tai lukoton kasvatus (CacheStats). Pyyntökohtaisia sanakirjoja ei
+luoda: reittien mittarit haetaan valmiista endpoint-taulusta.
+
+init_app(app) kirjaa pyyntöjen kestot ja virheet reiteittäin ja lisää
+reitin GET /metrics.
+"""
+
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sekunteina (Prometheus-tyyli: ämpärin yläraja "le")
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Kappalemäärille (esim. saapuneet lennot per päivä)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+# ---------- Mittarit ----------
+
+class Counter:
+    """Kasvava laskuri."""
+
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Kiinteäämpärinen histogrammi; observe() pitää lukkoa vain laskurien päivityksen ajan."""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # viimeinen = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Dict:
+        """Kumulatiiviset ämpärit [(yläraja, määrä)], määrä ja summa."""
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        cumulative, running = [], 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            running += n
+            cumulative.append((bound, running))
+        return {"buckets": cumulative, "count": count, "sum": total}
+
+
+class CacheStats:
+    """
+    Välimuistin osumat ja ohitukset. Kasvatus ilman lukkoa: GIL:n alla
+    harvinainen hukattu lisäys on hyväksyttävä hinta lukottomasta kuumasta polusta.
+    source: callable, joka palauttaa (hits, misses, ...) - esim. lru_cache.cache_info.
+    """
+
+    __slots__ = ("hits", "misses", "source")
+
+    def __init__(self, source: Optional[Callable[[], Sequence[int]]] = None):
+        self.hits = 0
+        self.misses = 0
+        self.source = source
+
+    def hit(self) -> None:
+        self.hits += 1
+
+    def miss(self) -> None:
+        self.misses += 1
+
+    def counts(self) -> Tuple[int, int]:
+        if self.source is not None:
+            info = self.source()
+            return int(info[0]), int(info[1])
+        return self.hits, self.misses
+
+
+# ---------- Rekisteri ----------
+
+class Family:
+    """Samannimiset mittarit eri label-arvoilla."""
+
+    def __init__(self, name: str, help_text: str, kind: str, labelnames: Sequence[str], factory):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.factory = factory
+        self.children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Label-arvojen mittari (luodaan ensimmäisellä kutsulla)."""
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: odotettiin labelit {self.labelnames}")
+            with self._lock:
+                child = self.children.setdefault(values, self.factory())
+        return child
+
+    def items(self) -> List[Tuple[LabelValues, object]]:
+        with self._lock:
+            return list(self.children.items())
+
+
+_families: Dict[str, Family] = {}
+_gauges: Dict[str, Tuple[str, Sequence[str], Callable[[], Iterable[Tuple[LabelValues, float]]]]] = {}
+_caches: Dict[str, CacheStats] = {}
+_registry_lock = threading.Lock()
+
+
+def _family(name: str, help_text: str, kind: str, labelnames: Sequence[str], factory) -> Family:
+    with _registry_lock:
+        family = _families.get(name)
+        if family is None:
+            family = _families[name] = Family(name, help_text, kind, labelnames, factory)
+        elif family.kind != kind or family.labelnames != tuple(labelnames):
+            raise ValueError(f"Mittari {name} on jo rekisteröity eri muodossa")
+    return family
+
+
+def counter(name: str, help_text: str, labelnames: Sequence[str] = ()):
+    """Rekisteröi laskurin; ilman labeleita palauttaa Counterin, muuten Familyn."""
+    family = _family(name, help_text, "counter", labelnames, Counter)
+    return family if labelnames else family.labels()
+
+
+def histogram(name: str, help_text: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS):
+    """Rekisteröi histogrammin; ilman labeleita palauttaa Histogramin, muuten Familyn."""
+    family = _family(name, help_text, "histogram", labelnames, lambda: Histogram(buckets))
+    return family if labelnames else family.labels()
+
+
+def gauge(name: str, help_text: str, callback: Callable[[], Iterable[Tuple[LabelValues, float]]],
+          labelnames: Sequence[str] = ()) -> None:
+    """Rekisteröi mittarin, jonka arvot [(label-arvot, arvo)] luetaan /metrics-haun aikana."""
+    with _registry_lock:
+        _gauges[name] = (help_text, tuple(labelnames), callback)
+
+
+def cache_stats(name: str, source: Optional[Callable[[], Sequence[int]]] = None) -> CacheStats:
+    """Nimetyn välimuistin osumalaskurit (sama nimi → sama olio)."""
+    with _registry_lock:
+        stats = _caches.get(name)
+        if stats is None:
+            stats = _caches[name] = CacheStats(source)
+        return stats
+
+
+# ---------- Prometheus-tekstimuoto ----------
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _render_family(family: Family, out: List[str]) -> None:
+    out.append(f"# HELP {family.name} {family.help}")
+    out.append(f"# TYPE {family.name} {family.kind}")
+    for values, child in sorted(family.items()):
+        if family.kind == "histogram":
+            snap = child.snapshot()
+            for bound, n in snap["buckets"]:
+                le = 'le="' + _number(float(bound)) + '"'
+                out.append(f"{family.name}_bucket{_labels(family.labelnames, values, le)} {n}")
+            lbl = _labels(family.labelnames, values)
+            out.append(f"{family.name}_sum{lbl} {_number(snap['sum'])}")
+            out.append(f"{family.name}_count{lbl} {snap['count']}")
+        else:
+            out.append(f"{family.name}{_labels(family.labelnames, values)} {_number(child.value)}")
+
+
+def _render_caches(caches: List[Tuple[str, CacheStats]], out: List[str]) -> None:
+    counts = []
+    for name, stats in caches:
+        try:
+            counts.append((name, stats.counts()))
+        except Exception:
+            logger.exception("Välimuistin %s laskurien luku epäonnistui", name)
+    for metric, help_text, pick in (
+        ("afc_cache_hits_total", "Välimuistin osumat", lambda h, m: h),
+        ("afc_cache_misses_total", "Välimuistin ohitukset (lataus kannasta tai laskenta)", lambda h, m: m),
+        ("afc_cache_hit_ratio", "Osumien osuus kaikista hauista", lambda h, m: h / (h + m) if h + m else 0.0),
+    ):
+        out.append(f"# HELP {metric} {help_text}")
+        out.append(f"# TYPE {metric} {'gauge' if metric.endswith('ratio') else 'counter'}")
+        for name, (hits, misses) in counts:
+            out.append(f'{metric}{{cache="{_escape(name)}"}} {_number(pick(hits, misses))}')
+
+
+def render() -> str:
+    """Kaikki rekisteröidyt mittarit Prometheus-tekstimuodossa."""
+    with _registry_lock:
+        families = sorted(_families.items())
+        gauges = sorted(_gauges.items())
+        caches = sorted(_caches.items())
+    out: List[str] = []
+    for _name, family in families:
+        _render_family(family, out)
+    for name, (help_text, labelnames, callback) in gauges:
+        try:
+            samples = list(callback())
+        except Exception:
+            logger.exception("Mittarin %s luku epäonnistui", name)
+            continue
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} gauge")
+        for values, value in samples:
+            out.append(f"{name}{_labels(labelnames, values)} {_number(value)}")
+    if caches:
+        _render_caches(caches, out)
+    return "\n".join(out) + "\n"
+
+
+# ---------- Flask-kytkentä ----------
+
+_REQUEST_SECONDS = histogram(
+    "afc_http_request_duration_seconds", "API-pyyntöjen kesto reiteittäin", ("endpoint",)
+)
+_REQUEST_ERRORS = counter(
+    "afc_http_errors_total", "Virhevastaukset (4xx/5xx) reiteittäin", ("endpoint", "status")
+)
+UNMATCHED_ENDPOINT = "unmatched"
+
+# endpoint -> Histogram; valmis taulu, jotta pyyntö ei luo label-tupleja
+_route_seconds: Dict[str, Histogram] = {}
+
+
+def _route_histogram(endpoint: str) -> Histogram:
+    hist = _route_seconds.get(endpoint)
+    if hist is None:
+        hist = _route_seconds[endpoint] = _REQUEST_SECONDS.labels(endpoint)
+    return hist
+
+
+def init_app(app) -> None:
+    """Kirjaa pyyntöjen kestot ja virheet ja lisää reitin GET /metrics."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g.afc_metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop("afc_metrics_started", None)
+        if started is None:
+            return response
+        endpoint = request.endpoint or UNMATCHED_ENDPOINT
+        _route_histogram(endpoint).observe(time.perf_counter() - started)
+        if response.status_code >= 400:
+            _REQUEST_ERRORS.labels(endpoint, str(response.status_code)).inc()
+        return response
+
+    def metrics_view():
+        return Response(render(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule("/metrics", "metrics", metrics_view, methods=["GET"])
+
+
+__all__ = [
+    "Counter", "Histogram", "CacheStats", "Family",
+    "counter", "histogram", "gauge", "cache_stats", "render", "init_app",
+    "DEFAULT_BUCKETS", "COUNT_BUCKETS",
+]
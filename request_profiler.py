@@ -0,0 +1,214 @@
+"""
+request_profiler.py - Pyyntökohtainen profilointi (flamegraph-tulosteet)
+========================================================================
+Käytössä vain, kun palvelin käynnistetään AFC_PROFILING=1. Silloin pyyntö,
+jossa on otsake "X-AFC-Profile: <muoto>" tai kyselyparametri
+"?_profile=<muoto>", ajetaan näytteistävän profiloijan alla:
+
+- Erillinen säie ottaa pyyntösäikeen pinosta näytteen SAMPLE_INTERVAL_S
+  välein (sys._current_frames), joten mitattava koodi ei hidastu kuten
+  cProfilella. Näytteen paino on todellinen kulunut aika edellisestä näytteestä.
+- Tulos kirjoitetaan hakemistoon AFC_PROFILE_DIR (oletus profiles/) nimellä
+  <endpoint>-<aikaleima>.<pääte>:
+    collapsed   → .collapsed (flamegraph.pl / speedscope: "a;b;c <µs>")
+    speedscope  → .speedscope.json (https://www.speedscope.app)
+  Muu arvo (esim. "1") tarkoittaa collapsed-muotoa.
+- Vastaukseen lisätään otsake X-AFC-Profile-File.
+
+Listaus: GET /api/debug/profiles, tiedosto: GET /api/debug/profiles/<nimi>.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, g, request
+
+ENABLED = os.environ.get("AFC_PROFILING", "0") == "1"
+PROFILE_DIR = os.environ.get(
+    "AFC_PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+)
+SAMPLE_INTERVAL_S = 0.001
+MAX_STACK_DEPTH = 128
+HEADER = "X-AFC-Profile"
+QUERY_FLAG = "_profile"
+
+FORMATS = {"collapsed": ".collapsed", "speedscope": ".speedscope.json"}
+DEFAULT_FORMAT = "collapsed"
+
+# (nimi, tiedosto, rivi) juuresta lehteen
+Frame = Tuple[str, str, int]
+Stack = Tuple[Frame, ...]
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+_SAFE_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class StackSampler:
+    """Näytteistää yhden säikeen pinoa taustasäikeessä."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL_S):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()   # Stack -> kulunut aika (s)
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="afc-profiler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if not self._stop.is_set():
+            self._stop.set()
+            self._thread.join()
+            self.elapsed = time.perf_counter() - self.started
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self.samples[_stack_of(frame)] += now - last
+            last = now
+
+
+def _stack_of(frame) -> Stack:
+    stack: List[Frame] = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        stack.append((code.co_name, _short_path(code.co_filename), frame.f_lineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _short_path(path: str) -> str:
+    return os.path.relpath(path, _ROOT) if path.startswith(_ROOT) else os.path.basename(path)
+
+
+# ---------- Tulostemuodot ----------
+
+def to_collapsed(samples: Counter) -> str:
+    """Brendan Greggin collapsed-muoto: "kehys;kehys;kehys <paino µs>" riveittäin."""
+    lines = []
+    for stack, seconds in samples.most_common():
+        names = ";".join(f"{name} ({path}:{line})" for name, path, line in stack)
+        lines.append(f"{names} {max(1, int(seconds * 1_000_000))}")
+    return "\n".join(lines) + "\n"
+
+
+def to_speedscope(samples: Counter, name: str, elapsed: float) -> Dict:
+    """speedscope-tiedostomuoto (sampled-profiili, yksikkö sekunti)."""
+    frame_index: Dict[Frame, int] = {}
+    frames: List[Dict] = []
+    stacks: List[List[int]] = []
+    weights: List[float] = []
+    for stack, seconds in samples.items():
+        ids = []
+        for fr in stack:
+            idx = frame_index.get(fr)
+            if idx is None:
+                idx = frame_index[fr] = len(frames)
+                frames.append({"name": fr[0], "file": fr[1], "line": fr[2]})
+            ids.append(idx)
+        stacks.append(ids)
+        weights.append(round(seconds, 6))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "afc666 request_profiler",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": round(max(elapsed, sum(weights)), 6),
+            "samples": stacks,
+            "weights": weights,
+        }],
+    }
+
+
+def write_profile(sampler: StackSampler, endpoint: str, fmt: str, out_dir: str = PROFILE_DIR) -> str:
+    """Kirjoittaa profiilin ja palauttaa tiedoston nimen (ilman hakemistoa)."""
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    filename = f"{_SAFE_RE.sub('_', endpoint)}-{stamp}{FORMATS[fmt]}"
+    with open(os.path.join(out_dir, filename), "w", encoding="utf-8") as f:
+        if fmt == "speedscope":
+            json.dump(to_speedscope(sampler.samples, endpoint, sampler.elapsed), f)
+        else:
+            f.write(to_collapsed(sampler.samples))
+    return filename
+
+
+def list_profiles(out_dir: str = PROFILE_DIR) -> List[Dict]:
+    """Profiilitiedostot uusimmasta vanhimpaan."""
+    try:
+        names = os.listdir(out_dir)
+    except OSError:
+        return []
+    out = []
+    for name in names:
+        fmt = next((k for k, ext in FORMATS.items() if name.endswith(ext)), None)
+        if fmt is None:
+            continue
+        stat = os.stat(os.path.join(out_dir, name))
+        out.append({
+            "name": name,
+            "endpoint": name[: -len(FORMATS[fmt])].rsplit("-", 3)[0],
+            "format": fmt,
+            "size": stat.st_size,
+            "created_at": datetime.fromtimestamp(stat.st_mtime),
+        })
+    out.sort(key=lambda p: p["name"].rsplit("-", 3)[1:], reverse=True)
+    return out
+
+
+# ---------- Flask-kytkentä ----------
+
+def _requested_format() -> Optional[str]:
+    value = request.headers.get(HEADER) or request.args.get(QUERY_FLAG)
+    if not value or value == "0":
+        return None
+    return value if value in FORMATS else DEFAULT_FORMAT
+
+
+def _finish(response=None):
+    sampler: Optional[StackSampler] = g.pop("afc_profiler", None)
+    if sampler is None:
+        return response
+    sampler.stop()
+    filename = write_profile(sampler, request.endpoint or request.path, g.pop("afc_profile_format"))
+    if response is not None:
+        response.headers[f"{HEADER}-File"] = filename
+    return response
+
+
+def init_app(app: Flask) -> None:
+    """Kytkee profiloinnin pyyntöihin, jos AFC_PROFILING=1."""
+    if not ENABLED:
+        return
+
+    @app.before_request
+    def _start_profile():
+        fmt = _requested_format()
+        if fmt is not None and not request.path.startswith("/api/debug/"):
+            g.afc_profile_format = fmt
+            g.afc_profiler = StackSampler(threading.get_ident()).start()
+
+    app.after_request(_finish)
+    # Käsittelemätön poikkeus ohittaa after_requestin; kirjoitetaan silti
+    app.teardown_request(lambda exc: _finish())
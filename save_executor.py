@@ -0,0 +1,190 @@
+"""
+save_executor.py - Tallennuskohtainen kirjoitusjono
+====================================================
+Kaksi välilehteä voi kutsua esim. /api/game/advance-day yhtä aikaa: molemmat
+GameSessionit lukevat saman current_dayn, jolloin päivä voi siirtyä kahdesti
+tai transaktiot lukkiutuvat ja perutaan. Siksi kaikki tallennusta muuttavat
+API-kutsut ajetaan tallennuksen omassa jonossa yksi kerrallaan:
+
+- Prosessin sisällä: jokaisella save_id:llä on oma FIFO-jono (_SaveQueue);
+  kirjoittajat pääsevät vuorollaan saapumisjärjestyksessä, eri tallennukset
+  eivät odota toisiaan. Sama säie voi ottaa vuoron uudelleen (sisäkkäiset kutsut).
+- Prosessien välillä (MySQL): vuoron ajaksi otetaan lisäksi neuvoa-antava
+  lukko GET_LOCK('afc666:save:<id>') omalla yhteydellään. Pois päältä
+  AFC_SAVE_DB_LOCK=0. SQLite-kannassa kirjoittajat sarjallistuvat jo
+  tiedostolukolla, joten neuvoa-antavaa lukkoa ei käytetä.
+- Lukevat reitit eivät käytä jonoa lainkaan.
+- Usean tallennuksen vuoro (save_writers, esim. aktiivisen tallennuksen
+  vaihto) otetaan aina nousevassa save_id-järjestyksessä.
+
+Jos vuoroa ei saada WRITER_TIMEOUT_S sekunnissa, nostetaan SaveBusy.
+
+Käyttö:
+    with save_writer(save_id):
+        session.advance_to_next_day(silent=True)
+"""
+
+import os
+import threading
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from typing import Deque, Dict, Iterator, Optional, Tuple
+
+import metrics
+from utils import DB_BACKEND, get_connection
+
+WRITER_TIMEOUT_S = float(os.environ.get("AFC_SAVE_WRITER_TIMEOUT", 30))
+DB_LOCK_ENABLED = DB_BACKEND == "mysql" and os.environ.get("AFC_SAVE_DB_LOCK", "1") != "0"
+DB_LOCK_PREFIX = "afc666:save:"
+
+
+class SaveBusy(Exception):
+    """Tallennuksen kirjoitusvuoroa ei saatu aikarajassa."""
+
+
+class _SaveQueue:
+    """Yhden tallennuksen FIFO-kirjoitusvuoro (uudelleen otettava samassa säikeessä)."""
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._waiters: Deque[Tuple[int, threading.Event]] = deque()
+        self._owner: Optional[int] = None
+        self._depth = 0
+
+    def acquire(self, timeout: float) -> bool:
+        me = threading.get_ident()
+        with self._mutex:
+            if self._owner == me:
+                self._depth += 1
+                return True
+            if self._owner is None and not self._waiters:
+                self._owner, self._depth = me, 1
+                return True
+            waiter = (me, threading.Event())
+            self._waiters.append(waiter)
+
+        if waiter[1].wait(timeout):
+            return True
+        with self._mutex:
+            # Vuoro on voinut tulla juuri aikarajan kohdalla
+            if waiter[1].is_set():
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def release(self) -> None:
+        with self._mutex:
+            if self._owner != threading.get_ident():
+                raise RuntimeError("Kirjoitusvuoroa vapautetaan väärästä säikeestä")
+            self._depth -= 1
+            if self._depth:
+                return
+            if self._waiters:
+                owner, event = self._waiters.popleft()
+                self._owner, self._depth = owner, 1
+                event.set()
+            else:
+                self._owner = None
+
+    def pending(self) -> int:
+        """Jonossa odottavien kirjoittajien määrä (ilman vuorossa olevaa)."""
+        with self._mutex:
+            return len(self._waiters)
+
+    def held_by_me(self) -> bool:
+        with self._mutex:
+            return self._owner == threading.get_ident()
+
+
+_queues: Dict[int, _SaveQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def _queue_for(save_id: int) -> _SaveQueue:
+    with _queues_lock:
+        queue = _queues.get(save_id)
+        if queue is None:
+            queue = _queues[save_id] = _SaveQueue()
+        return queue
+
+
+@contextmanager
+def _db_advisory_lock(save_id: int, timeout: float) -> Iterator[None]:
+    """MySQL GET_LOCK omalla yhteydellään koko vuoron ajan (lukko on yhteyskohtainen)."""
+    name = f"{DB_LOCK_PREFIX}{save_id}"
+    yhteys = get_connection()
+    kursori = None
+    try:
+        kursori = yhteys.cursor()
+        kursori.execute("SELECT GET_LOCK(%s, %s)", (name, max(0, int(timeout))))
+        row = kursori.fetchone()
+        if not row or row[0] != 1:
+            raise SaveBusy(f"Tallennus {save_id} on varattu toisessa prosessissa")
+        try:
+            yield
+        finally:
+            kursori.execute("SELECT RELEASE_LOCK(%s)", (name,))
+            kursori.fetchone()
+    finally:
+        if kursori:
+            kursori.close()
+        yhteys.close()
+
+
+@contextmanager
+def save_writer(save_id: int, timeout: float = WRITER_TIMEOUT_S) -> Iterator[None]:
+    """
+    Ajaa with-lohkon tallennuksen kirjoitusvuorossa.
+
+    Raises:
+        SaveBusy: Vuoroa ei saatu aikarajassa
+    """
+    save_id = int(save_id)
+    queue = _queue_for(save_id)
+    nested = queue.held_by_me()
+    if not queue.acquire(timeout):
+        raise SaveBusy(f"Tallennus {save_id} on varattu, yritä hetken päästä uudelleen")
+    try:
+        if DB_LOCK_ENABLED and not nested:
+            with _db_advisory_lock(save_id, timeout):
+                yield
+        else:
+            yield
+    finally:
+        queue.release()
+
+
+@contextmanager
+def save_writers(*save_ids: int, timeout: float = WRITER_TIMEOUT_S) -> Iterator[None]:
+    """
+    Ajaa with-lohkon usean tallennuksen kirjoitusvuorossa. Vuorot otetaan
+    nousevassa save_id-järjestyksessä, jotta kaksi usean tallennuksen
+    kirjoittajaa ei voi lukkiutua toisiinsa.
+
+    Raises:
+        SaveBusy: Jotain vuoroa ei saatu aikarajassa
+    """
+    with ExitStack() as stack:
+        for save_id in sorted({int(s) for s in save_ids}):
+            stack.enter_context(save_writer(save_id, timeout))
+        yield
+
+
+def _pending_samples():
+    with _queues_lock:
+        queues = list(_queues.items())
+    return [((str(save_id),), queue.pending()) for save_id, queue in queues]
+
+
+metrics.gauge("afc_save_writers_pending", "Kirjoitusvuoroa odottavat pyynnöt tallennuksittain",
+              _pending_samples, ("save_id",))
+
+
+def pending_writers(save_id: int) -> int:
+    """Tallennuksen jonossa odottavat kirjoittajat (seurantaa varten)."""
+    with _queues_lock:
+        queue = _queues.get(int(save_id))
+    return queue.pending() if queue is not None else 0
+
+
+__all__ = ["SaveBusy", "save_writer", "save_writers", "pending_writers", "WRITER_TIMEOUT_S"]
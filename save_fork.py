@@ -0,0 +1,355 @@
+"""
+save_fork.py - Tallennuksen haarat "mitä jos" -esikatseluun
+===========================================================
+Haara kopioi yhden tallennuksen omaan väliaikaiseen SQLite-kantaan, jossa
+GameSessionia voi ajaa normaalisti (päivien siirto, ostot, tehtävät) koskematta
+oikeisiin tauluihin. Oikeaa kantaa vain luetaan haaran luonnissa (tavallinen
+SELECT, ei FOR UPDATE -lukkoja).
+
+- Ohjaus: utils.connection_override() ohjaa säikeen get_connection()-kutsut
+  haaran kantaan session()-lohkon ajaksi; FleetStore erottaa haarat
+  connection_scope()-avaimella.
+- Hylkäys: discard() poistaa kannan.
+- Hyväksyntä: commit() kirjoittaa haaran tilan takaisin yhdessä transaktiossa.
+  Haaran aikana luodut rivit saavat uudet id:t (siirtymä oikean kannan
+  MAX(id):n yli). Jos oikea tallennus on muuttunut haaran luonnin jälkeen
+  (päivä, kassa, fleet_version tai contracts_version eri), hyväksyntä
+  hylätään (ForkConflict). Konemuutokset kasvattavat fleet_versionia ja
+  sopimus-/lentomuutokset contracts_versionia samassa transaktiossa, joten
+  esim. oikeassa tallennuksessa lähetetty tehtävä ei katoa hyväksynnässä.
+
+save_event_log ja cash_ledger eivät kopioidu haaraan (pelkkää historiaa);
+haaran omat rivit lisätään hyväksynnässä. Käytettyjen koneiden markkina (market_aircraft) on
+kaikille yhteinen, joten haarassa voi ostaa vain uusia koneita.
+"""
+
+import atexit
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional
+
+from airplane import invalidate_fleet_store
+from game_session import GameSession
+from session_helpers import get_airport_index, get_model_catalog
+from storage import sqlite_backend
+from storage.snapshot import SNAPSHOT_TABLES
+from utils import connection_override, connection_scope, get_connection
+
+MAX_FORKS = 8           # samanaikaiset haarat prosessissa (vanhin hylätään)
+MAX_FORK_DAYS = 365     # yhden advance-kutsun yläraja
+
+# Ei kopioida haaraan; haaran uudet rivit lisätään hyväksynnässä ilman vanhoja id:itä
+APPEND_ONLY_TABLES = ("save_event_log", "cash_ledger")
+# Siemenkohtainen kalenteri: kopioidaan haaraan, ei kirjoiteta takaisin
+READ_ONLY_TABLES = ("player_fate",)
+
+
+class ForkError(Exception):
+    """Haaraa ei löytynyt tai sitä ei voitu käsitellä."""
+
+
+class ForkConflict(ForkError):
+    """Oikea tallennus on muuttunut haaran luonnin jälkeen."""
+
+
+def _insert_sql(table: str, columns: List[str]) -> str:
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+
+class SaveFork:
+    """Yksi tallennuksen haara omassa SQLite-kannassaan."""
+
+    def __init__(self, save_id: int):
+        self.fork_id = uuid.uuid4().hex[:12]
+        self.save_id = int(save_id)
+        self.scope = f"fork:{self.fork_id}"
+        self.created_at = time.time()
+        self.days_advanced = 0
+        self._lock = threading.RLock()
+        self._dir = tempfile.mkdtemp(prefix="afc666-fork-")
+        self.path = os.path.join(self._dir, "fork.sqlite3")
+        self._base_day: Optional[int] = None
+        self._base_cash: Optional[Decimal] = None
+        # (fleet_version, contracts_version) haaran luonnissa
+        self._base_versions: Optional[tuple] = None
+        self._base_max: Dict[str, int] = {}
+        try:
+            self._load()
+        except Exception:
+            self.discard()
+            raise
+
+    # ---------- Luonti ----------
+
+    def _load(self) -> None:
+        """Kopioi tallennuksen rivit haaran kantaan (oikeat id:t säilyvät)."""
+        if connection_scope() is not None:
+            raise ForkError("Haaraa ei voi luoda toisen haaran sisältä")
+
+        yhteys = get_connection()
+        haara = sqlite_backend.get_connection(self.path)
+        try:
+            kursori = yhteys.cursor()
+            hkursori = haara.cursor()
+            try:
+                haara.start_transaction()
+                for table, pk, _refs, where in SNAPSHOT_TABLES:
+                    if table in APPEND_ONLY_TABLES:
+                        continue
+                    kursori.execute(f"SELECT * FROM {table} WHERE {where}", (self.save_id,))
+                    rows = kursori.fetchall() or []
+                    columns = [d[0] for d in kursori.description]
+                    if table == "game_saves":
+                        if not rows:
+                            raise ForkError(f"Tallennusta {self.save_id} ei löytynyt")
+                        row = dict(zip(columns, rows[0]))
+                        self._base_day = int(row["current_day"] or 0)
+                        self._base_cash = Decimal(str(row["cash"] or 0))
+                        self._base_versions = (int(row["fleet_version"] or 0), int(row["contracts_version"] or 0))
+                    if pk:
+                        idx = columns.index(pk)
+                        self._base_max[table] = max((int(r[idx]) for r in rows), default=0)
+                    if rows:
+                        hkursori.executemany(_insert_sql(table, columns), [tuple(r) for r in rows])
+                haara.commit()
+            finally:
+                kursori.close()
+                hkursori.close()
+        finally:
+            yhteys.close()
+            haara.close()
+
+    # ---------- Käyttö ----------
+
+    @contextmanager
+    def session(self) -> Iterator[GameSession]:
+        """
+        Avaa haaran GameSessionin: kaikki lohkon tietokantakutsut menevät haaran kantaan.
+        Globaali RNG-tila palautetaan lohkon jälkeen, jotta esikatselu ei vaikuta peliin.
+        """
+        # Staattinen viitedata ladataan oikeasta kannasta ennen ohjausta
+        get_airport_index()
+        get_model_catalog()
+        with self._lock:
+            rng_state = random.getstate()
+            try:
+                with connection_override(self.scope, lambda: sqlite_backend.get_connection(self.path)):
+                    yield GameSession(save_id=self.save_id)
+            finally:
+                random.setstate(rng_state)
+
+    def advance(self, days: int) -> List[dict]:
+        """Siirtää haaraa 'days' päivää (pysähtyy, jos peli ei ole enää ACTIVE)."""
+        days = max(1, min(int(days), MAX_FORK_DAYS))
+        summaries = []
+        with self.session() as session:
+            for _ in range(days):
+                if session.status != "ACTIVE":
+                    break
+                summary = session.advance_to_next_day(silent=True)
+                summary["day"] = session.current_day
+                summaries.append(summary)
+                self.days_advanced += 1
+        return summaries
+
+    def state(self) -> dict:
+        """Haaran tilannekuva (kassa, päivä, laivasto tiloittain) verrattuna lähtötilaan."""
+        with self.session() as session:
+            fleet: Dict[str, int] = {}
+            for plane in session.fleet.all():
+                fleet[plane.status] = fleet.get(plane.status, 0) + 1
+            cash = session.cash.to_decimal()
+            return {
+                "fork_id": self.fork_id,
+                "save_id": self.save_id,
+                "base_day": self._base_day,
+                "base_cash": self._base_cash,
+                "current_day": session.current_day,
+                "cash": cash,
+                "cash_delta": cash - self._base_cash,
+                "status": session.status,
+                "days_advanced": self.days_advanced,
+                "fleet": fleet,
+            }
+
+    # ---------- Hyväksyntä / hylkäys ----------
+
+    def _read_fork_rows(self) -> Dict[str, tuple]:
+        """Lukee haaran kaikki kirjoitettavat taulut: {taulu: (sarakkeet, rivit)}."""
+        out = {}
+        haara = sqlite_backend.get_connection(self.path)
+        try:
+            hkursori = haara.cursor()
+            try:
+                for table, _pk, _refs, where in SNAPSHOT_TABLES:
+                    if table in READ_ONLY_TABLES:
+                        continue
+                    hkursori.execute(f"SELECT * FROM {table} WHERE {where}", (self.save_id,))
+                    rows = hkursori.fetchall() or []
+                    out[table] = ([d[0] for d in hkursori.description], [list(r) for r in rows])
+            finally:
+                hkursori.close()
+        finally:
+            haara.close()
+        return out
+
+    def commit(self) -> None:
+        """
+        Kirjoittaa haaran tilan oikeaan kantaan yhdessä transaktiossa ja hylkää haaran.
+        ForkConflict, jos oikean tallennuksen päivä, kassa tai versiot ovat muuttuneet.
+        """
+        with self._lock:
+            fork_rows = self._read_fork_rows()
+            specs = {t[0]: t for t in SNAPSHOT_TABLES}
+
+            yhteys = get_connection()
+            kursori = yhteys.cursor()
+            try:
+                yhteys.start_transaction()
+                kursori.execute(
+                    """
+                    SELECT current_day, cash, fleet_version, contracts_version
+                    FROM game_saves WHERE save_id = %s FOR UPDATE
+                    """,
+                    (self.save_id,),
+                )
+                row = kursori.fetchone()
+                if not row:
+                    raise ForkError(f"Tallennusta {self.save_id} ei löytynyt")
+                if (int(row[0] or 0) != self._base_day
+                        or Decimal(str(row[1] or 0)) != self._base_cash
+                        or (int(row[2] or 0), int(row[3] or 0)) != self._base_versions):
+                    raise ForkConflict("Tallennus on muuttunut haaran luonnin jälkeen")
+
+                # Haarassa luodut rivit (id > lähtötilan max) siirretään oikean kannan MAX(id):n yli
+                shifts: Dict[str, int] = {}
+                for table, pk, _refs, _where in SNAPSHOT_TABLES:
+                    if table in self._base_max and table != "game_saves":
+                        kursori.execute(f"SELECT COALESCE(MAX({pk}), 0) FROM {table}")
+                        real_max = int(kursori.fetchone()[0])
+                        shifts[table] = max(real_max, self._base_max[table]) - self._base_max[table]
+
+                def map_id(table: str, value):
+                    if value is None or table not in shifts or int(value) <= self._base_max[table]:
+                        return value
+                    return int(value) + shifts[table]
+
+                # Vanhat rivit pois lapsitauluista alkaen
+                for table, _pk, _refs, where in reversed(SNAPSHOT_TABLES):
+                    if table in ("game_saves",) + APPEND_ONLY_TABLES + READ_ONLY_TABLES:
+                        continue
+                    kursori.execute(f"DELETE FROM {table} WHERE {where}", (self.save_id,))
+
+                for table, pk, refs, _where in SNAPSHOT_TABLES:
+                    if table in READ_ONLY_TABLES:
+                        continue
+                    columns, rows = fork_rows[table]
+                    if table == "game_saves":
+                        values = dict(zip(columns, rows[0]))
+                        values.pop("save_id", None)
+                        # Haaran koneet ja sopimukset korvaavat pääkannan rivit: versiot kasvavat,
+                        # jolloin muiden prosessien storet ja saman tallennuksen muut haarat vanhenevat
+                        values.pop("fleet_version", None)
+                        values.pop("contracts_version", None)
+                        assignments = [f"{c} = %s" for c in values] + [
+                            "fleet_version = fleet_version + 1",
+                            "contracts_version = contracts_version + 1",
+                        ]
+                        kursori.execute(
+                            f"UPDATE game_saves SET {', '.join(assignments)} WHERE save_id = %s",
+                            tuple(values.values()) + (self.save_id,),
+                        )
+                        continue
+                    if not rows:
+                        continue
+                    if table in APPEND_ONLY_TABLES:
+                        keep = [i for i, c in enumerate(columns) if c != pk]
+                        columns = [columns[i] for i in keep]
+                        rows = [[r[i] for i in keep] for r in rows]
+                    remap = [(columns.index(col), ref) for col, ref in
+                             ([(pk, table)] if pk in columns else []) + list(refs.items())
+                             if col in columns]
+                    for r in rows:
+                        for idx, ref in remap:
+                            r[idx] = map_id(ref, r[idx])
+                    kursori.executemany(_insert_sql(table, columns), rows)
+                yhteys.commit()
+            except Exception:
+                yhteys.rollback()
+                raise
+            finally:
+                kursori.close()
+                yhteys.close()
+
+            invalidate_fleet_store(self.save_id)
+        _drop_fork(self.fork_id)
+
+    def discard(self) -> None:
+        """Poistaa haaran kannan ja sen välimuistit."""
+        with connection_override(self.scope, lambda: sqlite_backend.get_connection(self.path)):
+            invalidate_fleet_store(self.save_id)
+        sqlite_backend.close_database(self.path)
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+
+# ---------- Prosessin haararekisteri ----------
+
+_FORKS: Dict[str, SaveFork] = {}
+_FORKS_LOCK = threading.Lock()
+
+
+def create_fork(save_id: int) -> SaveFork:
+    """Luo tallennuksesta uuden haaran (vanhin haara hylätään, jos MAX_FORKS täynnä)."""
+    fork = SaveFork(save_id)
+    evicted = []
+    with _FORKS_LOCK:
+        _FORKS[fork.fork_id] = fork
+        while len(_FORKS) > MAX_FORKS:
+            oldest = min(_FORKS.values(), key=lambda f: f.created_at)
+            evicted.append(_FORKS.pop(oldest.fork_id))
+    for old in evicted:
+        old.discard()
+    return fork
+
+
+def get_fork(fork_id: str) -> SaveFork:
+    """Palauttaa haaran tai nostaa ForkErrorin."""
+    with _FORKS_LOCK:
+        fork = _FORKS.get(fork_id)
+    if fork is None:
+        raise ForkError(f"Haaraa {fork_id} ei löytynyt")
+    return fork
+
+
+def list_forks(save_id: Optional[int] = None) -> List[SaveFork]:
+    """Aktiiviset haarat luontijärjestyksessä (valinnaisesti tallennuksen mukaan)."""
+    with _FORKS_LOCK:
+        forks = sorted(_FORKS.values(), key=lambda f: f.created_at)
+    return [f for f in forks if save_id is None or f.save_id == int(save_id)]
+
+
+def _drop_fork(fork_id: str) -> None:
+    with _FORKS_LOCK:
+        fork = _FORKS.pop(fork_id, None)
+    if fork is not None:
+        fork.discard()
+
+
+def discard_fork(fork_id: str) -> None:
+    """Hylkää haaran (ForkError, jos sitä ei ole)."""
+    get_fork(fork_id)
+    _drop_fork(fork_id)
+
+
+@atexit.register
+def _discard_all_forks() -> None:
+    """Prosessin päättyessä hylätään jäljelle jääneet haarat (väliaikaiset kannat pois)."""
+    for fork in list_forks():
+        _drop_fork(fork.fork_id)
@@ -7,8 +7,14 @@ jotka helpottavat yhtenäistä logiikkaa backendin eri osissa.
 Sisältö:
 --------
 - common: Yhteiset apurit (Decimal-muunnokset, ikonien formatointi)
+- money: Money-rahatyyppi (kokonaislukusentit, tarkka pyöristys)
 - aircraft: Lentokoneiden haku, päivitysten laskenta ja soveltaminen
 - bases: Tukikohtien hallinta ja päivitykset
+- catalog: Konemallien viitedata muistissa (aircraft_models ladataan kerran)
+- airports: Lentokenttien spatiaalinen indeksi (kohteiden arvonta etäisyyskaistoittain)
+- economy: Talouden puhtaat kaavat (kuukausilasku, tarjoukset, ECO) pelille ja simulaattorille
+- ledger: Kassakirjanpito (cash_ledger) ja game_saves.cash-saldon päivitys samassa transaktiossa
+- history: Päivittäiset talousluvut (save_daily_stats) ja niiden harvennus (LTTB)
 
 Käyttö:
 -------
@@ -20,6 +26,7 @@ cost = calc_aircraft_upgrade_cost(current_eco, target_eco)
 """
 
 from .common import _to_dec, _icon_title
+from .money import Money
 from .aircraft import (
     fetch_player_aircrafts_with_model_info,
     get_current_aircraft_upgrade_state,
@@ -28,17 +35,62 @@ from .aircraft import (
     apply_aircraft_upgrade,
     get_effective_eco_for_aircraft,
 )
+from .catalog import (
+    ModelCatalog,
+    get_model_catalog,
+    invalidate_model_catalog,
+    category_tier,
+)
 from .bases import (
     fetch_owned_bases,
     fetch_base_current_level_map,
     insert_base_upgrade,
+    apply_base_aircraft_deltas,
     get_base_capacity_info,
 )
+from .airports import (
+    AirportIndex,
+    OFFER_DISTANCE_BANDS,
+    get_airport_index,
+    invalidate_airport_index,
+    pick_banded_destinations,
+)
+from .economy import (
+    compute_monthly_bill,
+    compute_offer_reward,
+    roll_task_offer,
+    settle_contract_reward,
+    event_reward_multiplier,
+    eco_multiplier_for_level,
+    compute_upgrade_cost,
+)
+from .ledger import (
+    LedgerEntry,
+    post_cash_entries,
+    fetch_cash_ledger,
+)
+from .history import (
+    record_daily_stats,
+    fetch_daily_stats,
+    downsample_history,
+    lttb,
+)
+from .forecast import (
+    fetch_pending_arrivals,
+    forecast_cash_flow,
+)
+from .timing import (
+    Histogram,
+    PhaseTimer,
+    phase_histogram,
+    phase_histograms,
+)
 
 __all__ = [
     # Yhteiset työkalut
     "_to_dec",              # Muuntaa arvon Decimal-tyypiksi (rahamäärille)
     "_icon_title",          # Palauttaa emoji-ikonin ja otsikon parhaalle tiedolle
+    "Money",                # Rahasumma kokonaislukusentteinä (Decimal vain DB-rajalla)
     
     # Lentokoneiden hallinta
     "fetch_player_aircrafts_with_model_info",  # Hakee pelaajan koneet + mallin tiedot
@@ -48,9 +100,53 @@ __all__ = [
     "apply_aircraft_upgrade",                  # Päivittää koneen ECO-tason tietokantaan
     "get_effective_eco_for_aircraft",          # Hakee koneen efektiivisen ECO:n
     
+    # Konemallit
+    "ModelCatalog",                # Konemallit koodin/kategorian mukaan indeksoituna
+    "get_model_catalog",           # Palauttaa prosessin yhteisen malliluettelon
+    "invalidate_model_catalog",    # Pakottaa luettelon uudelleenlatauksen
+    "category_tier",               # Kategorian taso (SMALL=1 .. HUGE=4)
+
     # Tukikohtien hallinta
     "fetch_owned_bases",           # Hakee pelaajan omistamat tukikohdat
     "fetch_base_current_level_map", # Palauttaa tukikohtien nykyiset tasot
     "insert_base_upgrade",          # Lisää tukikohdan päivityksen tietokantaan 
-    "get_base_capacity_info"         # Hakee tukikohtien kapasiteettitiedot
+    "apply_base_aircraft_deltas",   # Päivittää tukikohtien konemäärälaskurit transaktiossa
+    "get_base_capacity_info",        # Hakee tukikohtien kapasiteettitiedot
+
+    # Lentokentät
+    "AirportIndex",                # Ruudukkoindeksi kenttien etäisyyskaistahakuihin
+    "get_airport_index",           # Palauttaa prosessin yhteisen kenttäindeksin
+    "invalidate_airport_index",    # Pakottaa indeksin uudelleenlatauksen
+    "OFFER_DISTANCE_BANDS",        # Tarjousten etäisyyskaistat (km)
+    "pick_banded_destinations",    # Arpoo kohteet kaistoittain koneen kantaman sisältä
+
+    # Talous (puhtaat kaavat)
+    "compute_monthly_bill",        # Kuukausilasku (perus, kasvukerroin, yhteensä)
+    "compute_offer_reward",        # Tarjouksen palkkio ja sakko
+    "roll_task_offer",             # Arpoo rahtitarjouksen kohteelle
+    "settle_contract_reward",      # Sopimuksen tilitys saapuessa (sakko, tapahtuman kerroin)
+    "event_reward_multiplier",     # Tapahtuman palkkiokerroin Decimalina
+    "eco_multiplier_for_level",    # ECO-kerroin päivitystasolla
+    "compute_upgrade_cost",        # Päivityksen hinta tason mukaan
+
+    # Kassakirjanpito
+    "LedgerEntry",                 # (summa, syy, viite-id) -kirjanpitorivi
+    "post_cash_entries",           # Kirjaa rivit erässä ja päivittää saldon samassa transaktiossa
+    "fetch_cash_ledger",           # Kirjanpitorivit päiväväliltä
+
+    # Historia
+    "record_daily_stats",          # Kirjoittaa päivän talousluvut päivänvaihdon transaktiossa
+    "fetch_daily_stats",           # Päivärivit väliltä (1 kysely)
+    "downsample_history",          # Ämpärit (min/max/viimeinen) + LTTB-pisteet kaaviolle
+    "lttb",                        # Largest-Triangle-Three-Buckets -harvennus
+
+    # Ennusteet
+    "fetch_pending_arrivals",      # Käynnissä olevat lennot + sopimukset + tapahtumat (1 kysely)
+    "forecast_cash_flow",          # Kassaennuste suljetussa muodossa (tilitykset, laskut, konkurssi)
+
+    # Ajanotto
+    "Histogram",                   # Kiinteäämpärinen histogrammi (prosessin mittarit)
+    "PhaseTimer",                  # Operaation vaiheiden kesto ja SQL-lauseet
+    "phase_histogram",             # Vaiheen prosessikohtainen histogrammi
+    "phase_histograms",            # Kaikkien vaihehistogrammien tilannekuva
 ]
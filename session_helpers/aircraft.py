@@ -14,7 +14,7 @@ ECO-päivitysjärjestelmä:
 - Muut koneet: prosentti ostohinnasta + kasvu
 """
 
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
 from typing import List
 
 from upgrade_config import (
@@ -27,15 +27,17 @@ from upgrade_config import (
 )
 from utils import get_connection
 
+from .catalog import get_model_catalog
 from .common import _to_dec
+from .economy import eco_multiplier_for_level, compute_upgrade_cost
 
 
 def fetch_player_aircrafts_with_model_info(save_id: int) -> List[dict]:
     """
     Hakee pelaajan kaikki myymättömät lentokoneet mallin metatiedoilla.
     
-    Palauttaa koneet yhdistettynä aircraft_models-tauluun, jotta saadaan
-    esim. model_name, category, eco_fee_multiplier mukaan.
+    Mallin tiedot (model_name, category, eco_fee_multiplier) täydennetään
+    konemalliluettelosta (catalog.py), joten kysely ei liitä aircraft_models-taulua.
     
     Args:
         save_id: Tallennuksen ID
@@ -59,13 +61,8 @@ def fetch_player_aircrafts_with_model_info(save_id: int) -> List[dict]:
             a.hours_flown,
             a.status,
             a.acquired_day,
-            a.purchase_price  AS purchase_price_aircraft,
-            am.model_name,
-            am.category,
-            am.purchase_price AS purchase_price_model,
-            am.eco_fee_multiplier
+            a.purchase_price  AS purchase_price_aircraft
         FROM aircraft a
-        JOIN aircraft_models am ON am.model_code = a.model_code
         WHERE a.save_id = %s
           AND (a.sold_day IS NULL OR a.sold_day = 0)
         ORDER BY a.aircraft_id
@@ -75,7 +72,7 @@ def fetch_player_aircrafts_with_model_info(save_id: int) -> List[dict]:
     try:
         kursori = yhteys.cursor(dictionary=True)
         kursori.execute(sql, (save_id,))
-        return kursori.fetchall() or []
+        rows = kursori.fetchall() or []
     finally:
         if kursori is not None:
             try:
@@ -84,6 +81,20 @@ def fetch_player_aircrafts_with_model_info(save_id: int) -> List[dict]:
                 pass
         yhteys.close()
 
+    catalog = get_model_catalog()
+    out = []
+    for r in rows:
+        model = catalog.get(r["model_code"])
+        if model is None:
+            continue  # sama kuin aiempi INNER JOIN
+        row = dict(r)
+        row["model_name"] = model.get("model_name")
+        row["category"] = model.get("category")
+        row["purchase_price_model"] = model.get("purchase_price")
+        row["eco_fee_multiplier"] = model.get("eco_fee_multiplier")
+        out.append(row)
+    return out
+
 
 def get_current_aircraft_upgrade_state(aircraft_id: int, upgrade_code: str = UPGRADE_CODE) -> dict:
     """
@@ -145,14 +156,7 @@ def compute_effective_eco_multiplier(aircraft_id: int, base_eco_multiplier: floa
     state = get_current_aircraft_upgrade_state(aircraft_id)
     level = int(state["level"])
 
-    factor_per_level = Decimal("1.05")
-    base_dec = Decimal(str(base_eco_multiplier))
-    effective_multiplier = base_dec * (factor_per_level ** level)
-
-    # Rajat: min 0.50, max 5.00
-    floor = Decimal("0.50")
-    cap = Decimal("5.00")
-    final_multiplier = max(floor, min(effective_multiplier, cap))
+    final_multiplier = eco_multiplier_for_level(Decimal(str(base_eco_multiplier)), level)
     return float(final_multiplier)
 
 
@@ -189,13 +193,10 @@ def calc_aircraft_upgrade_cost(aircraft_row: dict, next_level: int) -> Decimal:
         growth = NON_STARTER_GROWTH
 
     # Hinta = perushinta * (kasvukerroin ^ (taso - 1))
-    cost = (base * (growth ** (_to_dec(next_level) - _to_dec(1)))).quantize(
-        Decimal("0.01"), rounding=ROUND_HALF_UP
-    )
-    return cost
+    return compute_upgrade_cost(base, growth, next_level)
 
 
-def apply_aircraft_upgrade(aircraft_id: int, installed_day: int) -> int:
+def apply_aircraft_upgrade(aircraft_id: int, installed_day: int, fleet=None) -> int:
     """
     Asentaa uuden päivityksen koneelle (lisää rivin aircraft_upgrades-tauluun).
     
@@ -204,6 +205,9 @@ def apply_aircraft_upgrade(aircraft_id: int, installed_day: int) -> int:
     Args:
         aircraft_id: Koneen ID
         installed_day: Päivä jolloin päivitys asennettiin
+        fleet: Tallennuksen FleetStore; sen versio kasvatetaan samassa
+            transaktiossa ja kone päivitetään commitin jälkeen. Ilman sitä
+            game_saves.fleet_version kasvatetaan koneen tallennukselle suoraan.
     
     Returns:
         int: Uusi päivitystaso
@@ -232,11 +236,23 @@ def apply_aircraft_upgrade(aircraft_id: int, installed_day: int) -> int:
                 int(installed_day),
             ),
         )
+        if fleet is not None:
+            fleet_version = fleet.bump_version(kursori)
+        else:
+            kursori.execute(
+                """
+                UPDATE game_saves SET fleet_version = fleet_version + 1
+                WHERE save_id = (SELECT save_id FROM aircraft WHERE aircraft_id = %s)
+                """,
+                (int(aircraft_id),),
+            )
         yhteys.commit()
     finally:
         if kursori:
             kursori.close()
         yhteys.close()
+    if fleet is not None:
+        fleet.refresh([aircraft_id], fleet_version)
     return new_level
 
 
@@ -258,12 +274,7 @@ def get_effective_eco_for_aircraft(aircraft_id: int) -> float:
     - Lentojen kustannuslaskennassa
     - UI:ssa näytettäessä koneen nykyistä ECO-tasoa
     """
-    sql = """
-        SELECT am.eco_fee_multiplier
-        FROM aircraft a
-        JOIN aircraft_models am ON am.model_code = a.model_code
-        WHERE a.aircraft_id = %s
-    """
+    sql = "SELECT model_code FROM aircraft WHERE aircraft_id = %s"
     yhteys = get_connection()
     kursori = None
     try:
@@ -275,13 +286,12 @@ def get_effective_eco_for_aircraft(aircraft_id: int) -> float:
             kursori.close()
         yhteys.close()
 
-    # Haetaan perus-ECO
-    if row is None:
-        base_eco = 1.0
-    elif isinstance(row, dict):
-        base_eco = row.get("eco_fee_multiplier", 1.0)
-    else:
-        base_eco = row[0] if row[0] is not None else 1.0
+    # Haetaan perus-ECO konemalliluettelosta
+    model_code = None if row is None else (row["model_code"] if isinstance(row, dict) else row[0])
+    model = get_model_catalog().get(model_code) if model_code is not None else None
+    base_eco = 1.0
+    if model is not None and model.get("eco_fee_multiplier") is not None:
+        base_eco = model["eco_fee_multiplier"]
 
     # Sovella päivitykset
     return compute_effective_eco_multiplier(aircraft_id, base_eco)
@@ -0,0 +1,377 @@
+"""
+airports.py - Lentokenttien spatiaalinen indeksi
+=================================================
+Airport-taulu on pelin aikana staattista dataa, joten se ladataan kerran
+prosessin muistiin ja jaetaan lat/lon-ruudukkoon (CELL_DEG asteen solut).
+
+Indeksi vastaa kyselyyn "k satunnaista kenttää etäisyydellä [d_min, d_max] km
+pisteestä X" ilman tietokantaa:
+- Kandidaattisolut rajataan ympyrän lat/lon-laatikolla (rivikohtaiset viipaleet)
+- Kenttä arvotaan soluista painotetusti ja hyväksytään jos se osuu kaistaan
+- Harvoilla kaistoilla (esim. valtameret) käydään kandidaatit läpi kokonaan
+
+Determinismi:
+- Solujen ja kenttien järjestys on aina sama (lajiteltu identin mukaan)
+- Kaikki arvonnat tehdään Pythonin random-moduulilla (pelin RNG-siemen)
+"""
+
+import bisect
+import math
+import random
+import threading
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import metrics
+from utils import get_connection
+
+EARTH_RADIUS_KM = 6371.0
+CELL_DEG = 2.0  # solun koko asteina
+DESTINATION_TYPES = ("small_airport", "medium_airport", "large_airport")
+
+# Tarjousten etäisyyskaistat (km); samat rajat kuin rahtimäärän skaalauksessa.
+# Viimeisen kaistan yläraja on koneen kantama (None = ei rajaa).
+OFFER_DISTANCE_BANDS = ((0.0, 500.0), (500.0, 1500.0), (1500.0, None))
+
+SEGMENT_CACHE_SIZE = 4096  # muistissa pidettävät (lähtöpiste, säde) -kandidaattijoukot
+
+_ROWS = int(180 / CELL_DEG)
+_COLS = int(360 / CELL_DEG)
+
+
+def _row_of(lat: float) -> int:
+    return min(_ROWS - 1, max(0, int((lat + 90.0) // CELL_DEG)))
+
+
+def _col_of(lon: float) -> int:
+    return int((lon + 180.0) // CELL_DEG) % _COLS
+
+
+class AirportIndex:
+    """
+    Muistinvarainen ruudukkoindeksi lentokentille.
+
+    Merkintä (entry) on tuple: (ident, name, lat, lon, lat_rad, lon_rad, cos_lat).
+    Jokaisella ruudukon rivillä on kenttälista sarakkeittain järjestettynä, joten
+    sarakeväli vastaa yhtä yhtenäistä viipaletta listassa.
+    """
+
+    def __init__(self, rows: Iterable[Sequence]):
+        """
+        Args:
+            rows: (ident, name, latitude_deg, longitude_deg, type) -rivit airport-taulusta
+        """
+        self._coords: Dict[str, Tuple[float, float]] = {}
+        cells: Dict[Tuple[int, int], List[tuple]] = {}
+        for ident, name, lat, lon, kind in rows:
+            if lat is None or lon is None:
+                continue
+            lat, lon = float(lat), float(lon)
+            self._coords[ident] = (lat, lon)
+            if kind not in DESTINATION_TYPES:
+                continue
+            lat_r, lon_r = math.radians(lat), math.radians(lon)
+            entry = (ident, name, lat, lon, lat_r, lon_r, math.cos(lat_r))
+            cells.setdefault((_row_of(lat), _col_of(lon)), []).append(entry)
+
+        # Rivikohtaiset rakenteet: kentät sarakejärjestyksessä + sarakkeiden alkukohdat
+        self._row_entries: List[Tuple[tuple, ...]] = []
+        self._row_cols: List[List[int]] = []
+        self._row_starts: List[List[int]] = []
+        for r in range(_ROWS):
+            entries: List[tuple] = []
+            cols: List[int] = []
+            starts: List[int] = []
+            for c in range(_COLS):
+                cell = cells.get((r, c))
+                if not cell:
+                    continue
+                cols.append(c)
+                starts.append(len(entries))
+                entries.extend(sorted(cell))
+            self._row_entries.append(tuple(entries))
+            self._row_cols.append(cols)
+            self._row_starts.append(starts)
+
+        self.size = sum(len(e) for e in self._row_entries)
+        # Samat lähtökentät ja kaistat toistuvat → kandidaattiviipaleet muistiin
+        self._candidate_cache: Dict[Tuple[float, float, float], tuple] = {}
+
+    # ---------- Perushaut ----------
+
+    def coords(self, ident: str) -> Optional[Tuple[float, float]]:
+        """Palauttaa kentän (lat, lon) tai None jos kenttää/koordinaatteja ei ole."""
+        return self._coords.get(ident)
+
+    @staticmethod
+    def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        """Haversine-etäisyys kahden pisteen välillä (km)."""
+        phi1, phi2 = math.radians(lat1), math.radians(lat2)
+        dphi = phi2 - phi1
+        dl = math.radians(lon2 - lon1)
+        a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dl / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+    def nearest(self, origins: Iterable[str], targets: Sequence[str]) -> Dict[str, Tuple[str, float]]:
+        """
+        Lähin kohdekenttä jokaiselle lähtökentälle: etäisyysmatriisi (lähtö × kohde)
+        ja rivikohtainen argmin. Kohteiden koordinaatit ratkaistaan kerran.
+
+        Tasatilanteessa voittaa ensimmäinen kohde targets-järjestyksessä.
+        Kentät ilman koordinaatteja ohitetaan.
+
+        Returns:
+            {lähtö_ident: (kohde_ident, etäisyys_km)}
+        """
+        points = []
+        for ident in targets:
+            xy = self._coords.get(ident)
+            if xy is None:
+                continue
+            lat_r = math.radians(xy[0])
+            points.append((ident, lat_r, math.radians(xy[1]), math.cos(lat_r)))
+        if not points:
+            return {}
+
+        result: Dict[str, Tuple[str, float]] = {}
+        asin, sin, sqrt = math.asin, math.sin, math.sqrt
+        for origin in dict.fromkeys(origins):
+            xy = self._coords.get(origin)
+            if xy is None:
+                continue
+            lat1 = math.radians(xy[0])
+            lon1 = math.radians(xy[1])
+            cos1 = math.cos(lat1)
+            row = [
+                2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(
+                    sin((lat2 - lat1) / 2) ** 2 + cos1 * cos2 * sin((lon2 - lon1) / 2) ** 2
+                )))
+                for _, lat2, lon2, cos2 in points
+            ]
+            best = min(range(len(row)), key=row.__getitem__)
+            result[origin] = (points[best][0], row[best])
+        return result
+
+    # ---------- Kaistahaku ----------
+
+    def _row_slice(self, r: int, c0: int, c1: int) -> Tuple[int, int]:
+        """Palauttaa rivin r kenttälistan viipaleen sarakkeille c0..c1 (mukaan lukien)."""
+        cols = self._row_cols[r]
+        starts = self._row_starts[r]
+        lo_i = bisect.bisect_left(cols, c0)
+        hi_i = bisect.bisect_right(cols, c1)
+        lo = starts[lo_i] if lo_i < len(starts) else len(self._row_entries[r])
+        hi = starts[hi_i] if hi_i < len(starts) else len(self._row_entries[r])
+        return lo, hi
+
+    def _segments(self, lat: float, lon: float, d_max: float) -> List[Tuple[tuple, int, int]]:
+        """
+        Kandidaattiviipaleet (rivin kentät, alku, loppu), jotka kattavat
+        d_max-säteisen ympyrän pisteen ympärillä.
+        """
+        ang = d_max / EARTH_RADIUS_KM
+        dlat = math.degrees(ang)
+        lat_lo, lat_hi = lat - dlat, lat + dlat
+        # Napa ympyrän sisällä tai säde yli neljänneksen maapallosta → kaikki sarakkeet
+        all_cols = lat_lo <= -90.0 or lat_hi >= 90.0 or ang >= math.pi / 2
+        if not all_cols:
+            cos_lat = math.cos(math.radians(lat))
+            ratio = math.sin(ang) / cos_lat if cos_lat > 1e-9 else 2.0
+            dlon = math.degrees(math.asin(ratio)) if ratio < 1.0 else 180.0
+            all_cols = dlon >= 180.0
+
+        segments: List[Tuple[tuple, int, int]] = []
+        for r in range(_row_of(max(-90.0, lat_lo)), _row_of(min(90.0, lat_hi)) + 1):
+            entries = self._row_entries[r]
+            if not entries:
+                continue
+            if all_cols:
+                segments.append((entries, 0, len(entries)))
+                continue
+            c0, c1 = _col_of(lon - dlon), _col_of(lon + dlon)
+            if c0 <= c1:
+                spans = ((c0, c1),)
+            else:  # päivämäärärajan yli → kaksi viipaletta
+                spans = ((c0, _COLS - 1), (0, c1))
+            for a, b in spans:
+                lo, hi = self._row_slice(r, a, b)
+                if hi > lo:
+                    segments.append((entries, lo, hi))
+        return segments
+
+    def _candidates(self, lat: float, lon: float, d_max: float) -> tuple:
+        """Palauttaa (viipaleet, kumulatiiviset koot) välimuistista tai laskee ne."""
+        key = (lat, lon, d_max)
+        hit = self._candidate_cache.get(key)
+        if hit is not None:
+            return hit
+        segments = self._segments(lat, lon, d_max)
+        hit = (segments, list(accumulate(hi - lo for _, lo, hi in segments)))
+        if len(self._candidate_cache) >= SEGMENT_CACHE_SIZE:
+            self._candidate_cache.clear()
+        self._candidate_cache[key] = hit
+        return hit
+
+    def sample_in_band(
+        self,
+        lat: float,
+        lon: float,
+        d_min: float,
+        d_max: float,
+        k: int,
+        exclude: Iterable[str] = (),
+        rng=random,
+    ) -> List[dict]:
+        """
+        Arpoo enintään k eri kenttää, joiden etäisyys pisteestä on [d_min, d_max] km.
+
+        Args:
+            lat, lon: Lähtöpiste asteina
+            d_min, d_max: Etäisyyskaista (km)
+            k: Haluttu määrä kohteita
+            exclude: Identit joita ei palauteta (esim. lähtökenttä, aiemmat valinnat)
+            rng: Satunnaislähde (oletus: random-moduuli, jolloin pelin siemen pätee)
+
+        Returns:
+            Lista {"ident", "name", "distance_km"} arvontajärjestyksessä
+        """
+        if k <= 0 or d_max < d_min:
+            return []
+        segments, cum = self._candidates(lat, lon, d_max)
+        if not segments:
+            return []
+
+        total = cum[-1]
+        lat_r, lon_r = math.radians(lat), math.radians(lon)
+        cos_lat = math.cos(lat_r)
+        two_r = 2 * EARTH_RADIUS_KM
+
+        def dist(e: tuple) -> float:
+            a = math.sin((e[4] - lat_r) / 2) ** 2 + cos_lat * e[6] * math.sin((e[5] - lon_r) / 2) ** 2
+            return two_r * math.asin(min(1.0, math.sqrt(a)))
+
+        seen = set(exclude)
+        chosen: List[Tuple[tuple, float]] = []
+
+        # 1) Hylkäysotanta: arvo kandidaatti painotetusti ja tarkista kaista
+        attempts = 0
+        max_attempts = k * 40 + 20
+        while len(chosen) < k and attempts < max_attempts:
+            attempts += 1
+            i = rng.randrange(total)
+            s = bisect.bisect_right(cum, i)
+            entries, lo, _ = segments[s]
+            e = entries[lo + i - (cum[s - 1] if s else 0)]
+            if e[0] in seen:
+                continue
+            d = dist(e)
+            seen.add(e[0])
+            if d_min <= d <= d_max:
+                chosen.append((e, d))
+
+        # 2) Harva kaista: käydään loput kandidaatit läpi deterministisessä järjestyksessä
+        if len(chosen) < k:
+            rest = []
+            for entries, lo, hi in segments:
+                for e in entries[lo:hi]:
+                    if e[0] in seen:
+                        continue
+                    d = dist(e)
+                    if d_min <= d <= d_max:
+                        rest.append((e, d))
+            need = min(k - len(chosen), len(rest))
+            if need:
+                chosen.extend(rng.sample(rest, need))
+
+        return [{"ident": e[0], "name": e[1], "distance_km": d} for e, d in chosen]
+
+
+def pick_banded_destinations(
+    index: AirportIndex,
+    dep_ident: str,
+    dep_xy: Tuple[float, float],
+    range_km,
+    count: int,
+    rng=random,
+) -> List[dict]:
+    """
+    Arpoo 'count' kohdekenttää tasaisesti OFFER_DISTANCE_BANDS-kaistoista.
+
+    - Kaistat rajataan koneen kantamaan (range_km); kantaman ylittäviä kaistoja ei käytetä
+    - Tarjoukset jaetaan kaistoille vuorotellen (5 tarjousta → 2/2/1)
+    - Jos kaista on liian harva, vaje täytetään koko kantaman alueelta
+    Arvonnat käyttävät rng:tä (oletus random-moduuli), joten sama siemen → samat kohteet.
+    """
+    max_km = float(range_km) if range_km else math.inf
+    bands = [(lo, min(hi if hi is not None else math.inf, max_km))
+             for lo, hi in OFFER_DISTANCE_BANDS if lo < max_km]
+    if not bands:
+        return []
+
+    quotas = [0] * len(bands)
+    for i in range(count):
+        quotas[i % len(bands)] += 1
+
+    lat, lon = dep_xy
+    picked: List[dict] = []
+    used = {dep_ident}
+    for (lo, hi), quota in zip(bands, quotas):
+        for d in index.sample_in_band(lat, lon, lo, hi, quota, exclude=used, rng=rng):
+            used.add(d["ident"])
+            picked.append(d)
+
+    if len(picked) < count:
+        for d in index.sample_in_band(lat, lon, 0.0, max_km, count - len(picked), exclude=used, rng=rng):
+            used.add(d["ident"])
+            picked.append(d)
+    return picked
+
+
+# ---------- Prosessinlaajuinen välimuisti ----------
+
+_index: Optional[AirportIndex] = None
+_index_lock = threading.Lock()
+_index_stats = metrics.cache_stats("airport_index")
+
+
+def _load_airport_rows() -> List[tuple]:
+    yhteys = get_connection()
+    kursori = None
+    try:
+        kursori = yhteys.cursor()
+        kursori.execute(
+            """
+            SELECT ident, name, latitude_deg, longitude_deg, type
+            FROM airport
+            WHERE latitude_deg IS NOT NULL
+              AND longitude_deg IS NOT NULL
+            """
+        )
+        return kursori.fetchall() or []
+    finally:
+        if kursori:
+            kursori.close()
+        yhteys.close()
+
+
+def get_airport_index() -> AirportIndex:
+    """
+    Palauttaa prosessin yhteisen lentokenttäindeksin (ladataan ensimmäisellä kutsulla).
+    """
+    global _index
+    index = _index
+    if index is not None:
+        _index_stats.hit()
+        return index
+    with _index_lock:
+        if _index is None:
+            _index_stats.miss()
+            _index = AirportIndex(_load_airport_rows())
+        return _index
+
+
+def invalidate_airport_index() -> None:
+    """Tyhjentää indeksin; seuraava get_airport_index() lataa airport-taulun uudelleen."""
+    global _index
+    with _index_lock:
+        _index = None
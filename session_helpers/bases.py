@@ -8,11 +8,13 @@ Sisältää funktiot tukikohtien:
 
 Tukikohdat:
 - Jokaisella on base_id ja base_ident (ICAO-koodi)
-- Päivitykset tallennetaan base_upgrades-tauluun upgrade_code:lla
-- Viimeisin upgrade_code kertoo nykyisen tason
+- Päivitykset tallennetaan base_upgrades-tauluun upgrade_code:lla (historia)
+- Nykyinen taso ja kentän konemäärä ylläpidetään owned_bases-rivillä
+  (current_level, aircraft_count) samoissa transaktioissa kuin muutokset:
+  päivitys (insert_base_upgrade), ostot/lahjakone (+1) ja saapumiset (siirto)
 """
 
-from typing import Dict, List
+from typing import Dict, List, Mapping
 
 from utils import get_connection
 
@@ -32,9 +34,13 @@ def fetch_owned_bases(save_id: int) -> List[dict]:
         - base_ident: ICAO-koodi (esim. EFHK)
         - base_name: Tukikohdan nimi (esim. Helsinki-Vantaa)
         - purchase_cost: Ostohinta
+        - acquired_day: Ostopäivä
+        - current_level: Nykyinen taso (SMALL/MEDIUM/LARGE/HUGE)
+        - aircraft_count: Myymättömät koneet tukikohdan kentällä
     """
     sql = """
-        SELECT base_id, base_ident, base_name, purchase_cost
+        SELECT base_id, base_ident, base_name, purchase_cost, acquired_day,
+               current_level, aircraft_count
         FROM owned_bases
         WHERE save_id = %s
         ORDER BY base_name
@@ -55,31 +61,24 @@ def fetch_base_current_level_map(base_ids: List[int]) -> Dict[int, str]:
     """
     Palauttaa tukikohtien nykyiset päivitystasot.
     
-    Hakee base_upgrades-taulusta viimeisimmän upgrade_code:n kullekin
-    tukikohdalle. Käyttää subquerya löytääkseen viimeisimmän rivin.
+    Lukee owned_bases.current_level-sarakkeen (pääavainhaku), jota
+    insert_base_upgrade ylläpitää.
     
     Args:
         base_ids: Lista tukikohtien ID:tä
     
     Returns:
         Dictionary: {base_id: upgrade_code}
-        Esim. {1: "LVL2", 3: "LVL1"}
-        
-    Huom: Jos tukikohdalla ei ole päivityksiä, sitä ei ole mapissa.
+        Esim. {1: "MEDIUM", 3: "SMALL"}
     """
     if not base_ids:
         return {}
 
     placeholders = ",".join(["%s"] * len(base_ids))
     sql = f"""
-        SELECT bu.base_id, bu.upgrade_code
-        FROM base_upgrades bu
-        JOIN (
-            SELECT base_id, MAX(base_upgrade_id) AS maxid
-            FROM base_upgrades
-            WHERE base_id IN ({placeholders})
-            GROUP BY base_id
-        ) x ON x.base_id = bu.base_id AND x.maxid = bu.base_upgrade_id
+        SELECT base_id, current_level AS upgrade_code
+        FROM owned_bases
+        WHERE base_id IN ({placeholders})
     """
     yhteys = get_connection()
     kursori = None
@@ -98,8 +97,9 @@ def insert_base_upgrade(base_id: int, next_level_code: str, cost, day: int) -> N
     """
     Lisää tukikohdan päivityshistoriaan uuden rivin.
     
-    Tallentaa päivityksen base_upgrades-tauluun. Tämä funktio EI vähennä
-    rahaa - kutsuja vastaa siitä että transaktio on hoidettu.
+    Tallentaa päivityksen base_upgrades-tauluun ja päivittää samassa
+    transaktiossa owned_bases.current_level-sarakkeen. Tämä funktio EI
+    vähennä rahaa - kutsuja vastaa siitä että transaktio on hoidettu.
     
     Args:
         base_id: Tukikohdan ID
@@ -108,7 +108,7 @@ def insert_base_upgrade(base_id: int, next_level_code: str, cost, day: int) -> N
         day: Päivä jolloin päivitys asennettiin
     
     Esimerkki:
-        insert_base_upgrade(base_id=1, next_level_code="LVL2", 
+        insert_base_upgrade(base_id=1, next_level_code="MEDIUM", 
                            cost=Decimal("50000.00"), day=10)
     """
     sql = """
@@ -119,6 +119,7 @@ def insert_base_upgrade(base_id: int, next_level_code: str, cost, day: int) -> N
     kursori = None
     try:
         kursori = yhteys.cursor()
+        yhteys.start_transaction()
         kursori.execute(
             sql,
             (
@@ -128,13 +129,38 @@ def insert_base_upgrade(base_id: int, next_level_code: str, cost, day: int) -> N
                 float(_to_dec(cost)),
             ),
         )
+        kursori.execute(
+            "UPDATE owned_bases SET current_level = %s WHERE base_id = %s",
+            (str(next_level_code), int(base_id)),
+        )
         yhteys.commit()
+    except Exception:
+        yhteys.rollback()
+        raise
     finally:
         if kursori:
             kursori.close()
         yhteys.close()
 
 
+def apply_base_aircraft_deltas(kursori, save_id: int, deltas: Mapping[str, int]) -> None:
+    """
+    Päivittää owned_bases.aircraft_count-laskurit kutsujan transaktiossa.
+
+    Args:
+        kursori: Avoimen transaktion kursori
+        save_id: Tallennuksen ID
+        deltas: {kentän ident: muutos}, esim. saapuminen {"EFHK": -1, "ESSA": +1}
+    """
+    rows = [(int(d), save_id, ident) for ident, d in sorted(deltas.items()) if d]
+    if not rows:
+        return
+    kursori.executemany(
+        "UPDATE owned_bases SET aircraft_count = aircraft_count + %s WHERE save_id = %s AND base_ident = %s",
+        rows,
+    )
+
+
 def get_base_capacity_info(save_id: int) -> List[dict]:
     """
     Returns capacity information for all owned bases.
@@ -157,27 +183,13 @@ def get_base_capacity_info(save_id: int) -> List[dict]:
         'HUGE': 20
     }
     
+    # Taso ja konemäärä ylläpidetään owned_bases-rivillä (ks. moduulin kuvaus)
     sql = """
-        SELECT 
-            ob.base_id,
-            ob.base_ident,
-            ob.base_name,
-            COALESCE(
-                (SELECT bu.upgrade_code 
-                 FROM base_upgrades bu 
-                 WHERE bu.base_id = ob.base_id 
-                 ORDER BY bu.base_upgrade_id DESC 
-                 LIMIT 1),
-                'SMALL'
-            ) AS current_level,
-            COUNT(a.aircraft_id) AS current_count
-        FROM owned_bases ob
-        LEFT JOIN aircraft a ON a.current_airport_ident = ob.base_ident 
-            AND a.save_id = ob.save_id 
-            AND (a.sold_day IS NULL OR a.sold_day = 0)
-        WHERE ob.save_id = %s
-        GROUP BY ob.base_id, ob.base_ident, ob.base_name
-        ORDER BY ob.base_name
+        SELECT base_id, base_ident, base_name, current_level,
+               aircraft_count AS current_count
+        FROM owned_bases
+        WHERE save_id = %s
+        ORDER BY base_name
     """
     
     yhteys = get_connection()
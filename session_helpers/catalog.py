@@ -0,0 +1,140 @@
+"""
+catalog.py - Konemallien viitedata (aircraft_models) prosessin muistissa
+=========================================================================
+aircraft_models on pelin aikana staattista dataa, joten taulu luetaan kerran
+ja jaetaan kaikille kutsujille (CLI, API, FleetStore). Kutsujat hakevat
+mallitiedot luettelosta sen sijaan, että jokainen kysely liittäisi taulun.
+
+- get(model_code): yksittäinen malli
+- by_category(category): mallit kategoriassa (hinta, koodi -järjestys)
+- purchasable(max_tier): kaupassa näkyvät mallit tukikohdan tason mukaan
+- invalidate_model_catalog(): pakottaa uudelleenlatauksen (esim. taulun muutoksen jälkeen)
+
+Rivit ovat jaettuja sanakirjoja: niitä ei saa muokata (kopioi dict(row) tarvittaessa).
+"""
+
+import threading
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+import metrics
+from utils import get_connection
+
+# Kategorioiden taso (tukikohdan SMALL..HUGE-päivitykset avaavat vastaavat mallit).
+# Tuntematon kategoria = 0, eli näkyy aina; STARTER ei koskaan näy kaupassa.
+CATEGORY_TIERS: Dict[str, int] = {"SMALL": 1, "MEDIUM": 2, "LARGE": 3, "HUGE": 4}
+STARTER_CATEGORY = "STARTER"
+MAX_TIER = max(CATEGORY_TIERS.values())
+
+
+def category_tier(category: Optional[str]) -> int:
+    """Kategorian taso (0 jos tuntematon)."""
+    return CATEGORY_TIERS.get(category or "", 0)
+
+
+def _price_key(row: dict):
+    price = row.get("purchase_price")
+    return (Decimal(str(price)) if price is not None else Decimal("0"), row["model_code"])
+
+
+class ModelCatalog:
+    """Konemallit indeksoituna koodin ja kategorian mukaan."""
+
+    def __init__(self, rows: Iterable[dict]):
+        self._by_code: Dict[str, dict] = {}
+        self._by_category: Dict[str, List[dict]] = {}
+        for r in rows:
+            row = dict(r)
+            self._by_code[row["model_code"]] = row
+            self._by_category.setdefault(row.get("category"), []).append(row)
+        for models in self._by_category.values():
+            models.sort(key=_price_key)
+
+        # Kauppanäkymä tasoittain: tason t lista sisältää kaikki mallit, joiden taso <= t
+        shop = sorted(
+            (r for r in self._by_code.values() if r.get("category") != STARTER_CATEGORY),
+            key=_price_key,
+        )
+        self._purchasable: List[List[dict]] = [
+            [r for r in shop if category_tier(r.get("category")) <= tier]
+            for tier in range(MAX_TIER + 1)
+        ]
+        # Markkinoille arvottavat mallit koodijärjestyksessä (vakaa arvontajärjestys)
+        self._non_starter: List[dict] = sorted(shop, key=lambda r: r["model_code"])
+
+    def get(self, model_code: str) -> Optional[dict]:
+        """Palauttaa mallin rivin tai None."""
+        return self._by_code.get(model_code)
+
+    def all(self) -> List[dict]:
+        """Kaikki mallit koodijärjestyksessä."""
+        return [self._by_code[code] for code in sorted(self._by_code)]
+
+    def by_category(self, category: str) -> List[dict]:
+        """Kategorian mallit hinnan ja koodin mukaan järjestettynä."""
+        return list(self._by_category.get(category, ()))
+
+    def non_starter(self) -> List[dict]:
+        """Kaikki muut kuin STARTER-mallit koodijärjestyksessä."""
+        return list(self._non_starter)
+
+    def purchasable(self, max_tier: int) -> List[dict]:
+        """Kaupan mallit, joiden kategorian taso <= max_tier (hinta, koodi -järjestys)."""
+        tier = max(0, min(int(max_tier), MAX_TIER))
+        return list(self._purchasable[tier])
+
+    def __contains__(self, model_code: str) -> bool:
+        return model_code in self._by_code
+
+    def __len__(self) -> int:
+        return len(self._by_code)
+
+
+_catalog: Optional[ModelCatalog] = None
+_catalog_lock = threading.Lock()
+_catalog_stats = metrics.cache_stats("model_catalog")
+
+
+def _load_model_rows() -> List[dict]:
+    """Lukee koko aircraft_models-taulun."""
+    yhteys = get_connection()
+    kursori = None
+    try:
+        kursori = yhteys.cursor(dictionary=True)
+        kursori.execute(
+            """
+            SELECT model_code, manufacturer, model_name, purchase_price, base_cargo_kg,
+                   range_km, cruise_speed_kts, category, upkeep_price, efficiency_score,
+                   co2_kg_per_km, eco_class, eco_fee_multiplier
+            FROM aircraft_models
+            ORDER BY model_code
+            """
+        )
+        return kursori.fetchall() or []
+    finally:
+        if kursori:
+            kursori.close()
+        yhteys.close()
+
+
+def get_model_catalog() -> ModelCatalog:
+    """
+    Palauttaa prosessin yhteisen konemalliluettelon (ladataan ensimmäisellä kutsulla).
+    """
+    global _catalog
+    catalog = _catalog
+    if catalog is not None:
+        _catalog_stats.hit()
+        return catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog_stats.miss()
+            _catalog = ModelCatalog(_load_model_rows())
+        return _catalog
+
+
+def invalidate_model_catalog() -> None:
+    """Tyhjentää luettelon; seuraava get_model_catalog() lukee aircraft_models-taulun uudelleen."""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
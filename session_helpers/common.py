@@ -8,6 +8,8 @@ Sisältää perustyökaluja, joita käytetään läpi projektin:
 
 from decimal import Decimal
 
+from .money import Money
+
 
 def _to_dec(x):
     """
@@ -17,7 +19,7 @@ def _to_dec(x):
     Decimal-tyyppinä välttäen liukulukujen pyöristysvirheet.
     
     Args:
-        x: Mikä tahansa arvo (int, float, str, Decimal tai None)
+        x: Mikä tahansa arvo (int, float, str, Decimal, Money tai None)
     
     Returns:
         Decimal: Muunnettu arvo. None → Decimal('0')
@@ -29,7 +31,11 @@ def _to_dec(x):
         Decimal('123.45')
         >>> _to_dec(None)
         Decimal('0')
+        >>> _to_dec(Money(12345))
+        Decimal('123.45')
     """
+    if isinstance(x, Money):
+        return x.to_decimal()
     return x if isinstance(x, Decimal) else Decimal(str(x if x is not None else 0))
 
 
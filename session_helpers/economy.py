@@ -0,0 +1,237 @@
+"""
+economy.py - Pelitalouden puhtaat laskukaavat
+==============================================
+Kaavat ilman tietokantaa, jotta sama laskenta on käytössä sekä pelissä
+(GameSession) että tasapainosimulaattorissa (balance_sim.py):
+- Kuukausilasku (HQ + huollot, korkoa korolle 60. päivästä alkaen)
+- Rahtitarjouksen muodostus (rahti, kesto, palkkio, sakko, deadline)
+- Sopimuksen tilitys saapuessa (myöhästymissakko, tapahtuman kerroin)
+- ECO-kerroin tason mukaan ja ECO-päivityksen hinta
+
+Oletusarvot tulevat upgrade_configista; avainsanaparametreilla arvoja voi
+kokeilla ilman että konfiguraatiota muutetaan. Rahasummat palautetaan
+Money-tyyppisinä (kokonaislukusentit, ks. money.py).
+"""
+
+import math
+import random
+from decimal import Decimal, ROUND_HALF_UP, ROUND_HALF_EVEN
+from functools import lru_cache
+from typing import Tuple
+
+import metrics
+from upgrade_config import (
+    HQ_MONTHLY_FEE,
+    MAINT_PER_AIRCRAFT,
+    STARTER_MAINT_DISCOUNT,
+    BILL_GROWTH_RATE,
+    TASK_REWARD_PER_KG,
+    TASK_REWARD_PER_KM,
+    TASK_MIN_REWARD,
+    TASK_PENALTY_RATIO,
+    DEFAULT_ECO_FACTOR_PER_LEVEL,
+)
+
+from .money import Money, _div_round, _ratio as _exact_ratio
+
+_CENTS = Decimal("0.01")
+
+
+@lru_cache(maxsize=256)
+def _ratio(value) -> Tuple[int, int]:
+    """Parametrien (Decimal) murtolukuesitys; samat arvot toistuvat joka tarjouksessa."""
+    return _exact_ratio(value)
+
+
+metrics.cache_stats("economy_ratio", source=_ratio.cache_info)
+
+# Laskutus alkaa kasvaa tästä päivästä alkaen (päivä 60 = 1. korollinen kausi)
+BILL_GROWTH_START_DAY = 60
+
+# ECO-kertoimen rajat tasopäivitysten jälkeen
+ECO_LEVEL_FLOOR = Decimal("0.50")
+ECO_LEVEL_CAP = Decimal("5.00")
+
+
+def compute_monthly_bill(
+    day: int,
+    total_planes: int,
+    starter_planes: int,
+    *,
+    hq_fee: Decimal = HQ_MONTHLY_FEE,
+    maint_per_aircraft: Decimal = MAINT_PER_AIRCRAFT,
+    starter_discount: Decimal = STARTER_MAINT_DISCOUNT,
+    growth_rate: Decimal = BILL_GROWTH_RATE,
+) -> Tuple[Money, Decimal, Money]:
+    """
+    Laskee päivän 'day' kuukausilaskun.
+
+    Args:
+        day: Laskutuspäivä (joka 30. päivä)
+        total_planes: Aktiivisten (myymättömien) koneiden määrä
+        starter_planes: Joista STARTER-koneita
+
+    Returns:
+        (base_bill, growth_multiplier, total_bill) – summat Money-tyyppisinä
+    """
+    maint = Money.of(maint_per_aircraft)
+    maint_starter = maint.scale(Decimal(starter_discount) * starter_planes, ROUND_HALF_EVEN)
+    maint_nonstarter = maint * max(0, total_planes - starter_planes)
+    base_bill = Money.of(hq_fee, ROUND_HALF_EVEN) + maint_starter + maint_nonstarter
+
+    if day < BILL_GROWTH_START_DAY:
+        return base_bill, Decimal("1.00"), base_bill
+
+    # Päivä 60 = 1. kausi, päivä 90 = 2. kausi jne.
+    # Loppusumma = Perussumma * (1 + korko)^kaudet
+    growth_periods = (day // 30) - 1
+    growth_multiplier = Decimal((1 + growth_rate) ** growth_periods)
+    total_bill = base_bill.scale(growth_multiplier, ROUND_HALF_EVEN)
+    return base_bill, growth_multiplier, total_bill
+
+
+def compute_offer_reward(
+    payload_kg: int,
+    distance_km: float,
+    eco: Decimal,
+    *,
+    per_kg: Decimal = TASK_REWARD_PER_KG,
+    per_km: Decimal = TASK_REWARD_PER_KM,
+    min_reward: Decimal = TASK_MIN_REWARD,
+    penalty_ratio: Decimal = TASK_PENALTY_RATIO,
+) -> Tuple[Money, Money]:
+    """
+    Rahtitarjouksen palkkio ja myöhästymissakko.
+    - Palkkio: (payload * per_kg + distance * per_km) * eco, vähintään min_reward
+    - Sakko: penalty_ratio palkkiosta, ei koskaan negatiivinen
+
+    Lasku tehdään tarkkoina murtolukuina (etäisyys on float) ja pyöristetään
+    kerran sentteihin, kuten aiempi Decimal-quantize.
+
+    Returns:
+        (reward, penalty) Money-tyyppisinä
+    """
+    kg_n, kg_d = _ratio(per_kg)
+    km_n, km_d = _ratio(per_km)
+    eco_n, eco_d = _ratio(eco)
+    dist_n, dist_d = float(distance_km).as_integer_ratio()
+    num = 100 * eco_n * (payload_kg * kg_n * dist_d * km_d + dist_n * km_n * kg_d)
+    den = kg_d * dist_d * km_d * eco_d
+    reward = Money(_div_round(num, den, ROUND_HALF_EVEN))
+    floor = Money.of(min_reward)
+    if reward < floor:
+        reward = floor
+
+    penalty = reward.scale(penalty_ratio, ROUND_HALF_EVEN)
+    if penalty.cents < 0:
+        penalty = Money(0)
+    return reward, penalty
+
+
+def settle_contract_reward(
+    reward: Money,
+    penalty: Money,
+    deadline_day: int,
+    settle_day: int,
+    multiplier: Decimal = Decimal("1.0"),
+) -> Tuple[Money, bool]:
+    """
+    Sopimuksen lopullinen palkkio saapumisessa.
+    - Myöhässä (settle_day > deadline_day): palkkio - sakko, vähintään 0
+    - Saapumispäivän tapahtuman kerroin (package_multiplier) skaalaa tuloksen
+
+    Returns:
+        (final_reward, late)
+    """
+    late = settle_day > deadline_day
+    base_reward = max(Money(0), reward - penalty) if late else reward
+    final_reward = base_reward.scale(multiplier, ROUND_HALF_UP)
+    if final_reward.cents < 0:
+        final_reward = Money(0)
+    return final_reward, late
+
+
+def event_reward_multiplier(package_multiplier) -> Decimal:
+    """Tapahtuman palkkiokerroin Decimalina (puuttuva tai 0 = 1.0 kuten FlightEvent.from_row, negatiivinen = 0)."""
+    if not package_multiplier:
+        return Decimal("1.0")
+    try:
+        multiplier = Decimal(str(package_multiplier))
+    except (ArithmeticError, ValueError):
+        return Decimal("1.0")
+    return max(Decimal("0.0"), multiplier)
+
+
+def roll_task_offer(
+    dest: dict,
+    capacity: int,
+    speed_km_per_day: float,
+    eco: Decimal,
+    current_day: int,
+    rng=random,
+    **reward_kwargs,
+) -> dict:
+    """
+    Arpoo rahtitarjouksen yhdelle kohteelle.
+    - Rahti skaalataan etäisyyden mukaan; yli-kapasiteetti sallitaan (→ useita reissuja)
+    - Peruskesto matkan ja nopeuden mukaan, kokonaiskesto = peruskesto * reissut
+    - Deadline = kokonaiskesto + puskuri
+
+    Args:
+        dest: {"ident", "name", "distance_km"} (AirportIndex.sample_in_band)
+        capacity: Koneen kapasiteetti (kg, vähintään 1)
+        speed_km_per_day: Koneen päivämatka
+        eco: Efektiivinen ECO-kerroin (valmiiksi rajattu)
+        current_day: Tarjouspäivä
+        rng: Satunnaislähde (oletus: random-moduuli, jolloin pelin siemen pätee)
+        reward_kwargs: compute_offer_reward-parametrit (per_kg, per_km, ...)
+    """
+    dist_km = dest["distance_km"]
+    if dist_km < 500:
+        base_payload = rng.randint(max(1, capacity // 2), max(1, capacity * 3))
+    elif dist_km < 1500:
+        base_payload = rng.randint(capacity, capacity * 4)
+    else:
+        base_payload = rng.randint(capacity * 2, capacity * 6)
+    payload = max(1, int(base_payload))
+
+    base_days = max(1, math.ceil(dist_km / speed_km_per_day))
+    trips = max(1, math.ceil(payload / capacity))
+    total_days = base_days * trips
+
+    reward, penalty = compute_offer_reward(payload, dist_km, eco, **reward_kwargs)
+
+    buffer_days = max(1, trips // 2)
+    return {
+        "dest_ident": dest["ident"],
+        "dest_name": dest.get("name"),
+        "payload_kg": payload,
+        "distance_km": dist_km,
+        "base_days": base_days,
+        "trips": trips,
+        "total_days": total_days,
+        "reward": reward,
+        "penalty": penalty,
+        "deadline": current_day + total_days + buffer_days,
+    }
+
+
+def eco_multiplier_for_level(
+    base_eco: Decimal,
+    level: int,
+    *,
+    factor_per_level: Decimal = DEFAULT_ECO_FACTOR_PER_LEVEL,
+) -> Decimal:
+    """
+    ECO-kerroin päivitystasolla: base * (1 + factor_per_level)^level,
+    rajattuna välille [ECO_LEVEL_FLOOR, ECO_LEVEL_CAP].
+    """
+    effective = base_eco * ((Decimal("1") + factor_per_level) ** int(level))
+    return max(ECO_LEVEL_FLOOR, min(effective, ECO_LEVEL_CAP))
+
+
+def compute_upgrade_cost(base: Decimal, growth: Decimal, next_level: int) -> Decimal:
+    """Päivityksen hinta = perushinta * (kasvukerroin ^ (taso - 1)), sentteihin pyöristettynä."""
+    return (base * (growth ** (Decimal(next_level) - Decimal(1)))).quantize(
+        _CENTS, rounding=ROUND_HALF_UP
+    )
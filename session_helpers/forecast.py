@@ -0,0 +1,166 @@
+"""
+forecast.py - Kassavirtaennuste ilman päiväsimulaatiota
+========================================================
+Ennuste lasketaan suljetussa muodossa tunnetuista tapahtumista:
+- Käynnissä olevat sopimuslennot tilitetään saapumispäivänään samalla kaavalla
+  kuin advance_to_next_day (settle_contract_reward + saapumispäivän tapahtuma)
+- Kuukausilaskut joka 30. päivä compute_monthly_bill-kaavalla nykyisellä laivastolla
+- Ensimmäinen laskupäivä, jolloin kassa ei riitä, on konkurssiriskipäivä
+
+Uusia tehtäviä, ostoja tai korjauksia ei oleteta, joten ennuste on alaraja.
+Tietokannasta tarvitaan yksi kysely (fetch_pending_arrivals).
+"""
+
+from typing import Dict, List, Optional
+
+from utils import get_connection
+
+from .economy import compute_monthly_bill, event_reward_multiplier, settle_contract_reward
+from .money import Money
+
+BILL_INTERVAL_DAYS = 30
+
+
+def fetch_pending_arrivals(save_id: int, rng_seed: Optional[int]) -> List[dict]:
+    """
+    Käynnissä olevat lennot sopimuksineen ja saapumispäivän tapahtuman kertoimineen.
+    Yksi kysely: flights + contracts + player_fate + random_events.
+    """
+    yhteys = get_connection()
+    kursori = None
+    try:
+        kursori = yhteys.cursor(dictionary=True)
+        kursori.execute(
+            """
+            SELECT f.flight_id, f.aircraft_id, f.arr_ident, f.arrival_day,
+                   f.status AS flight_status, f.contract_id,
+                   c.deadline_day, c.reward, c.penalty,
+                   pf.event_name, re.package_multiplier
+            FROM flights f
+                     LEFT JOIN contracts c ON c.contractId = f.contract_id
+                     LEFT JOIN player_fate pf ON pf.seed = %s AND pf.day = f.arrival_day
+                     LEFT JOIN random_events re ON re.event_name = pf.event_name
+            WHERE f.save_id = %s
+              AND f.status IN ('ENROUTE', 'ENROUTE_RTB')
+            ORDER BY f.arrival_day, f.flight_id, re.event_id
+            """,
+            (rng_seed, save_id),
+        )
+        rows = kursori.fetchall() or []
+    finally:
+        if kursori:
+            kursori.close()
+        yhteys.close()
+
+    # random_events.event_name ei ole uniikki → pienin event_id kuten event_system
+    seen = set()
+    out = []
+    for r in rows:
+        if r["flight_id"] in seen:
+            continue
+        seen.add(r["flight_id"])
+        out.append(dict(r))
+    return out
+
+
+def forecast_cash_flow(
+    cash: Money,
+    current_day: int,
+    days: int,
+    arrivals: List[dict],
+    total_planes: int,
+    starter_planes: int,
+) -> Dict:
+    """
+    Projisoi kassan päiville current_day+1 .. current_day+days.
+
+    Args:
+        cash: Kassa nyt
+        arrivals: fetch_pending_arrivals-rivit
+        total_planes / starter_planes: laivasto laskuja varten (pysyy vakiona)
+
+    Returns:
+        dict: arrivals (tilitykset), bills, timeline (kassa muutospäivinä),
+        cash_end, min_cash, bankruptcy_day (None jos kassa riittää)
+    """
+    end_day = current_day + max(0, int(days))
+    first_day = current_day + 1
+
+    # Tilitykset päivittäin: myöhässä olevat (arrival_day <= nyt) käsitellään huomenna
+    income: Dict[int, Money] = {}
+    settled: List[dict] = []
+    for r in arrivals:
+        day = max(int(r["arrival_day"]), first_day)
+        if day > end_day:
+            continue
+        entry = {
+            "day": day,
+            "flight_id": r["flight_id"],
+            "aircraft_id": r["aircraft_id"],
+            "arr_ident": r["arr_ident"],
+            "contract_id": r["contract_id"],
+            "return_to_base": r["flight_status"] == "ENROUTE_RTB",
+            "reward": Money(0),
+            "late": False,
+            "event": None,
+            "multiplier": float(event_reward_multiplier(None)),
+        }
+        if r["contract_id"] is not None and r["flight_status"] == "ENROUTE":
+            multiplier = event_reward_multiplier(r["package_multiplier"])
+            reward, late = settle_contract_reward(
+                Money.of(r["reward"]), Money.of(r["penalty"]), int(r["deadline_day"]), day, multiplier
+            )
+            entry.update(reward=reward, late=late, event=r["event_name"], multiplier=float(multiplier))
+            income[day] = income.get(day, Money(0)) + reward
+        settled.append(entry)
+
+    bill_days = range(
+        ((first_day + BILL_INTERVAL_DAYS - 1) // BILL_INTERVAL_DAYS) * BILL_INTERVAL_DAYS,
+        end_day + 1,
+        BILL_INTERVAL_DAYS,
+    )
+
+    # Kassa muuttuu vain tilitys- ja laskupäivinä → käydään läpi vain ne
+    balance = cash
+    min_cash = cash
+    bankruptcy_day = None
+    bills: List[dict] = []
+    timeline: List[dict] = []
+    for day in sorted(set(income) | set(bill_days)):
+        balance += income.get(day, Money(0))
+        if day % BILL_INTERVAL_DAYS == 0:
+            base_bill, growth, total_bill = compute_monthly_bill(day, total_planes, starter_planes)
+            covered = balance >= total_bill
+            if covered:
+                balance -= total_bill
+            elif bankruptcy_day is None:
+                bankruptcy_day = day
+            bills.append({
+                "day": day,
+                "amount": total_bill,
+                "base": base_bill,
+                "growth_multiplier": float(growth),
+                "covered": covered,
+                "cash_after": balance,
+            })
+        timeline.append({"day": day, "cash": balance})
+        min_cash = min(min_cash, balance)
+        if bankruptcy_day is not None:
+            break  # konkurssissa peli päättyy
+
+    if bankruptcy_day is not None:
+        settled = [a for a in settled if a["day"] <= bankruptcy_day]
+
+    return {
+        "current_day": current_day,
+        "end_day": end_day,
+        "cash": cash,
+        "cash_end": balance,
+        "min_cash": min_cash,
+        "bankruptcy_day": bankruptcy_day,
+        "total_planes": total_planes,
+        "starter_planes": starter_planes,
+        "arrivals": settled,
+        "bills": bills,
+        "timeline": timeline,
+    }
@@ -0,0 +1,144 @@
+"""
+history.py - Päivittäiset talousluvut ja niiden harvennus kaavioille
+====================================================================
+save_daily_stats: yksi rivi per tallennus per päivä (kassa, laivaston koko,
+aktiiviset sopimukset, päivän ansiot), kaikki kokonaislukuina (sentit).
+Rivi kirjoitetaan päivänvaihdon transaktiossa (record_daily_stats);
+saman päivän myöhemmät kassamuutokset (esim. kuukausilasku) päivittävät sen
+post_cash_entries-kutsussa, joten cash_cents on aina päivän loppusaldo.
+
+Kaaviot eivät tarvitse jokaista päivää: downsample_history jakaa välin
+ämpäreihin (min/max/viimeinen per ämpäri) ja poimii kassakäyrästä
+LTTB-algoritmilla (Largest-Triangle-Three-Buckets) muodon säilyttävät pisteet.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils import get_connection
+
+from .money import Money
+
+STAT_COLUMNS = ("day", "cash_cents", "fleet_size", "active_contracts", "earnings_cents")
+
+
+def record_daily_stats(kursori, save_id: int, day: int, earnings: Money) -> None:
+    """
+    Kirjoittaa päivän rivin avoimessa transaktiossa. Kassa, laivaston koko
+    (myymättömät koneet) ja aktiiviset sopimukset luetaan samassa lauseessa
+    samalla kursorilla, joten rivi vastaa transaktioon kirjattua tilaa eikä
+    istunnon välimuistia.
+    """
+    kursori.execute(
+        """
+        INSERT INTO save_daily_stats
+            (save_id, day, cash_cents, fleet_size, active_contracts, earnings_cents)
+        SELECT g.save_id, %s, ROUND(g.cash * 100),
+               (SELECT COUNT(*) FROM aircraft a
+                WHERE a.save_id = g.save_id AND (a.sold_day IS NULL OR a.sold_day = 0)),
+               (SELECT COUNT(*) FROM contracts c
+                WHERE c.save_id = g.save_id AND c.status IN ('ACCEPTED', 'IN_PROGRESS')),
+               %s
+        FROM game_saves g
+        WHERE g.save_id = %s
+        """,
+        (day, Money.of(earnings).cents, save_id),
+    )
+
+
+def fetch_daily_stats(save_id: int, from_day: int, to_day: int) -> List[dict]:
+    """Päivärivit väliltä from_day..to_day päiväjärjestyksessä (yksi kysely)."""
+    yhteys = get_connection()
+    kursori = None
+    try:
+        kursori = yhteys.cursor()
+        kursori.execute(
+            f"""
+            SELECT {', '.join(STAT_COLUMNS)}
+            FROM save_daily_stats
+            WHERE save_id = %s AND day BETWEEN %s AND %s
+            ORDER BY day
+            """,
+            (save_id, from_day, to_day),
+        )
+        rows = kursori.fetchall() or []
+    finally:
+        if kursori:
+            kursori.close()
+        yhteys.close()
+    return [dict(zip(STAT_COLUMNS, (int(v or 0) for v in r))) for r in rows]
+
+
+def lttb(points: Sequence[Tuple[int, int]], threshold: int) -> List[Tuple[int, int]]:
+    """
+    Largest-Triangle-Three-Buckets: valitsee 'threshold' pistettä (x, y)-sarjasta
+    niin, että käyrän muoto (huiput ja notkot) säilyy. Ensimmäinen ja viimeinen
+    piste ovat aina mukana.
+    """
+    n = len(points)
+    # Alle kolme ei riitä kolmioihin: ensimmäinen ja viimeinen piste
+    threshold = max(int(threshold), 2)
+    if threshold >= n:
+        return list(points)
+    if threshold == 2:
+        return [points[0], points[-1]]
+
+    out = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Seuraavan ämpärin keskiarvo kolmion kolmanneksi kärjeksi
+        nxt_start = int((i + 1) * every) + 1
+        nxt_end = min(int((i + 2) * every) + 1, n)
+        span = nxt_end - nxt_start
+        avg_x = sum(p[0] for p in points[nxt_start:nxt_end]) / span
+        avg_y = sum(p[1] for p in points[nxt_start:nxt_end]) / span
+
+        ax, ay = points[a]
+        best, best_area = None, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(points[best])
+        a = best
+    out.append(points[-1])
+    return out
+
+
+def downsample_history(rows: Sequence[dict], from_day: int, to_day: int, buckets: int) -> Dict:
+    """
+    Harventaa päivärivit enintään 'buckets' ämpäriin (tasavälisesti päivinä).
+
+    Returns:
+        dict: buckets (day_start, day_end, cash/fleet_size/active_contracts
+        min/max/last, earnings = summa) ja points (LTTB-poiminta kassasta, (day, cash_cents))
+    """
+    buckets = max(1, int(buckets))
+    span = max(1, to_day - from_day + 1)
+    width = -(-span // buckets)  # ceil
+
+    grouped: List[dict] = []
+    current: Optional[dict] = None
+    for r in rows:
+        start = from_day + ((r["day"] - from_day) // width) * width
+        if current is None or current["day_start"] != start:
+            current = {
+                "day_start": start,
+                "day_end": min(start + width - 1, to_day),
+                "days": 0,
+                "earnings_cents": 0,
+            }
+            for col in ("cash_cents", "fleet_size", "active_contracts"):
+                current[col] = {"min": r[col], "max": r[col], "last": r[col]}
+            grouped.append(current)
+        current["days"] += 1
+        current["earnings_cents"] += r["earnings_cents"]
+        for col in ("cash_cents", "fleet_size", "active_contracts"):
+            agg = current[col]
+            agg["min"] = min(agg["min"], r[col])
+            agg["max"] = max(agg["max"], r[col])
+            agg["last"] = r[col]
+
+    points = lttb([(r["day"], r["cash_cents"]) for r in rows], buckets)
+    return {"bucket_days": width, "buckets": grouped, "points": points}
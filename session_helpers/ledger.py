@@ -0,0 +1,115 @@
+"""
+ledger.py - Kassakirjanpito (cash_ledger)
+=========================================
+Jokainen kassan muutos kirjataan cash_ledger-tauluun (save_id, day,
+amount_cents, reason, ref_id). Kirjanpito on totuuden lähde; game_saves.cash
+on sen välimuistisaldo, joka päivitetään samassa transaktiossa:
+
+- Saldo päivitetään suhteellisesti (cash = cash + summa) ilman edeltävää
+  SELECT ... FOR UPDATE -lukua, joten rivilukko pidetään vain kirjoituksen ajan
+- Veloitus, johon kassa ei riitä, ei päivitä riviä → post_cash_entries palauttaa None
+- Yhden operaation kaikki rivit lisätään yhdellä executemany-kutsulla
+  (esim. päivän kaikki sopimustilitykset)
+- Saman päivän save_daily_stats-rivin cash_cents päivitetään samalla
+
+Invariantti: SUM(amount_cents) / 100 = game_saves.cash jokaiselle tallennukselle.
+"""
+
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from .money import Money
+
+# (summa, syy, viite-id) – viite on esim. contract_id tai aircraft_id
+LedgerEntry = Tuple[Money, str, Optional[int]]
+
+REASON_MAX_LEN = 64
+
+
+def post_cash_entries(
+    kursori,
+    save_id: int,
+    day: int,
+    entries: Iterable[LedgerEntry],
+    allow_negative: bool = False,
+) -> Optional[Money]:
+    """
+    Kirjaa rivit kirjanpitoon ja päivittää game_saves.cash-saldon.
+    Kutsuja vastaa transaktiosta (commit/rollback).
+
+    Args:
+        kursori: Avoimen transaktion kursori
+        entries: (summa, syy, viite-id) -rivit; nollasummat ohitetaan
+        allow_negative: Salli saldon painuminen negatiiviseksi
+
+    Returns:
+        Money: Uusi saldo, tai None jos kassa ei riitä (mitään ei kirjattu)
+    """
+    rows: List[tuple] = []
+    total = Money(0)
+    for amount, reason, ref_id in entries:
+        amount = Money.of(amount)
+        if not amount:
+            continue
+        total += amount
+        rows.append((save_id, day, amount.cents, str(reason)[:REASON_MAX_LEN], ref_id))
+
+    if rows:
+        delta = total.to_decimal()
+        if total.cents < 0 and not allow_negative:
+            kursori.execute(
+                "UPDATE game_saves SET cash = ROUND(cash + %s, 2), updated_at = %s "
+                "WHERE save_id = %s AND cash + %s >= 0",
+                (delta, datetime.utcnow(), save_id, delta),
+            )
+        else:
+            kursori.execute(
+                "UPDATE game_saves SET cash = ROUND(cash + %s, 2), updated_at = %s WHERE save_id = %s",
+                (delta, datetime.utcnow(), save_id),
+            )
+        if kursori.rowcount == 0:
+            return None
+        # Päivän tilastorivi (jos jo kirjoitettu) pysyy päivän loppusaldossa
+        kursori.execute(
+            "UPDATE save_daily_stats SET cash_cents = cash_cents + %s WHERE save_id = %s AND day = %s",
+            (total.cents, save_id, day),
+        )
+        kursori.executemany(
+            "INSERT INTO cash_ledger (save_id, day, amount_cents, reason, ref_id) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            rows,
+        )
+
+    kursori.execute("SELECT cash FROM game_saves WHERE save_id = %s", (save_id,))
+    row = kursori.fetchone()
+    if not row:
+        return None
+    return Money.of(row["cash"] if isinstance(row, dict) else row[0])
+
+
+def fetch_cash_ledger(kursori, save_id: int, from_day: int = 0, to_day: Optional[int] = None) -> List[dict]:
+    """Kirjanpitorivit päiväväliltä (ledger_id-järjestyksessä), summat Money-olioina."""
+    if to_day is None:
+        kursori.execute(
+            "SELECT ledger_id, day, amount_cents, reason, ref_id FROM cash_ledger "
+            "WHERE save_id = %s AND day >= %s ORDER BY ledger_id",
+            (save_id, from_day),
+        )
+    else:
+        kursori.execute(
+            "SELECT ledger_id, day, amount_cents, reason, ref_id FROM cash_ledger "
+            "WHERE save_id = %s AND day BETWEEN %s AND %s ORDER BY ledger_id",
+            (save_id, from_day, to_day),
+        )
+    out = []
+    for r in kursori.fetchall() or []:
+        if not isinstance(r, dict):
+            r = dict(zip(("ledger_id", "day", "amount_cents", "reason", "ref_id"), r))
+        out.append({
+            "ledger_id": int(r["ledger_id"]),
+            "day": int(r["day"]),
+            "amount": Money(int(r["amount_cents"])),
+            "reason": r["reason"],
+            "ref_id": r["ref_id"],
+        })
+    return out
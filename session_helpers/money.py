@@ -0,0 +1,180 @@
+"""
+money.py - Kiintopisteinen rahatyyppi (kokonaislukusentit)
+==========================================================
+Money tallentaa summan kokonaislukuna sentteinä. Yhteen- ja vähennyslasku
+ovat tarkkoja int-operaatioita, ja kertoimella skaalaus pyöristetään tarkasti
+(kerroin muunnetaan murtoluvuksi as_integer_ratio():lla), joten tulos on
+sama kuin Decimal-laskussa quantize(Decimal("0.01"), rounding=...) -kutsulla.
+
+Decimaliin muunnetaan vain tietokantarajalla (to_decimal) ja tarvittaessa
+_to_dec():ssa; Money vertautuu ja laskee suoraan Decimalin, intin ja floatin
+kanssa, joten se sopii olemassa olevaan koodiin sellaisenaan.
+
+Esimerkit:
+    >>> Money.of("1234.565")            # ROUND_HALF_UP
+    Money('1234.57')
+    >>> Money.of("100.00").scale(Decimal("1.05"))
+    Money('105.00')
+    >>> Money.of(5) + Decimal("0.10")
+    Money('5.10')
+"""
+
+from decimal import Decimal, ROUND_HALF_UP, ROUND_HALF_EVEN
+from typing import Union
+
+Number = Union[int, float, Decimal, str, "Money", None]
+
+
+def _div_round(num: int, den: int, rounding: str = ROUND_HALF_UP) -> int:
+    """Jakaa num/den ja pyöristää kokonaisluvuksi (den > 0). Tasatilanne: HALF_UP tai HALF_EVEN."""
+    q, r = divmod(abs(num), den)
+    twice = 2 * r
+    if twice > den or (twice == den and (rounding != ROUND_HALF_EVEN or q & 1)):
+        q += 1
+    return q if num >= 0 else -q
+
+
+def _ratio(value) -> tuple:
+    """Palauttaa luvun tarkkana murtolukuna (osoittaja, nimittäjä > 0)."""
+    if isinstance(value, int):
+        return value, 1
+    if isinstance(value, float):
+        # Kuten _to_dec: float → str → Decimal, jotta 0.1 tarkoittaa 0.1:tä
+        value = Decimal(str(value))
+    elif not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.as_integer_ratio()
+
+
+class Money:
+    """Rahasumma kokonaislukusentteinä. Käsitellään muuttumattomana arvona."""
+
+    __slots__ = ("cents",)
+
+    def __init__(self, cents: int = 0):
+        self.cents = int(cents)
+
+    # ---------- Muunnokset ----------
+
+    @classmethod
+    def of(cls, value: Number, rounding: str = ROUND_HALF_UP) -> "Money":
+        """
+        Muuntaa arvon Moneyksi (None → 0). Int tulkitaan euroiksi,
+        muut pyöristetään sentteihin (oletus ROUND_HALF_UP).
+        """
+        if isinstance(value, Money):
+            return value
+        if value is None:
+            return cls(0)
+        if isinstance(value, int):
+            return cls(value * 100)
+        num, den = _ratio(value)
+        return cls(_div_round(num * 100, den, rounding))
+
+    def to_decimal(self) -> Decimal:
+        """Decimal kahdella desimaalilla (tietokantaraja)."""
+        return Decimal(self.cents).scaleb(-2)
+
+    # ---------- Laskenta ----------
+
+    def scale(self, factor, rounding: str = ROUND_HALF_UP) -> "Money":
+        """Kertoo summan kertoimella ja pyöristää tarkasti sentteihin."""
+        num, den = _ratio(factor)
+        return Money(_div_round(self.cents * num, den, rounding))
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money(self.cents + other.cents)
+        if isinstance(other, (int, float, Decimal)):
+            return Money(self.cents + Money.of(other).cents)
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money(self.cents - other.cents)
+        if isinstance(other, (int, float, Decimal)):
+            return Money(self.cents - Money.of(other).cents)
+        return NotImplemented
+
+    def __rsub__(self, other):
+        if isinstance(other, (int, float, Decimal)):
+            return Money(Money.of(other).cents - self.cents)
+        return NotImplemented
+
+    def __mul__(self, other):
+        if isinstance(other, int) and not isinstance(other, bool):
+            return Money(self.cents * other)
+        if isinstance(other, (float, Decimal)):
+            return self.scale(other)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __neg__(self) -> "Money":
+        return Money(-self.cents)
+
+    def __pos__(self) -> "Money":
+        return self
+
+    def __abs__(self) -> "Money":
+        return Money(abs(self.cents))
+
+    def __bool__(self) -> bool:
+        return self.cents != 0
+
+    # ---------- Vertailut ----------
+
+    def _cmp_key(self, other):
+        """Palauttaa (oma, toinen) vertailtavassa muodossa tai None."""
+        if isinstance(other, Money):
+            return self.cents, other.cents
+        if isinstance(other, int):
+            return self.cents, other * 100
+        if isinstance(other, (float, Decimal)):
+            return self.to_decimal(), Decimal(str(other)) if isinstance(other, float) else other
+        return None
+
+    def __eq__(self, other):
+        pair = self._cmp_key(other)
+        return NotImplemented if pair is None else pair[0] == pair[1]
+
+    def __lt__(self, other):
+        pair = self._cmp_key(other)
+        return NotImplemented if pair is None else pair[0] < pair[1]
+
+    def __le__(self, other):
+        pair = self._cmp_key(other)
+        return NotImplemented if pair is None else pair[0] <= pair[1]
+
+    def __gt__(self, other):
+        pair = self._cmp_key(other)
+        return NotImplemented if pair is None else pair[0] > pair[1]
+
+    def __ge__(self, other):
+        pair = self._cmp_key(other)
+        return NotImplemented if pair is None else pair[0] >= pair[1]
+
+    def __hash__(self) -> int:
+        # Sama hash kuin vastaavalla Decimalilla (Money('1.00') == Decimal('1.00'))
+        return hash(self.to_decimal())
+
+    # ---------- Esitys ----------
+
+    def __float__(self) -> float:
+        return self.cents / 100
+
+    def __str__(self) -> str:
+        sign = "-" if self.cents < 0 else ""
+        euros, cents = divmod(abs(self.cents), 100)
+        return f"{sign}{euros}.{cents:02d}"
+
+    def __repr__(self) -> str:
+        return f"Money('{self}')"
+
+    def __format__(self, spec: str) -> str:
+        return format(self.to_decimal(), spec) if spec else str(self)
+
+    def __reduce__(self):
+        return (Money, (self.cents,))
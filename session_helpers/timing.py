@@ -0,0 +1,108 @@
+"""
+timing.py - Vaiheiden ajanotto ja prosessin histogrammit
+========================================================
+PhaseTimer mittaa yhden operaation (esim. päivänvaihto) vaiheet:
+kesto ja (pyydettäessä) SQL-lauseiden määrä per vaihe. Sisäkkäisen vaiheen
+aika ja lauseet vähennetään ympäröivästä vaiheesta, joten luvut ovat
+vaiheen omia ja summautuvat kokonaisuudeksi.
+
+Jokaisen vaiheen kesto kirjataan myös prosessin yhteiseen histogrammiin
+(phase_histogram), joten regressiot näkyvät vaihekohtaisesti laivaston kasvaessa.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import metrics
+from metrics import DEFAULT_BUCKETS, Histogram
+from sql_accounting import StatementRecorder
+
+# Vaiheiden kestot näkyvät myös /metrics-reitillä: afc_phase_seconds{operation, phase}
+_PHASE_SECONDS = metrics.histogram(
+    "afc_phase_seconds", "Operaatioiden vaiheiden kestot (phase=total: koko operaatio)",
+    ("operation", "phase"),
+)
+
+
+def phase_histogram(operation: str, phase: str) -> Histogram:
+    """Prosessin yhteinen histogrammi operaation vaiheelle (luodaan tarvittaessa)."""
+    return _PHASE_SECONDS.labels(operation, phase)
+
+
+def phase_histograms() -> Dict[str, Dict[str, Dict]]:
+    """Kaikkien vaihehistogrammien tilannekuva {operaatio: {vaihe: snapshot}}."""
+    out: Dict[str, Dict[str, Dict]] = {}
+    for (operation, phase), hist in _PHASE_SECONDS.items():
+        out.setdefault(operation, {})[phase] = hist.snapshot()
+    return out
+
+
+class PhaseTimer:
+    """
+    Yhden operaation vaiheajastin.
+
+    Args:
+        operation: Histogrammien nimiavaruus (esim. "advance_day")
+        statements: Laske myös SQL-lauseet (käytä recorderia sql_accounting.recording()-lohkossa)
+    """
+
+    def __init__(self, operation: str, statements: bool = False):
+        self.operation = operation
+        self.recorder: Optional[StatementRecorder] = StatementRecorder() if statements else None
+        self.started = time.perf_counter()
+        # vaihe -> [kutsut, omat sekunnit, omat lauseet]
+        self.phases: Dict[str, List] = {}
+        # avoimet vaiheet: [nimi, alku, lauseet alussa, lasten sekunnit, lasten lauseet]
+        self._stack: List[List] = []
+
+    def _statements(self) -> int:
+        return self.recorder.statements if self.recorder is not None else 0
+
+    def start(self, name: str) -> None:
+        self._stack.append([name, time.perf_counter(), self._statements(), 0.0, 0])
+
+    def stop(self, name: str) -> None:
+        frame = self._stack.pop()
+        if frame[0] != name:
+            raise RuntimeError(f"Vaihe {name} pysäytettiin, mutta auki oli {frame[0]}")
+        elapsed = time.perf_counter() - frame[1]
+        statements = self._statements() - frame[2]
+        if self._stack:
+            parent = self._stack[-1]
+            parent[3] += elapsed
+            parent[4] += statements
+        agg = self.phases.get(name)
+        if agg is None:
+            agg = self.phases[name] = [0, 0.0, 0]
+        agg[0] += 1
+        agg[1] += elapsed - frame[3]
+        agg[2] += statements - frame[4]
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def finish(self) -> Dict:
+        """
+        Kirjaa vaiheet ja kokonaiskeston histogrammeihin ja palauttaa raportin:
+        {"total_ms", "statements"?, "phases": {vaihe: {"calls", "ms", "statements"?}}}
+        """
+        total = time.perf_counter() - self.started
+        self._stack.clear()  # poikkeuksen jälkeen auki jääneet vaiheet
+        phase_histogram(self.operation, "total").observe(total)
+        report_phases = {}
+        for name, (calls, seconds, statements) in self.phases.items():
+            phase_histogram(self.operation, name).observe(seconds)
+            entry = {"calls": calls, "ms": round(seconds * 1000, 3)}
+            if self.recorder is not None:
+                entry["statements"] = statements
+            report_phases[name] = entry
+        report = {"total_ms": round(total * 1000, 3), "phases": report_phases}
+        if self.recorder is not None:
+            report["statements"] = self.recorder.statements
+        return report
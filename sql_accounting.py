@@ -0,0 +1,498 @@
+"""
+sql_accounting.py - SQL-lauseiden kirjanpito
+============================================
+utils.get_connection() käärii yhteyden InstrumentedConnectioniin, kun
+tämän säikeen recording()-lohko on käynnissä. Kääre kirjaa jokaisen
+execute/executemany-kutsun (kesto, palautetut rivit) ja yhteyden oton
+kaikille säikeen aktiivisille kirjaajille, joten sisäkkäiset lohkot
+(esim. pyyntö → päivänvaihdon vaihe) näkevät samat lauseet.
+
+Ilman recording()-lohkoa yhteyksiä ei kääritä, joten tavallisessa ajossa
+kustannus on yksi säikeen paikallisen muuttujan haku per yhteys.
+
+Pyyntökohtainen kirjanpito (init_app) on käytössä, kun AFC_SQL_ACCOUNTING=1
+tai Flask on debug-tilassa:
+- Vastausotsakkeet X-SQL-Statements, -Connections, -Rows, -Time-Ms ja
+  X-SQL-Top (useimmin ajetut sormenjäljet)
+- Sormenjälki, jota ajetaan yhdessä pyynnössä vähintään N_PLUS_ONE_THRESHOLD
+  kertaa, merkitään otsakkeeseen X-SQL-Repeated ja lokiin (N+1-epäily)
+- Prosessin kooste sormenjäljittäin: top_fingerprints() / GET /api/debug/sql
+
+Hitaiden kyselyiden loki (kehitystila): kun AFC_SLOW_QUERY_MS=<ms> on
+asetettu (tai Flask on debug-tilassa, oletus DEBUG_SLOW_QUERY_MS), kaikki
+yhteydet kääritään ja rajan ylittävä lause kirjataan parametreineen ja
+EXPLAIN-tulosteineen kiertävään tiedostoon AFC_SLOW_QUERY_LOG (oletus
+logs/slow_queries.log). Sama sormenjälki kirjataan vain kerran; myöhemmät
+osumat näkyvät laskureina (slow_queries()).
+"""
+
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import metrics
+
+ENABLED = os.environ.get("AFC_SQL_ACCOUNTING", "0") == "1"
+N_PLUS_ONE_THRESHOLD = 10
+TOP_HEADER_COUNT = 3
+HEADER_MAX_LEN = 512
+
+SLOW_QUERY_MS = float(os.environ.get("AFC_SLOW_QUERY_MS", "0") or 0)
+DEBUG_SLOW_QUERY_MS = 100.0
+SLOW_QUERY_LOG = os.environ.get(
+    "AFC_SLOW_QUERY_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "slow_queries.log"),
+)
+SLOW_QUERY_LOG_BYTES = 1_000_000
+SLOW_QUERY_LOG_BACKUPS = 3
+PARAMS_MAX_LEN = 1000
+
+_local = threading.local()
+
+
+# ---------- Sormenjäljet ----------
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%s|\?")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_IN_SINGLE_RE = re.compile(r"\b(IN ?)\( ?\? ?\)", re.I)
+_WS_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql: str) -> str:
+    """
+    Normalisoitu lause: kommentit pois, literaalit ja parametrit → ?,
+    IN-listat (myös yhden alkion) → (?+), välilyönnit tiivistetty. Samat kyselyt eri arvoilla
+    (myös merkkijonoista kootut) saavat saman sormenjäljen.
+    """
+    s = _COMMENT_RE.sub(" ", sql)
+    s = _STRING_RE.sub("?", s)
+    s = _NUMBER_RE.sub("?", s)
+    s = _PARAM_RE.sub("?", s)
+    s = _IN_LIST_RE.sub("(?+)", s)
+    # Yhden alkion lista samaksi kuin pidempi (esim. NOT IN -lista omistetuista tukikohdista)
+    s = _IN_SINGLE_RE.sub(r"\1(?+)", _WS_RE.sub(" ", s))
+    return s.strip()
+
+
+metrics.cache_stats("sql_fingerprint", source=fingerprint.cache_info)
+
+
+# ---------- Kirjaajat ----------
+
+class StatementRecorder:
+    """Laskee recording()-lohkon aikana suoritetut lauseet ja yhteyden otot."""
+
+    __slots__ = ("statements", "connections")
+
+    def __init__(self):
+        self.statements = 0
+        self.connections = 0
+
+    def checkout(self) -> None:
+        self.connections += 1
+
+    def record(self, sql: str, seconds: float = 0.0) -> None:
+        self.statements += 1
+
+    def record_rows(self, sql: str, rows: int) -> None:
+        pass
+
+
+class RequestRecorder(StatementRecorder):
+    """Pyynnön kirjaaja: kesto, rivit ja sormenjälkikohtaiset luvut."""
+
+    __slots__ = ("seconds", "rows", "by_fingerprint")
+
+    def __init__(self):
+        super().__init__()
+        self.seconds = 0.0
+        self.rows = 0
+        # sormenjälki -> [kerrat, sekunnit, pisin, rivit]
+        self.by_fingerprint: Dict[str, List] = {}
+
+    def _entry(self, sql: str) -> List:
+        fp = fingerprint(sql)
+        entry = self.by_fingerprint.get(fp)
+        if entry is None:
+            entry = self.by_fingerprint[fp] = [0, 0.0, 0.0, 0]
+        return entry
+
+    def record(self, sql: str, seconds: float = 0.0) -> None:
+        self.statements += 1
+        self.seconds += seconds
+        entry = self._entry(sql)
+        entry[0] += 1
+        entry[1] += seconds
+        if seconds > entry[2]:
+            entry[2] = seconds
+
+    def record_rows(self, sql: str, rows: int) -> None:
+        self.rows += rows
+        self._entry(sql)[3] += rows
+
+    def top(self, n: int = TOP_HEADER_COUNT) -> List[Tuple[str, List]]:
+        """Useimmin ajetut sormenjäljet (tasatilanteessa hitain ensin)."""
+        return sorted(self.by_fingerprint.items(), key=lambda kv: (-kv[1][0], -kv[1][1]))[:n]
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+        """Sormenjäljet, joita ajettiin vähintään threshold kertaa (N+1-epäily)."""
+        return [(fp, e[0]) for fp, e in self.by_fingerprint.items() if e[0] >= threshold]
+
+
+def active() -> Tuple[StatementRecorder, ...]:
+    """Tämän säikeen aktiiviset kirjaajat (uloimmasta sisimpään)."""
+    return getattr(_local, "recorders", ())
+
+
+def push(recorder: StatementRecorder) -> Tuple[StatementRecorder, ...]:
+    """Lisää kirjaajan tämän säikeen pinoon; palauttaa edellisen tilan pop()-kutsua varten."""
+    previous = active()
+    _local.recorders = previous + (recorder,)
+    return previous
+
+
+def pop(previous: Tuple[StatementRecorder, ...]) -> None:
+    _local.recorders = previous
+
+
+@contextmanager
+def recording(recorder: Optional[StatementRecorder] = None) -> Iterator[StatementRecorder]:
+    """Kirjaa with-lohkossa avattujen yhteyksien lauseet recorderiin."""
+    recorder = recorder if recorder is not None else StatementRecorder()
+    previous = push(recorder)
+    try:
+        yield recorder
+    finally:
+        pop(previous)
+
+
+# ---------- Yhteys- ja kursorikääreet ----------
+
+class InstrumentedCursor:
+    """Kursorikääre: kirjaa lauseen keston ja rivit, delegoi loput alkuperäiselle kursorille."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._sql = ""
+
+    def _run(self, method, sql, args, kwargs, many=False):
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            return method(sql, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            for recorder in active():
+                recorder.record(sql, elapsed)
+            if _slow_threshold_s is not None and elapsed >= _slow_threshold_s:
+                params = args[0] if args else kwargs.get("params")
+                if many and params:
+                    params = next(iter(params), None)  # EXPLAIN ensimmäisellä rivillä
+                capture_slow_query(sql, params, elapsed)
+
+    def execute(self, sql, *args, **kwargs):
+        return self._run(self._cursor.execute, sql, args, kwargs)
+
+    def executemany(self, sql, *args, **kwargs):
+        return self._run(self._cursor.executemany, sql, args, kwargs, many=True)
+
+    def _rows(self, n: int) -> None:
+        if n:
+            for recorder in active():
+                recorder.record_rows(self._sql, n)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._rows(0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._rows(len(rows) if rows else 0)
+        return rows
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._rows(1)
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Yhteyskääre, jonka cursor() palauttaa InstrumentedCursorin."""
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def cursor(self, *args, **kwargs) -> InstrumentedCursor:
+        return InstrumentedCursor(self.raw.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __enter__(self) -> "InstrumentedConnection":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.raw.close()
+
+
+def instrument(connection):
+    """
+    Käärii yhteyden (ja kirjaa yhteyden oton), jos tässä säikeessä on recording()-lohko
+    tai hitaiden kyselyiden loki on päällä.
+    """
+    recorders = active()
+    if not recorders:
+        return connection if _slow_threshold_s is None else InstrumentedConnection(connection)
+    for recorder in recorders:
+        recorder.checkout()
+    return InstrumentedConnection(connection)
+
+
+def unwrap(connection):
+    """Alkuperäinen yhteys (esim. tyyppitarkistuksia varten)."""
+    return connection.raw if isinstance(connection, InstrumentedConnection) else connection
+
+
+# ---------- Prosessin kooste ----------
+
+# sormenjälki -> [kerrat, sekunnit, pisin, rivit, pyynnöt, enimmillään per pyyntö]
+_totals: Dict[str, List] = {}
+_totals_lock = threading.Lock()
+
+SORT_KEYS = {
+    "total": lambda e: e[1],
+    "count": lambda e: e[0],
+    "max": lambda e: e[2],
+    "avg": lambda e: e[1] / e[0] if e[0] else 0.0,
+}
+
+
+def merge(recorder: RequestRecorder) -> None:
+    """Lisää pyynnön luvut prosessin koosteeseen (yksi lukitus per pyyntö)."""
+    with _totals_lock:
+        for fp, (count, seconds, longest, rows) in recorder.by_fingerprint.items():
+            total = _totals.get(fp)
+            if total is None:
+                total = _totals[fp] = [0, 0.0, 0.0, 0, 0, 0]
+            total[0] += count
+            total[1] += seconds
+            total[2] = max(total[2], longest)
+            total[3] += rows
+            total[4] += 1
+            total[5] = max(total[5], count)
+
+
+def top_fingerprints(n: int = 20, sort: str = "total") -> List[Dict]:
+    """Prosessin top-N sormenjäljet (sort: total | count | max | avg)."""
+    key = SORT_KEYS.get(sort, SORT_KEYS["total"])
+    with _totals_lock:
+        items = [(fp, list(e)) for fp, e in _totals.items()]
+    items.sort(key=lambda kv: key(kv[1]), reverse=True)
+    return [
+        {
+            "fingerprint": fp,
+            "count": e[0],
+            "total_ms": round(e[1] * 1000, 3),
+            "avg_ms": round(e[1] * 1000 / e[0], 3) if e[0] else 0.0,
+            "max_ms": round(e[2] * 1000, 3),
+            "rows": e[3],
+            "requests": e[4],
+            "max_per_request": e[5],
+        }
+        for fp, e in items[:n]
+    ]
+
+
+def reset_totals() -> None:
+    with _totals_lock:
+        _totals.clear()
+
+
+# ---------- Hitaat kyselyt ----------
+
+_slow_threshold_s: Optional[float] = None
+# sormenjälki -> [kerrat, pisin (s)]
+_slow_seen: Dict[str, List] = {}
+_slow_lock = threading.Lock()
+_slow_logger: Optional[logging.Logger] = None
+
+_EXPLAINABLE_RE = re.compile(r"^\s*(SELECT|WITH|UPDATE|DELETE|INSERT|REPLACE)\b", re.I)
+
+
+def enable_slow_query_log(threshold_ms: float, path: str = SLOW_QUERY_LOG) -> None:
+    """Kirjaa threshold_ms:n ylittävät lauseet tiedostoon path (kiertävä, ks. SLOW_QUERY_LOG_*)."""
+    global _slow_threshold_s, _slow_logger
+    with _slow_lock:
+        if _slow_logger is None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=SLOW_QUERY_LOG_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            _slow_logger = logging.getLogger("afc666.slow_queries")
+            _slow_logger.setLevel(logging.INFO)
+            _slow_logger.propagate = False
+            _slow_logger.addHandler(handler)
+        _slow_threshold_s = max(0.0, threshold_ms) / 1000.0
+
+
+def disable_slow_query_log() -> None:
+    global _slow_threshold_s
+    _slow_threshold_s = None
+
+
+def slow_query_enabled() -> bool:
+    return _slow_threshold_s is not None
+
+
+def _is_sqlite(connection) -> bool:
+    from storage.sqlite_backend import SQLiteConnection  # storage → sql_accounting (migraatiot)
+
+    return isinstance(unwrap(connection), (sqlite3.Connection, SQLiteConnection))
+
+
+def _explain(sql: str, params) -> str:
+    """EXPLAIN (SQLite: EXPLAIN QUERY PLAN) omalla yhteydellään; ei kirjata pyynnön lukuihin."""
+    if not _EXPLAINABLE_RE.match(_COMMENT_RE.sub(" ", sql)):
+        return "(lauseelle ei ajeta EXPLAINia)"
+    from utils import get_connection  # utils → sql_accounting
+
+    previous = active()
+    pop(())
+    _local.explaining = True
+    yhteys = None
+    kursori = None
+    try:
+        yhteys = get_connection()
+        prefix = "EXPLAIN QUERY PLAN " if _is_sqlite(yhteys) else "EXPLAIN "
+        kursori = unwrap(yhteys).cursor()
+        if params is None:
+            kursori.execute(prefix + sql)
+        else:
+            kursori.execute(prefix + sql, params)
+        rows = kursori.fetchall() or []
+        names = [d[0] for d in (kursori.description or ())]
+        lines = [" | ".join(names)] if names else []
+        if not rows:
+            return "(ei suunnitelmarivejä)"
+        lines += [" | ".join("" if v is None else str(v) for v in row) for row in rows]
+        return "\n".join(lines)
+    except Exception as exc:
+        return f"(EXPLAIN epäonnistui: {exc})"
+    finally:
+        if kursori:
+            kursori.close()
+        if yhteys:
+            yhteys.close()
+        _local.explaining = False
+        pop(previous)
+
+
+def capture_slow_query(sql: str, params, seconds: float) -> None:
+    """Kirjaa hitaan lauseen; sama sormenjälki lokiin vain ensimmäisellä kerralla."""
+    if getattr(_local, "explaining", False) or _slow_logger is None:
+        return
+    fp = fingerprint(sql)
+    with _slow_lock:
+        seen = _slow_seen.get(fp)
+        if seen is not None:
+            seen[0] += 1
+            seen[1] = max(seen[1], seconds)
+            return
+        _slow_seen[fp] = [1, seconds]
+    plan = _explain(sql, params)
+    _slow_logger.info(
+        "Hidas kysely %.1f ms (raja %g ms)\nsormenjälki: %s\nlause: %s\nparametrit: %s\nEXPLAIN:\n%s\n",
+        seconds * 1000, (_slow_threshold_s or 0.0) * 1000, fp, sql.strip(),
+        repr(params)[:PARAMS_MAX_LEN], plan,
+    )
+
+
+def slow_queries() -> List[Dict]:
+    """Kirjatut hitaat sormenjäljet (kerrat ja pisin kesto), pisin ensin."""
+    with _slow_lock:
+        items = [(fp, list(e)) for fp, e in _slow_seen.items()]
+    items.sort(key=lambda kv: kv[1][1], reverse=True)
+    return [{"fingerprint": fp, "count": e[0], "max_ms": round(e[1] * 1000, 3)} for fp, e in items]
+
+
+def reset_slow_queries() -> None:
+    """Unohtaa kirjatut sormenjäljet; seuraava hidas osuma kirjataan taas EXPLAINin kanssa."""
+    with _slow_lock:
+        _slow_seen.clear()
+
+
+if SLOW_QUERY_MS > 0:
+    enable_slow_query_log(SLOW_QUERY_MS)
+
+
+# ---------- Flask-kytkentä ----------
+
+def _header_safe(text: str) -> str:
+    return text.encode("latin-1", "replace").decode("latin-1")[:HEADER_MAX_LEN]
+
+
+def init_app(app) -> None:
+    """Pyyntökohtainen kirjanpito (AFC_SQL_ACCOUNTING=1 tai debug-tila)."""
+    from flask import g, request
+
+    def enabled() -> bool:
+        return ENABLED or app.debug
+
+    @app.before_request
+    def _start_sql_accounting():
+        if app.debug and not slow_query_enabled():
+            enable_slow_query_log(DEBUG_SLOW_QUERY_MS)
+        if enabled():
+            g.sql_recorder = RequestRecorder()
+            g.sql_previous = push(g.sql_recorder)
+
+    @app.after_request
+    def _sql_headers(response):
+        recorder: Optional[RequestRecorder] = g.get("sql_recorder")
+        if recorder is None:
+            return response
+        response.headers["X-SQL-Statements"] = str(recorder.statements)
+        response.headers["X-SQL-Connections"] = str(recorder.connections)
+        response.headers["X-SQL-Rows"] = str(recorder.rows)
+        response.headers["X-SQL-Time-Ms"] = f"{recorder.seconds * 1000:.3f}"
+        if recorder.by_fingerprint:
+            response.headers["X-SQL-Top"] = _header_safe(
+                " | ".join(f"{e[0]}x {e[1] * 1000:.1f}ms {fp}" for fp, e in recorder.top())
+            )
+        repeated = recorder.repeated()
+        if repeated:
+            response.headers["X-SQL-Repeated"] = _header_safe(
+                " | ".join(f"{count}x {fp}" for fp, count in repeated)
+            )
+        return response
+
+    @app.teardown_request
+    def _finish_sql_accounting(_exc):
+        recorder: Optional[RequestRecorder] = g.pop("sql_recorder", None)
+        if recorder is None:
+            return
+        pop(g.pop("sql_previous"))
+        merge(recorder)
+        for fp, count in recorder.repeated():
+            app.logger.warning("Mahdollinen N+1: %s kertaa pyynnössä %s: %s", count, request.path, fp)
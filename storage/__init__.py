@@ -0,0 +1,28 @@
+"""
+storage - Tietokantataustat
+===========================
+Kaikki pelin tietokantayhteydet kulkevat utils.get_connection()-funktion kautta.
+Tausta valitaan ympäristömuuttujalla AFC_DB_BACKEND:
+
+- "mysql" (oletus): MariaDB/MySQL-yhteyspooli (utils.db_pool)
+- "sqlite": prosessinsisäinen SQLite-tiedosto (storage.sqlite_backend),
+  polku AFC_SQLITE_PATH (oletus: airway666.sqlite3 repositorion juuressa)
+
+SQLite-tausta kääntää pelin MySQL-kyselyt lennossa, joten pelilogiikkaan
+ei tarvita taustakohtaisia haaroja.
+"""
+
+import os
+
+SUPPORTED_BACKENDS = ("mysql", "sqlite")
+
+
+def backend_name() -> str:
+    """Palauttaa valitun tietokantataustan nimen (AFC_DB_BACKEND)."""
+    name = os.environ.get("AFC_DB_BACKEND", "mysql").strip().lower()
+    if name not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Tuntematon AFC_DB_BACKEND: {name!r} (sallitut: {', '.join(SUPPORTED_BACKENDS)})")
+    return name
+
+
+__all__ = ["SUPPORTED_BACKENDS", "backend_name"]
@@ -0,0 +1,189 @@
+"""
+migrations.py - Skeemamuutokset olemassa oleviin tietokantoihin
+================================================================
+Uudet tietokannat saavat ajantasaisen skeeman suoraan (build_db_script.sql,
+sqlite_schema.sql). Vanhoihin kantoihin muutokset ajetaan täältä:
+
+- Jokaisella migraatiolla on tunnistekysely (probe): jos se onnistuu, muutos
+  on jo tehty ja migraatio ohitetaan. Ajaminen on siis aina turvallista.
+- Lauseet ovat MariaDB:n ja SQLiten yhteistä SQL:ää (ei parametreja). Jos
+  murteet eroavat (esim. AUTO_INCREMENT), lause annetaan sanakirjana
+  {"mysql": ..., "sqlite": ...}.
+
+SQLite-tausta ajaa migraatiot automaattisesti avatessaan olemassa olevan
+tiedoston. MariaDB:lle:
+    python -m storage.migrations
+"""
+
+import sqlite3
+from typing import Dict, List, Sequence, Tuple, Union
+
+Statement = Union[str, Dict[str, str]]
+
+# (nimi, tunnistekysely, lauseet)
+MIGRATIONS: Sequence[Tuple[str, str, Sequence[Statement]]] = (
+    (
+        "001_owned_bases_level_and_count",
+        "SELECT current_level, aircraft_count FROM owned_bases WHERE 1 = 0",
+        (
+            "ALTER TABLE owned_bases ADD COLUMN current_level VARCHAR(40) NOT NULL DEFAULT 'SMALL'",
+            "ALTER TABLE owned_bases ADD COLUMN aircraft_count INT NOT NULL DEFAULT 0",
+            # Taso = viimeisin base_upgrades-rivi (historia säilyy ennallaan)
+            """
+            UPDATE owned_bases
+            SET current_level = COALESCE(
+                (SELECT bu.upgrade_code
+                 FROM base_upgrades bu
+                 WHERE bu.base_id = owned_bases.base_id
+                 ORDER BY bu.base_upgrade_id DESC
+                 LIMIT 1),
+                'SMALL')
+            """,
+            # Koneet = myymättömät koneet tukikohdan kentällä
+            """
+            UPDATE owned_bases
+            SET aircraft_count = (
+                SELECT COUNT(*)
+                FROM aircraft a
+                WHERE a.save_id = owned_bases.save_id
+                  AND a.current_airport_ident = owned_bases.base_ident
+                  AND (a.sold_day IS NULL OR a.sold_day = 0))
+            """,
+        ),
+    ),
+    (
+        "002_cash_ledger",
+        "SELECT ledger_id, amount_cents, reason, ref_id FROM cash_ledger WHERE 1 = 0",
+        (
+            {
+                "mysql": """
+                CREATE TABLE cash_ledger (
+                  ledger_id INT AUTO_INCREMENT PRIMARY KEY,
+                  save_id INT NOT NULL,
+                  day INT NOT NULL,
+                  amount_cents BIGINT NOT NULL,
+                  reason VARCHAR(64) NOT NULL,
+                  ref_id INT,
+                  FOREIGN KEY (save_id) REFERENCES game_saves(save_id)
+                ) ENGINE=InnoDB DEFAULT CHARSET=latin1
+                """,
+                "sqlite": """
+                CREATE TABLE cash_ledger (
+                  ledger_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  save_id INT NOT NULL REFERENCES game_saves(save_id),
+                  day INT NOT NULL,
+                  amount_cents BIGINT NOT NULL,
+                  reason VARCHAR(64) NOT NULL,
+                  ref_id INT
+                )
+                """,
+            },
+            "CREATE INDEX idx_cash_ledger_save_day ON cash_ledger (save_id, day)",
+            # Avaussaldo: kirjanpidon summa vastaa nykyistä kassaa
+            """
+            INSERT INTO cash_ledger (save_id, day, amount_cents, reason, ref_id)
+            SELECT save_id, COALESCE(current_day, 1), ROUND(COALESCE(cash, 0) * 100), 'OPENING_BALANCE', NULL
+            FROM game_saves
+            """,
+        ),
+    ),
+    (
+        "003_save_daily_stats",
+        "SELECT save_id, day, cash_cents FROM save_daily_stats WHERE 1 = 0",
+        (
+            """
+            CREATE TABLE save_daily_stats (
+              save_id INT NOT NULL,
+              day INT NOT NULL,
+              cash_cents BIGINT NOT NULL,
+              fleet_size INT NOT NULL,
+              active_contracts INT NOT NULL,
+              earnings_cents BIGINT NOT NULL,
+              PRIMARY KEY (save_id, day),
+              FOREIGN KEY (save_id) REFERENCES game_saves(save_id)
+            )
+            """,
+        ),
+    ),
+    (
+        "004_game_saves_fleet_version",
+        "SELECT fleet_version FROM game_saves WHERE 1 = 0",
+        (
+            # Kasvaa jokaisen konemuutoksen jälkeen; prosessien FleetStoret vertaavat tähän
+            "ALTER TABLE game_saves ADD COLUMN fleet_version INT NOT NULL DEFAULT 0",
+        ),
+    ),
+    (
+        "005_game_saves_contracts_version",
+        "SELECT contracts_version FROM game_saves WHERE 1 = 0",
+        (
+            # Kasvaa sopimus- ja lentomuutosten transaktiossa; haarat (save_fork) vertaavat tähän
+            "ALTER TABLE game_saves ADD COLUMN contracts_version INT NOT NULL DEFAULT 0",
+        ),
+    ),
+)
+
+
+def _dialect(yhteys) -> str:
+    """"sqlite" SQLite-yhteydelle (raaka tai SQLiteConnection), muuten "mysql"."""
+    from sql_accounting import unwrap
+
+    from .sqlite_backend import SQLiteConnection
+
+    return "sqlite" if isinstance(unwrap(yhteys), (sqlite3.Connection, SQLiteConnection)) else "mysql"
+
+
+def _probe(yhteys, sql: str) -> bool:
+    """Palauttaa True, jos tunnistekysely onnistuu (migraatio on jo ajettu)."""
+    kursori = yhteys.cursor()
+    try:
+        kursori.execute(sql)
+        kursori.fetchall()
+        return True
+    except Exception:
+        return False
+    finally:
+        kursori.close()
+
+
+def apply_migrations(yhteys) -> List[str]:
+    """
+    Ajaa puuttuvat migraatiot annetulla yhteydellä (DB-API: cursor()).
+    Kutsuja vastaa transaktiosta/commitista. Palauttaa ajettujen nimet.
+    """
+    applied = []
+    dialect = _dialect(yhteys)
+    for name, probe, statements in MIGRATIONS:
+        if _probe(yhteys, probe):
+            continue
+        kursori = yhteys.cursor()
+        try:
+            for statement in statements:
+                if isinstance(statement, dict):
+                    statement = statement[dialect]
+                kursori.execute(statement)
+        finally:
+            kursori.close()
+        applied.append(name)
+    return applied
+
+
+def main() -> int:
+    from utils import get_connection
+
+    yhteys = get_connection()
+    try:
+        applied = apply_migrations(yhteys)
+        yhteys.commit()
+    finally:
+        yhteys.close()
+    if applied:
+        for name in applied:
+            print(f"✅ Migraatio ajettu: {name}")
+    else:
+        print("ℹ️  Skeema on ajan tasalla.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,305 @@
+"""
+snapshot.py - Yhden tallennuksen vienti ja tuonti tiedostona
+============================================================
+Tallennus (save_id) kirjoitetaan pakattuun, versioituun tiedostoon ja
+voidaan tuoda mihin tahansa tietokantaan (MariaDB tai SQLite) uusilla id:illä.
+Käyttö: varmuuskopiot ja pelaajien bugiraporttien toisto paikallisesti.
+
+Tiedostomuoto (gzip, JSON Lines):
+- 1. rivi: otsake {"format", "version", "save_id", "exported_at"}
+- jokaiselle taululle: {"table", "columns", "rows", "id_min", "id_max"}
+  ja sen perään "rows" kappaletta rivejä JSON-taulukkoina (sarakejärjestys)
+- Decimal ja datetime kirjoitetaan merkkijonoina
+
+Vienti lukee rivit fetchmany-erissä ja kirjoittaa ne suoraan tiedostoon.
+Tuonti ei pidä tauluja muistissa: id:t siirretään vakiosiirtymällä
+(uusi = vanha - id_min + MAX(id) + 1), joten viiteavaimet voidaan kääntää
+rivi kerrallaan ja rivit lisätä executemany-erinä (mysql-connector kokoaa
+ne monirivisiksi INSERTeiksi). Koko tuonti on yksi transaktio.
+
+Huom: save_event_log-viestien tekstissä olevia id:itä (esim. "aircraft_id=3")
+eikä cash_ledger.ref_id-viitteitä muunneta. Vanhaan snapshotiin ilman
+kirjanpitoa lisätään avaussaldorivi. player_fate on siemenkohtainen: rivit tuodaan vain, jos
+siemenellä ei vielä ole kalenteria.
+
+Käyttö:
+    python -m storage.snapshot export 12 save12.afcsave.gz
+    python -m storage.snapshot import save12.afcsave.gz
+"""
+
+import argparse
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+SNAPSHOT_FORMAT = "afc666-save"
+SNAPSHOT_VERSION = 1
+BATCH_SIZE = 2000
+
+# (taulu, pääavain, {viiteavain: viitattu taulu}, WHERE-ehto save_id:llä)
+# Järjestys on viiteavainten mukainen: viitattu taulu tuodaan ennen viittaajaa.
+SNAPSHOT_TABLES: Sequence[Tuple[str, Optional[str], Dict[str, str], str]] = (
+    ("game_saves", "save_id", {}, "save_id = %s"),
+    ("owned_bases", "base_id", {"save_id": "game_saves"}, "save_id = %s"),
+    (
+        "base_upgrades", "base_upgrade_id", {"base_id": "owned_bases"},
+        "base_id IN (SELECT base_id FROM owned_bases WHERE save_id = %s)",
+    ),
+    (
+        "aircraft", "aircraft_id", {"save_id": "game_saves", "base_id": "owned_bases"},
+        "save_id = %s",
+    ),
+    (
+        "aircraft_upgrades", "aircraft_upgrade_id", {"aircraft_id": "aircraft"},
+        "aircraft_id IN (SELECT aircraft_id FROM aircraft WHERE save_id = %s)",
+    ),
+    (
+        "contracts", "contractId", {"save_id": "game_saves", "aircraft_id": "aircraft"},
+        "save_id = %s",
+    ),
+    (
+        "flights", "flight_id",
+        {"save_id": "game_saves", "aircraft_id": "aircraft", "contract_id": "contracts"},
+        "save_id = %s",
+    ),
+    ("save_event_log", "log_id", {"save_id": "game_saves"}, "save_id = %s"),
+    ("cash_ledger", "ledger_id", {"save_id": "game_saves"}, "save_id = %s"),
+    ("save_daily_stats", None, {"save_id": "game_saves"}, "save_id = %s"),
+    (
+        "player_fate", None, {},
+        "seed = (SELECT rng_seed FROM game_saves WHERE save_id = %s)",
+    ),
+)
+
+
+class SnapshotError(Exception):
+    """Virheellinen tai yhteensopimaton snapshot-tiedosto."""
+
+
+def _encode(value):
+    if isinstance(value, Decimal):
+        return format(value, "f")
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode()
+    return value
+
+
+def _write_line(out, obj) -> None:
+    out.write(json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_encode))
+    out.write("\n")
+
+
+# ---------- Vienti ----------
+
+def export_save(save_id: int, path: str) -> Dict[str, int]:
+    """
+    Kirjoittaa tallennuksen 'save_id' tiedostoon 'path'.
+    Palauttaa rivimäärät tauluittain. SnapshotError, jos tallennusta ei ole.
+    """
+    from utils import get_connection
+
+    counts: Dict[str, int] = {}
+    yhteys = get_connection()
+    try:
+        kursori = yhteys.cursor()
+        try:
+            kursori.execute("SELECT 1 FROM game_saves WHERE save_id = %s", (save_id,))
+            if not kursori.fetchall():
+                raise SnapshotError(f"Tallennusta {save_id} ei löytynyt")
+
+            with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as out:
+                _write_line(out, {
+                    "format": SNAPSHOT_FORMAT,
+                    "version": SNAPSHOT_VERSION,
+                    "save_id": save_id,
+                    "exported_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                })
+                for table, pk, _refs, where in SNAPSHOT_TABLES:
+                    if pk:
+                        kursori.execute(
+                            f"SELECT COUNT(*), MIN({pk}), MAX({pk}) FROM {table} WHERE {where}",
+                            (save_id,),
+                        )
+                        total, id_min, id_max = kursori.fetchone()
+                    else:
+                        kursori.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", (save_id,))
+                        total, id_min, id_max = kursori.fetchone()[0], None, None
+
+                    order = f" ORDER BY {pk}" if pk else ""
+                    kursori.execute(f"SELECT * FROM {table} WHERE {where}{order}", (save_id,))
+                    columns = [d[0] for d in kursori.description]
+                    _write_line(out, {
+                        "table": table,
+                        "columns": columns,
+                        "rows": int(total or 0),
+                        "id_min": id_min,
+                        "id_max": id_max,
+                    })
+                    written = 0
+                    while True:
+                        rows = kursori.fetchmany(BATCH_SIZE)
+                        if not rows:
+                            break
+                        for row in rows:
+                            _write_line(out, list(row))
+                        written += len(rows)
+                    if written != int(total or 0):
+                        raise SnapshotError(f"{table}: rivimäärä muuttui viennin aikana")
+                    counts[table] = written
+        finally:
+            kursori.close()
+    finally:
+        yhteys.close()
+    return counts
+
+
+# ---------- Tuonti ----------
+
+def _read_sections(path: str) -> Iterator[Tuple[dict, Iterator[list]]]:
+    """Lukee otsakkeen tarkistettuna ja tuottaa (taulun otsake, rivi-iteraattori) -parit."""
+    with gzip.open(path, "rt", encoding="utf-8") as src:
+        header = json.loads(src.readline() or "null")
+        if not isinstance(header, dict) or header.get("format") != SNAPSHOT_FORMAT:
+            raise SnapshotError("Tiedosto ei ole AFC 666 -tallennussnapshot")
+        if int(header.get("version") or 0) > SNAPSHOT_VERSION:
+            raise SnapshotError(f"Snapshot-versio {header.get('version')} on uudempi kuin tuettu {SNAPSHOT_VERSION}")
+
+        for line in src:
+            section = json.loads(line)
+            remaining = int(section.get("rows") or 0)
+
+            def rows(n=remaining):
+                for _ in range(n):
+                    yield json.loads(src.readline())
+
+            yield section, rows()
+
+
+def import_save(path: str, player_name: Optional[str] = None) -> Tuple[int, Dict[str, int]]:
+    """
+    Tuo snapshotin uudeksi tallennukseksi (kaikki id:t uusia).
+    Palauttaa (uusi save_id, rivimäärät tauluittain).
+    """
+    from utils import get_connection
+
+    known = {t[0]: t for t in SNAPSHOT_TABLES}
+    offsets: Dict[str, int] = {}
+    counts: Dict[str, int] = {}
+    new_save_id = None
+
+    yhteys = get_connection()
+    kursori = yhteys.cursor()
+    try:
+        yhteys.start_transaction()
+        for section, rows in _read_sections(path):
+            table = section.get("table")
+            if table not in known:
+                raise SnapshotError(f"Tuntematon taulu snapshotissa: {table!r}")
+            _, pk, refs, _where = known[table]
+            columns: List[str] = list(section["columns"])
+
+            if table == "player_fate":
+                # Siemenen kalenteri on jaettu: ei korvata olemassa olevaa
+                seed_rows = list(rows)
+                if seed_rows:
+                    seed = seed_rows[0][columns.index("seed")]
+                    kursori.execute("SELECT 1 FROM player_fate WHERE seed = %s LIMIT 1", (seed,))
+                    if kursori.fetchall():
+                        counts[table] = 0
+                        continue
+                rows = iter(seed_rows)
+
+            if pk and section.get("id_min") is not None:
+                kursori.execute(f"SELECT COALESCE(MAX({pk}), 0) FROM {table}")
+                offsets[table] = int(kursori.fetchone()[0]) + 1 - int(section["id_min"])
+
+            remap = []
+            if pk:
+                remap.append((columns.index(pk), table))
+            for col, ref in refs.items():
+                if col in columns:
+                    remap.append((columns.index(col), ref))
+            name_idx = columns.index("player_name") if table == "game_saves" and player_name else None
+
+            sql = (
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join(['%s'] * len(columns))})"
+            )
+            batch: List[list] = []
+            total = 0
+            for row in rows:
+                for idx, ref in remap:
+                    if row[idx] is not None and ref in offsets:
+                        row[idx] = int(row[idx]) + offsets[ref]
+                if name_idx is not None:
+                    row[name_idx] = player_name
+                batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    kursori.executemany(sql, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                kursori.executemany(sql, batch)
+                total += len(batch)
+            counts[table] = total
+
+            if table == "game_saves":
+                if total != 1:
+                    raise SnapshotError("Snapshotissa pitää olla täsmälleen yksi game_saves-rivi")
+                new_save_id = int(section["id_min"]) + offsets["game_saves"]
+
+        if new_save_id is None:
+            raise SnapshotError("Snapshotista puuttuu game_saves")
+        if "cash_ledger" not in counts:
+            kursori.execute(
+                "INSERT INTO cash_ledger (save_id, day, amount_cents, reason, ref_id) "
+                "SELECT save_id, COALESCE(current_day, 1), ROUND(COALESCE(cash, 0) * 100), 'OPENING_BALANCE', NULL "
+                "FROM game_saves WHERE save_id = %s",
+                (new_save_id,),
+            )
+        yhteys.commit()
+    except Exception:
+        yhteys.rollback()
+        raise
+    finally:
+        kursori.close()
+        yhteys.close()
+    return new_save_id, counts
+
+
+# ---------- Komentorivi ----------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="AFC 666 -tallennuksen vienti ja tuonti")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="vie tallennus tiedostoon")
+    p_export.add_argument("save_id", type=int)
+    p_export.add_argument("path")
+    p_import = sub.add_parser("import", help="tuo tiedosto uudeksi tallennukseksi")
+    p_import.add_argument("path")
+    p_import.add_argument("--player-name", help="korvaa pelaajan nimen tuodussa tallennuksessa")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "export":
+            counts = export_save(args.save_id, args.path)
+            print(f"✅ Tallennus {args.save_id} viety: {args.path}")
+        else:
+            new_id, counts = import_save(args.path, player_name=args.player_name)
+            print(f"✅ Tuotu uudeksi tallennukseksi {new_id}")
+    except SnapshotError as e:
+        print(f"❌ {e}")
+        return 1
+    for table, n in counts.items():
+        print(f"   {table}: {n}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,403 @@
+"""
+sqlite_backend.py - Prosessinsisäinen SQLite-tausta
+====================================================
+Tarjoaa mysql-connectorin kanssa yhteensopivan yhteys-/kursorirajapinnan,
+jotta pelin nykyiset kyselyt toimivat sellaisenaan paikallisessa tiedostossa:
+
+- %s-parametrit → ?                 (SQLite-paikkamerkit)
+- SELECT ... FOR UPDATE → SELECT    (transaktio on jo BEGIN IMMEDIATE -lukittu)
+- GREATEST(...) / LEAST(...) → MAX(...) / MIN(...)
+- cursor(dictionary=True), start_transaction(), commit(), rollback(), close()
+
+Tietokanta luodaan ensimmäisellä avauksella: skeema sqlite_schema.sql:stä,
+random_events- ja aircraft_models-siemendata build_db_script.sql:stä ja
+lentokentät airports_seed.csv:stä (täysi OurAirports-CSV voidaan tuoda erikseen).
+
+Käyttö komentoriviltä:
+    python -m storage.sqlite_backend --init
+    python -m storage.sqlite_backend --airports airports.csv   # OurAirports-data
+"""
+
+import argparse
+import csv
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+from .migrations import apply_migrations
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_REPO_DIR = os.path.dirname(_PACKAGE_DIR)
+
+SCHEMA_PATH = os.path.join(_PACKAGE_DIR, "sqlite_schema.sql")
+AIRPORTS_SEED_PATH = os.path.join(_PACKAGE_DIR, "airports_seed.csv")
+BUILD_SCRIPT_PATH = os.path.join(_REPO_DIR, "build_db_script.sql")
+DEFAULT_DB_PATH = os.environ.get("AFC_SQLITE_PATH") or os.path.join(_REPO_DIR, "airway666.sqlite3")
+
+BUSY_TIMEOUT_MS = 5000
+POOL_SIZE = 10
+
+# ---------- Tyyppimuunnokset ----------
+
+_CENTS = Decimal("0.01")
+
+
+def _convert_decimal(raw: bytes) -> Optional[Decimal]:
+    # Kaikki skeeman DECIMAL-sarakkeet ovat DECIMAL(15,2) → pyöristetään senteille
+    try:
+        return Decimal(raw.decode()).quantize(_CENTS, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _convert_datetime(raw: bytes) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(raw.decode())
+    except ValueError:
+        return None
+
+
+# Decimal tallennetaan tekstinä (ei floatin kautta), joten arvo säilyy tarkkana.
+# DECIMAL-sarakkeiden NUMERIC-affiniteetti pitää vertailut numeerisina; luku
+# palautuu Decimaliksi _convert_decimal-muuntimella.
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(" "))
+sqlite3.register_converter("DECIMAL", _convert_decimal)
+sqlite3.register_converter("DATETIME", _convert_datetime)
+sqlite3.register_converter("TIMESTAMP", _convert_datetime)
+
+# ---------- SQL-murteen käännös ----------
+
+_FOR_UPDATE_RE = re.compile(r"\s+FOR\s+UPDATE\b", re.IGNORECASE)
+_GREATEST_RE = re.compile(r"\bGREATEST\s*\(", re.IGNORECASE)
+_LEAST_RE = re.compile(r"\bLEAST\s*\(", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def translate_sql(sql: str) -> str:
+    """Kääntää pelin MySQL-kyselyn SQLite-murteelle (tulos välimuistissa)."""
+    sql = _FOR_UPDATE_RE.sub("", sql)
+    sql = _GREATEST_RE.sub("MAX(", sql)
+    sql = _LEAST_RE.sub("MIN(", sql)
+    return sql.replace("%s", "?")
+
+
+# Lausemäärä prosessissa (benchmark käyttää tätä palvelimen Questions-laskurin sijaan)
+_statement_count = 0
+
+
+def statement_count() -> int:
+    """Palauttaa tämän prosessin SQLite-taustalla suorittamien lauseiden määrän."""
+    return _statement_count
+
+
+class SQLiteCursor:
+    """mysql-connectorin kursoria vastaava kääre sqlite3-kursorille."""
+
+    def __init__(self, raw_cursor: sqlite3.Cursor, dictionary: bool = False):
+        self._cur = raw_cursor
+        self._dictionary = dictionary
+
+    def execute(self, sql: str, params: Optional[Sequence] = None) -> None:
+        global _statement_count
+        _statement_count += 1
+        self._cur.execute(translate_sql(sql), tuple(params) if params else ())
+
+    def executemany(self, sql: str, seq_of_params) -> None:
+        global _statement_count
+        _statement_count += 1
+        self._cur.executemany(translate_sql(sql), [tuple(p) for p in seq_of_params])
+
+    def _shape(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {d[0]: v for d, v in zip(self._cur.description, row)}
+
+    def fetchone(self):
+        return self._shape(self._cur.fetchone())
+
+    def fetchmany(self, size: int = 1):
+        return [self._shape(r) for r in self._cur.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._shape(r) for r in self._cur.fetchall()]
+
+    def __iter__(self):
+        for row in self._cur:
+            yield self._shape(row)
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self._cur.rowcount
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    @property
+    def column_names(self):
+        return tuple(d[0] for d in self._cur.description or ())
+
+    def close(self) -> None:
+        try:
+            self._cur.close()
+        except sqlite3.Error:
+            pass
+
+
+class SQLiteConnection:
+    """
+    Poolattu yhteys, jonka rajapinta vastaa PooledMySQLConnectionia.
+    Oletuksena autocommit (kuten MySQL-poolissa); start_transaction() aloittaa
+    kirjoitustransaktion heti (BEGIN IMMEDIATE), mikä korvaa FOR UPDATE -lukot.
+    """
+
+    def __init__(self, pool: "_ConnectionPool", raw: sqlite3.Connection):
+        self._pool = pool
+        self._raw = raw
+
+    def cursor(self, dictionary: bool = False, **_kwargs) -> SQLiteCursor:
+        return SQLiteCursor(self._raw.cursor(), dictionary=dictionary)
+
+    def start_transaction(self, **_kwargs) -> None:
+        self._raw.execute("BEGIN IMMEDIATE")
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._raw is not None and self._raw.in_transaction
+
+    def commit(self) -> None:
+        if self._raw.in_transaction:
+            self._raw.execute("COMMIT")
+
+    def rollback(self) -> None:
+        if self._raw.in_transaction:
+            self._raw.execute("ROLLBACK")
+
+    def close(self) -> None:
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw)
+
+    def __enter__(self) -> "SQLiteConnection":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+
+class _ConnectionPool:
+    """Yhden tietokantatiedoston yhteyspooli (uudelleenkäyttää avatut yhteydet)."""
+
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        # Seurantaa varten (/metrics): lainassa olevat ja avatut yhteydet
+        self.in_use = 0
+        self.opened = 0
+
+    def _open(self) -> sqlite3.Connection:
+        raw = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level=None,  # autocommit; transaktiot hallitaan itse
+            check_same_thread=False,
+            timeout=BUSY_TIMEOUT_MS / 1000.0,
+        )
+        raw.execute("PRAGMA journal_mode=WAL")
+        raw.execute("PRAGMA synchronous=NORMAL")
+        raw.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return raw
+
+    def acquire(self) -> SQLiteConnection:
+        with self._lock:
+            raw = self._idle.pop() if self._idle else None
+            self.in_use += 1
+            if raw is None:
+                self.opened += 1
+        if raw is None:
+            try:
+                raw = self._open()
+            except Exception:
+                with self._lock:
+                    self.in_use -= 1
+                raise
+        return SQLiteConnection(self, raw)
+
+    def release(self, raw: sqlite3.Connection) -> None:
+        if raw.in_transaction:
+            raw.execute("ROLLBACK")
+        with self._lock:
+            self.in_use -= 1
+            if len(self._idle) < self.size:
+                self._idle.append(raw)
+                return
+        raw.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Poolin tilannekuva: koko, lainassa, vapaana ja avatut yhteensä."""
+        with self._lock:
+            return {"size": self.size, "in_use": self.in_use, "idle": len(self._idle), "opened": self.opened}
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for raw in idle:
+            raw.close()
+
+
+_pools: Dict[str, _ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(path: str) -> _ConnectionPool:
+    pool = _pools.get(path)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            initialize_database(path)
+            pool = _pools[path] = _ConnectionPool(path)
+        return pool
+
+
+def get_connection(path: Optional[str] = None) -> SQLiteConnection:
+    """Hakee yhteyden annetun (oletus: AFC_SQLITE_PATH) tietokannan poolista."""
+    return _get_pool(os.path.abspath(path or DEFAULT_DB_PATH)).acquire()
+
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    """Avoinna olevien poolien tilannekuvat tiedostopolun mukaan."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {path: pool.stats() for path, pool in pools}
+
+
+def close_database(path: Optional[str] = None) -> None:
+    """Sulkee tietokannan vapaat yhteydet ja unohtaa poolin (esim. ennen tiedoston poistoa)."""
+    key = os.path.abspath(path or DEFAULT_DB_PATH)
+    with _pools_lock:
+        pool = _pools.pop(key, None)
+    if pool is not None:
+        pool.close_all()
+
+
+# ---------- Skeema ja siemendata ----------
+
+
+def _seed_insert_sql() -> str:
+    """Palauttaa build_db_script.sql:n siemen-INSERTit (random_events, aircraft_models)."""
+    with open(BUILD_SCRIPT_PATH, encoding="utf-8") as f:
+        script = f.read()
+    start = script.find("INSERT INTO random_events")
+    if start < 0:
+        raise RuntimeError("build_db_script.sql ei sisällä random_events-siemendataa")
+    return script[start:]
+
+
+def _load_airports_csv(raw: sqlite3.Connection, csv_path: str) -> int:
+    """
+    Lukee lentokentät CSV:stä (OurAirports-muoto tai airports_seed.csv) airport-tauluun.
+    Palauttaa lisättyjen rivien määrän.
+    """
+    columns = ("ident", "type", "name", "latitude_deg", "longitude_deg", "elevation_ft",
+               "continent", "iso_country", "iso_region", "municipality", "gps_code", "iata_code")
+    rows = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for rec in csv.DictReader(f):
+            if not rec.get("ident"):
+                continue
+            rows.append(tuple((rec.get(c) or None) for c in columns))
+    raw.executemany(
+        f"INSERT OR REPLACE INTO airport ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        rows,
+    )
+    return len(rows)
+
+
+def _split_statements(script: str) -> List[str]:
+    """Pilkkoo SQL-skriptin lauseiksi (sqlite3.complete_statement huomioi merkkijonot)."""
+    statements, buf = [], []
+    for line in script.splitlines(keepends=True):
+        buf.append(line)
+        text = "".join(buf)
+        if sqlite3.complete_statement(text):
+            if text.strip():
+                statements.append(text)
+            buf = []
+    return statements
+
+
+def initialize_database(path: str) -> bool:
+    """
+    Luo skeeman ja siemendatan, jos tietokanta on tyhjä; muuten ajaa
+    puuttuvat migraatiot. Palauttaa True jos tietokanta alustettiin.
+    """
+    raw = sqlite3.connect(path, isolation_level=None, timeout=BUSY_TIMEOUT_MS / 1000.0)
+    try:
+        raw.execute("BEGIN IMMEDIATE")
+        try:
+            exists = raw.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'game_saves'"
+            ).fetchone()
+            if exists:
+                # Olemassa oleva tiedosto: tuodaan skeema ajan tasalle
+                apply_migrations(raw)
+                raw.execute("COMMIT")
+                return False
+            with open(SCHEMA_PATH, encoding="utf-8") as f:
+                schema = f.read()
+            for statement in _split_statements(schema) + _split_statements(_seed_insert_sql()):
+                raw.execute(statement)
+            _load_airports_csv(raw, AIRPORTS_SEED_PATH)
+            raw.execute("COMMIT")
+        except Exception:
+            if raw.in_transaction:
+                raw.execute("ROLLBACK")
+            raise
+        return True
+    finally:
+        raw.close()
+
+
+def import_airports(csv_path: str, path: Optional[str] = None) -> int:
+    """Tuo OurAirports-CSV:n airport-tauluun (korvaa samat identit)."""
+    with get_connection(path) as yhteys:
+        raw = yhteys._raw
+        raw.execute("BEGIN IMMEDIATE")
+        count = _load_airports_csv(raw, csv_path)
+        raw.execute("COMMIT")
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="AFC 666 SQLite-tietokannan hallinta")
+    parser.add_argument("--path", default=DEFAULT_DB_PATH, help="tietokantatiedosto")
+    parser.add_argument("--init", action="store_true", help="luo skeema ja siemendata")
+    parser.add_argument("--airports", help="tuo lentokentät OurAirports-CSV:stä")
+    args = parser.parse_args(argv)
+
+    path = os.path.abspath(args.path)
+    if args.init:
+        created = initialize_database(path)
+        print(f"✅ Tietokanta {'luotu' if created else 'oli jo olemassa'}: {path}")
+    if args.airports:
+        count = import_airports(args.airports, path)
+        print(f"✈️  Tuotiin {count} lentokenttää tiedostosta {args.airports}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,214 @@
+-- --------------------------------------------------------
+-- Flight Game -skeema SQLite-taustalle
+-- --------------------------------------------------------
+-- Vastaa build_db_script.sql:n rakennetta. Tyyppinimet pidetään samoina
+-- (DECIMAL, DATETIME), jotta sqlite_backend osaa muuntaa arvot takaisin
+-- Decimal- ja datetime-olioiksi. Siemendata (random_events, aircraft_models)
+-- luetaan suoraan build_db_script.sql:stä.
+
+-- --------------------------------------------------------
+-- airport (flight_game-tietokannan kenttätaulu, pelin käyttämät sarakkeet)
+-- --------------------------------------------------------
+CREATE TABLE IF NOT EXISTS airport (
+  ident VARCHAR(40) PRIMARY KEY,
+  type VARCHAR(40),
+  name VARCHAR(100),
+  latitude_deg DOUBLE,
+  longitude_deg DOUBLE,
+  elevation_ft INT,
+  continent VARCHAR(40),
+  iso_country VARCHAR(40),
+  iso_region VARCHAR(40),
+  municipality VARCHAR(100),
+  gps_code VARCHAR(40),
+  iata_code VARCHAR(40)
+);
+CREATE INDEX IF NOT EXISTS idx_airport_type ON airport (type);
+
+CREATE TABLE IF NOT EXISTS game_saves (
+  save_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  player_name VARCHAR(40),
+  current_day INT,
+  cash DECIMAL(15,2),
+  difficulty VARCHAR(40),
+  status VARCHAR(40),
+  rng_seed BIGINT,
+  created_at DATETIME,
+  updated_at DATETIME,
+  fleet_version INT NOT NULL DEFAULT 0,
+  contracts_version INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS owned_bases (
+  base_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  save_id INT NOT NULL REFERENCES game_saves(save_id),
+  base_ident VARCHAR(40) NOT NULL,
+  base_name VARCHAR(100) NOT NULL,
+  acquired_day INT NOT NULL,
+  purchase_cost DECIMAL(15,2) NOT NULL DEFAULT 0.00,
+  sold_day INT NULL,
+  is_headquarters BOOLEAN DEFAULT FALSE,
+  current_level VARCHAR(40) NOT NULL DEFAULT 'SMALL',
+  aircraft_count INT NOT NULL DEFAULT 0,
+  created_at DATETIME NOT NULL,
+  updated_at DATETIME NOT NULL,
+  CONSTRAINT uq_base_per_save UNIQUE (save_id, base_ident)
+);
+
+CREATE TABLE IF NOT EXISTS aircraft_models (
+  model_code VARCHAR(40) PRIMARY KEY,
+  manufacturer VARCHAR(40),
+  model_name VARCHAR(40),
+  purchase_price DECIMAL(15,2),
+  base_cargo_kg DOUBLE,
+  range_km DOUBLE,
+  cruise_speed_kts DOUBLE,
+  category VARCHAR(40),
+  upkeep_price DECIMAL(15,2),
+  efficiency_score DOUBLE,
+  co2_kg_per_km DOUBLE,
+  eco_class VARCHAR(40),
+  eco_fee_multiplier DOUBLE
+);
+
+CREATE TABLE IF NOT EXISTS aircraft (
+  aircraft_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  model_code VARCHAR(40) REFERENCES aircraft_models(model_code),
+  base_level INT,
+  current_airport_ident VARCHAR(40),
+  registration VARCHAR(40),
+  nickname VARCHAR(40),
+  acquired_day INT,
+  purchase_price DECIMAL(15,2),
+  condition_percent INT,
+  status VARCHAR(40),
+  hours_flown INT,
+  sold_day INT,
+  sale_price DECIMAL(15,2),
+  speed_kph DOUBLE,
+  save_id INT REFERENCES game_saves(save_id),
+  base_id INT REFERENCES owned_bases(base_id)
+);
+CREATE INDEX IF NOT EXISTS idx_aircraft_save ON aircraft (save_id);
+
+CREATE TABLE IF NOT EXISTS random_events (
+  event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  event_name VARCHAR(100) NOT NULL,
+  description TEXT,
+  weather_description TEXT,
+  chance_max INT,
+  package_multiplier DOUBLE,
+  plane_damage INT,
+  days DOUBLE,
+  duration INT,
+  sound_file VARCHAR(255)
+);
+
+CREATE TABLE IF NOT EXISTS contracts (
+  contractId INTEGER PRIMARY KEY AUTOINCREMENT,
+  payload_kg DOUBLE,
+  reward DECIMAL(15,2),
+  penalty DECIMAL(15,2),
+  priority VARCHAR(40),
+  created_day INT,
+  deadline_day INT,
+  accepted_day INT,
+  completed_day INT,
+  status VARCHAR(40),
+  lost_packages INT,
+  damaged_packages INT,
+  final_reward DECIMAL(15,2),
+  event_adjustment DECIMAL(15,2),
+  save_id INT REFERENCES game_saves(save_id),
+  aircraft_id INT REFERENCES aircraft(aircraft_id),
+  ident VARCHAR(40),
+  event_id INT REFERENCES random_events(event_id)
+);
+CREATE INDEX IF NOT EXISTS idx_contracts_save_status ON contracts (save_id, status);
+
+CREATE TABLE IF NOT EXISTS save_event_log (
+  log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  save_id INT NOT NULL REFERENCES game_saves(save_id),
+  event_day INT NOT NULL,
+  event_type VARCHAR(40) NOT NULL,
+  payload TEXT,
+  created_at DATETIME NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_event_log_save_day ON save_event_log (save_id, event_day);
+CREATE INDEX IF NOT EXISTS idx_event_log_type ON save_event_log (event_type);
+
+CREATE TABLE IF NOT EXISTS cash_ledger (
+  ledger_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  save_id INT NOT NULL REFERENCES game_saves(save_id),
+  day INT NOT NULL,
+  amount_cents BIGINT NOT NULL,
+  reason VARCHAR(64) NOT NULL,
+  ref_id INT
+);
+CREATE INDEX IF NOT EXISTS idx_cash_ledger_save_day ON cash_ledger (save_id, day);
+
+CREATE TABLE IF NOT EXISTS save_daily_stats (
+  save_id INT NOT NULL REFERENCES game_saves(save_id),
+  day INT NOT NULL,
+  cash_cents BIGINT NOT NULL,
+  fleet_size INT NOT NULL,
+  active_contracts INT NOT NULL,
+  earnings_cents BIGINT NOT NULL,
+  PRIMARY KEY (save_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS flights (
+  flight_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  created_day INT,
+  dep_day INT,
+  arrival_day INT,
+  status VARCHAR(40),
+  distance_km DOUBLE,
+  schedule_delay_min INT,
+  emission_kg_co2 DOUBLE,
+  eco_fee DECIMAL(15,2),
+  dep_ident VARCHAR(40),
+  arr_ident VARCHAR(40),
+  aircraft_id INT REFERENCES aircraft(aircraft_id),
+  save_id INT REFERENCES game_saves(save_id),
+  contract_id INT REFERENCES contracts(contractId)
+);
+CREATE INDEX IF NOT EXISTS idx_flights_save_status ON flights (save_id, status, arrival_day);
+
+CREATE TABLE IF NOT EXISTS aircraft_upgrades (
+  aircraft_upgrade_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  aircraft_id INT REFERENCES aircraft(aircraft_id),
+  upgrade_code VARCHAR(40),
+  level INT,
+  installed_day INT
+);
+CREATE INDEX IF NOT EXISTS idx_air_upg_air_code ON aircraft_upgrades (aircraft_id, upgrade_code);
+CREATE INDEX IF NOT EXISTS idx_air_upg_day ON aircraft_upgrades (installed_day);
+
+CREATE TABLE IF NOT EXISTS base_upgrades (
+  base_upgrade_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  base_id INT REFERENCES owned_bases(base_id),
+  upgrade_code VARCHAR(40),
+  installed_day INT,
+  upgrade_cost DECIMAL(15,2)
+);
+CREATE INDEX IF NOT EXISTS idx_base_upgrades_base_day ON base_upgrades (base_id, installed_day);
+CREATE INDEX IF NOT EXISTS idx_base_upgrades_code ON base_upgrades (upgrade_code);
+
+CREATE TABLE IF NOT EXISTS player_fate (
+  seed INT NOT NULL,
+  day INT NOT NULL,
+  event_name VARCHAR(100) NOT NULL,
+  PRIMARY KEY (seed, day)
+);
+
+CREATE TABLE IF NOT EXISTS market_aircraft (
+  market_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  model_code VARCHAR(40) NOT NULL REFERENCES aircraft_models(model_code),
+  purchase_price DECIMAL(15,2) NOT NULL,
+  condition_percent INT NOT NULL,
+  hours_flown INT NOT NULL,
+  manufactured_day INT NOT NULL,
+  market_notes TEXT NULL,
+  listed_day INT NOT NULL
+);
@@ -0,0 +1,50 @@
+"""
+test_history.py - Historiakaavion harvennus (LTTB ja ämpäröinti)
+================================================================
+Ajo:
+    python -m pytest -q test_history.py
+"""
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def history(sqlite_env):
+    from session_helpers import history
+    return history
+
+
+def _series(n):
+    return [(day, (day * 37) % 11 * 100) for day in range(1, n + 1)]
+
+
+@pytest.mark.parametrize("threshold", [0, 1, 2])
+def test_lttb_small_threshold_keeps_only_endpoints(history, threshold):
+    points = _series(50)
+    assert history.lttb(points, threshold) == [points[0], points[-1]]
+
+
+@pytest.mark.parametrize("threshold", [3, 10, 49])
+def test_lttb_returns_threshold_points(history, threshold):
+    points = _series(50)
+    out = history.lttb(points, threshold)
+    assert len(out) == threshold
+    assert out[0] == points[0] and out[-1] == points[-1]
+    assert out == sorted(out)
+
+
+def test_lttb_short_series_unchanged(history):
+    points = _series(2)
+    assert history.lttb(points, 300) == points
+    assert history.lttb(points, 1) == points
+
+
+def test_downsample_history_single_bucket(history):
+    rows = [
+        {"day": d, "cash_cents": c, "fleet_size": 3, "active_contracts": 1, "earnings_cents": 10}
+        for d, c in _series(40)
+    ]
+    result = history.downsample_history(rows, 1, 40, 1)
+    assert len(result["buckets"]) == 1
+    assert result["buckets"][0]["earnings_cents"] == 400
+    assert result["points"] == [(1, rows[0]["cash_cents"]), (40, rows[-1]["cash_cents"])]
@@ -0,0 +1,320 @@
+"""
+test_query_counts.py - SQL-lauseiden ja yhteyksien ylärajat API-reiteittäin
+===========================================================================
+Käynnistää api_server.appin väliaikaista SQLite-kantaa vasten, luo
+edustavan tallennuksen (30 konetta, 5 tukikohtaa, 20 aktiivista sopimusta)
+ja kutsuu jokaista /api-reittiä sql_accounting.recording()-lohkossa.
+
+Jokaisella reitillä on odotettu 2xx-tila, yläraja lauseille ja yhteyden
+otoille sekä yhden sormenjäljen toistoille (MAX_REPEAT). Rajat eivät riipu
+laivaston koosta, joten rivikohtainen kysely (N+1, esim. koneittainen
+ECO-haku) kaatuu heti 30 koneella. Scenario.prepare() luo ennen mittausta
+tilan, jota reitti tarvitsee (esim. korjattava kone, saapuvat lennot), ja
+MIN_STATEMENTS kaataa mittauksen, joka ei ajanut mitattavaa koodia.
+Uusi reitti ilman rajaa kaataa test_every_api_route_has_budget-testin.
+
+api-fixture (conftest.py) kytkee profiloinnin (AFC_PROFILING) ja
+SQL-kirjanpidon (AFC_SQL_ACCOUNTING) päälle, jotta /api/debug-reitit vastaavat.
+
+Ajo:
+    python -m pytest -q test_query_counts.py
+"""
+
+import re
+
+import pytest
+
+# Lehtimoduuli: ei tuo utilsia eikä lue tietokantataustaa
+import sql_accounting
+
+FLEET_SIZE = 30
+BASE_COUNT = 5
+ACTIVE_CONTRACTS = 20
+SEED = 6661234
+STARTING_CASH = 50_000_000
+
+# Yksi sormenjälki saa toistua pyynnössä enintään näin monta kertaa
+# (30 koneen N+1 ylittää rajan selvästi)
+MAX_REPEAT = 5
+
+# Korjausreitin kone lasketaan tähän kuntoon ennen mittausta
+REPAIR_FROM_CONDITION = 60
+
+# Alaraja lauseille: oletuksena 1 (0, jos yläraja on 0). Päivänvaihdossa
+# saapuu vähintään ACTIVE_CONTRACTS lentoa, joiden käsittely on rivikohtaista;
+# päivä ilman saapumisia on alle 10 lausetta. Pikakelaus pysähtyy ensimmäiseen saapumiseen.
+MIN_STATEMENTS = {
+    ("POST", "/api/game/advance-day"): 2 * ACTIVE_CONTRACTS,
+    ("POST", "/api/game/fast-forward"): 20,
+}
+
+# (metodi, polku, rungon avain, odotettu tila, max lauseet, max yhteydet, max toistot)
+# Polun paikkamerkit täytetään Scenario-oliosta. Järjestys on ajojärjestys:
+# muuttavat reitit ovat lopussa.
+ROUTES = [
+    ("GET", "/api/game", None, 200, 2, 2, None),
+    ("GET", "/api/game/stats", None, 200, 7, 2, None),
+    ("GET", "/api/game/events", None, 200, 1, 1, None),
+    ("GET", "/api/game/forecast", None, 200, 2, 2, None),
+    ("GET", "/api/game/history", None, 200, 2, 2, None),
+    ("GET", "/api/games", None, 200, 1, 1, None),
+    ("GET", "/api/tasks", None, 200, 1, 1, None),
+    ("GET", "/api/events", None, 200, 3, 3, None),
+    ("GET", "/api/events/timeline", None, 200, 3, 3, None),
+    ("GET", "/api/map-data", None, 200, 5, 2, None),
+    ("GET", "/api/aircrafts", None, 200, 1, 1, None),
+    ("GET", "/api/aircrafts/{aircraft_id}", None, 200, 1, 1, None),
+    ("GET", "/api/aircrafts/{idle_aircraft_id}/task-offers", None, 200, 4, 4, None),
+    ("GET", "/api/bases", None, 200, 1, 1, None),
+    ("GET", "/api/bases/capacity", None, 200, 1, 1, None),
+    ("GET", "/api/bases/available", None, 200, 2, 2, None),
+    ("GET", "/api/market/new", None, 200, 2, 2, None),
+    # Ensimmäinen haku täydentää käytettyjen markkinan (INSERT per ilmoitus, ei per kone)
+    ("GET", "/api/market/used", None, 200, 12, 3, 8),
+    ("GET", "/api/clubhouse", None, 200, 0, 0, None),
+    ("GET", "/api/game/forks", None, 200, 0, 0, None),
+    ("GET", "/api/game/forks/{fork_id}", None, 200, 1, 1, None),
+    ("GET", "/api/game/forks/{fork_id}/aircrafts/{idle_aircraft_id}/task-offers", None, 200, 4, 4, None),
+    ("GET", "/api/debug/profiles", None, 200, 0, 0, None),
+    ("GET", "/api/debug/profiles/{profile_name}", None, 200, 0, 0, None),
+    ("GET", "/api/debug/sql", None, 200, 0, 0, None),
+    ("POST", "/api/game/save", None, 200, 1, 1, None),
+    ("POST", "/api/clubhouse", "clubhouse", 200, 7, 3, None),
+    # Konemuutokset: kirjoittaja kasvattaa game_saves.fleet_versionia samassa
+    # transaktiossa (UPDATE + SELECT, kun store on ladattu), jotta muut prosessit huomaavat muutoksen
+    ("POST", "/api/tasks", "task", 201, 10, 3, None),
+    ("POST", "/api/tasks/bulk", "tasks_bulk", 201, 11, 3, None),
+    ("POST", "/api/aircrafts/{aircraft_id}/upgrade", "confirm", 200, 12, 6, None),
+    # Korjaus: kunto laskettu prepare():ssa, joten mitataan oikea korjaus (kassa, kirjanpito, loki)
+    ("POST", "/api/aircrafts/{spare_aircraft_id}/repair", None, 200, 13, 5, None),
+    ("POST", "/api/bases/{base_id}/upgrade", "confirm", 200, 10, 4, None),
+    ("POST", "/api/bases/buy", "base", 201, 10, 5, None),
+    ("POST", "/api/market/buy", "market_new", 201, 13, 4, None),
+    ("POST", "/api/game/forks", None, 201, 12, 4, None),
+    # Haaran päivät: saapumisten käsittely on rivikohtaista (UPDATE/loki per lento)
+    ("POST", "/api/game/forks/{fork_id}/advance", "days", 200, 160, 14, FLEET_SIZE + 5),
+    ("POST", "/api/game/forks/{fork_id}/tasks", "fork_tasks", 200, 12, 4, None),
+    ("POST", "/api/game/forks/{fork_id}/purchase", "model", 201, 14, 5, None),
+    ("POST", "/api/game/forks/{fresh_fork_id}/commit", None, 200, 30, 3, None),
+    ("DELETE", "/api/game/forks/{fork_id}", None, 200, 0, 0, None),
+    # Päivänvaihto: saapumisten käsittely on rivikohtaista (UPDATE per lento),
+    # joten toistoraja on laivaston kokoinen; lauseiden yläraja kattaa 30 saapumista
+    ("POST", "/api/game/advance-day", None, 200, 200, 8, FLEET_SIZE + 5),
+    ("POST", "/api/game/fast-forward", None, 200, 400, 16, 2 * FLEET_SIZE + 10),
+    ("POST", "/api/games/{save_id}/load", None, 200, 2, 1, None),
+    ("POST", "/api/games", "new_game", 201, 20, 6, None),
+]
+
+
+class Scenario:
+    """Edustava tallennus ja apurit reittien parametreille."""
+
+    def __init__(self, api_server, make_save):
+        self.api = api_server
+        self.session = make_save(SEED, FLEET_SIZE, STARTING_CASH)
+        self.save_id = self.session.save_id
+        self.client = api_server.app.test_client()
+        self._activate()
+
+        # Lisätukikohdat (kotitukikohdan lisäksi)
+        available = self.client.get("/api/bases/available").get_json()["available_bases"]
+        for airport in available[: BASE_COUNT - 1]:
+            assert self.client.post("/api/bases/buy", json={"ident": airport["ident"]}).status_code == 201
+        self.spare_base_ident = available[BASE_COUNT - 1]["ident"]
+
+        # Historiaa muutamalle päivälle, sitten 20 sopimusta käyntiin
+        for _ in range(3):
+            self.session.advance_to_next_day(silent=True)
+        fleet = self.client.get("/api/aircrafts").get_json()["aircraft"]
+        items = [{"aircraft_id": p["aircraft_id"], "offer": self._offer(p["aircraft_id"])}
+                 for p in fleet[:ACTIVE_CONTRACTS]]
+        results = self.session.accept_task_offers_bulk(items)
+        assert sum(1 for r in results if r.get("ok")) == ACTIVE_CONTRACTS
+
+        self.aircraft_id = fleet[0]["aircraft_id"]
+        self.idle_ids = [p["aircraft_id"] for p in fleet[ACTIVE_CONTRACTS:]]
+        self.base_id = self.client.get("/api/bases").get_json()["owned_bases"][0]["base_id"]
+        self._fork_id = None
+
+        # Oikea profiilitiedosto /api/debug/profiles/<nimi>-reitille
+        response = self.client.get("/api/game", query_string={"_profile": "collapsed"})
+        self.profile_name = response.headers["X-AFC-Profile-File"]
+
+    def _activate(self) -> None:
+        self.api.ACTIVE_SAVE_ID = self.save_id
+
+    def _execute(self, sql: str, params: tuple, aircraft_ids=()) -> int:
+        """
+        Suora muutos kantaan mittauksen ulkopuolella; palauttaa muuttuneiden rivien
+        määrän. aircraft_ids: muuttuneet koneet, joista FleetStore päivitetään.
+        """
+        from airplane import get_fleet_store
+        from utils import get_connection
+
+        store = get_fleet_store(self.save_id)
+        yhteys = get_connection()
+        kursori = None
+        try:
+            kursori = yhteys.cursor()
+            kursori.execute(sql, params)
+            changed = kursori.rowcount
+            fleet_version = store.bump_version(kursori) if aircraft_ids else None
+            yhteys.commit()
+        finally:
+            if kursori:
+                kursori.close()
+            yhteys.close()
+        if aircraft_ids:
+            store.refresh(aircraft_ids, fleet_version)
+        return changed
+
+    def prepare(self, method: str, path: str) -> None:
+        """Tila, jota reitti tarvitsee, jotta mittaus ajaa reitin varsinaisen työn."""
+        if path.endswith("/repair"):
+            # Täysikuntoista konetta ei korjata: lasketaan kunto, ja FleetStore päivitetään
+            aircraft_id = self.idle_ids[-1]
+            self._execute(
+                "UPDATE aircraft SET condition_percent = %s WHERE aircraft_id = %s AND save_id = %s",
+                (REPAIR_FROM_CONDITION, aircraft_id, self.save_id),
+                aircraft_ids=[aircraft_id],
+            )
+        elif (method, path) == ("POST", "/api/game/advance-day"):
+            # Kaikki ilmassa olevat lennot saapuvat mitattavana päivänä
+            moved = self._execute(
+                """
+                UPDATE flights
+                SET arrival_day = (SELECT current_day + 1 FROM game_saves WHERE save_id = %s)
+                WHERE save_id = %s AND status IN ('ENROUTE', 'ENROUTE_RTB')
+                """,
+                (self.save_id, self.save_id),
+            )
+            assert moved >= ACTIVE_CONTRACTS, f"Vain {moved} lentoa ilmassa"
+        elif (method, path) == ("POST", "/api/game/fast-forward"):
+            # Päivänvaihdon jälkeen koneet ovat maassa: uudet sopimukset käyntiin
+            fleet = self.client.get("/api/aircrafts").get_json()["aircraft"]
+            idle = [p["aircraft_id"] for p in fleet if p["status"] == "IDLE"][:ACTIVE_CONTRACTS]
+            items = [{"aircraft_id": i, "offer": self._offer(i)} for i in idle]
+            response = self.client.post("/api/tasks/bulk", json={"items": items})
+            assert response.status_code == 201, response.get_data(as_text=True)[:300]
+
+    def _offer(self, aircraft_id: int) -> dict:
+        offers = self.client.get(f"/api/aircrafts/{aircraft_id}/task-offers").get_json()["offers"]
+        return offers[0]
+
+    def fork_id(self) -> str:
+        """Avoin haara (luodaan tarvittaessa mittauksen ulkopuolella)."""
+        if self._fork_id is None or self.client.get(f"/api/game/forks/{self._fork_id}").status_code != 200:
+            self._activate()
+            self._fork_id = self.client.post("/api/game/forks").get_json()["fork_id"]
+        return self._fork_id
+
+    def idle_aircraft_id(self) -> int:
+        return self.idle_ids[0]
+
+    def fields(self, path: str) -> dict:
+        out = {}
+        if "{fork_id}" in path:
+            out["fork_id"] = self.fork_id()
+        if "{fresh_fork_id}" in path:
+            # Hyväksyntä vaatii haaran, jonka jälkeen oikea tallennus ei ole muuttunut
+            self._fork_id = None
+            out["fresh_fork_id"] = self.fork_id()
+        out.update(
+            aircraft_id=self.aircraft_id,
+            idle_aircraft_id=self.idle_aircraft_id(),
+            spare_aircraft_id=self.idle_ids[-1],
+            base_id=self.base_id,
+            save_id=self.save_id,
+            profile_name=self.profile_name,
+        )
+        return out
+
+    def body(self, key):
+        if key is None:
+            return None
+        self._activate()
+        if key == "clubhouse":
+            return {"game": "coin_flip", "bet": 1000, "choice": "heads"}
+        if key == "task":
+            return {"aircraft_id": self.idle_ids[0], "offer": self._offer(self.idle_ids[0])}
+        if key == "tasks_bulk":
+            ids = self.idle_ids[1:4]
+            return {"items": [{"aircraft_id": i, "offer": self._offer(i)} for i in ids]}
+        if key == "confirm":
+            return {"confirm": True}
+        if key == "base":
+            return {"ident": self.spare_base_ident}
+        if key == "market_new":
+            return {"type": "new", "model_code": "C172"}
+        if key == "days":
+            return {"days": 3}
+        if key == "fork_tasks":
+            fork_id = self.fork_id()
+            aid = self.idle_ids[-1]
+            offers = self.client.get(f"/api/game/forks/{fork_id}/aircrafts/{aid}/task-offers").get_json()["offers"]
+            return {"items": [{"aircraft_id": aid, "offer": offers[0]}]}
+        if key == "model":
+            return {"model_code": "C172"}
+        if key == "new_game":
+            return {"player_name": "querycounts", "rng_seed": SEED + 1}
+        raise KeyError(key)
+
+
+@pytest.fixture(scope="module")
+def scenario(api, make_save):
+    return Scenario(api, make_save)
+
+
+def measure(scenario: Scenario, method: str, path: str, body_key):
+    """Ajaa pyynnön kirjaajan alla; palauttaa (url, vastaus, kirjaaja)."""
+    url = path.format(**scenario.fields(path))
+    body = scenario.body(body_key)
+    scenario.prepare(method, path)
+    scenario._activate()
+    with sql_accounting.recording(sql_accounting.RequestRecorder()) as recorder:
+        response = scenario.client.open(url, method=method, json=body)
+    scenario._activate()
+    return url, response, recorder
+
+
+def _describe(recorder: sql_accounting.RequestRecorder) -> str:
+    return "\n".join(f"  {e[0]:>4}x {fp[:160]}" for fp, e in recorder.top(10))
+
+
+@pytest.mark.parametrize(
+    "method,path,body_key,status,max_statements,max_connections,max_repeat",
+    ROUTES,
+    ids=[f"{r[0]} {r[1]}" for r in ROUTES],
+)
+def test_route_query_budget(scenario, method, path, body_key, status, max_statements, max_connections,
+                            max_repeat):
+    url, response, recorder = measure(scenario, method, path, body_key)
+    assert response.status_code == status, (
+        f"{method} {url} → {response.status_code} (odotettiin {status}): {response.get_data(as_text=True)[:300]}"
+    )
+    details = _describe(recorder)
+    min_statements = MIN_STATEMENTS.get((method, path), 1 if max_statements else 0)
+    assert recorder.statements >= min_statements, (
+        f"{method} {url}: {recorder.statements} lausetta < {min_statements} (mitattava koodi ei ajanut?)\n{details}"
+    )
+    assert recorder.statements <= max_statements, (
+        f"{method} {url}: {recorder.statements} lausetta > {max_statements}\n{details}"
+    )
+    assert recorder.connections <= max_connections, (
+        f"{method} {url}: {recorder.connections} yhteyttä > {max_connections}\n{details}"
+    )
+    repeated = recorder.repeated(threshold=(max_repeat or MAX_REPEAT) + 1)
+    assert not repeated, f"{method} {url}: rivikohtainen kysely (N+1?)\n{details}"
+
+
+def test_every_api_route_has_budget(api):
+    budgeted = {(m, re.sub(r"\{[^}]+\}", "{}", p)) for m, p, *_ in ROUTES}
+    missing = []
+    for rule in api.app.url_map.iter_rules():
+        if not rule.rule.startswith("/api/"):
+            continue
+        shape = re.sub(r"<[^>]+>", "{}", rule.rule)
+        for method in rule.methods - {"HEAD", "OPTIONS"}:
+            if (method, shape) not in budgeted:
+                missing.append(f"{method} {rule.rule}")
+    assert not missing, "Reitit ilman kyselyrajaa: " + ", ".join(sorted(missing))
@@ -0,0 +1,101 @@
+"""
+test_save_fork.py - Haaran hyväksyntä ja ristiriidat oikean tallennuksen kanssa
+===============================================================================
+Ajo:
+    python -m pytest -q test_save_fork.py
+"""
+
+import pytest
+
+SEED = 6665150
+FLEET_SIZE = 4
+STARTING_CASH = 5_000_000
+DISPATCHED = 3
+
+
+@pytest.fixture
+def game(api, make_save, monkeypatch):
+    """Uusi tallennus aktiivisena: (Flask-testiasiakas, GameSession)."""
+    session = make_save(SEED, FLEET_SIZE, STARTING_CASH)
+    monkeypatch.setattr(api, "ACTIVE_SAVE_ID", session.save_id)
+    return api.app.test_client(), session
+
+
+def _count(sql: str, save_id: int) -> int:
+    from utils import get_connection
+
+    yhteys = get_connection()
+    kursori = yhteys.cursor()
+    try:
+        kursori.execute(sql, (save_id,))
+        return int(kursori.fetchone()[0])
+    finally:
+        kursori.close()
+        yhteys.close()
+
+
+def _dispatch_tasks(client, n: int) -> None:
+    """Lähettää n konetta tehtäviin oikeassa tallennuksessa (POST /api/tasks)."""
+    fleet = client.get("/api/aircrafts").get_json()["aircraft"]
+    for plane in fleet[:n]:
+        aid = plane["aircraft_id"]
+        offer = client.get(f"/api/aircrafts/{aid}/task-offers").get_json()["offers"][0]
+        response = client.post("/api/tasks", json={"aircraft_id": aid, "offer": offer})
+        assert response.status_code == 201, response.get_data(as_text=True)[:300]
+
+
+def test_commit_rejected_when_real_save_dispatched_tasks(game):
+    from save_fork import ForkConflict, create_fork, discard_fork
+
+    client, session = game
+    fork = create_fork(session.save_id)
+    try:
+        _dispatch_tasks(client, DISPATCHED)
+        fork.advance(2)
+        with pytest.raises(ForkConflict):
+            fork.commit()
+    finally:
+        discard_fork(fork.fork_id)
+
+    # Oikean tallennuksen tehtävät ja koneiden tilat säilyivät
+    assert _count("SELECT COUNT(*) FROM contracts WHERE save_id = %s", session.save_id) == DISPATCHED
+    assert _count(
+        "SELECT COUNT(*) FROM aircraft WHERE save_id = %s AND status = 'BUSY'", session.save_id
+    ) == DISPATCHED
+
+
+def test_commit_applies_fork_when_real_save_unchanged(game):
+    from save_fork import create_fork
+
+    client, session = game
+    fork = create_fork(session.save_id)
+    fork.advance(2)
+    fork.commit()
+
+    state = client.get("/api/game").get_json()
+    assert state["current_day"] == session.current_day + 2
+
+
+def test_fork_task_offers_use_fork_aircraft(api, game, make_save, monkeypatch):
+    from save_fork import create_fork, discard_fork
+
+    client, session = game
+    fork = create_fork(session.save_id)
+    try:
+        response = client.post(f"/api/game/forks/{fork.fork_id}/purchase", json={"model_code": "C172"})
+        assert response.status_code == 201, response.get_data(as_text=True)[:300]
+        with fork.session() as fork_session:
+            fork_ids = {p.aircraft_id for p in fork_session.fleet.all()}
+        real_ids = {p["aircraft_id"] for p in client.get("/api/aircrafts").get_json()["aircraft"]}
+        (fork_only,) = fork_ids - real_ids
+        assert client.get(f"/api/aircrafts/{fork_only}/task-offers").status_code == 404
+
+        # Haaran koneet haetaan haaran tallennuksesta, vaikka aktiivinen tallennus vaihtuu
+        other = make_save(SEED + 1, 1, STARTING_CASH)
+        monkeypatch.setattr(api, "ACTIVE_SAVE_ID", other.save_id)
+        # Vain haarassa oleva kone löytyy haaran tarjousreitiltä
+        response = client.get(f"/api/game/forks/{fork.fork_id}/aircrafts/{fork_only}/task-offers")
+        assert response.status_code == 200, response.get_data(as_text=True)[:300]
+        assert response.get_json()["offers"]
+    finally:
+        discard_fork(fork.fork_id)
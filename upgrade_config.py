@@ -9,8 +9,9 @@ from decimal import Decimal
 # --------- Palkkion muodostus ------------------------------------
 # Perusmalli pitää palkkion riippuvuuden selkeänä: lineaarinen painon ja etäisyyden suhteen.
 # Pienin palkkio estää mitättömät keikat; sakko sidotaan suoraan palkkioon.
-TASK_REWARD_PER_KG: Decimal = Decimal("2.50")   # €/kg
-TASK_REWARD_PER_KM: Decimal = Decimal("1.90")    # €/km
+# Palkkio = (payload * PER_KG + distance * PER_KM) * efektiivinen ECO-kerroin.
+TASK_REWARD_PER_KG: Decimal = Decimal("10.10")  # €/kg
+TASK_REWARD_PER_KM: Decimal = Decimal("6.90")    # €/km
 TASK_MIN_REWARD: Decimal = Decimal("250.00")     # alin sallittu palkkio
 TASK_PENALTY_RATIO: Decimal = Decimal("0.30")    # sakko-osuus palkkiosta
 
@@ -1,28 +1,116 @@
-import mysql.connector
-from mysql.connector import pooling
+import os
+import threading
+import time
 from contextlib import contextmanager
 
-# Alustetaan yhteyspooli globaalisti, jotta yhteyksiä kierrätetään
-# Tämä estää "Can't assign requested address" -virheet raskaassa kuormassa
-db_pool = mysql.connector.pooling.MySQLConnectionPool(
-    pool_name="mypool",
-    pool_size=10,
-    host="127.0.0.1",
-    user="golda",
-    password="GoldaKoodaa",
-    database="airway666",
-    autocommit=True
+import metrics
+import sql_accounting
+from storage import backend_name
+
+# Tietokantatausta valitaan kerran käynnistyksessä (AFC_DB_BACKEND=mysql|sqlite)
+DB_BACKEND = backend_name()
+
+db_pool = None
+if DB_BACKEND == "mysql":
+    import mysql.connector
+    from mysql.connector import pooling
+
+    # Alustetaan yhteyspooli globaalisti, jotta yhteyksiä kierrätetään
+    # Tämä estää "Can't assign requested address" -virheet raskaassa kuormassa
+    db_pool = mysql.connector.pooling.MySQLConnectionPool(
+        pool_name="mypool",
+        pool_size=10,
+        host="127.0.0.1",
+        user="golda",
+        password="GoldaKoodaa",
+        database="airway666",
+        autocommit=True
+    )
+else:
+    from storage import sqlite_backend
+
+# Poolin seuranta (/metrics): yhteyden oton kesto ja loppuun käyneen poolin virheet
+_POOL_WAIT_SECONDS = metrics.histogram(
+    "afc_db_pool_wait_seconds", "Yhteyden oton kesto poolista"
+)
+_POOL_EXHAUSTED = metrics.counter(
+    "afc_db_pool_exhausted_total", "Yhteyttä ei saatu, koska pooli oli täynnä"
 )
 
+
+def _pool_samples():
+    """[(("backend", "pool"), kenttä-sanakirja)] - in_use, idle ja size poolikohtaisesti."""
+    if DB_BACKEND == "mysql":
+        size = db_pool.pool_size
+        queue = getattr(db_pool, "_cnx_queue", None)  # yksityinen; puuttuessa vain koko
+        idle = queue.qsize() if queue is not None else None
+        fields = {"size": size}
+        if idle is not None:
+            fields.update(idle=idle, in_use=size - idle)
+        return [(("mysql", db_pool.pool_name), fields)]
+    return [(("sqlite", os.path.basename(path)), stats)
+            for path, stats in sqlite_backend.pool_stats().items()]
+
+
+def _pool_gauge(field):
+    return lambda: [(labels, fields[field]) for labels, fields in _pool_samples() if field in fields]
+
+
+metrics.gauge("afc_db_pool_size", "Poolin koko", _pool_gauge("size"), ("backend", "pool"))
+metrics.gauge("afc_db_pool_in_use", "Lainassa olevat yhteydet", _pool_gauge("in_use"), ("backend", "pool"))
+metrics.gauge("afc_db_pool_idle", "Vapaat yhteydet", _pool_gauge("idle"), ("backend", "pool"))
+if DB_BACKEND == "sqlite":
+    metrics.cache_stats("sqlite_translate", source=sqlite_backend.translate_sql.cache_info)
+
+# Säiekohtainen yhteyden ohjaus (esim. save_fork: esikatselu erillisessä kannassa)
+_override = threading.local()
+
+
 def get_connection():
     """Hakee tietokantayhteyden poolista ja varmistaa sen puhtauden."""
-    cnx = db_pool.get_connection()
+    override = getattr(_override, "value", None)
+    if override is not None:
+        return sql_accounting.instrument(override[1]())
+
+    started = time.perf_counter()
+    if DB_BACKEND == "sqlite":
+        cnx = sqlite_backend.get_connection()
+        _POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+        return sql_accounting.instrument(cnx)
+
+    try:
+        cnx = db_pool.get_connection()
+    except mysql.connector.errors.PoolError:
+        _POOL_EXHAUSTED.inc()
+        raise
+    _POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
     try:
         # Varmistetaan että edellinen transaktio on päättynyt
         cnx.rollback()
     except Exception:
         pass
-    return cnx
+    # Lauseiden kirjanpito vain sql_accounting.recording()-lohkossa
+    return sql_accounting.instrument(cnx)
+
+
+@contextmanager
+def connection_override(scope: str, factory):
+    """
+    Ohjaa tämän säikeen get_connection()-kutsut factory()-yhteyksiin with-lohkon ajaksi.
+    scope nimeää kannan prosessin välimuisteille (ks. connection_scope).
+    """
+    previous = getattr(_override, "value", None)
+    _override.value = (scope, factory)
+    try:
+        yield
+    finally:
+        _override.value = previous
+
+
+def connection_scope():
+    """Palauttaa aktiivisen ohjauksen nimen tai None (oletuskanta)."""
+    override = getattr(_override, "value", None)
+    return override[0] if override is not None else None
 
 
 @contextmanager